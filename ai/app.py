@@ -1,15 +1,31 @@
 # ai/app.py
 
-from flask import Flask, request, jsonify
-from flask_cors import CORS
 import sys
 import os
+import io
+import json
 import re
+import threading
 from pathlib import Path
-from dotenv import load_dotenv
 
-# --- LOAD ENV DARI FOLDER ai/ (root ai) ---
+# allow import "core.*" from ai/
 current_file = Path(__file__).resolve()
+sys.path.append(str(current_file.parent))
+
+from core.startup_profiler import print_report, profile_step
+from core.startup_profiler import report as startup_report
+from core import metrics
+from core.admission import get_admission_controller
+from core.singleflight import SingleFlight
+from core.reranker import get_reranker
+from core.bundle import BundleError, BUNDLE_WATCH_INTERVAL_S, get_bundle_manager
+
+with profile_step("import flask, flask_cors, dotenv", kind="import"):
+    from flask import Flask, Response, g, has_request_context, request, jsonify, stream_with_context
+    from flask_cors import CORS
+    from dotenv import load_dotenv
+
+# --- LOAD ENV DARI FOLDER ai/ (root ai) ---
 project_root = current_file.parent
 env_path = project_root / ".env"
 load_dotenv(dotenv_path=env_path)
@@ -18,58 +34,112 @@ load_dotenv(dotenv_path=env_path)
 IS_VERCEL = os.environ.get("VERCEL", "0") == "1"
 USE_SUPABASE = IS_VERCEL or os.environ.get("USE_SUPABASE", "0") == "1"
 
-# Only import genai if needed (lazy load)
+# google.generativeai is imported & configured lazily (core.llm_helper.get_genai)
 API_KEY = os.getenv("GOOGLE_API_KEY")
 if API_KEY:
-    import google.generativeai as genai
     print(f"✅ API Key terdeteksi: {API_KEY[:5]}*******")
-    genai.configure(api_key=API_KEY)
 else:
     print("❌ CRITICAL ERROR: API Key tidak ditemukan!")
 
-# allow import "core.*" from ai/
-sys.path.append(str(current_file.parent))
-
 app = Flask(__name__)
 CORS(app)
 
-# --- EAGER INITIALIZATION AT STARTUP ---
+# --- STARTUP MODES ---
+# FAST_START=1   : serve immediately, load catalog + model in a background thread
+#                  (lexical answers while warming). Default on Vercel.
+# PRELOAD_MODELS=1: load everything before serving (default for containers)
+# otherwise      : load on first request
 PRELOAD_MODELS = os.environ.get("PRELOAD_MODELS", "1") == "1"
+FAST_START = os.environ.get("FAST_START", "1" if IS_VERCEL else "0") == "1"
+
+# Katalog (parquet + embeddings + FAISS index) dipegang BundleManager sebagai satu
+# snapshot berversi; reload menukar snapshot tanpa memutus request yang sedang jalan
+bundles = get_bundle_manager()
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+
+def current_catalog():
+    """Snapshot katalog aktif; satu request selalu memakai snapshot yang sama."""
+    if has_request_context():
+        snapshot = g.get("catalog")
+        if snapshot is None:
+            snapshot = g.catalog = bundles.current()
+        return snapshot
+    return bundles.current()
+
+
+def get_matcher():
+    return current_catalog().matcher
+
+
+def get_nutrition_calc():
+    return current_catalog().nutrition_calc
+
+
+@bundles.on_swap
+def _invalidate_catalog_caches(snapshot):
+    """
+    Cache & artifact turunan katalog lama dibuang; di-load ulang saat dibutuhkan dan
+    dicek terhadap catalog_fingerprint bundle baru. Cache rekomendasi sudah di-key per versi.
+    """
+    from core.query_table import reset_query_table
+    from core.recommendation_engine import reset_recommendation_engine
+    from core.spell import reset_spell_index
+    from core.substitution import reset_substitution_graph
+
+    reset_recommendation_engine()
+    reset_substitution_graph()
+    reset_query_table()
+    reset_spell_index()
+
 
-if PRELOAD_MODELS:
+# Reload bundle: SIGHUP ke worker (kill -HUP <pid worker>), atau poll BUNDLE_DIR/CURRENT
+if bundles.install_signal_handler():
+    print("📦 Bundle reload via signal enabled")
+bundles.watch(BUNDLE_WATCH_INTERVAL_S)
+
+
+def _warm_up_in_background():
+    """Fast-start: model loads in its own thread while catalog/index load here."""
+    try:
+        from core.matcher import load_model_in_background
+
+        loader = load_model_in_background()
+        bundles.current()
+        print("✅ FoodMatcher + NutritionCalculator loaded (lexical search available)")
+        if loader is not None:
+            loader.join()
+        get_reranker()
+        print_report()
+    except Exception as e:
+        print(f"❌ Background warmup failed: {e}")
+
+
+if FAST_START:
+    print("⚡ Fast-start mode: serving now, loading models in background")
+    threading.Thread(target=_warm_up_in_background, name="warmup", daemon=True).start()
+elif PRELOAD_MODELS:
     print("⏳ Pre-loading models... (this may take a moment)")
 
-    from core.matcher import FoodMatcher, get_embedding_model
-    from core.nutrition import NutritionCalculator
+    from core.matcher import get_embedding_model
 
     # Pre-load embedding model first (shared across instances)
     get_embedding_model()
 
-    matcher = FoodMatcher()
-    print("✅ FoodMatcher loaded")
+    bundles.current()
+    print("✅ FoodMatcher + NutritionCalculator loaded")
 
-    nutrition_calc = NutritionCalculator()
-    print("✅ NutritionCalculator loaded")
+    # Cross-encoder untuk rerank sebelum Gemini (no-op jika RERANKER=0)
+    get_reranker()
+    print_report()
 else:
     print("⚡ Lazy loading mode (PRELOAD_MODELS=0)")
-    matcher = None
-    nutrition_calc = None
 
 
-def get_matcher():
-    global matcher
-    if matcher is None:
-        from core.matcher import FoodMatcher
-        matcher = FoodMatcher()
-    return matcher
+def models_ready() -> bool:
+    from core.matcher import is_model_loaded
 
-
-def get_nutrition_calc():
-    global nutrition_calc
-    if nutrition_calc is None:
-        from core.nutrition import NutritionCalculator
-        nutrition_calc = NutritionCalculator()
-    return nutrition_calc
+    return bundles.loaded() and is_model_loaded()
 
 
 # --- CANDIDATE PARSING UTILITY ---
@@ -85,69 +155,89 @@ def parse_candidates(raw_text: str) -> list[str]:
     return [c.strip() for c in candidates if c and c.strip()]
 
 
-def match_candidate(candidate: str, top_n: int = 5) -> dict:
+def format_matches(final_matches: list, top_n: int = 5) -> list:
+    """
+    Public match shape: food_id, nama, similarity (rounded), best first.
+    Hasil rerank menambah rerankScore dan diurutkan menurut skor itu.
+    """
+    results = []
+    for match in final_matches:
+        item = {
+            "food_id": match.get("food_id", match.get("id")),
+            "nama": match.get("nama", match.get("name", "")),
+            "similarity": round(float(match.get("similarity", 0)), 4),
+        }
+        if "rerank_score" in match:
+            item["rerankScore"] = round(float(match["rerank_score"]), 4)
+        results.append(item)
+
+    results.sort(key=lambda x: x.get("rerankScore", x["similarity"]), reverse=True)
+    return results[:top_n]
+
+
+def lookup_shortcuts(user_id, candidates: list) -> dict:
+    """{index: match_data} untuk kandidat yang pernah dikonfirmasi user (core/user_shortcuts.py)."""
+    if user_id is None or not candidates:
+        return {}
+    from core.user_shortcuts import get_user_shortcuts
+
+    store = get_user_shortcuts()
+    if store is None:
+        return {}
+    return {
+        i: {
+            "matches": [{"food_id": s["food_id"], "nama": s["nama"], "similarity": 1.0}],
+            "method": "user_shortcut",
+            "search_terms": [],
+            "portion": {"quantity": s["quantity"], "unit": s["unit"]},
+        }
+        # Versi snapshot request (bukan bundles.version()): food_id harus dari katalog yang sama dengan match
+        for i, s in store.lookup(user_id, candidates, current_catalog().version).items()
+    }
+
+
+# Request identik (kandidat ternormalisasi, top_n, mode, versi katalog) yang sedang berjalan digabung
+_match_flight = SingleFlight("match_candidate")
+
+
+def match_candidate(candidate: str, top_n: int = 5, mode: str | None = None, snapshot=None) -> dict:
     """
     Attempt 1: Direct database search
     Attempt 2: LLM refinement (Gemini) if score < 0.5
+    (see core.refinement for the speculative / eager modes, LLM_REFINE_MODE)
+
+    snapshot: katalog yang dipakai (default current_catalog()); wajib diteruskan
+    dari thread tanpa request context agar tetap memakai snapshot request.
+
+    Concurrent requests for the same normalized candidate share one in-flight
+    computation (single-flight); the returned dict is shared, do not mutate it.
     """
     if not candidate or not candidate.strip():
         return {"matches": [], "method": "none"}
 
-    try:
-        from core.llm_helper import generate_food_candidates
-
-        food_matcher = get_matcher()
-        final_matches = []
-        used_method = "unknown"
-        search_terms = []
-
-        for attempt in range(1, 3):
-            print(f"   🔄 Attempt {attempt}/2 for '{candidate}'")
-
-            if attempt == 1:
-                print("      👉 Strategy: Direct Database Search")
-                search_terms = [candidate]
-                used_method = "direct_match"
-            else:
-                print("      👉 Strategy: LLM Refinement (Gemini)")
-                search_terms = generate_food_candidates(candidate)
-                print(f"      🤖 LLM Terms: {search_terms}")
-                used_method = "llm_enhanced"
+    from core.text_utils import normalize_query
 
-            current_matches = food_matcher.match_with_llm_candidates(
-                search_terms, top_final=top_n
-            )
+    snapshot = snapshot or current_catalog()
+    # Versi katalog ikut di key: saat hot reload, food_id snapshot lama tidak bocor ke request baru
+    key = (normalize_query(candidate) or candidate, top_n, mode, snapshot.version)
+    result, shared = _match_flight.do(key, _match_candidate, candidate, top_n, mode, snapshot)
+    if shared:
+        print(f"   🔗 '{candidate}' digabung dengan request yang sedang berjalan")
+    return result
 
-            if current_matches:
-                top_score = current_matches[0].get("similarity", 0)
-                print(f"      📊 Best Score: {top_score:.4f}")
-
-                if top_score >= 0.5:
-                    print("      ✅ Match Found! Stopping loop.")
-                    final_matches = current_matches
-                    break
-                else:
-                    print("      ⚠️ Score < 0.5. Trying next strategy...")
-                    if attempt == 2:
-                        print("      ❌ Last attempt. Returning best effort.")
-                        final_matches = current_matches
-            else:
-                print("      ❌ No matches found in DB.")
 
-        results = []
-        for match in final_matches:
-            results.append(
-                {
-                    "food_id": match.get("food_id", match.get("id")),
-                    "nama": match.get("nama", match.get("name", "")),
-                    "similarity": round(float(match.get("similarity", 0)), 4),
-                }
-            )
+def _match_candidate(candidate: str, top_n: int, mode: str | None, snapshot) -> dict:
+    try:
+        from core.refinement import search_with_refinement
 
-        results.sort(key=lambda x: x["similarity"], reverse=True)
+        print(f"   🔄 Matching '{candidate}'")
+        refined = search_with_refinement(snapshot.matcher, candidate, top_n=top_n, mode=mode)
+        final_matches = refined["matches"]
+        used_method = refined["method"]
+        search_terms = refined["search_terms"]
 
         return {
-            "matches": results[:top_n],
+            "matches": format_matches(final_matches, top_n),
             "method": used_method,
             "search_terms": search_terms,
         }
@@ -157,11 +247,110 @@ def match_candidate(candidate: str, top_n: int = 5) -> dict:
         return {"matches": [], "method": "error", "error": str(e)}
 
 
+def match_candidates_two_phase(candidates: list, top_n: int = 5, allow_llm: bool = True) -> list:
+    """
+    Batched variant of match_candidate for a whole request:
+    one direct search pass, at most one Gemini call for every low-scoring
+    candidate, one retrieval pass over all returned terms.
+    """
+    from core.refinement import match_candidates_batched
+
+    try:
+        refined = match_candidates_batched(get_matcher(), candidates, top_n=top_n, allow_llm=allow_llm)
+    except Exception as e:
+        print(f"❌ Error in batched matching: {e}")
+        return [{"matches": [], "method": "error", "error": str(e)} for _ in candidates]
+
+    return [
+        {
+            "matches": format_matches(r["matches"], top_n),
+            "method": r["method"],
+            "search_terms": r["search_terms"],
+        }
+        for r in refined
+    ]
+
+
+def iter_match_results(candidates: list, top_n: int = 5, mode: str = "batched", refine_mode: str | None = None):
+    """
+    Yield (index, match_data) per kandidat begitu hasilnya final (dipakai mode stream).
+    batched   : kandidat yang lolos direct search keluar dulu, yang butuh Gemini menyusul
+    lainnya   : match_candidate per kandidat paralel, urutan sesuai selesai
+    refine_mode None = LLM_REFINE_MODE (juga untuk batched: "off" berarti tanpa Gemini/rerank)
+    """
+    from core.refinement import resolve_refine_mode
+
+    refine_mode = resolve_refine_mode(refine_mode)
+    if mode == "batched":
+        from core.refinement import iter_candidates_batched
+
+        done = set()
+        try:
+            for i, r in iter_candidates_batched(
+                get_matcher(), candidates, top_n=top_n, allow_llm=refine_mode != "off"
+            ):
+                done.add(i)
+                yield i, {
+                    "matches": format_matches(r["matches"], top_n),
+                    "method": r["method"],
+                    "search_terms": r["search_terms"],
+                }
+        except Exception as e:
+            print(f"❌ Error in batched matching: {e}")
+            for i in range(len(candidates)):
+                if i not in done:
+                    yield i, {"matches": [], "method": "error", "error": str(e)}
+        return
+
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    # Thread pool tidak punya request context: snapshot request di-resolve di sini sekali
+    snapshot = current_catalog()
+    with ThreadPoolExecutor(max_workers=max(1, min(len(candidates), STREAM_MATCH_WORKERS))) as pool:
+        futures = {
+            pool.submit(match_candidate, c, top_n, refine_mode, snapshot): i for i, c in enumerate(candidates)
+        }
+        for future in as_completed(futures):
+            try:
+                match_data = future.result()
+            except Exception as e:
+                print(f"❌ Error matching candidate '{candidates[futures[future]]}': {e}")
+                match_data = {"matches": [], "method": "error", "error": str(e)}
+            yield futures[future], match_data
+
+
+# "batched": two-phase matching (max one Gemini call per request)
+# "per_candidate": match_candidate one by one
+# Keduanya mengikuti LLM_REFINE_MODE (atau refineMode per request); "off" = tanpa Gemini/rerank
+# Kandidat yang diproses paralel pada /api/match-foods stream mode per_candidate
+STREAM_MATCH_WORKERS = int(os.environ.get("STREAM_MATCH_WORKERS", "4"))
+MATCH_FOODS_MODE = os.environ.get("MATCH_FOODS_MODE", "batched").strip().lower()
+
 print(f"🚀 App ready (mode: {'supabase' if USE_SUPABASE else 'local'})")
 
 # --- ROUTES ---
 
 
+# --- ADMISSION CONTROL ---
+# Batas request berjalan + antrian per grup endpoint (core/admission.py).
+# Saat penuh: 503 cepat dengan Retry-After; saat tertekan: Gemini dilewati.
+admission = get_admission_controller()
+
+
+def _reject_busy(e):
+    print(f"🚦 Request ditolak ({e}), Retry-After {e.retry_after}s")
+    response = jsonify({"error": "Service busy, try again later", "reason": e.reason, "retryAfter": e.retry_after})
+    return response, 503, {"Retry-After": str(e.retry_after)}
+
+
+def llm_allowed(endpoint: str) -> bool:
+    """False saat mode degraded (antrian penuh / RSS dekat budget): refinement Gemini dilewati."""
+    if admission.degraded():
+        metrics.incr(f"admission.{endpoint}.degraded")
+        return False
+    return True
+
+
 @app.route("/health", methods=["GET"])
 def health_check():
     return jsonify(
@@ -169,63 +358,178 @@ def health_check():
             "status": "healthy",
             "service": "NutriMori AI Service",
             "mode": "supabase" if USE_SUPABASE else "local",
+            "modelReady": models_ready(),
+            "catalogVersion": bundles.version(),
         }
     )
 
 
+@app.route("/health/startup", methods=["GET"])
+def startup_profile():
+    """Time spent per import and init step since the process started."""
+    return jsonify({"modelReady": models_ready(), **startup_report()})
+
+
+@app.route("/ready", methods=["GET"])
+def readiness():
+    """
+    Readiness probe: 200 jika model siap dan RSS di bawah MEMORY_BUDGET_MB,
+    503 jika belum. Selalu menyertakan kedalaman antrian dan RSS.
+    """
+    state = admission.readiness()
+    ready = models_ready() and state["level"] != "critical"
+    return jsonify({"ready": ready, "modelReady": models_ready(), **state}), 200 if ready else 503
+
+
+@app.route("/api/metrics", methods=["GET"])
+def metrics_endpoint():
+    """Counter proses + stats single-flight (berapa request yang digabung)."""
+    return jsonify(metrics.snapshot())
+
+
 @app.route("/api/match-foods", methods=["POST"])
+@admission.guard("match", _reject_busy)
 def match_foods():
     """
     Request Body:
-        { "text": "tahu telor dan 3 tempe, nasi goreng", "limit": 5 }
+        { "text": "tahu telor dan 3 tempe, nasi goreng", "limit": 5,
+          "userId": "...",                 # optional, jawab frasa yang pernah dikonfirmasi user dulu
+          "mode": "batched",               # optional, default MATCH_FOODS_MODE
+          "refineMode": "speculative",     # optional, default LLM_REFINE_MODE
+          "stream": true }                 # optional, NDJSON per kandidat (lihat stream_match_foods)
     """
     try:
         data = request.get_json()
         if not data or "text" not in data:
             return jsonify({"error": "Missing text field"}), 400
 
+        from core.refinement import resolve_refine_mode
+
         raw_text = data["text"]
         top_n = data.get("limit", 5)
+        refine_mode = resolve_refine_mode(data.get("refineMode"))
+        degraded = not llm_allowed("match")
+        if degraded:
+            refine_mode = "off"
 
-        print(f"\n📥 Match Foods Request: '{raw_text}'")
+        print(f"\n📥 Match Foods Request: '{raw_text}'" + (" (degraded: tanpa Gemini)" if degraded else ""))
 
         candidates = parse_candidates(raw_text)
         print(f"📋 Parsed Candidates: {candidates}")
+        shortcuts = lookup_shortcuts(data.get("userId"), candidates)
+        pending = [c for i, c in enumerate(candidates) if i not in shortcuts]
+
+        if data.get("stream"):
+            response = stream_match_foods(
+                candidates, top_n, data.get("mode", MATCH_FOODS_MODE), refine_mode, shortcuts=shortcuts
+            )
+            if degraded:
+                response.headers["X-Degraded"] = "llm-skipped"
+            return response
 
         if not candidates:
             return jsonify([]), 200
 
+        if data.get("mode", MATCH_FOODS_MODE) == "batched" and pending:
+            batched = iter(match_candidates_two_phase(
+                pending, top_n=top_n, allow_llm=refine_mode != "off"
+            ))
+        else:
+            batched = None
+
         results = []
-        for candidate in candidates:
+        for i, candidate in enumerate(candidates):
             print(f"\n🔍 Processing candidate: '{candidate}'")
-            match_data = match_candidate(candidate, top_n=top_n)
-
-            results.append(
-                {
-                    "candidate": candidate,
-                    "match_result": match_data.get("matches", []),
-                    "method": match_data.get("method", "unknown"),
-                    "search_terms": match_data.get("search_terms", []),
-                }
-            )
+            if i in shortcuts:
+                match_data = shortcuts[i]
+            elif batched is not None:
+                match_data = next(batched)
+            else:
+                match_data = match_candidate(candidate, top_n=top_n, mode=refine_mode)
+
+            result = {
+                "candidate": candidate,
+                "match_result": match_data.get("matches", []),
+                "method": match_data.get("method", "unknown"),
+                "search_terms": match_data.get("search_terms", []),
+            }
+            if "portion" in match_data:
+                result["portion"] = match_data["portion"]
+            results.append(result)
 
             print(
                 f"   ✅ Found {len(match_data.get('matches', []))} matches (method: {match_data.get('method')})"
             )
 
-        return jsonify(results), 200
+        return jsonify(results), 200, ({"X-Degraded": "llm-skipped"} if degraded else {})
 
     except Exception as e:
         print(f"❌ Server Error in match_foods: {e}")
         return jsonify({"error": str(e)}), 500
 
 
+def stream_match_foods(candidates: list, top_n: int, mode: str, refine_mode: str | None, shortcuts: dict = None):
+    """
+    NDJSON stream untuk /api/match-foods:
+      {"type": "candidates", "candidates": [...]}
+      {"type": "match", "index": i, "candidate", "match_result", "method", "search_terms"}  (urutan selesai)
+      {"type": "summary", "count", "methods", "elapsedMs"}
+    Kandidat di shortcuts (lookup_shortcuts) keluar paling awal.
+    """
+    import time
+
+    shortcuts = shortcuts or {}
+    pending = [i for i in range(len(candidates)) if i not in shortcuts]
+
+    def results():
+        yield from shortcuts.items()
+        if pending:
+            for j, match_data in iter_match_results([candidates[i] for i in pending], top_n, mode, refine_mode):
+                yield pending[j], match_data
+
+    def generate():
+        t0 = time.perf_counter()
+        methods = {}
+        yield json.dumps({"type": "candidates", "candidates": candidates}, ensure_ascii=False) + "\n"
+        for i, match_data in results():
+            method = match_data.get("method", "unknown")
+            methods[method] = methods.get(method, 0) + 1
+            event = {
+                "type": "match",
+                "index": i,
+                "candidate": candidates[i],
+                "match_result": match_data.get("matches", []),
+                "method": method,
+                "search_terms": match_data.get("search_terms", []),
+                "elapsedMs": round((time.perf_counter() - t0) * 1000, 1),
+            }
+            if "portion" in match_data:
+                event["portion"] = match_data["portion"]
+            if "error" in match_data:
+                event["error"] = match_data["error"]
+            yield json.dumps(event, ensure_ascii=False, default=str) + "\n"
+        yield json.dumps({
+            "type": "summary",
+            "count": len(candidates),
+            "methods": methods,
+            "elapsedMs": round((time.perf_counter() - t0) * 1000, 1),
+        }) + "\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="application/x-ndjson",
+        headers={"X-Accel-Buffering": "no", "Cache-Control": "no-cache"},
+    )
+
+
 @app.route("/api/parse-food", methods=["POST"])
+@admission.guard("parse", _reject_busy)
 def parse_food():
     """
     Legacy single-food parse endpoint.
     Request Body:
-        { "text": "...", "quantity": 1, "unit": "porsi" }
+        { "text": "...", "quantity": 1, "unit": "porsi", "refineMode": "speculative",
+          "userId": "..." }   # optional: frasa yang pernah dikonfirmasi user memakai food + porsinya
     """
     try:
         data = request.get_json()
@@ -233,49 +537,24 @@ def parse_food():
             return jsonify({"error": "Missing text"}), 400
 
         text = data["text"]
-        qty = data.get("quantity", 1)
-        unit = data.get("unit", "porsi")
+        shortcut = lookup_shortcuts(data.get("userId"), [text]).get(0)
+        portion = shortcut["portion"] if shortcut else {"quantity": 1, "unit": "porsi"}
+        qty = data.get("quantity", portion["quantity"])
+        unit = data.get("unit", portion["unit"])
 
         print(f"\n📥 Request: {text} ({qty} {unit})")
 
-        from core.llm_helper import generate_food_candidates
+        if shortcut:
+            refined = shortcut
+        else:
+            from core.refinement import search_with_refinement
 
-        final_matches = []
-        used_method = "unknown"
-        candidates = []
-
-        for attempt in range(1, 3):
-            print(f"\n🔄 Attempt {attempt}/2 processing...")
-
-            if attempt == 1:
-                print("   👉 Strategy: Direct Database Search")
-                candidates = [text]
-                used_method = "direct_match"
-            else:
-                print("   👉 Strategy: LLM Refinement (Gemini)")
-                candidates = generate_food_candidates(text)
-                print(f"   🤖 LLM Candidates: {candidates}")
-                used_method = "llm_enhanced"
-
-            current_matches = get_matcher().match_with_llm_candidates(
-                candidates, top_final=5
+            refined = search_with_refinement(
+                get_matcher(), text, top_n=5, mode=data.get("refineMode") if llm_allowed("parse") else "off"
             )
-
-            if current_matches:
-                top_score = current_matches[0]["similarity"]
-                print(f"   📊 Best Score: {top_score:.4f}")
-
-                if top_score >= 0.5:
-                    print("   ✅ Match Found! Stopping loop.")
-                    final_matches = current_matches
-                    break
-                else:
-                    print("   ⚠️ Score < 0.5.")
-                    if attempt == 2:
-                        print("   ❌ Returning best effort.")
-                        final_matches = current_matches
-            else:
-                print("   ❌ No matches found in DB.")
+        final_matches = refined["matches"]
+        used_method = refined["method"]
+        candidates = refined["search_terms"]
 
         if not final_matches:
             return (
@@ -326,8 +605,70 @@ def parse_food():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/api/bulk-match", methods=["POST"])
+@admission.guard("bulk", _reject_busy)
+def bulk_match_foods():
+    """
+    Backfill banyak log makanan sekaligus, hasil di-stream sebagai NDJSON.
+
+    Input (salah satu):
+      - JSON: ["2 tempe goreng", ...] atau {"entries": [{"id": "log-1", "text": "..."}], "limit": 3, "allowLlm": false}
+      - NDJSON (Content-Type: application/x-ndjson): satu "teks" atau {"id", "text"} per baris;
+        opsi lewat query string (?limit=3&allowLlm=0). Input tidak pernah dimuat utuh ke memori.
+
+    Output: satu baris {"type": "result", "id", "text", "parser", "items", "totals"} per entri
+    (urutan sama dengan input), diakhiri {"type": "summary", ...}.
+    """
+    from core.bulk import bulk_match, iter_entries
+
+    if request.mimetype in ("application/x-ndjson", "application/jsonl"):
+        options = request.args
+        # Buffer supaya iterasi per baris tidak membaca stream byte demi byte
+        entries = iter_entries(stream=io.BufferedReader(request.stream, buffer_size=65536))
+    else:
+        data = request.get_json(silent=True)
+        if data is None:
+            return jsonify({"error": "Body harus JSON atau NDJSON"}), 400
+        options = {**request.args.to_dict(), **(data if isinstance(data, dict) else {})}
+        if not isinstance(data.get("entries", []) if isinstance(data, dict) else data, list):
+            return jsonify({"error": "entries harus berupa list"}), 400
+        entries = iter_entries(data=data)
+
+    try:
+        top_n = int(options.get("limit", 3))
+    except (TypeError, ValueError):
+        return jsonify({"error": "limit harus bilangan bulat"}), 400
+    if top_n < 1:
+        return jsonify({"error": "limit minimal 1"}), 400
+    from core.refinement import resolve_refine_mode
+
+    allow_llm = (
+        str(options.get("allowLlm", "0")).lower() in ("1", "true")
+        and llm_allowed("bulk")
+        and resolve_refine_mode() != "off"
+    )
+
+    try:
+        matcher = get_matcher()
+        nutrition_calc = get_nutrition_calc()
+    except Exception as e:
+        print(f"❌ Bulk Match Init Error: {e}")
+        return jsonify({"error": str(e)}), 503
+
+    def generate():
+        try:
+            for event in bulk_match(entries, matcher, nutrition_calc, top_n=top_n, allow_llm=allow_llm):
+                yield json.dumps(event, ensure_ascii=False, default=str) + "\n"
+        except Exception as e:
+            print(f"❌ Bulk Match Error: {e}")
+            yield json.dumps({"type": "error", "error": str(e)}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
 # ✅ NEW ENDPOINT: DAILY RECOMMENDATION (OUTPUT: recommendedFoods only)
 @app.route("/api/daily-recommendation", methods=["POST"])
+@admission.guard("recommendation", _reject_busy)
 def daily_recommendation():
     """
     Request Body:
@@ -335,9 +676,14 @@ def daily_recommendation():
       "userId": "...",
       "weeklyAnalysis": {...},
       "userPreferences": {...},    # budget/avoid/likes
-      "candidateCatalog": [ ... ]  # list kandidat dengan pricePerKg & nutrition
+      "candidateCatalog": [ ... ], # optional override; default: full catalog
+      "topK": 5,                   # optional
+      "timezone": "Asia/Jakarta",  # optional, batas hari lokal untuk cache
+      "refresh": false             # optional, paksa hitung ulang
     }
 
+    Hasil di-cache per user sampai tengah malam lokal (header X-Cache: HIT/MISS).
+
     Response:
     { "recommendedFoods": [ ... ] }
     """
@@ -351,7 +697,7 @@ def daily_recommendation():
         user_preferences = data.get("userPreferences")
         candidate_catalog = data.get("candidateCatalog")
 
-        if not all([user_id, weekly_analysis, user_preferences, candidate_catalog]):
+        if user_id is None or weekly_analysis is None or user_preferences is None:
             return (
                 jsonify(
                     {
@@ -360,31 +706,298 @@ def daily_recommendation():
                             "userId",
                             "weeklyAnalysis",
                             "userPreferences",
-                            "candidateCatalog",
                         ],
                     }
                 ),
                 400,
             )
 
-        from core.daily_recommendation import generate_daily_recommendation
+        from core.daily_recommendation import recommend_for_user
+        from core.recommendation_cache import get_recommendation_cache
 
-        result = generate_daily_recommendation(
-            user_id=user_id,
-            weekly_analysis=weekly_analysis,
-            user_preferences=user_preferences,
-            today_foods=[],  # optional, bisa diisi backend kalau mau
-            candidate_catalog=candidate_catalog,
-        )
+        top_k = int(data.get("topK", 5))
 
-        # kontrak final dari temen backend: ONLY recommendedFoods
-        return jsonify({"recommendedFoods": result.get("recommendedFoods", [])}), 200
+        def compute():
+            result = recommend_for_user(
+                weekly_analysis=weekly_analysis,
+                user_preferences=user_preferences,
+                candidate_catalog=candidate_catalog,
+                top_k=top_k,
+            )
+            # kontrak final dari temen backend: ONLY recommendedFoods
+            return {"recommendedFoods": result.get("recommendedFoods", [])}
+
+        cache = get_recommendation_cache()
+        if cache is None:
+            return jsonify(compute()), 200
+
+        body, hit = cache.get_or_compute(
+            user_id,
+            # versi katalog ikut di key: hasil dari katalog lama tidak dipakai setelah reload
+            (bundles.version(), weekly_analysis, user_preferences, candidate_catalog, top_k),
+            compute,
+            tz=data.get("timezone"),
+            offset_minutes=data.get("timezoneOffsetMinutes"),
+            refresh=bool(data.get("refresh")),
+        )
+        return Response(body, status=200, mimetype="application/json", headers={"X-Cache": "HIT" if hit else "MISS"})
 
     except Exception as e:
         print(f"❌ Daily Recommendation Error: {e}")
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/api/daily-recommendation/invalidate", methods=["POST"])
+def invalidate_daily_recommendation():
+    """
+    Buang cache rekomendasi (mis. setelah user log makanan / ubah preferensi).
+    Body: {"userId": "..."} atau {"all": true}
+    """
+    from core.recommendation_cache import get_recommendation_cache
+
+    data = request.get_json(silent=True) or {}
+    cache = get_recommendation_cache()
+    if cache is None:
+        return jsonify({"invalidated": False, "reason": "cache disabled"}), 200
+
+    if data.get("all"):
+        cache.invalidate_all()
+        return jsonify({"invalidated": True, "scope": "all"}), 200
+
+    user_id = data.get("userId")
+    if user_id is None:
+        return jsonify({"error": "Missing required fields", "required": ["userId"]}), 400
+
+    version = cache.invalidate(user_id)
+    return jsonify({"invalidated": True, "scope": "user", "userId": user_id, "version": version}), 200
+
+
+def _require_admin():
+    """None jika token admin valid, selain itu response error."""
+    if not ADMIN_TOKEN:
+        return jsonify({"error": "admin endpoints disabled (ADMIN_TOKEN not set)"}), 403
+    if request.headers.get("X-Admin-Token") != ADMIN_TOKEN:
+        return jsonify({"error": "invalid admin token"}), 401
+    return None
+
+
+@app.route("/admin/bundle", methods=["GET"])
+def bundle_status():
+    """Versi katalog aktif di worker ini + riwayat reload."""
+    denied = _require_admin()
+    if denied:
+        return denied
+    return jsonify({"pid": os.getpid(), **bundles.stats()})
+
+
+@app.route("/admin/bundle/reload", methods=["POST"])
+def reload_bundle():
+    """
+    Load bundle katalog baru dan swap tanpa restart (hanya worker yang menerima
+    request ini; untuk semua worker pakai SIGHUP atau BUNDLE_WATCH_INTERVAL_S).
+    Header: X-Admin-Token. Body (opsional): {"version": "v0004", "force": false}
+    """
+    denied = _require_admin()
+    if denied:
+        return denied
+    data = request.get_json(silent=True) or {}
+    try:
+        result = bundles.reload(data.get("version"), force=bool(data.get("force")))
+    except BundleError as e:
+        return jsonify({"reloaded": False, "pid": os.getpid(), "error": str(e)}), 409
+    except Exception as e:
+        print(f"❌ Bundle reload error: {e}")
+        return jsonify({"reloaded": False, "pid": os.getpid(), "error": str(e)}), 500
+    return jsonify({"reloaded": result["changed"], "pid": os.getpid(), **result}), 200
+
+
+@app.route("/api/shortcuts/confirm", methods=["POST"])
+def confirm_shortcut():
+    """
+    Simpan pilihan user: input ini berarti food_id ini (dipanggil backend saat user menyimpan log).
+    Body: {"userId": "...", "text": "2 potong tempe goreng", "foodId": 545, "quantity": 2, "unit": "potong"}
+    quantity/unit optional (default: dari text, atau 1 porsi).
+    """
+    from core.user_shortcuts import get_user_shortcuts
+
+    data = request.get_json(silent=True) or {}
+    user_id, text, food_id = data.get("userId"), data.get("text"), data.get("foodId")
+    if user_id is None or not text or food_id is None:
+        return jsonify({"error": "Missing required fields", "required": ["userId", "text", "foodId"]}), 400
+    store = get_user_shortcuts()
+    if store is None:
+        return jsonify({"saved": False, "reason": "shortcuts disabled"}), 200
+
+    catalog = current_catalog()
+    df = catalog.nutrition_calc.df
+    if isinstance(food_id, bool) or not isinstance(food_id, int) or not 0 <= food_id < len(df):
+        return jsonify({"error": f"Unknown foodId {food_id}"}), 400
+    try:
+        entry = store.confirm(
+            user_id, text, food_id, str(df.iloc[food_id]["Nama Bahan Makanan"]), catalog.version,
+            quantity=data.get("quantity"), unit=data.get("unit"),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"❌ Shortcut confirm error: {e}")
+        return jsonify({"saved": False, "error": str(e)}), 500
+    return jsonify({"saved": True, "userId": user_id, **entry}), 200
+
+
+@app.route("/api/shortcuts/forget", methods=["POST"])
+def forget_shortcut():
+    """Body: {"userId": "...", "text": "tempe goreng"} atau tanpa text untuk semua shortcut user."""
+    from core.user_shortcuts import get_user_shortcuts
+
+    data = request.get_json(silent=True) or {}
+    user_id = data.get("userId")
+    if user_id is None:
+        return jsonify({"error": "Missing required fields", "required": ["userId"]}), 400
+    store = get_user_shortcuts()
+    if store is None:
+        return jsonify({"removed": 0, "reason": "shortcuts disabled"}), 200
+    return jsonify({"removed": store.forget(user_id, data.get("text")), "userId": user_id}), 200
+
+
+@app.route("/api/foods/<int:food_id>/substitutes", methods=["GET"])
+@admission.guard("search", _reject_busy)
+def food_substitutes(food_id):
+    """
+    Alternatif makanan mirip dari kNN graph prekomputasi (tanpa model).
+
+    Query params:
+      lower=Gula,Lemak Total   # nutrisi yang harus lebih rendah (boleh diulang)
+      higher=Protein           # nutrisi yang harus lebih tinggi
+      k=10, minSimilarity=0.6, minDeltaPct=0.1
+    """
+    try:
+        from core.substitution import get_substitution_graph
+
+        def nutrient_list(name):
+            return [c for v in request.args.getlist(name) for c in v.split(",") if c.strip()]
+
+        graph = get_substitution_graph()
+        result = graph.substitutes(
+            food_id,
+            lower=nutrient_list("lower"),
+            higher=nutrient_list("higher"),
+            k=request.args.get("k", 10, type=int),
+            min_similarity=request.args.get("minSimilarity", 0.0, type=float),
+            min_delta_pct=request.args.get("minDeltaPct", 0.0, type=float),
+        )
+        return jsonify(result), 200
+
+    except KeyError:
+        return jsonify({"error": f"food_id {food_id} tidak ditemukan"}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 503
+    except Exception as e:
+        print(f"❌ Substitutes Error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/nutrient-search", methods=["POST"])
+@admission.guard("search", _reject_busy)
+def nutrient_search():
+    """
+    Cari makanan berdasarkan nilai nutrisi per 100 g (bukan nama).
+
+    Request Body:
+    {
+      "targets": {"Protein": 20, "Gula": 5},  # kNN di ruang nutrisi terstandarisasi
+      "k": 10,
+      "radius": 0.5,                          # optional: range query (satuan std dev)
+      "ranges": {"Energi": [null, 200]},      # optional: batas nilai absolut
+      "groups": ["Kacang-kacangan"],          # optional: Kelompok Makanan
+      "state": "Olahan"                       # optional: Mentah/Olahan
+    }
+    """
+    try:
+        data = request.get_json()
+        if not data or not (data.get("targets") or data.get("ranges")):
+            return jsonify({"error": "Missing targets or ranges"}), 400
+
+        from core.nutrient_index import get_nutrient_index
+
+        index = get_nutrient_index(get_nutrition_calc())
+        targets = data.get("targets") or {}
+        ranges = data.get("ranges") or {}
+        hits = index.search(
+            targets=targets,
+            k=int(data.get("k", 10)),
+            radius=data.get("radius"),
+            groups=data.get("groups"),
+            state=data.get("state"),
+            ranges=ranges,
+        )
+
+        cols = list(dict.fromkeys(index.resolve_columns(list(targets) + list(ranges))))
+        results = []
+        for row, distance in hits:
+            item = index.describe(row, cols)
+            if distance is not None:
+                item["distance"] = round(distance, 4)
+            results.append(item)
+
+        return jsonify({"results": results, "count": len(results)}), 200
+
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"❌ Nutrient Search Error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/meal-plan", methods=["POST"])
+@admission.guard("recommendation", _reject_busy)
+def meal_plan():
+    """
+    Request Body:
+    {
+      "userId": "...",
+      "profile": {"group": "Perempuan", "age": 27},   # kelompok AKG
+      "userPreferences": {"dailyBudget": 30000, "avoid": [...], "likes": [...]},
+      "consumed": {"Energi": 500, "Protein": 20},      # optional, sudah dimakan hari ini
+      "candidateCatalog": [ ... ],                     # optional override
+      "maxItems": 6,                                   # optional
+      "timeLimitMs": 200                               # optional
+    }
+
+    Response:
+    { "mealPlan": { items, totalPrice, nutrients, targets, coverage, akg, solver } }
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({"error": "Missing request body"}), 400
+
+        profile = data.get("profile")
+        if not profile:
+            return jsonify({"error": "Missing required fields", "required": ["profile"]}), 400
+
+        from core.daily_recommendation import generate_meal_plan
+        from core.meal_plan import DEFAULT_MAX_ITEMS, DEFAULT_TIME_LIMIT_MS
+
+        result = generate_meal_plan(
+            profile=profile,
+            user_preferences=data.get("userPreferences") or {},
+            candidate_catalog=data.get("candidateCatalog"),
+            consumed=data.get("consumed"),
+            max_items=int(data.get("maxItems", DEFAULT_MAX_ITEMS)),
+            time_limit_ms=float(data.get("timeLimitMs", DEFAULT_TIME_LIMIT_MS)),
+        )
+        return jsonify(result), 200
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"❌ Meal Plan Error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5050))
     app.run(host="0.0.0.0", port=port, debug=True)
\ No newline at end of file
@@ -0,0 +1,71 @@
+# ai/benchmarks/bench_food_parser.py
+"""
+Benchmark rule-based food parser (tahap pertama smart_food_pipeline).
+
+Mengukur latency parse per input dan LLM call rate (porsi input yang
+confidence-nya di bawah RULE_PARSER_MIN_CONFIDENCE sehingga tetap ke Gemini)
+pada korpus input yang direkam.
+
+Usage:
+    python benchmarks/bench_food_parser.py [--corpus path] [--min-confidence 0.8] [--verbose]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(BASE_DIR))
+
+from core.food_parser import RULE_PARSER_MIN_CONFIDENCE, rule_based_parse  # noqa: E402
+
+DEFAULT_CORPUS = BASE_DIR / "benchmarks" / "data" / "parse_corpus.txt"
+
+
+def load_corpus(path: Path) -> list[str]:
+    lines = path.read_text(encoding="utf-8").splitlines()
+    return [ln.strip() for ln in lines if ln.strip() and not ln.startswith("#")]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS)
+    ap.add_argument("--min-confidence", type=float, default=RULE_PARSER_MIN_CONFIDENCE)
+    ap.add_argument("--repeat", type=int, default=200)
+    ap.add_argument("--verbose", action="store_true")
+    args = ap.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    print(f"📂 Korpus: {args.corpus} ({len(corpus)} input)")
+
+    latencies_us = []
+    llm_calls = 0
+    for text in corpus:
+        # warmup + ambil median dari beberapa run supaya stabil
+        runs = []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            items, conf = rule_based_parse(text)
+            runs.append((time.perf_counter() - t0) * 1e6)
+        latencies_us.append(statistics.median(runs))
+
+        needs_llm = not items or conf < args.min_confidence
+        llm_calls += int(needs_llm)
+        if args.verbose:
+            tag = "LLM " if needs_llm else "RULE"
+            print(f"  [{tag}] {conf:.2f}  {text!r} -> {items}")
+
+    latencies_us.sort()
+    p95 = latencies_us[int(0.95 * (len(latencies_us) - 1))]
+    print("\n" + "=" * 50)
+    print(f"Parse latency (rule)  : mean {statistics.mean(latencies_us):.1f} µs | "
+          f"p50 {statistics.median(latencies_us):.1f} µs | p95 {p95:.1f} µs")
+    print(f"LLM call rate         : {llm_calls}/{len(corpus)} = {llm_calls / len(corpus):.1%} "
+          f"(sebelumnya 100%, min_confidence={args.min_confidence})")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# ai/benchmarks/bench_meal_plan.py
+"""
+Benchmark waktu solve MealPlanSolver terhadap ukuran katalog dan ukuran plan.
+
+Usage:
+    python benchmarks/bench_meal_plan.py [--sizes 1000 10000 100000] [--plan-sizes 3 6 10] [--repeat 20]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(BASE_DIR))
+
+from bench_recommendation import synthetic_engine  # noqa: E402
+from core.meal_plan import MealPlanSolver, find_akg_target  # noqa: E402
+from core.recommendation_engine import RecommendationEngine  # noqa: E402
+
+PROFILE = {"group": "Perempuan", "age": 27}
+PREFS = {"avoid": ["gorengan"], "likes": ["tempe"]}
+BUDGET = 30000
+
+
+def bench(engine, plan_size: int, repeat: int, time_limit_ms: float):
+    solver = MealPlanSolver(engine)
+    targets = find_akg_target(PROFILE)["targets"]
+    runs, last = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        last = solver.solve(targets, PREFS, budget=BUDGET, max_items=plan_size, time_limit_ms=time_limit_ms)
+        runs.append((time.perf_counter() - t0) * 1000)
+    runs.sort()
+    return statistics.median(runs), runs[int(0.95 * (len(runs) - 1))], last
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    ap.add_argument("--plan-sizes", type=int, nargs="+", default=[3, 6, 10])
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--time-limit-ms", type=float, default=200)
+    args = ap.parse_args()
+
+    engines = []
+    try:
+        engine = RecommendationEngine.from_parquet()
+        engines.append((f"parquet {engine.n}", engine))
+    except Exception as e:
+        print(f"(katalog parquet dilewati: {e})")
+    engines += [(str(n), synthetic_engine(n)) for n in args.sizes]
+
+    print(f"{'catalog':>12} | {'plan':>4} | {'p50 ms':>7} | {'p95 ms':>7} | {'gap':>7} | {'price':>6} | status")
+    for label, engine in engines:
+        for plan_size in args.plan_sizes:
+            p50, p95, plan = bench(engine, plan_size, args.repeat, args.time_limit_ms)
+            print(
+                f"{label:>12} | {plan_size:>4} | {p50:7.2f} | {p95:7.2f} | {plan['gap']:7.4f} | "
+                f"{plan['totalPrice']:>6} | {plan['solver']['status']}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# ai/benchmarks/bench_recommendation.py
+"""
+Benchmark RecommendationEngine.recommend pada katalog sintetis berbagai ukuran
+(plus katalog asli dari parquet jika ada).
+
+Usage:
+    python benchmarks/bench_recommendation.py [--sizes 1000 10000 100000] [--repeat 50]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(BASE_DIR))
+
+from core.recommendation_engine import FEATURE_COLUMNS, RecommendationEngine  # noqa: E402
+
+WEEKLY = {
+    "patterns": [{"type": "negative", "message": "Asupan protein kurang dari target", "impact": "High"}],
+    "recommendations": ["Tambahkan sumber protein seperti telur, ikan, atau tahu"],
+}
+PREFS = {"budget": 3000, "likes": ["tahu", "tempe"], "avoid": ["gorengan"]}
+WORDS = ["tahu", "tempe", "ayam", "ikan", "nasi", "sayur", "goreng", "rebus", "bakar", "kukus",
+         "telur", "sapi", "bayam", "gorengan", "susu", "kacang", "jagung", "pisang", "mie", "udang"]
+
+
+def synthetic_engine(n: int, seed: int = 0) -> RecommendationEngine:
+    rng = np.random.default_rng(seed)
+    names = [" ".join(rng.choice(WORDS, size=3)) + f" {i}" for i in range(n)]
+    nutrients = {c: rng.gamma(2.0, 5.0, size=n) for c in FEATURE_COLUMNS}
+    prices = rng.uniform(300, 8000, size=n)
+    return RecommendationEngine(np.arange(n), names, nutrients, prices)
+
+
+def bench(engine: RecommendationEngine, repeat: int):
+    engine.recommend(WEEKLY, PREFS, top_k=5)  # warmup
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        engine.recommend(WEEKLY, PREFS, top_k=5)
+        runs.append((time.perf_counter() - t0) * 1000)
+    runs.sort()
+    return statistics.median(runs), runs[int(0.95 * (len(runs) - 1))]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    ap.add_argument("--repeat", type=int, default=50)
+    args = ap.parse_args()
+
+    print(f"{'catalog':>12} | {'build ms':>9} | {'p50 ms':>7} | {'p95 ms':>7}")
+    try:
+        t0 = time.perf_counter()
+        engine = RecommendationEngine.from_parquet()
+        build = (time.perf_counter() - t0) * 1000
+        p50, p95 = bench(engine, args.repeat)
+        print(f"{'parquet ' + str(engine.n):>12} | {build:9.1f} | {p50:7.3f} | {p95:7.3f}")
+    except Exception as e:
+        print(f"(katalog parquet dilewati: {e})")
+
+    for n in args.sizes:
+        t0 = time.perf_counter()
+        engine = synthetic_engine(n)
+        build = (time.perf_counter() - t0) * 1000
+        p50, p95 = bench(engine, args.repeat)
+        print(f"{n:>12} | {build:9.1f} | {p50:7.3f} | {p95:7.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+# ai/benchmarks/bench_spell.py
+"""
+Benchmark koreksi ejaan (core/spell.py) pada query bertypo sintetis dari
+nama_clean katalog (1 edit acak per query: hapus / sisip / ganti / tukar huruf).
+
+Dilaporkan:
+  - latency per token: lookup dingin (tanpa cache) dan hangat (lru_cache)
+  - akurasi: typo yang kembali ke token aslinya, dan koreksi salah pada query bersih
+    (benchmarks/data/labeled_queries.jsonl)
+  - --with-matcher: LLM fallback rate (skor direct search < 0.5) tanpa vs dengan
+    koreksi; butuh model embedding + FAISS index
+
+Usage (dari folder ai/):
+    python benchmarks/bench_spell.py [--queries 2000] [--with-matcher]
+"""
+
+import argparse
+import json
+import random
+import statistics
+import string
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(BASE_DIR))
+
+from core.spell import SPELL_INDEX_DIR, SPELL_MIN_TOKEN_LEN, SpellIndex  # noqa: E402
+
+DATA_PATH = BASE_DIR / "data" / "data pangan bersih.parquet"
+LABELED_PATH = BASE_DIR / "benchmarks" / "data" / "labeled_queries.jsonl"
+
+
+def make_typo(token: str, rng: random.Random) -> str:
+    i = rng.randrange(len(token))
+    op = rng.choice(("delete", "insert", "replace", "transpose"))
+    if op == "delete":
+        return token[:i] + token[i + 1:]
+    if op == "insert":
+        return token[:i] + rng.choice(string.ascii_lowercase) + token[i:]
+    if op == "replace":
+        return token[:i] + rng.choice(string.ascii_lowercase.replace(token[i], "")) + token[i + 1:]
+    i = min(i, len(token) - 2)
+    return token[:i] + token[i + 1] + token[i] + token[i + 2:]
+
+
+def typo_corpus(names, n: int, rng: random.Random):
+    """[(query bertypo, query asli, token asli)] dengan tepat satu token diubah."""
+    out = []
+    names = [s for s in names if any(len(t) >= SPELL_MIN_TOKEN_LEN for t in s.split())]
+    while len(out) < n:
+        tokens = rng.choice(names).split()
+        idx = rng.choice([i for i, t in enumerate(tokens) if len(t) >= SPELL_MIN_TOKEN_LEN])
+        typo = make_typo(tokens[idx], rng)
+        if typo == tokens[idx]:
+            continue
+        bad = tokens[:idx] + [typo] + tokens[idx + 1:]
+        out.append((" ".join(bad), " ".join(tokens), tokens[idx]))
+    return out
+
+
+def load_index(index_dir: Path) -> SpellIndex:
+    if (index_dir / "meta.json").exists():
+        return SpellIndex(index_dir)
+    tmp = Path(tempfile.mkdtemp(prefix="spell_index_"))
+    print(f"Spell index belum ada di {index_dir}, build sementara di {tmp}")
+    subprocess.run([sys.executable, str(BASE_DIR / "preprocess" / "build_spell_index.py"), "--out-dir", str(tmp)],
+                   check=True, stdout=subprocess.DEVNULL)
+    return SpellIndex(tmp)
+
+
+def time_tokens(fn, tokens):
+    per_token = []
+    for tok in tokens:
+        t0 = time.perf_counter()
+        fn(tok)
+        per_token.append((time.perf_counter() - t0) * 1e6)
+    per_token.sort()
+    return {
+        "meanUs": round(statistics.mean(per_token), 2),
+        "p50Us": round(per_token[len(per_token) // 2], 2),
+        "p99Us": round(per_token[int(len(per_token) * 0.99)], 2),
+    }
+
+
+def fallback_rate(matcher, queries, threshold):
+    results = matcher.search_many(queries)
+    low = sum(1 for res in results if not res or res[0]["similarity"] < threshold)
+    return low / len(queries)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--queries", type=int, default=2000)
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--index-dir", type=Path, default=SPELL_INDEX_DIR)
+    ap.add_argument("--with-matcher", action="store_true", help="Ukur LLM fallback rate (butuh model + index)")
+    ap.add_argument("--json", type=Path, help="Simpan hasil ke file JSON")
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    index = load_index(args.index_dir)
+    names = pd.read_parquet(DATA_PATH)["nama_clean"].astype(str).tolist()
+    corpus = typo_corpus(names, args.queries, rng)
+    typo_tokens = [bad.split()[[t != o for t, o in zip(bad.split(), good.split())].index(True)]
+                   for bad, good, _ in corpus]
+
+    report = {"words": len(index), "queries": len(corpus)}
+    # Dingin: _lookup langsung, tanpa lru_cache
+    report["coldLookup"] = time_tokens(lambda t: index.correct_token(t) if t in index.vocab else index._lookup(t),
+                                       typo_tokens)
+    for tok in typo_tokens:
+        index.correct_token(tok)
+    report["warmLookup"] = time_tokens(index.correct_token, typo_tokens)
+
+    fixed = sum(index.correct(bad) == good for bad, good, _ in corpus)
+    # Typo yang kebetulan membentuk kata lain di kosakata tidak bisa dideteksi per token
+    in_vocab = sum(t in index.vocab for t in typo_tokens)
+    report["restored"] = round(fixed / len(corpus), 4)
+    report["typoIsVocabWord"] = round(in_vocab / len(corpus), 4)
+
+    clean = [json.loads(line)["query"] for line in open(LABELED_PATH, encoding="utf-8") if line.strip()]
+    changed = [(q, index.correct(q)) for q in clean if index.correct(q) != q]
+    report["cleanQueriesChanged"] = len(changed)
+    report["cleanQueries"] = len(clean)
+
+    print(f"Spell index: {len(index)} kata, {len(corpus)} query bertypo (seed {args.seed})")
+    for name in ("coldLookup", "warmLookup"):
+        r = report[name]
+        print(f"  {name:<11} mean {r['meanUs']:8.2f} µs | p50 {r['p50Us']:8.2f} µs | p99 {r['p99Us']:8.2f} µs per token")
+    print(f"  Typo dipulihkan ke query asli : {report['restored']:.1%}")
+    print(f"  Typo yang berupa kata valid   : {report['typoIsVocabWord']:.1%} (tidak bisa dikoreksi per token)")
+    print(f"  Query bersih yang diubah      : {len(changed)}/{len(clean)}")
+    for q, c in changed:
+        print(f"    {q!r} -> {c!r}")
+
+    if args.with_matcher:
+        from core.bundle import get_bundle_manager
+        from core.matcher import FoodMatcher
+        from core.refinement import SCORE_THRESHOLD
+
+        bundle = get_bundle_manager().active_bundle()
+        missing = [bundle.file(name).name for name in ("embeddings", "index") if not bundle.file(name).exists()]
+        if missing:
+            sys.exit(f"--with-matcher butuh {', '.join(missing)} dari bundle {bundle.version}; "
+                     "jalankan preprocess/build_embeddings.py dulu")
+        matcher = FoodMatcher()
+        bad = [b for b, _, _ in corpus]
+        before = fallback_rate(matcher, bad, SCORE_THRESHOLD)
+        after = fallback_rate(matcher, [index.correct(b) for b in bad], SCORE_THRESHOLD)
+        original = fallback_rate(matcher, [g for _, g, _ in corpus], SCORE_THRESHOLD)
+        report.update({"fallbackTypo": round(before, 4), "fallbackCorrected": round(after, 4),
+                       "fallbackOriginal": round(original, 4)})
+        print(f"  LLM fallback (skor < {SCORE_THRESHOLD}): typo {before:.1%} -> dikoreksi {after:.1%} "
+              f"(query asli {original:.1%})")
+
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+        print(f"Saved: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
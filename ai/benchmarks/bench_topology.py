@@ -0,0 +1,133 @@
+# ai/benchmarks/bench_topology.py
+"""
+Benchmark matrix topologi worker untuk /api/match-foods (jalur CPU: encode +
+FAISS, tanpa Gemini). Setiap konfigurasi WORKERSxTHREADS dijalankan sebagai
+gunicorn terpisah dengan WORKER_TOPOLOGY=manual (lihat core/topology.py),
+lalu dibebani N user konkuren; hasilnya throughput dan latency per konfigurasi.
+
+Usage (dari folder ai/, butuh environment lengkap: model + index):
+    python benchmarks/bench_topology.py                      # semua WxT dengan W*T = CPU tersedia
+    python benchmarks/bench_topology.py --matrix 1x4 2x2 4x1 --pin --users 4 16 --duration 30
+Tanpa model embedding (stub, lihat loadtest/stub_model.py; encode tidak ikut terukur):
+    python benchmarks/bench_topology.py --stub-model --matrix 1x1 1x2 2x1
+"""
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(BASE_DIR))
+sys.path.append(str(BASE_DIR / "loadtest"))
+
+from core.topology import available_cpus, describe  # noqa: E402
+from load_test import run_users, wait_ready  # noqa: E402
+
+# Input campuran yang lolos direct search (tidak memicu Gemini)
+MATCH_TEXTS = [
+    "nasi putih", "tempe goreng", "tahu goreng", "telur dadar", "ayam goreng", "sayur bayam",
+    "ikan bandeng goreng", "teh manis", "pisang ambon", "mie goreng", "susu sapi", "kangkung tumis",
+]
+
+
+def default_matrix(cpus: int) -> list:
+    """Semua (workers, threads) dengan workers * threads == cpus."""
+    return [(w, cpus // w) for w in range(1, cpus + 1) if cpus % w == 0]
+
+
+def parse_matrix(items) -> list:
+    out = []
+    for item in items:
+        w, _, t = item.lower().partition("x")
+        out.append((int(w), int(t)))
+    return out
+
+
+def make_body(rng):
+    items = rng.sample(MATCH_TEXTS, rng.randint(1, 3))
+    return {"text": ", ".join(items), "refineMode": "off", "mode": "batched"}
+
+
+def start_service(port: int, workers: int, threads: int, pin: bool, extra_env: dict = None,
+                  stub_model: bool = False):
+    env = {
+        **os.environ,
+        "PORT": str(port),
+        "WORKER_TOPOLOGY": "manual",
+        "TOPOLOGY_WORKERS": str(workers),
+        "TOPOLOGY_THREADS": str(threads),
+        "TOPOLOGY_PIN": "1" if pin else "0",
+        "PRELOAD_MODELS": "1",
+        "FAST_START": "0",
+        # Yang diukur encode + search per request, bukan coalescing / load shedding
+        "SINGLE_FLIGHT": "0",
+        "ADMISSION_CONTROL": "0",
+        "GOOGLE_API_KEY": os.environ.get("GOOGLE_API_KEY", "fake"),
+        **(extra_env or {}),
+    }
+    target = ["--pythonpath", "loadtest", "stub_app:app"] if stub_model else ["app:app"]
+    cmd = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", *target]
+    return subprocess.Popen(cmd, cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--matrix", nargs="+", help="Konfigurasi WORKERSxTHREADS, mis. 1x4 2x2 4x1")
+    ap.add_argument("--users", type=int, nargs="+", default=[4, 16])
+    ap.add_argument("--duration", type=float, default=30)
+    ap.add_argument("--pin", action="store_true", help="Pin setiap worker ke core-nya (TOPOLOGY_PIN=1)")
+    ap.add_argument("--port", type=int, default=7862)
+    ap.add_argument("--timeout", type=float, default=60)
+    ap.add_argument("--json", type=Path, help="Simpan hasil ke file JSON")
+    ap.add_argument("--stub-model", action="store_true", help="embedding model stub + bundle sementara")
+    args = ap.parse_args()
+
+    extra_env = {}
+    if args.stub_model:
+        from stub_model import build_bundle
+
+        extra_env["BUNDLE_DIR"] = str(build_bundle(Path(tempfile.mkdtemp(prefix="nutrimori-stub-"))))
+
+    cpus = available_cpus()
+    matrix = parse_matrix(args.matrix) if args.matrix else default_matrix(cpus)
+    print(f"CPU: {describe()}")
+    model = ", stub model" if args.stub_model else ""
+    print(f"Matrix: {' '.join(f'{w}x{t}' for w, t in matrix)}, users {args.users}, pin={args.pin}{model}")
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    rows = []
+    for workers, threads in matrix:
+        print(f"🚀 {workers} worker x {threads} thread...")
+        proc = start_service(args.port, workers, threads, args.pin, extra_env, args.stub_model)
+        try:
+            if not wait_ready(base_url, proc=proc):
+                print(f"❌ {workers}x{threads} tidak siap, dilewati")
+                continue
+            # Pemanasan: setiap worker sempat encode sebelum diukur
+            run_users(base_url + "/api/match-foods", workers * 2, 5, args.timeout, make_body)
+            for users in args.users:
+                result = run_users(base_url + "/api/match-foods", users, args.duration, args.timeout, make_body)
+                rows.append({"workers": workers, "threads": threads, "users": users, **result})
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait(timeout=60)
+
+    print(f"\n{'config':>7} | {'users':>5} | {'req':>6} | {'err':>4} | {'rps':>7} | {'p50 ms':>7} | {'p95 ms':>7} | {'p99 ms':>7}")
+    for r in rows:
+        print(
+            f"{r['workers']}x{r['threads']:<5} | {r['users']:>5} | {r['requests']:>6} | {r['errors']:>4} | "
+            f"{r['rps']:7.2f} | {r['p50']:7.0f} | {r['p95']:7.0f} | {r['p99']:7.0f}"
+        )
+    if args.json:
+        args.json.write_text(json.dumps({"cpu": describe(), "pin": args.pin, "stubModel": args.stub_model,
+                                               "rows": rows}, indent=2))
+        print(f"Saved: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
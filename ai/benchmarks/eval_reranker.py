@@ -0,0 +1,153 @@
+# ai/benchmarks/eval_reranker.py
+"""
+Evaluasi reranker cross-encoder (core/reranker.py) vs alur lama (direct search
+-> Gemini) pada query berlabel di benchmarks/data/labeled_queries.jsonl.
+
+Per konfigurasi dilaporkan: LLM call rate, akurasi top-1 / top-5 (hit jika salah
+satu nama di "expected" ada di hasil), dan latency end-to-end search_with_refinement.
+
+Usage (dari folder ai/, butuh model embedding + reranker):
+    python benchmarks/eval_reranker.py                          # Gemini asli (butuh GOOGLE_API_KEY)
+    python benchmarks/eval_reranker.py --fake-gemini-ms 800     # Gemini diganti stub dengan latency tetap
+    python benchmarks/eval_reranker.py --accept 0.4 0.5 0.6 0.7 --json eval.json
+
+Dengan --fake-gemini-ms, stub mengembalikan query apa adanya, jadi akurasi
+jalur Gemini tidak bermakna; call rate dan latency tetap valid.
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(BASE_DIR))
+
+from core import llm_trace, refinement, reranker  # noqa: E402
+from core.matcher import FoodMatcher  # noqa: E402
+
+DEFAULT_DATA = BASE_DIR / "benchmarks" / "data" / "labeled_queries.jsonl"
+# Di-set dari --fake-gemini-ms
+FAKE_GEMINI_MS = None
+
+
+def load_queries(path: Path) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+class CountingGemini:
+    """Pengganti refinement.generate_food_candidates yang menghitung panggilan."""
+
+    def __init__(self, real, fake_ms=None):
+        self.real = real
+        self.fake_ms = fake_ms
+        self.calls = 0
+
+    def __call__(self, text, cancel_event=None):
+        self.calls += 1
+        if self.fake_ms is not None:
+            time.sleep(self.fake_ms / 1000)
+            return [text]
+        return self.real(text, cancel_event)
+
+
+def run(matcher, queries, top_n, use_reranker, accept_score=None):
+    gemini = refinement.generate_food_candidates
+    counter = CountingGemini(gemini.real if isinstance(gemini, CountingGemini) else gemini, FAKE_GEMINI_MS)
+    refinement.generate_food_candidates = counter
+    rr = reranker.get_reranker() if use_reranker else None
+    if rr is not None and accept_score is not None:
+        rr.accept_score = accept_score
+    refinement.get_reranker = (lambda: rr)
+
+    latencies, methods = [], {}
+    top1 = top5 = 0
+    misses = []
+    for q in queries:
+        t0 = time.perf_counter()
+        result = refinement.search_with_refinement(matcher, q["query"], top_n=top_n, mode="sequential")
+        latencies.append((time.perf_counter() - t0) * 1000)
+        methods[result["method"]] = methods.get(result["method"], 0) + 1
+        names = [m["nama"] for m in result["matches"]]
+        expected = set(q["expected"])
+        top1 += bool(names) and names[0] in expected
+        hit5 = bool(expected.intersection(names))
+        top5 += hit5
+        if not hit5:
+            misses.append({"query": q["query"], "got": names[:3]})
+
+    n = len(queries)
+    return {
+        "reranker": use_reranker and rr is not None,
+        "acceptScore": rr.accept_score if rr is not None else None,
+        "queries": n,
+        "llmCalls": counter.calls,
+        "llmCallRate": round(counter.calls / n, 4),
+        "top1": round(top1 / n, 4),
+        "top5": round(top5 / n, 4),
+        "p50Ms": round(percentile(latencies, 50), 1),
+        "p95Ms": round(percentile(latencies, 95), 1),
+        "meanMs": round(statistics.mean(latencies), 1),
+        "methods": methods,
+        "misses": misses,
+    }
+
+
+def main():
+    global FAKE_GEMINI_MS
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--data", type=Path, default=DEFAULT_DATA)
+    ap.add_argument("--top-n", type=int, default=5)
+    ap.add_argument("--accept", type=float, nargs="+", help="Sweep RERANK_ACCEPT_SCORE (default: nilai env)")
+    ap.add_argument("--fake-gemini-ms", type=float, help="Ganti Gemini dengan stub berlatency tetap")
+    ap.add_argument("--verbose", action="store_true", help="Tampilkan query yang meleset dari top-5")
+    ap.add_argument("--json", type=Path, help="Simpan hasil ke file JSON")
+    args = ap.parse_args()
+    FAKE_GEMINI_MS = args.fake_gemini_ms
+
+    queries = load_queries(args.data)
+    # Yang diukur reranker vs Gemini saja: tanpa alias table, koreksi ejaan, dan tanpa menulis trace
+    refinement.rewrite_query = lambda text: (text, None)
+    refinement.spell_correct = lambda query: None
+    llm_trace._disabled = True
+    # Evaluasi selalu memuat reranker, walaupun RERANKER=0 (default) di environment
+    reranker.RERANKER_ENABLED = True
+    matcher = FoodMatcher()
+    if reranker.get_reranker() is None:
+        sys.exit("❌ Reranker tidak bisa dimuat (cek RERANKER_MODEL / sentence-transformers)")
+
+    # Pemanasan: encode + predict pertama (alokasi torch) tidak ikut terukur
+    pool = matcher.search_many([queries[0]["query"]], k=reranker.RERANK_TOP_K)[0]
+    reranker.get_reranker().rerank(queries[0]["query"], pool)
+
+    rows = [run(matcher, queries, args.top_n, use_reranker=False)]
+    for accept in args.accept or [None]:
+        rows.append(run(matcher, queries, args.top_n, use_reranker=True, accept_score=accept))
+
+    print(f"\n{len(queries)} query, Gemini: {'stub %.0f ms' % FAKE_GEMINI_MS if FAKE_GEMINI_MS is not None else 'asli'}")
+    print(f"{'config':>14} | {'LLM calls':>9} | {'rate':>6} | {'top1':>6} | {'top5':>6} | {'p50 ms':>7} | {'p95 ms':>7} | {'mean ms':>7}")
+    for r in rows:
+        name = f"rerank@{r['acceptScore']:.2f}" if r["reranker"] else "baseline"
+        print(
+            f"{name:>14} | {r['llmCalls']:>9} | {r['llmCallRate']:6.1%} | {r['top1']:6.1%} | {r['top5']:6.1%} | "
+            f"{r['p50Ms']:7.0f} | {r['p95Ms']:7.0f} | {r['meanMs']:7.0f}"
+        )
+        if args.verbose:
+            for m in r["misses"]:
+                print(f"{'':>16}miss: {m['query']!r} -> {m['got']}")
+
+    if args.json:
+        args.json.write_text(json.dumps({"fakeGeminiMs": FAKE_GEMINI_MS, "rows": rows}, indent=2))
+        print(f"Saved: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
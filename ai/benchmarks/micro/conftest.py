@@ -0,0 +1,125 @@
+# ai/benchmarks/micro/conftest.py
+"""
+Microbenchmark hot path core/ (pytest-benchmark) tanpa model, Gemini, atau data asli:
+katalog sintetis beberapa ukuran + embedding model stub yang deterministik.
+
+Usage (dari folder ai/):
+    python -m pytest benchmarks/micro                             # ukur saja
+    python -m pytest benchmarks/micro --benchmark-save=baseline   # simpan baseline di mesin ini
+    python -m pytest benchmarks/micro --benchmark-compare --benchmark-compare-fail=median:25%
+
+Baseline disimpan di benchmarks/micro/baseline/<machine id>/ (tidak di-commit: angka
+hanya sebanding di mesin yang sama). Compare dan batas regresi hanya aktif lewat flag;
+CI menyimpan baseline di runner-nya sendiri lalu membandingkan dengan flag di atas.
+Di host bersama (VM 1 vCPU) selisih antar run identik bisa sampai 2x.
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(BASE_DIR))
+# Satu embedding model stub untuk test, microbenchmark dan load test (loadtest/stub_model.py)
+sys.path.append(str(BASE_DIR / "loadtest"))
+
+# Sebelum core.* di-import: tanpa Supabase, model server, atau artefak yang dibangun dari katalog asli
+os.environ.update({
+    "USE_SUPABASE": "0",
+    "MODEL_SERVER_SOCKET": "",
+    "USE_QUERY_TABLE": "0",
+    "QUERY_REWRITE": "0",
+    "SPELL_CORRECTION": "0",
+    "RERANKER": "0",
+    "LLM_TRACE": "0",
+    "PRELOAD_MODELS": "0",
+    "FAST_START": "0",
+})
+
+from stub_model import HashEmbeddingModel  # noqa: E402
+
+BASELINE_DIR = Path(__file__).resolve().parent / "baseline"
+CATALOG_SIZES = [int(x) for x in os.environ.get("MICRO_CATALOG_SIZES", "1000,10000,50000").split(",")]
+EMBEDDING_DIM = 64
+
+WORDS = ["tahu", "tempe", "ayam", "ikan", "nasi", "sayur", "goreng", "rebus", "bakar", "kukus",
+         "telur", "sapi", "bayam", "gorengan", "susu", "kacang", "jagung", "pisang", "mie", "udang",
+         "kangkung", "bandeng", "santan", "kuah", "putih", "merah", "manis", "asin", "pedas", "kering"]
+NUTRIENT_COLUMNS = ["Energi", "Protein", "Lemak Total", "Karbohidrat", "Gula", "Serat", "Natrium",
+                    "Kalsium", "Besi", "Vitamin C"]
+
+
+def pytest_configure(config):
+    """Storage baseline di folder ini (compare / compare-fail tetap opt-in lewat flag)."""
+    if not hasattr(config.option, "benchmark_storage"):
+        return  # pytest-benchmark tidak terpasang
+    if config.option.benchmark_storage == "file://./.benchmarks":
+        config.option.benchmark_storage = f"file://{BASELINE_DIR}"
+
+
+def synthetic_catalog(n: int, seed: int = 0) -> pd.DataFrame:
+    """Katalog dengan kolom yang sama seperti parquet asli (nama, nama_clean, food_text, nutrisi per 100 g)."""
+    rng = np.random.default_rng(seed)
+    names = [" ".join(rng.choice(WORDS, size=rng.integers(2, 5))) for _ in range(n)]
+    df = pd.DataFrame({
+        "Nama Bahan Makanan": [name.title() for name in names],
+        "Mentah/Olahan": rng.choice(["Mentah", "Olahan"], size=n),
+        "Kelompok Makanan": rng.choice(["Serealia", "Sayuran", "Daging", "Ikan", "Olahan"], size=n),
+    })
+    for col in NUTRIENT_COLUMNS:
+        df[col] = rng.gamma(2.0, 10.0, size=n).round(2)
+    df["nama_clean"] = names
+    df["food_text"] = names
+    return df
+
+
+class SyntheticCatalog:
+    def __init__(self, n: int, root: Path):
+        import faiss
+
+        from core.bundle import Bundle
+        from core.matcher import FoodMatcher
+        from core.nutrition import NutritionCalculator
+
+        self.n = n
+        self.model = HashEmbeddingModel(EMBEDDING_DIM)
+        self.df = synthetic_catalog(n)
+
+        path = root / f"synthetic-{n}"
+        path.mkdir(parents=True)
+        self.df.to_parquet(path / "catalog.parquet")
+        emb = self.model.encode(self.df["food_text"].tolist())
+        np.save(path / "embeddings.npy", emb)
+        faiss.normalize_L2(emb)
+        index = faiss.IndexFlatIP(EMBEDDING_DIM)
+        index.add(emb)
+        faiss.write_index(index, str(path / "index.faiss"))
+        with open(path / "manifest.json", "w", encoding="utf-8") as f:
+            json.dump({"version": f"synthetic-{n}", "rows": n, "dim": EMBEDDING_DIM}, f)
+
+        bundle = Bundle.open(path)
+        self.matcher = FoodMatcher(bundle)
+        self.matcher.model = self.model
+        self.nutrition_calc = NutritionCalculator(bundle)
+        # Bentuk foods_from_supabase (hasil JOIN backend) untuk generate_daily_recommendation
+        self.records = [
+            {
+                "food_id": i,
+                "name": row["Nama Bahan Makanan"],
+                "price_estimated": 500 + (i * 37) % 7500,
+                "protein": row["Protein"],
+                "fat": row["Lemak Total"],
+                "sugar": row["Gula"],
+            }
+            for i, row in enumerate(self.df.to_dict(orient="records"))
+        ]
+
+
+@pytest.fixture(scope="session", params=CATALOG_SIZES, ids=lambda n: f"{n}rows")
+def catalog(request, tmp_path_factory):
+    return SyntheticCatalog(request.param, tmp_path_factory.mktemp("catalog"))
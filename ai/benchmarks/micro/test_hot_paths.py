@@ -0,0 +1,87 @@
+# ai/benchmarks/micro/test_hot_paths.py
+"""
+Microbenchmark hot path per request. Fungsi yang sangat cepat (parse_candidates,
+portion_to_gram, get_nutrition_smart) diukur per batch input (BATCH kali daftar input)
+supaya satu round cukup panjang dan noise timer kecil.
+Fixture `catalog` (conftest) diparametrisasi per ukuran katalog sintetis.
+"""
+
+import pytest
+
+from core.daily_recommendation import generate_daily_recommendation
+from core.portion import portion_to_gram
+
+BATCH = 50
+RAW_INPUTS = [
+    "nasi putih dan ayam goreng",
+    "2 potong tempe goreng, sayur bayam + es teh manis",
+    "mie rebus lalu telur ceplok & kerupuk",
+    "bubur ayam",
+    "1 mangkuk soto ayam, 1 piring nasi putih dan 2 butir telur rebus",
+    "",
+]
+PORTIONS = [
+    (1, "porsi", "nasi putih"), (2, "potong", "tempe goreng"), (1.5, "mangkuk", "soto ayam"),
+    (3, "sendok", "sambal"), (150, "gram", "ayam bakar"), (100, "g", None), (1, "buah", "pisang"),
+    (2, "butir", "telur rebus"), (1, "Gelas", "susu"), (1, None, "kerupuk"),
+]
+QUERIES = ["tempe goreng", "nasi putih", "ayam bakar pedas", "sayur bayam kuah", "ikan bandeng"]
+LLM_CANDIDATES = ["tahu goreng", "tempe bacem", "tahu isi"]
+WEEKLY_ANALYSIS = {
+    "patterns": [{"type": "negative", "message": "Asupan protein kurang dari target", "impact": "High"}],
+    "recommendations": ["Tambahkan sumber protein seperti telur, ikan, atau tahu"],
+}
+USER_PREFERENCES = {"budget": 5000, "likes": ["tahu", "tempe"], "avoid": ["gorengan"]}
+
+
+@pytest.mark.benchmark(group="parse_candidates")
+def test_parse_candidates(benchmark):
+    from app import parse_candidates
+
+    texts = RAW_INPUTS * BATCH
+    result = benchmark(lambda: [parse_candidates(text) for text in texts])
+    assert result[1] == ["2 potong tempe goreng", "sayur bayam", "es teh manis"]
+
+
+@pytest.mark.benchmark(group="portion_to_gram")
+def test_portion_to_gram(benchmark):
+    portions = PORTIONS * BATCH
+    result = benchmark(lambda: [portion_to_gram(*p) for p in portions])
+    assert result[:2] == [150, 160]
+
+
+@pytest.mark.benchmark(group="get_nutrition_smart")
+@pytest.mark.parametrize("similarity", [0.95, 0.6], ids=["exact", "average"])
+def test_get_nutrition_smart(benchmark, catalog, similarity):
+    calc = catalog.nutrition_calc
+    matches = [
+        [{"food_id": (i * 7919 + j) % catalog.n, "nama_clean": "", "similarity": similarity - 0.01 * j}
+         for j in range(5)]
+        for i in range(10)
+    ]
+    result = benchmark(lambda: [calc.get_nutrition_smart(m, 2, "potong") for m in matches])
+    assert result[0]["metode"] == ("exact_match" if similarity >= 0.90 else "average")
+
+
+@pytest.mark.benchmark(group="search_single_local")
+def test_search_single_local(benchmark, catalog):
+    matcher = catalog.matcher
+    result = benchmark(lambda: [matcher._search_single_local(q, 5) for q in QUERIES])
+    assert all(len(r) == 5 for r in result)
+
+
+@pytest.mark.benchmark(group="match_with_llm_candidates")
+def test_match_with_llm_candidates(benchmark, catalog):
+    result = benchmark(catalog.matcher.match_with_llm_candidates, LLM_CANDIDATES, 5)
+    assert 0 < len(result) <= 5
+
+
+@pytest.mark.benchmark(group="generate_daily_recommendation")
+def test_generate_daily_recommendation(benchmark, catalog):
+    result = benchmark(
+        generate_daily_recommendation,
+        weekly_analysis=WEEKLY_ANALYSIS,
+        user_preferences=USER_PREFERENCES,
+        foods_from_supabase=catalog.records,
+    )
+    assert result["recommendedFoods"]
@@ -1,19 +1,30 @@
 """
 NutriMori AI Core Module
+
+Exports are resolved lazily (PEP 562) so that importing a light submodule
+such as core.refinement or core.startup_profiler does not pull in pandas,
+torch or google.generativeai.
 """
 
-try:
-    from .matcher import FoodMatcher
-    from .nutrition import NutritionCalculator
-    from .llm_helper import generate_food_candidates
-    from .portion import portion_to_gram
-    
-    __all__ = [
-        'FoodMatcher',
-        'NutritionCalculator',
-        'generate_food_candidates',
-        'portion_to_gram'
-    ]
-except ImportError as e:
-    print(f"Warning: Failed to import some modules: {e}")
-    print("Make sure all dependencies are installed: pip install -r requirements.txt")
+import importlib
+
+_EXPORTS = {
+    'FoodMatcher': '.matcher',
+    'NutritionCalculator': '.nutrition',
+    'generate_food_candidates': '.llm_helper',
+    'portion_to_gram': '.portion',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    try:
+        module = importlib.import_module(_EXPORTS[name], __name__)
+    except ImportError as e:
+        print(f"Warning: Failed to import some modules: {e}")
+        print("Make sure all dependencies are installed: pip install -r requirements.txt")
+        raise
+    return getattr(module, name)
@@ -0,0 +1,240 @@
+# ai/core/admission.py
+
+import functools
+import math
+import os
+import threading
+import time
+
+from . import metrics
+from .memory_utils import get_process_memory_mb
+
+# Batas RSS per worker; 0 = tanpa budget (readiness hanya melaporkan RSS)
+MEMORY_BUDGET_MB = float(os.environ.get("MEMORY_BUDGET_MB", "0"))
+# Di atas rasio ini dari budget -> mode degraded (tanpa Gemini); >= budget -> tolak request berat
+MEMORY_DEGRADE_RATIO = float(os.environ.get("MEMORY_DEGRADE_RATIO", "0.85"))
+# Antrian sebuah endpoint terisi >= rasio ini -> mode degraded
+QUEUE_DEGRADE_RATIO = float(os.environ.get("ADMISSION_QUEUE_DEGRADE_RATIO", "0.5"))
+# Lama maksimum menunggu slot sebelum 503
+ADMISSION_QUEUE_TIMEOUT_S = float(os.environ.get("ADMISSION_QUEUE_TIMEOUT_S", "10"))
+ADMISSION_ENABLED = os.environ.get("ADMISSION_CONTROL", "1") == "1"
+
+# Default per grup endpoint: (request berjalan, request menunggu).
+# Override: ADMISSION_<NAMA>_CONCURRENCY / ADMISSION_<NAMA>_QUEUE
+DEFAULT_LIMITS = {
+    "match": (8, 32),
+    "parse": (8, 32),
+    "bulk": (1, 2),
+    "recommendation": (4, 16),
+    "search": (16, 64),
+}
+
+# RSS dibaca paling sering sekali per interval ini
+_RSS_TTL_S = 1.0
+
+
+class Saturated(Exception):
+    """Endpoint penuh (slot + antrian) atau memori melewati budget."""
+
+    def __init__(self, name: str, reason: str, retry_after: int):
+        super().__init__(f"{name}: {reason}")
+        self.name = name
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionLimit:
+    """
+    Semaphore dengan antrian terbatas untuk satu grup endpoint.
+    Request yang tidak dapat slot menunggu maksimal queue_timeout; jika antrian
+    sudah penuh langsung ditolak (fail fast, tanpa menumpuk thread).
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        # EWMA durasi request (detik), dipakai untuk estimasi Retry-After
+        self.avg_service_s = 0.5
+        self._cond = threading.Condition()
+
+    def acquire(self) -> bool:
+        with self._cond:
+            if self.active < self.max_concurrent and self.waiting == 0:
+                self.active += 1
+                self.admitted += 1
+                return True
+            if self.waiting >= self.max_queue:
+                self.rejected += 1
+                return False
+            self.waiting += 1
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                while self.active >= self.max_concurrent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timed_out += 1
+                        return False
+                    self._cond.wait(remaining)
+            finally:
+                self.waiting -= 1
+            self.active += 1
+            self.admitted += 1
+            return True
+
+    def release(self, elapsed_s: float = None):
+        with self._cond:
+            self.active -= 1
+            if elapsed_s is not None:
+                self.avg_service_s = 0.8 * self.avg_service_s + 0.2 * elapsed_s
+            self._cond.notify()
+
+    def retry_after(self) -> int:
+        """Perkiraan detik sampai antrian saat ini habis."""
+        backlog = (self.waiting + 1) / self.max_concurrent
+        return max(1, math.ceil(self.avg_service_s * backlog))
+
+    def queue_pressure(self) -> float:
+        return self.waiting / self.max_queue if self.max_queue else float(self.active >= self.max_concurrent)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "active": self.active,
+                "waiting": self.waiting,
+                "maxConcurrent": self.max_concurrent,
+                "maxQueue": self.max_queue,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "timedOut": self.timed_out,
+                "avgServiceMs": round(self.avg_service_s * 1000, 1),
+            }
+
+
+class AdmissionController:
+    """
+    Admission control per grup endpoint + status tekanan proses:
+      ok       : normal
+      degraded : antrian mulai penuh atau RSS mendekati budget -> lewati Gemini
+      critical : RSS >= MEMORY_BUDGET_MB -> request baru ke endpoint berat ditolak
+    """
+
+    def __init__(self, limits: dict = None, memory_budget_mb: float = MEMORY_BUDGET_MB,
+                 queue_timeout: float = ADMISSION_QUEUE_TIMEOUT_S, enabled: bool = ADMISSION_ENABLED):
+        self.enabled = enabled
+        self.memory_budget_mb = memory_budget_mb
+        self.limits = {}
+        for name, (conc, queue) in (limits or DEFAULT_LIMITS).items():
+            env = name.upper()
+            conc = int(os.environ.get(f"ADMISSION_{env}_CONCURRENCY", conc))
+            queue = int(os.environ.get(f"ADMISSION_{env}_QUEUE", queue))
+            self.limits[name] = AdmissionLimit(name, conc, queue, queue_timeout)
+        self._rss = (0.0, 0.0)  # (timestamp, mb)
+        self._rss_lock = threading.Lock()
+
+    def rss_mb(self) -> float:
+        now = time.monotonic()
+        ts, mb = self._rss
+        if now - ts > _RSS_TTL_S:
+            with self._rss_lock:
+                ts, mb = self._rss
+                if now - ts > _RSS_TTL_S:
+                    mb = get_process_memory_mb()
+                    self._rss = (now, mb)
+        return mb
+
+    def level(self) -> str:
+        if self.memory_budget_mb > 0:
+            rss = self.rss_mb()
+            if rss >= self.memory_budget_mb:
+                return "critical"
+            if rss >= self.memory_budget_mb * MEMORY_DEGRADE_RATIO:
+                return "degraded"
+        if any(l.queue_pressure() >= QUEUE_DEGRADE_RATIO for l in self.limits.values()):
+            return "degraded"
+        return "ok"
+
+    def degraded(self) -> bool:
+        """True jika fitur mahal (LLM refinement) sebaiknya dilewati."""
+        return self.enabled and self.level() != "ok"
+
+    def acquire(self, name: str) -> AdmissionLimit:
+        limit = self.limits[name]
+        if not self.enabled:
+            return limit
+        if self.memory_budget_mb > 0 and self.rss_mb() >= self.memory_budget_mb:
+            metrics.incr(f"admission.{name}.shed_memory")
+            raise Saturated(name, "memory budget exceeded", limit.retry_after())
+        if not limit.acquire():
+            metrics.incr(f"admission.{name}.shed_queue")
+            raise Saturated(name, "too many requests", limit.retry_after())
+        return limit
+
+    def readiness(self) -> dict:
+        rss = self.rss_mb()
+        return {
+            "level": self.level(),
+            "rssMb": round(rss, 1),
+            "memoryBudgetMb": self.memory_budget_mb or None,
+            "memoryUsedRatio": round(rss / self.memory_budget_mb, 3) if self.memory_budget_mb > 0 else None,
+            "queueDepth": sum(l.waiting for l in self.limits.values()),
+            "inFlight": sum(l.active for l in self.limits.values()),
+            "endpoints": {name: l.stats() for name, l in self.limits.items()},
+        }
+
+    def guard(self, name: str, on_reject):
+        """
+        Decorator Flask view: ambil slot `name` sebelum view jalan.
+        on_reject(Saturated) -> response (mis. 503 + Retry-After).
+        Untuk response streaming, slot baru dilepas saat stream selesai.
+        """
+
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                try:
+                    limit = self.acquire(name)
+                except Saturated as e:
+                    return on_reject(e)
+                if not self.enabled:
+                    return view(*args, **kwargs)
+
+                t0 = time.perf_counter()
+
+                def release():
+                    limit.release(time.perf_counter() - t0)
+
+                try:
+                    rv = view(*args, **kwargs)
+                except BaseException:
+                    release()
+                    raise
+                if getattr(rv, "is_streamed", False):
+                    rv.call_on_close(release)
+                else:
+                    release()
+                return rv
+
+            return wrapper
+
+        return decorator
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_admission_controller() -> AdmissionController:
+    global _controller
+    if _controller is None:
+        with _controller_lock:
+            if _controller is None:
+                _controller = AdmissionController()
+                metrics.register("admission", _controller.readiness)
+    return _controller
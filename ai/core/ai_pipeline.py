@@ -1,15 +1,32 @@
 # ai/core/ai_pipeline.py
 
+import os
 import uuid
 from datetime import datetime, timezone
 
-from .food_parser import parse_food_text
-from .llm_helper import generate_food_candidates
-from .matcher import FoodMatcher
-from .nutrition import NutritionCalculator
+from .food_parser import (
+    RULE_PARSER_MIN_CONFIDENCE,
+    parse_food_text_fast,
+    parse_food_with_candidates,
+    rule_based_parse,
+)
+from .bundle import get_bundle_manager
+from .llm_helper import generate_food_candidates, generate_food_candidates_batch
 
-matcher = FoodMatcher()
-nutrition_calc = NutritionCalculator()
+# Matcher & kalkulator nutrisi milik snapshot katalog aktif (bukan salinan privat):
+# ikut bundle swap, dan tidak me-load katalog + index kedua kalinya
+
+
+def get_matcher():
+    return get_bundle_manager().current().matcher
+
+
+def get_nutrition_calc():
+    return get_bundle_manager().current().nutrition_calc
+
+# "combined": satu request Gemini untuk parse + kandidat semua item (O(1) round trip)
+# "per_item": parse lalu generate_food_candidates per item (jalur lama, juga fallback)
+PIPELINE_LLM_MODE = os.environ.get("PIPELINE_LLM_MODE", "combined").strip().lower()
 
 
 def infer_meal_type(ts: datetime):
@@ -20,14 +37,42 @@ def infer_meal_type(ts: datetime):
     return "Camilan"
 
 
+def parse_with_candidates(text: str):
+    """
+    Return (items, parser) dengan setiap item sudah punya key "candidates".
+    """
+    if PIPELINE_LLM_MODE == "combined":
+        items, conf = rule_based_parse(text)
+        if items and conf >= RULE_PARSER_MIN_CONFIDENCE:
+            # Parse sudah jelas, cukup satu request untuk kandidat semua item
+            batch = generate_food_candidates_batch([it["name"] for it in items])
+            if batch is not None:
+                for it, cands in zip(items, batch):
+                    it["candidates"] = cands
+                return items, "rules"
+        else:
+            combined = parse_food_with_candidates(text)
+            if combined:
+                return combined, "llm_combined"
+        print("[Pipeline] Combined LLM mode gagal, fallback ke per-item")
+
+    parsed, parser_used = parse_food_text_fast(text)
+    for it in parsed:
+        it["candidates"] = generate_food_candidates(it["name"])
+    return parsed, parser_used
+
+
 def smart_food_pipeline(text: str, ts: datetime | None = None):
     if ts is None:
         ts = datetime.now(timezone.utc)
 
     meal_type = infer_meal_type(ts)
 
-    # 1. SMART FOOD PARSER
-    parsed = parse_food_text(text)
+    # 1. SMART FOOD PARSER + 2. LLM NORMALIZER
+    #    (rule-based dulu, Gemini hanya jika confidence rendah; kandidat dalam satu request)
+    parsed, parser_used = parse_with_candidates(text)
+    # Satu snapshot untuk semua item: food_id match dan nutrisinya dari versi katalog yang sama
+    snapshot = get_bundle_manager().current()
 
     smart_items = []
     total_nutr = {}
@@ -37,12 +82,10 @@ def smart_food_pipeline(text: str, ts: datetime | None = None):
         qty = item["qty"]
         unit = item["unit"]
         conf = item["confidence"]
-
-        # 2. LLM NORMALIZER
-        candidates = generate_food_candidates(name)
+        candidates = item["candidates"]
 
         # 3. MATCHER
-        matches = matcher.match_with_llm_candidates(candidates, top_final=5)
+        matches = snapshot.matcher.match_with_llm_candidates(candidates, top_final=5)
 
         if not matches:
             smart_items.append({
@@ -60,7 +103,7 @@ def smart_food_pipeline(text: str, ts: datetime | None = None):
             continue
 
         # 4. NUTRISI
-        nutr = nutrition_calc.get_nutrition_smart(matches, qty, unit)
+        nutr = snapshot.nutrition_calc.get_nutrition_smart(matches, qty, unit)
 
         for k, v in nutr.items():
             if k in ["nama_pilihan", "gram", "metode"]:
@@ -91,6 +134,7 @@ def smart_food_pipeline(text: str, ts: datetime | None = None):
         "userInput": text,
         "parsedResult": {
             "mealType": meal_type,
+            "parser": parser_used,
             "items": smart_items
         },
         "createdAt": created_at
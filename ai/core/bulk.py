@@ -0,0 +1,203 @@
+# ai/core/bulk.py
+
+import json
+import os
+import time
+from collections import OrderedDict
+
+from .food_parser import parse_food_text, rule_based_parse, RULE_PARSER_MIN_CONFIDENCE
+from .refinement import match_candidates_batched
+
+# Jumlah entri per tahap batch (parse -> match -> nutrisi -> stream)
+BULK_CHUNK_SIZE = int(os.environ.get("BULK_CHUNK_SIZE", "256"))
+# Hasil per teks yang diingat lintas chunk (LRU, memori tetap terbatas)
+BULK_DEDUPE_CACHE = int(os.environ.get("BULK_DEDUPE_CACHE", "10000"))
+# Batas entri per request
+BULK_MAX_ENTRIES = int(os.environ.get("BULK_MAX_ENTRIES", "100000"))
+
+NUTRITION_SUMMARY = ["Energi", "Protein", "Lemak Total", "Karbohidrat", "Gula", "Serat", "Natrium"]
+
+
+def iter_entries(data=None, stream=None):
+    """
+    Normalisasi input bulk menjadi generator (id, text):
+      - JSON: ["teks", ...] atau {"entries": [{"id": .., "text": ..}, ...]}
+      - NDJSON (stream baris): "teks" / {"id": .., "text": ..} per baris
+    Baris/entri yang tidak valid menghasilkan (id, ValueError) agar entri lain tetap diproses.
+    """
+    if stream is not None:
+        for n, line in enumerate(stream):
+            try:
+                line = line.decode("utf-8") if isinstance(line, bytes) else line
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+            except ValueError as e:
+                yield n, ValueError(f"baris {n + 1} bukan JSON valid: {e}")
+                continue
+            yield _entry(entry, n)
+        return
+
+    entries = data.get("entries", []) if isinstance(data, dict) else data
+    for n, entry in enumerate(entries or []):
+        yield _entry(entry, n)
+
+
+def _entry(entry, n):
+    if isinstance(entry, str):
+        return n, entry
+    if isinstance(entry, dict):
+        return entry.get("id", n), str(entry.get("text", ""))
+    return n, ValueError(f"entri {n} harus teks atau object {{id, text}}, bukan {type(entry).__name__}")
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _parse(text, allow_llm):
+    items, confidence = rule_based_parse(text)
+    if (not items or confidence < RULE_PARSER_MIN_CONFIDENCE) and allow_llm:
+        llm_items = parse_food_text(text)
+        if llm_items:
+            return llm_items, "llm"
+    if not items and text.strip():
+        # Rule parser gagal total: perlakukan seluruh teks sebagai satu item
+        items = [{"name": text.strip(), "qty": 1, "unit": "porsi", "confidence": 0.0}]
+    return items, "rules"
+
+
+def _match_chunk(parsed, food_matcher, nutrition_calc, top_n, allow_llm):
+    """Tahap 3 + 4 untuk satu chunk: {key: [item hasil]} untuk setiap teks yang berhasil di-parse."""
+    names = list(dict.fromkeys(
+        str(it["name"]) for v in parsed.values() if not isinstance(v, Exception) for it in v[0]
+    ))
+    matched = dict(zip(names, match_candidates_batched(food_matcher, names, top_n, allow_llm=allow_llm))) if names else {}
+
+    flat = [(key, it) for key, v in parsed.items() if not isinstance(v, Exception) for it in v[0]]
+    nutrition = nutrition_calc.get_nutrition_batch(
+        [matched[str(it["name"])]["matches"] for _, it in flat],
+        [float(it.get("qty") or 1) for _, it in flat],
+        [it.get("unit") or "porsi" for _, it in flat],
+    ) if flat else []
+
+    results = {key: [] for key, v in parsed.items() if not isinstance(v, Exception)}
+    for (key, it), nutr in zip(flat, nutrition):
+        m = matched[str(it["name"])]
+        best = m["matches"][0] if m["matches"] else None
+        results[key].append({
+            "name": it["name"],
+            "qty": it.get("qty", 1),
+            "unit": it.get("unit", "porsi"),
+            "match": best,
+            "method": m["method"],
+            "nutrition": _round_nutrition(nutr),
+        })
+    return results
+
+
+def bulk_match(entries, food_matcher, nutrition_calc, top_n=3, allow_llm=False, chunk_size=None):
+    """
+    Generator hasil per entri (urutan input), diproses per chunk:
+      1. dedupe teks (lowercase, spasi dirapikan) (juga lintas chunk lewat LRU terbatas)
+      2. parse (rule parser; Gemini hanya jika allow_llm)
+      3. match semua nama item unik dalam chunk sekaligus (batched encode + FAISS)
+      4. nutrisi tervektorisasi untuk semua item
+    Entri yang gagal (input tidak valid, parse, atau match chunk-nya gagal) menjadi
+    {"type": "result", "id", "error"}; entri berikutnya tetap diproses.
+    Diakhiri satu dict {"type": "summary"}.
+    """
+    chunk_size = chunk_size or BULK_CHUNK_SIZE
+    cache = OrderedDict()
+    t0 = time.perf_counter()
+    stats = {"entries": 0, "unique": 0, "items": 0, "errors": 0, "llmParses": 0}
+
+    for chunk in _chunks(entries, chunk_size):
+        if stats["entries"] + len(chunk) > BULK_MAX_ENTRIES:
+            chunk = chunk[:max(0, BULK_MAX_ENTRIES - stats["entries"])]
+            stats["truncated"] = True
+        if not chunk:
+            break
+        stats["entries"] += len(chunk)
+
+        # Kunci dedupe: lowercase + spasi dirapikan (tanda baca dipertahankan, "1/2" dan "," bermakna)
+        keys = [None if isinstance(text, Exception) else " ".join(text.lower().split()) for _, text in chunk]
+        todo = list(dict.fromkeys(k for k in keys if k is not None and k not in cache))
+        stats["unique"] += len(todo)
+
+        # 2. parse per teks unik
+        parsed = {}
+        for key in todo:
+            try:
+                items, parser = _parse(key, allow_llm)
+                parsed[key] = (items, parser)
+                stats["llmParses"] += parser == "llm"
+            except Exception as e:
+                parsed[key] = e
+
+        # 3 + 4. match nama unik + nutrisi satu kali per chunk; gagal -> hanya entri chunk ini error
+        try:
+            results = _match_chunk(parsed, food_matcher, nutrition_calc, top_n, allow_llm)
+            chunk_error = None
+        except Exception as e:
+            print(f"❌ Bulk chunk gagal: {e}")
+            results, chunk_error = {}, e
+
+        chunk_values = {k: cache[k] for k in keys if k in cache}
+        for key in todo:
+            value = parsed[key]
+            if isinstance(value, Exception):
+                chunk_values[key] = {"error": str(value)}
+            elif chunk_error is not None:
+                # Kegagalan sementara (mis. Gemini) tidak disimpan di LRU: duplikat berikutnya dicoba lagi
+                chunk_values[key] = {"error": str(chunk_error)}
+                continue
+            else:
+                items = results[key]
+                chunk_values[key] = {"parser": value[1], "items": items, "totals": _totals(items)}
+            cache[key] = chunk_values[key]
+            while len(cache) > BULK_DEDUPE_CACHE:
+                cache.popitem(last=False)
+        for key in keys:
+            if key in cache:
+                cache.move_to_end(key)
+
+        for (entry_id, text), key in zip(chunk, keys):
+            if key is None:
+                stats["errors"] += 1
+                yield {"type": "result", "id": entry_id, "error": str(text)}
+                continue
+            value = chunk_values[key]
+            if "error" in value:
+                stats["errors"] += 1
+            else:
+                stats["items"] += len(value["items"])
+            yield {"type": "result", "id": entry_id, "text": text, **value}
+
+    stats["elapsedMs"] = round((time.perf_counter() - t0) * 1000, 1)
+    yield {"type": "summary", **stats}
+
+
+def _round_nutrition(nutr):
+    if nutr is None:
+        return None
+    out = {"gram": round(nutr["gram"], 1), "nama_pilihan": nutr["nama_pilihan"], "metode": nutr["metode"]}
+    for col in NUTRITION_SUMMARY:
+        if col in nutr:
+            out[col] = round(float(nutr[col]), 2)
+    return out
+
+
+def _totals(items):
+    totals = {col: 0.0 for col in NUTRITION_SUMMARY}
+    for it in items:
+        for col in NUTRITION_SUMMARY:
+            totals[col] += (it["nutrition"] or {}).get(col, 0.0)
+    return {col: round(v, 2) for col, v in totals.items()}
@@ -0,0 +1,355 @@
+# ai/core/bundle.py
+"""
+Bundle katalog berversi: parquet + embeddings + FAISS index dalam satu folder
+dengan manifest (checksum, model, dimensi, jumlah baris). Ketiganya selalu
+berpindah bersama, jadi food_id hasil FAISS selalu menunjuk baris parquet yang benar.
+
+Layout BUNDLE_DIR (dibuat preprocess/build_bundle.py):
+  CURRENT                 : nama folder versi aktif, mis. "v0003"
+  v0003/manifest.json     : version, model, dim, rows, files {nama: {sha256, bytes}}
+  v0003/catalog.parquet
+  v0003/embeddings.npy
+  v0003/index.faiss
+Tanpa BUNDLE_DIR/CURRENT, file lepas lama di data/ dipakai (versi "loose").
+
+Artifact turunan katalog (query table, kNN graph, spell index) menyimpan
+catalog_fingerprint bundle sumbernya di meta.json (Bundle.artifact_meta) dan
+hanya dipakai jika cocok dengan bundle aktif (Bundle.matches_artifact).
+
+Hot reload (BundleManager.reload): bundle baru di-load di samping yang lama,
+lalu satu referensi snapshot ditukar. Request yang sedang berjalan tetap memakai
+snapshot lama sampai selesai; request baru mendapat yang baru.
+"""
+
+import hashlib
+import json
+import os
+import signal
+import threading
+import time
+from pathlib import Path
+
+from . import metrics
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BASE_DIR / "data"
+BUNDLE_DIR = Path(os.environ.get("BUNDLE_DIR", DATA_DIR / "bundles"))
+# sha256 semua file dicek sebelum bundle dipakai (~50 ms untuk katalog sekarang)
+BUNDLE_VERIFY_CHECKSUMS = os.environ.get("BUNDLE_VERIFY_CHECKSUMS", "1") == "1"
+# > 0: setiap worker mengecek BUNDLE_DIR/CURRENT tiap N detik dan reload sendiri
+BUNDLE_WATCH_INTERVAL_S = float(os.environ.get("BUNDLE_WATCH_INTERVAL_S", "0"))
+BUNDLE_RELOAD_SIGNAL = os.environ.get("BUNDLE_RELOAD_SIGNAL", "SIGHUP")
+
+BUNDLE_FILES = {
+    "catalog": "catalog.parquet",
+    "embeddings": "embeddings.npy",
+    "index": "index.faiss",
+}
+LOOSE_FILES = {
+    "catalog": DATA_DIR / "data pangan bersih.parquet",
+    "embeddings": DATA_DIR / "build_embeddings.npy",
+    "index": DATA_DIR / "build_index.faiss",
+}
+
+
+class BundleError(Exception):
+    """Bundle tidak ada, rusak (checksum), atau tidak konsisten dengan isinya."""
+
+
+def sha256_file(path, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class Bundle:
+    def __init__(self, path=None, manifest: dict = None, files: dict = None):
+        self.path = Path(path) if path is not None else None
+        self.manifest = manifest or {}
+        self.version = self.manifest.get("version", "loose")
+        self.files = files or {name: self.path / fname for name, fname in BUNDLE_FILES.items()}
+        self._fingerprints = {}
+
+    @classmethod
+    def open(cls, path):
+        path = Path(path)
+        try:
+            with open(path / "manifest.json", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            raise BundleError(f"manifest {path} tidak bisa dibaca: {e}") from e
+        return cls(path, manifest)
+
+    @classmethod
+    def loose(cls):
+        """File lepas lama di data/ (sebelum ada bundle); tanpa manifest."""
+        return cls(files=dict(LOOSE_FILES))
+
+    @property
+    def is_loose(self) -> bool:
+        return self.path is None
+
+    def file(self, name: str) -> Path:
+        return self.files[name]
+
+    def verify(self, checksums: bool = BUNDLE_VERIFY_CHECKSUMS):
+        """Ukuran + sha256 setiap file sesuai manifest; BundleError jika tidak."""
+        for name, info in self.manifest.get("files", {}).items():
+            path = self.file(name)
+            if not path.exists():
+                raise BundleError(f"{self.version}: {path.name} tidak ada")
+            if path.stat().st_size != info["bytes"]:
+                raise BundleError(f"{self.version}: ukuran {path.name} tidak sesuai manifest")
+            if checksums and sha256_file(path) != info["sha256"]:
+                raise BundleError(f"{self.version}: checksum {path.name} tidak sesuai manifest")
+
+    def check_loaded(self, rows: int = None, ntotal: int = None, dim: int = None, model: str = None):
+        """Cek isi yang sudah di-load terhadap manifest (dan rows == ntotal untuk file lepas)."""
+        expected = self.manifest
+        if rows is not None and ntotal is not None and rows != ntotal:
+            raise BundleError(f"{self.version}: katalog {rows} baris tapi index {ntotal} vektor")
+        for key, actual in (("rows", rows), ("rows", ntotal), ("dim", dim), ("model", model)):
+            if actual is not None and key in expected and expected[key] != actual:
+                raise BundleError(f"{self.version}: {key} {actual!r} != manifest {expected[key]!r}")
+
+    def sha256(self, name: str) -> str:
+        """sha256 file dari manifest; dihitung untuk file lepas / manifest tanpa checksum."""
+        info = self.manifest.get("files", {}).get(name)
+        return info["sha256"] if info and info.get("sha256") else sha256_file(self.file(name))
+
+    def fingerprint(self, with_index: bool = True) -> str:
+        """Identitas isi katalog + index: food_id artifact turunan hanya valid untuk pasangan yang sama.
+
+        with_index=False: katalog saja, untuk artifact yang tidak bergantung pada FAISS index
+        (kosakata spell index).
+        """
+        if with_index not in self._fingerprints:
+            source = f"{self.sha256('catalog')}:{self.sha256('index')}" if with_index else self.sha256("catalog")
+            self._fingerprints[with_index] = hashlib.sha256(source.encode("ascii")).hexdigest()[:16]
+        return self._fingerprints[with_index]
+
+    def artifact_meta(self, with_index: bool = True) -> dict:
+        """Field meta.json untuk artifact yang dibangun dari bundle ini."""
+        return {"catalog_version": self.version, "catalog_fingerprint": self.fingerprint(with_index)}
+
+    def matches_artifact(self, meta: dict, with_index: bool = True) -> bool:
+        """True jika artifact (meta.json) dibangun dari katalog (+ index) bundle ini."""
+        return meta.get("catalog_fingerprint") == self.fingerprint(with_index)
+
+    def describe(self) -> dict:
+        return {
+            "version": self.version,
+            "path": str(self.path) if self.path else None,
+            **{k: self.manifest.get(k) for k in ("model", "dim", "rows", "created_at") if k in self.manifest},
+        }
+
+
+def current_version_name(bundle_dir=BUNDLE_DIR):
+    pointer = Path(bundle_dir) / "CURRENT"
+    try:
+        return pointer.read_text(encoding="utf-8").strip() or None
+    except OSError:
+        return None
+
+
+def open_bundle(version: str = None, bundle_dir=BUNDLE_DIR) -> Bundle:
+    """Bundle versi tertentu, versi CURRENT, atau file lepas jika belum ada bundle."""
+    name = version or current_version_name(bundle_dir)
+    if name is None:
+        return Bundle.loose()
+    path = Path(bundle_dir) / name
+    if not path.is_dir():
+        raise BundleError(f"bundle {name} tidak ada di {bundle_dir}")
+    return Bundle.open(path)
+
+
+class CatalogSnapshot:
+    """Satu versi katalog yang konsisten: matcher + nutrition calculator dari bundle yang sama."""
+
+    __slots__ = ("bundle", "matcher", "nutrition_calc", "loaded_at")
+
+    def __init__(self, bundle, matcher, nutrition_calc):
+        self.bundle = bundle
+        self.matcher = matcher
+        self.nutrition_calc = nutrition_calc
+        self.loaded_at = time.time()
+
+    @property
+    def version(self) -> str:
+        return self.bundle.version
+
+
+class BundleManager:
+    """
+    Pemegang snapshot katalog aktif per proses.
+      current()        : snapshot aktif (di-load saat pertama diminta)
+      reload(version)  : load bundle baru di samping yang lama, tukar, jalankan callback
+      on_swap(fn)      : fn(snapshot) dipanggil setelah swap (invalidasi cache)
+    Embedding model tidak ikut di-load ulang (singleton di core/matcher.py).
+    """
+
+    def __init__(self, bundle_dir=BUNDLE_DIR):
+        self.bundle_dir = Path(bundle_dir)
+        self._snapshot = None
+        self._init_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._callbacks = []
+        self.reloads = 0
+        self.failures = 0
+        self.last_error = None
+        self.last_reload = None
+
+    def on_swap(self, callback):
+        self._callbacks.append(callback)
+        return callback
+
+    def _build(self, bundle: Bundle) -> CatalogSnapshot:
+        from .matcher import FoodMatcher
+        from .nutrition import NutritionCalculator
+        from .startup_profiler import profile_step
+
+        with profile_step(f"verify bundle {bundle.version}"):
+            bundle.verify()
+        with profile_step("FoodMatcher init"):
+            matcher = FoodMatcher(bundle)
+        with profile_step("NutritionCalculator init"):
+            nutrition_calc = NutritionCalculator(bundle)
+        if matcher.df is not None and len(matcher.df) != len(nutrition_calc.df):
+            raise BundleError(f"{bundle.version}: katalog berubah saat di-load")
+        return CatalogSnapshot(bundle, matcher, nutrition_calc)
+
+    def current(self) -> CatalogSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._init_lock:
+                if self._snapshot is None:
+                    self._snapshot = self._build(open_bundle(bundle_dir=self.bundle_dir))
+                    print(f"📦 Catalog bundle {self._snapshot.version} loaded")
+                snapshot = self._snapshot
+        return snapshot
+
+    def loaded(self) -> bool:
+        return self._snapshot is not None
+
+    def version(self) -> str:
+        """Versi aktif tanpa memicu load katalog."""
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot.version
+        return current_version_name(self.bundle_dir) or "loose"
+
+    def active_bundle(self) -> Bundle:
+        """Bundle versi aktif, tanpa memicu load katalog."""
+        snapshot = self._snapshot
+        return snapshot.bundle if snapshot is not None else open_bundle(bundle_dir=self.bundle_dir)
+
+    def catalog_path(self) -> Path:
+        """Parquet versi aktif (untuk modul yang membaca katalog sendiri)."""
+        return self.active_bundle().file("catalog")
+
+    def reload(self, version: str = None, force: bool = False) -> dict:
+        """
+        Load bundle `version` (default: CURRENT) lalu swap. Request yang sedang
+        berjalan selesai dengan snapshot lama. BundleError jika bundle tidak valid
+        (snapshot lama tetap aktif) atau reload lain sedang berjalan.
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            raise BundleError("reload lain sedang berjalan")
+        t0 = time.perf_counter()
+        try:
+            bundle = open_bundle(version, self.bundle_dir)
+            old = self._snapshot
+            if old is not None and old.version == bundle.version and not force:
+                return {"changed": False, "version": old.version}
+
+            print(f"📦 Loading catalog bundle {bundle.version} (aktif: {old.version if old else '-'})...")
+            new = self._build(bundle)
+            self._snapshot = new  # swap atomik: satu assignment referensi
+            for callback in self._callbacks:
+                try:
+                    callback(new)
+                except Exception as e:
+                    print(f"⚠️ Bundle swap callback {getattr(callback, '__name__', callback)} gagal: {e}")
+
+            elapsed_ms = round((time.perf_counter() - t0) * 1000, 1)
+            self.reloads += 1
+            self.last_error = None
+            self.last_reload = {"from": old.version if old else None, "to": new.version,
+                                "at": new.loaded_at, "elapsedMs": elapsed_ms}
+            metrics.incr("bundle.reloads")
+            print(f"✅ Catalog bundle {new.version} aktif ({elapsed_ms} ms)")
+            return {"changed": True, **self.last_reload}
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            metrics.incr("bundle.reload_failed")
+            print(f"❌ Reload bundle gagal, tetap di versi lama: {e}")
+            raise
+        finally:
+            self._reload_lock.release()
+
+    def reload_in_background(self, version: str = None):
+        def run():
+            try:
+                self.reload(version)
+            except Exception:
+                pass  # sudah dicatat di reload()
+
+        thread = threading.Thread(target=run, name="bundle-reload", daemon=True)
+        thread.start()
+        return thread
+
+    def install_signal_handler(self, signame: str = BUNDLE_RELOAD_SIGNAL) -> bool:
+        """Reload di background saat menerima sinyal (hanya bisa dari main thread)."""
+        signum = getattr(signal, signame, None)
+        if signum is None or threading.current_thread() is not threading.main_thread():
+            return False
+        signal.signal(signum, lambda *_: self.reload_in_background())
+        return True
+
+    def watch(self, interval_s: float = BUNDLE_WATCH_INTERVAL_S):
+        """Thread yang reload begitu BUNDLE_DIR/CURRENT menunjuk versi lain."""
+        if interval_s <= 0:
+            return None
+
+        def loop():
+            while True:
+                time.sleep(interval_s)
+                name = current_version_name(self.bundle_dir)
+                if name and self._snapshot is not None and name != self._snapshot.version:
+                    try:
+                        self.reload(name)
+                    except Exception:
+                        pass
+
+        thread = threading.Thread(target=loop, name="bundle-watch", daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "active": snapshot.bundle.describe() if snapshot else None,
+            "loadedAt": snapshot.loaded_at if snapshot else None,
+            "current": current_version_name(self.bundle_dir),
+            "reloads": self.reloads,
+            "failures": self.failures,
+            "lastReload": self.last_reload,
+            "lastError": self.last_error,
+        }
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_bundle_manager() -> BundleManager:
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = BundleManager()
+                metrics.register("bundle", _manager.stats)
+    return _manager
@@ -1,4 +1,7 @@
-from typing import Dict, List
+from typing import Dict, List, Optional
+
+from .meal_plan import DEFAULT_MAX_ITEMS, DEFAULT_TIME_LIMIT_MS, MealPlanSolver, find_akg_target
+from .recommendation_engine import RecommendationEngine, get_recommendation_engine
 
 
 def generate_daily_recommendation(
@@ -39,116 +42,67 @@ def generate_daily_recommendation(
     }
     """
 
-    # ===============================
-    # 1. USER PREFERENCES
-    # ===============================
-    budget = user_preferences.get("budget")
-    avoid = set(x.lower() for x in user_preferences.get("avoid", []))
-    likes = set(x.lower() for x in user_preferences.get("likes", []))
-
-    # ===============================
-    # 2. WEEKLY ISSUE (INTERNAL ONLY)
-    # ===============================
-    patterns = weekly_analysis.get("patterns", [])
-    recommendations = weekly_analysis.get("recommendations", [])
-
-    key_issue = None
-    for p in patterns:
-        if p.get("type") == "negative" and p.get("impact") == "High":
-            key_issue = p.get("message")
-            break
-
-    if not key_issue and patterns:
-        key_issue = patterns[0].get("message")
-
-    main_reco_text = recommendations[0] if recommendations else None
-
-    # ===============================
-    # 3. SCORING FOOD (RULE-BASED)
-    # ===============================
-    scored = []
-
-    for food in foods_from_supabase:
-        food_id = food.get("food_id")
-        name = food.get("name", "")
-        price = food.get("price_estimated", 0)
-
-        protein = food.get("protein", 0)
-        fat = food.get("fat", 0)
-        sugar = food.get("sugar", 0)
-
-        if not name:
-            continue
-
-        # Avoid preference
-        if name.lower() in avoid:
-            continue
-
-        # Budget constraint
-        if budget and price > budget:
-            continue
-
-        score = 0
-
-        # Focus weekly issue
-        if key_issue and "protein" in key_issue.lower():
-            if protein >= 8:
-                score += 2
-            else:
-                score -= 1
-
-        # Penalize unhealthy
-        if fat >= 15:
-            score -= 0.5
-        if sugar >= 15:
-            score -= 0.5
-
-        # User likes
-        if likes and any(l in name.lower() for l in likes):
-            score += 0.5
-
-        # Cheap food bonus
-        if budget:
-            score += max(0, 1 - (price / budget))
+    # Aturan loop lama persis (legacy), divektorisasi (lihat core.recommendation_engine)
+    engine = RecommendationEngine.from_legacy_records(foods_from_supabase)
+    return engine.recommend(weekly_analysis, user_preferences, top_k=top_k)
 
-        scored.append({
-            "foodId": food_id,
-            "name": name,
-            "estimatedPrice": round(price),
-            "score": score
-        })
 
-    # ===============================
-    # 4. SORT & PICK TOP
-    # ===============================
-    scored.sort(key=lambda x: x["score"], reverse=True)
-    top_foods = scored[:top_k]
-
-    # ===============================
-    # 5. FINAL OUTPUT
-    # ===============================
-    recommended = []
-
-    for f in top_foods:
-        reason_parts = []
-
-        if key_issue:
-            reason_parts.append(key_issue.rstrip("."))
+def recommend_for_user(
+    *,
+    weekly_analysis: Dict,
+    user_preferences: Dict,
+    candidate_catalog: Optional[List[Dict]] = None,
+    top_k: int = 5
+) -> Dict:
+    """
+    Rekomendasi harian atas katalog lengkap (parquet + harga pangan) yang
+    fiturnya sudah dihitung sekali per proses. candidate_catalog hanya dipakai
+    sebagai override jika backend ingin membatasi kandidat.
+    """
+    if candidate_catalog:
+        engine = RecommendationEngine.from_catalog(candidate_catalog)
+    else:
+        engine = get_recommendation_engine()
+    return engine.recommend(weekly_analysis, user_preferences, top_k=top_k)
 
-        if main_reco_text:
-            reason_parts.append(main_reco_text.rstrip("."))
 
-        reason_parts.append(
-            "Dipilih karena harga terjangkau dan sesuai preferensi kamu"
-        )
+def generate_meal_plan(
+    *,
+    profile: Dict,
+    user_preferences: Dict,
+    candidate_catalog: Optional[List[Dict]] = None,
+    consumed: Optional[Dict] = None,
+    max_items: int = DEFAULT_MAX_ITEMS,
+    time_limit_ms: float = DEFAULT_TIME_LIMIT_MS
+) -> Dict:
+    """
+    MEAL PLAN MODE: pilih kombinasi makanan + gram yang meminimalkan gap
+    nutrisi terhadap AKG kelompok user, dengan total harga <= budget harian.
 
-        recommended.append({
-            "foodId": f["foodId"],
-            "name": f["name"],
-            "estimatedPrice": f["estimatedPrice"],
-            "reason": ". ".join(reason_parts) + "."
-        })
+    INPUT:
+    - profile          : {"group": "Perempuan", "age": 27, "condition"?: "Hamil", "stage"?: "Trimester 2"}
+    - user_preferences : {"dailyBudget" (atau "budget"): 30000, "avoid": [...], "likes": [...]}
+    - consumed         : nutrisi yang sudah dimakan hari ini {"Energi": .., "Protein": ..}
 
-    return {
-        "recommendedFoods": recommended
-    }
\ No newline at end of file
+    OUTPUT:
+    { "mealPlan": { items, totalPrice, nutrients, targets, coverage, akg, solver } }
+    """
+    akg = find_akg_target(profile or {})
+    prefs = user_preferences or {}
+    budget = prefs.get("dailyBudget", prefs.get("budget"))
+
+    if candidate_catalog:
+        engine = RecommendationEngine.from_catalog(candidate_catalog)
+    else:
+        engine = get_recommendation_engine()
+
+    plan = MealPlanSolver(engine).solve(
+        akg["targets"],
+        user_preferences=prefs,
+        budget=float(budget) if budget else None,
+        max_items=max_items,
+        time_limit_ms=time_limit_ms,
+        consumed=consumed,
+    )
+    plan["akg"] = {"group": akg["group"], "umur": akg["umur"], "condition": akg["condition"]}
+    return {"mealPlan": plan}
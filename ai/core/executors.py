@@ -0,0 +1,30 @@
+# ai/core/executors.py
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Dengan worker gthread, banyak request thread bisa jalan bersamaan. I/O
+# (Gemini, Supabase) aman dijalankan paralel karena melepas GIL, tapi encode
+# model adalah kerja CPU: kalau 32 thread encode bersamaan, torch saling
+# berebut core dan semuanya melambat. Encode dilewatkan ke pool kecil ini.
+EMBED_WORKERS = int(os.environ.get("EMBED_WORKERS", "1"))
+
+_cpu_executor = None
+_cpu_lock = threading.Lock()
+
+
+def get_cpu_executor() -> ThreadPoolExecutor:
+    global _cpu_executor
+    if _cpu_executor is None:
+        with _cpu_lock:
+            if _cpu_executor is None:
+                _cpu_executor = ThreadPoolExecutor(max_workers=EMBED_WORKERS, thread_name_prefix="embed")
+    return _cpu_executor
+
+
+def run_cpu(fn, *args, **kwargs):
+    """Jalankan fn di executor CPU terbatas dan tunggu hasilnya (request thread hanya menunggu)."""
+    if threading.current_thread().name.startswith("embed"):
+        return fn(*args, **kwargs)
+    return get_cpu_executor().submit(fn, *args, **kwargs).result()
@@ -1,6 +1,9 @@
 import json
+import os
 import re
-import google.generativeai as genai
+
+from .llm_helper import call_gemini_json, get_genai
+from .portion import PORSI_MAP
 
 INDONESIAN_NUMBER_WORDS = {
     "setengah": 0.5,
@@ -13,6 +16,172 @@ INDONESIAN_NUMBER_WORDS = {
     "lima": 5,
 }
 
+# Confidence minimum hasil rule parser agar Gemini tidak perlu dipanggil
+RULE_PARSER_MIN_CONFIDENCE = float(os.environ.get("RULE_PARSER_MIN_CONFIDENCE", "0.8"))
+
+_NUMBER_WORDS = {
+    **INDONESIAN_NUMBER_WORDS,
+    "enam": 6,
+    "tujuh": 7,
+    "delapan": 8,
+    "sembilan": 9,
+    "sepuluh": 10,
+}
+
+# Singkatan / variasi ejaan -> key PORSI_MAP
+_UNIT_ALIASES = {
+    "mangkok": "mangkuk",
+    "ptg": "potong",
+    "bks": "bungkus",
+    "sdm": "sendok",
+    "sdt": "sendok",
+    "biji": "butir",
+    "iris": "slice",
+    "irisan": "slice",
+    "gelas": "gelas",
+    "cangkir": "gelas",
+}
+_GRAM_UNITS = {"gram": "gram", "gr": "gram", "g": "gram"}
+
+# Kata yang biasanya butuh pemahaman konteks (lebih aman diserahkan ke Gemini)
+_AMBIGUOUS_WORDS = {
+    "tanpa", "pakai", "pake", "tapi", "yang", "sedikit", "banyak", "agak",
+    "setiap", "tiap", "kurang", "lebih", "atau", "bekas", "sisa", "level",
+}
+
+_SEPARATOR_PATTERN = r"\s+(?:dan|sama|lalu|serta|plus)\s+|[,+&;\n]"
+_NUMBER_PATTERN = re.compile(r"^(\d+(?:[.,]\d+)?|\d+/\d+)(x)?$")
+
+
+def _resolve_unit(token: str):
+    if token in PORSI_MAP:
+        return token
+    if token in _UNIT_ALIASES:
+        return _UNIT_ALIASES[token]
+    return _GRAM_UNITS.get(token)
+
+
+def _parse_number(token: str):
+    """Angka ("2", "1,5", "1/2", "2x") atau kata bilangan ("dua", "setengah")."""
+    m = _NUMBER_PATTERN.match(token)
+    if m:
+        num = m.group(1)
+        if "/" in num:
+            a, b = num.split("/")
+            return float(a) / float(b) if float(b) else None
+        return float(num.replace(",", "."))
+    if token in _NUMBER_WORDS:
+        return float(_NUMBER_WORDS[token])
+    return None
+
+
+def _take_quantity(tokens: list, i: int):
+    """
+    Baca [QTY] [setengah] [UNIT] mulai dari tokens[i].
+    Return (qty, unit, jumlah token terpakai); qty/unit None jika tidak ada.
+    """
+    qty, unit, used = None, None, 0
+    tok = tokens[i]
+
+    # "sepiring", "sebutir", "seporsi" -> 1 <unit>
+    if tok.startswith("se") and _resolve_unit(tok[2:]) and tok not in _NUMBER_WORDS:
+        return 1.0, _resolve_unit(tok[2:]), 1
+
+    qty = _parse_number(tok)
+    if qty is None:
+        return None, None, 0
+    used = 1
+
+    # "satu setengah" -> 1.5
+    if used + i < len(tokens) and tokens[i + used] == "setengah" and qty >= 1:
+        qty += 0.5
+        used += 1
+
+    if i + used < len(tokens):
+        unit = _resolve_unit(tokens[i + used])
+        if unit:
+            used += 1
+
+    return qty, unit, used
+
+
+def _rule_parse_segment(segment: str, default_unit: str):
+    tokens = re.findall(r"[a-z0-9/.,]+", segment.lower())
+    tokens = [t.strip(".,") or t for t in tokens]
+    tokens = [t for t in tokens if t]
+    if not tokens:
+        return None
+
+    qty, unit, name_tokens = None, None, []
+    confidence = 0.95
+    i = 0
+    while i < len(tokens):
+        q, u, used = _take_quantity(tokens, i)
+        if used:
+            if qty is not None:
+                # dua jumlah dalam satu item ("2 tempe 3 potong") -> ambigu
+                confidence -= 0.3
+            else:
+                qty, unit = q, u
+                # jumlah di tengah nama ("tempe 2 goreng") lebih jarang
+                if name_tokens and i + used < len(tokens):
+                    confidence -= 0.2
+            i += used
+            continue
+        name_tokens.append(tokens[i])
+        i += 1
+
+    if not name_tokens:
+        return None
+
+    if any(re.search(r"\d", t) for t in name_tokens):
+        confidence -= 0.3
+    if any(t in _AMBIGUOUS_WORDS for t in name_tokens):
+        confidence -= 0.3
+    if len(name_tokens) > 5:
+        confidence -= 0.2
+    if qty is None:
+        qty = 1.0
+        confidence -= 0.05
+    elif qty <= 0:
+        # "telur 0 butir": sama seperti validator Gemini (qty <= 0 ditolak) -> serahkan ke LLM
+        confidence = 0.0
+
+    return {
+        "name": " ".join(name_tokens),
+        "qty": qty,
+        "unit": unit or default_unit,
+        "confidence": round(max(confidence, 0.0), 2),
+    }
+
+
+def rule_based_parse(text: str, default_unit="porsi"):
+    """
+    Parser deterministik (tanpa LLM) untuk input umum seperti
+    "2 tempe goreng dan nasi setengah porsi".
+
+    Grammar per item: [QTY [UNIT]] NAMA [QTY [UNIT]], dengan QTY berupa angka,
+    pecahan, atau kata bilangan (INDONESIAN_NUMBER_WORDS), dan UNIT dari PORSI_MAP.
+
+    Return (items, confidence) — confidence = nilai terendah antar item.
+    """
+    if not text or not text.strip():
+        return [], 0.0
+
+    items = []
+    for segment in re.split(_SEPARATOR_PATTERN, text, flags=re.IGNORECASE):
+        if not segment or not segment.strip():
+            continue
+        item = _rule_parse_segment(segment, default_unit)
+        if item is None:
+            # segmen tanpa nama makanan (mis. hanya angka) -> serahkan ke LLM
+            return items, 0.0
+        items.append(item)
+
+    if not items:
+        return [], 0.0
+    return items, min(it["confidence"] for it in items)
+
 def _fallback_parse(text: str, default_unit="porsi"):
     parts = re.split(r"\b(dan|sama|\+|,)\b", text, flags=re.IGNORECASE)
     items = []
@@ -75,7 +244,7 @@ def parse_food_text(text: str, default_unit="porsi"):
 
     for mn in model_names:
         try:
-            model = genai.GenerativeModel(
+            model = get_genai().GenerativeModel(
                 mn,
                 generation_config={"response_mime_type": "application/json"}
             )
@@ -106,4 +275,102 @@ def parse_food_text(text: str, default_unit="porsi"):
             print(f"[FoodParser] Model {mn} gagal: {e}")
 
     # fallback jika semua gagal
-    return _fallback_parse(text)
\ No newline at end of file
+    return _fallback_parse(text)
+
+
+def parse_food_text_fast(text: str, default_unit="porsi", min_confidence=None):
+    """
+    Rule parser dulu; Gemini (parse_food_text) hanya jika confidence rendah.
+    Return (items, parser) dengan parser = "rules" atau "llm".
+    """
+    if min_confidence is None:
+        min_confidence = RULE_PARSER_MIN_CONFIDENCE
+
+    items, confidence = rule_based_parse(text, default_unit)
+    if items and confidence >= min_confidence:
+        return items, "rules"
+
+    print(f"[FoodParser] Rule parser confidence {confidence:.2f} < {min_confidence}, pakai Gemini")
+    return parse_food_text(text, default_unit), "llm"
+
+
+# Schema output gabungan parse + kandidat (dipakai di prompt & validasi)
+PARSE_WITH_CANDIDATES_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "required": ["name", "qty", "unit", "candidates"],
+        "properties": {
+            "name": {"type": "string"},
+            "qty": {"type": "number"},
+            "unit": {"type": "string"},
+            "confidence": {"type": "number"},
+            "candidates": {"type": "array", "items": {"type": "string"}},
+        },
+    },
+}
+
+
+def _validate_parse_with_candidates(data, default_unit="porsi"):
+    """Validasi & normalisasi output Gemini terhadap PARSE_WITH_CANDIDATES_SCHEMA."""
+    if not isinstance(data, list) or not data:
+        raise ValueError("output harus array tidak kosong")
+
+    norm = []
+    for item in data:
+        if not isinstance(item, dict):
+            raise ValueError("item harus object")
+        missing = [k for k in PARSE_WITH_CANDIDATES_SCHEMA["items"]["required"] if k not in item]
+        if missing:
+            raise ValueError(f"field wajib hilang: {missing}")
+
+        name = str(item["name"]).strip()
+        qty = float(item["qty"])
+        cands = item["candidates"]
+        if not name or qty <= 0:
+            raise ValueError("name kosong atau qty <= 0")
+        if not isinstance(cands, list):
+            raise ValueError("candidates harus array")
+        cands = [str(c).strip() for c in cands if str(c).strip()]
+
+        norm.append({
+            "name": name,
+            "qty": qty,
+            "unit": str(item.get("unit") or default_unit),
+            "confidence": float(item.get("confidence", 0.9)),
+            "candidates": cands or [name],
+        })
+    return norm
+
+
+def parse_food_with_candidates(text: str, default_unit="porsi"):
+    """
+    Satu request Gemini untuk parse item (qty, unit, nama) sekaligus kandidat
+    nama baku per item. Return list item (dengan key "candidates"), atau None
+    jika Gemini gagal / output tidak lolos schema.
+    """
+    prompt = f"""
+    Pecahkan input makanan menjadi item terpisah.
+    Untuk tiap item tentukan jumlah (qty), satuan (unit), nama makanannya (name),
+    dan 3 kandidat nama baku di database komposisi pangan TKPI/USDA (candidates)
+    dengan format "Bahan Utama, detail spesifik, metode pengolahan", contoh
+    "Daging ayam, dada, goreng". Kandidat tidak boleh mengandung angka/satuan.
+
+    Jika tidak ada jumlah → qty = 1.
+    Jika tidak ada unit → unit = "{default_unit}".
+
+    Output HARUS JSON sesuai schema berikut:
+    {json.dumps(PARSE_WITH_CANDIDATES_SCHEMA)}
+
+    Contoh:
+    [
+      {{ "name": "ayam geprek", "qty": 1, "unit": "porsi", "confidence": 0.95,
+         "candidates": ["Daging ayam, goreng tepung", "Ayam, paha, goreng", "Ayam goreng, dengan kulit"] }}
+    ]
+
+    Input user:
+    "{text}"
+    """
+    return call_gemini_json(
+        prompt, validate=lambda data: _validate_parse_with_candidates(data, default_unit)
+    )
@@ -1,14 +1,100 @@
-import google.generativeai as genai
 import json
 import os
 import time
 import random
+import threading
+
+from .singleflight import SingleFlight
+from .startup_profiler import profiled_import
+from .text_utils import normalize_query
 
 # Pastikan API KEY sudah diset
 # os.environ["GOOGLE_API_KEY"] = "MASUKKAN_API_KEY_ANDA"
 # genai.configure(api_key=os.environ["GOOGLE_API_KEY"])
 
-def generate_food_candidates(query_text):
+# "rest" lebih ramah untuk worker gthread/gevent daripada gRPC (default library)
+GEMINI_TRANSPORT = os.environ.get("GEMINI_TRANSPORT", "rest")
+
+_genai = None
+_genai_lock = threading.Lock()
+
+
+def get_genai():
+    """
+    Lazy import google.generativeai (import-nya mahal, ~1 detik) dan configure
+    dengan GOOGLE_API_KEY saat pertama kali Gemini benar-benar dipakai.
+    """
+    global _genai
+    if _genai is None:
+        with _genai_lock:
+            if _genai is None:
+                genai = profiled_import("google.generativeai")
+                api_key = os.getenv("GOOGLE_API_KEY")
+                endpoint = os.getenv("GEMINI_API_ENDPOINT")
+                if endpoint:
+                    # Endpoint alternatif (mis. loadtest/fake_gemini.py), hanya via REST
+                    genai.configure(
+                        api_key=api_key or "fake",
+                        transport="rest",
+                        client_options={"api_endpoint": endpoint},
+                    )
+                elif api_key:
+                    genai.configure(api_key=api_key, transport=GEMINI_TRANSPORT)
+                _genai = genai
+    return _genai
+
+GEMINI_MODELS = [
+    "models/gemini-flash-latest",   # Versi stabil Flash
+    "models/gemini-pro-latest",     # Versi stabil Pro
+    "models/gemini-2.0-flash-lite", # Ringan
+    "models/gemini-2.0-flash",      # Canggih
+]
+
+
+def call_gemini_json(prompt, validate=None):
+    """
+    Kirim prompt ke Gemini (JSON mode), coba model satu per satu.
+    validate(data) boleh menormalisasi data atau raise ValueError jika tidak sesuai
+    schema; model berikutnya dicoba. Jitter hanya dipakai sebelum retry.
+    Return data hasil validate, atau None jika semua model gagal.
+    """
+    for i, model_name in enumerate(GEMINI_MODELS):
+        try:
+            if i > 0:
+                time.sleep(0.5 + random.random())
+            model = get_genai().GenerativeModel(
+                model_name,
+                generation_config={"response_mime_type": "application/json"}
+            )
+            response = model.generate_content(prompt)
+            data = json.loads(response.text.strip())
+            return validate(data) if validate else data
+        except Exception as e:
+            print(f"[LLM] Model {model_name} gagal: {e}")
+            continue
+    return None
+
+_candidates_flight = SingleFlight("generate_food_candidates")
+
+
+def generate_food_candidates(query_text, cancel_event=None):
+    """
+    Petakan input user ke kandidat nama baku via Gemini.
+
+    cancel_event (threading.Event, opsional): jika sudah di-set sebelum request
+    dikirim (mis. direct search ternyata sudah cukup), panggilan dibatalkan dan
+    mengembalikan list kosong tanpa memakai kuota Gemini.
+
+    Input yang sama (setelah normalize_query) yang sedang diproses request lain
+    ikut menunggu satu panggilan Gemini itu (single-flight); pembatalan baru
+    berlaku jika semua request yang menunggu sudah membatalkan.
+    """
+    key = normalize_query(query_text) or query_text
+    candidates, _ = _candidates_flight.do(key, _generate_food_candidates, query_text, cancel_event=cancel_event)
+    return list(candidates)
+
+
+def _generate_food_candidates(query_text, cancel_event=None):
     # Prompt yang lebih spesifik agar menghapus angka/satuan
     prompt = f"""
     Bertindaklah sebagai ahli database nutrisi (TKPI & USDA). 
@@ -36,11 +122,14 @@ def generate_food_candidates(query_text):
     for model_name in model_list:
         try:
             time.sleep(0.5 + random.random())
+            if cancel_event is not None and cancel_event.is_set():
+                print("LLM refinement dibatalkan (direct match sudah cukup)")
+                return []
             print(f"Mencoba model: {model_name}...") # Debugging log
             
             # FITUR BARU: Menggunakan response_mime_type untuk memaksa output JSON
             # Ini didukung di google-generativeai >= 0.5.0
-            model = genai.GenerativeModel(
+            model = get_genai().GenerativeModel(
                 model_name,
                 generation_config={"response_mime_type": "application/json"}
             )
@@ -64,4 +153,50 @@ def generate_food_candidates(query_text):
         return query_text.split(" dan ")
         
     # Kembalikan input asli sebagai jalan terakhir
-    return [query_text]
\ No newline at end of file
+    return [query_text]
+
+
+def _validate_candidate_lists(n_inputs):
+    def validate(data):
+        if not isinstance(data, list) or len(data) != n_inputs:
+            raise ValueError("jumlah hasil tidak sama dengan jumlah input")
+        out = []
+        for entry in data:
+            cands = entry.get("candidates") if isinstance(entry, dict) else entry
+            if not isinstance(cands, list):
+                raise ValueError("candidates harus array")
+            cands = [str(c).strip() for c in cands if str(c).strip()]
+            if not cands:
+                raise ValueError("candidates kosong")
+            out.append(cands)
+        return out
+    return validate
+
+
+def generate_food_candidates_batch(query_texts):
+    """
+    Versi batch generate_food_candidates: satu request Gemini untuk banyak input.
+    Return list kandidat (urutan sama dengan input), atau None jika Gemini gagal
+    sehingga caller bisa kembali ke jalur per-item.
+    """
+    if not query_texts:
+        return []
+
+    numbered = "\n".join(f'{i + 1}. "{q}"' for i, q in enumerate(query_texts))
+    prompt = f"""
+    Bertindaklah sebagai ahli database nutrisi (TKPI & USDA).
+    Untuk SETIAP input makanan user di bawah, berikan 3 kandidat nama baku yang ada di database komposisi pangan.
+
+    ATURAN PENAMAAN (PENTING):
+    1. Gunakan format "Bahan Utama, detail spesifik, metode pengolahan".
+    2. Tiru gaya database resmi: "Keju, cheddar", "Mentega, asin", "Daging ayam, dada, mentah".
+    3. Prioritaskan istilah dalam Bahasa Indonesia baku (TKPI), jika tidak ada gunakan terjemahan baku USDA.
+    4. Abaikan angka dan satuan porsi.
+
+    Input user:
+    {numbered}
+
+    Output HANYA JSON array dengan panjang {len(query_texts)} dan urutan sama dengan input:
+    [{{"input": "tempe goreng", "candidates": ["Tempe, goreng", "Tempe kedelai murni, goreng", "Tempe, bacem"]}}]
+    """
+    return call_gemini_json(prompt, validate=_validate_candidate_lists(len(query_texts)))
@@ -0,0 +1,88 @@
+# ai/core/llm_trace.py
+"""
+Jejak refinement Gemini / reranker (input user -> istilah LLM -> match akhir) dalam JSONL,
+bahan untuk preprocess/mine_aliases.py. Setiap worker menulis file sendiri
+(trace-<pid>.jsonl) supaya baris dari beberapa proses tidak bercampur.
+
+Trace menyimpan teks input user apa adanya, jadi default mati (LLM_TRACE=1 untuk
+mengumpulkan). File di-roll setiap LLM_TRACE_MAX_MB menjadi trace-<pid>-<ns>.jsonl;
+hanya LLM_TRACE_KEEP_FILES file terbaru (selain file aktif) yang disimpan.
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from . import metrics
+from .text_utils import normalize_query
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+IS_VERCEL = os.environ.get("VERCEL", "0") == "1"
+# Berisi input user mentah: opt-in. Filesystem Vercel read-only, jadi tetap mati di sana
+LLM_TRACE_ENABLED = os.environ.get("LLM_TRACE", "0") == "1" and not IS_VERCEL
+LLM_TRACE_DIR = Path(os.environ.get("LLM_TRACE_DIR", BASE_DIR / "data" / "llm_trace"))
+# Roll file aktif pada ukuran ini (0 = tanpa batas); simpan sejumlah file lama terbaru
+LLM_TRACE_MAX_BYTES = int(float(os.environ.get("LLM_TRACE_MAX_MB", "10")) * 1024 * 1024)
+LLM_TRACE_KEEP_FILES = int(os.environ.get("LLM_TRACE_KEEP_FILES", "5"))
+
+_lock = threading.Lock()
+_disabled = not LLM_TRACE_ENABLED
+
+
+def record(query: str, terms, matches, method: str = "llm_enhanced"):
+    """Tambahkan satu baris trace; gagal tulis -> trace dimatikan untuk proses ini."""
+    global _disabled
+    if _disabled:
+        return
+    top = matches[0] if matches else None
+    entry = {
+        "ts": round(time.time(), 3),
+        "query": query,
+        "norm": normalize_query(query),
+        "terms": list(terms or []),
+        "method": method,
+        "top": {
+            "food_id": top["food_id"],
+            "nama": str(top["nama"]),
+            "nama_clean": str(top.get("nama_clean") or normalize_query(str(top["nama"]))),
+            "similarity": round(float(top["similarity"]), 4),
+            **({"rerank_score": round(float(top["rerank_score"]), 4)} if "rerank_score" in top else {}),
+        } if top else None,
+    }
+    line = json.dumps(entry, ensure_ascii=False) + "\n"
+    with _lock:
+        try:
+            LLM_TRACE_DIR.mkdir(parents=True, exist_ok=True)
+            path = LLM_TRACE_DIR / f"trace-{os.getpid()}.jsonl"
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line)
+                size = f.tell()
+        except OSError as e:
+            print(f"⚠️ LLM trace dimatikan: {e}")
+            _disabled = True
+            return
+        if LLM_TRACE_MAX_BYTES and size >= LLM_TRACE_MAX_BYTES:
+            try:
+                _rotate(path)
+            except OSError as e:
+                print(f"⚠️ LLM trace gagal di-roll: {e}")
+    metrics.incr("llm_trace.records")
+
+
+def _mtime(path: Path) -> float:
+    try:
+        return path.stat().st_mtime
+    except OSError:
+        return 0.0  # sudah dihapus worker lain
+
+
+def _rotate(path: Path):
+    """File aktif -> trace-<pid>-<ns>.jsonl, lalu hapus file lama di luar LLM_TRACE_KEEP_FILES terbaru."""
+    path.rename(path.with_name(f"{path.stem}-{time.time_ns()}.jsonl"))
+    metrics.incr("llm_trace.rotations")
+    # Hanya file yang sudah di-roll (trace-<pid>-<ns>); trace-<pid>.jsonl worker lain masih aktif
+    old = sorted(path.parent.glob("trace-*-*.jsonl"), key=_mtime, reverse=True)
+    for stale in old[LLM_TRACE_KEEP_FILES:]:
+        stale.unlink(missing_ok=True)
@@ -1,39 +1,96 @@
 import numpy as np
 import os
 import json
-from pathlib import Path
+import re
+import threading
+
+from .executors import run_cpu
+from .model_server import MODEL_SERVER_SOCKET, get_model_client
+from .query_table import get_query_table
+from .startup_profiler import profile_step, profiled_import
+from .topology import configure_threads
 
 # Cek Mode Deploy (Vercel/Supabase)
 IS_VERCEL = os.environ.get("VERCEL", "0") == "1"
 USE_SUPABASE = IS_VERCEL or os.environ.get("USE_SUPABASE", "0") == "1"
 
 # --- GLOBAL MODEL CACHE ---
+EMBEDDING_MODEL_NAME = "Qwen/Qwen3-Embedding-0.6B"
 _cached_model = None
+_model_lock = threading.Lock()
 
 def get_embedding_model():
     """
     Get or load the embedding model (singleton pattern).
-    Model is loaded once and cached globally.
+    Model is loaded once and cached globally (thread-safe, so a background
+    warmup thread and a request thread never load it twice).
+
+    With MODEL_SERVER_SOCKET set, returns a ModelClient instead: the model lives
+    in the shared model server process (core/model_server.py).
     """
     global _cached_model
     
-    if _cached_model is None:
-        print("  ⏳ Loading Qwen3 Embedding Model (first time only)...")
-        from sentence_transformers import SentenceTransformer
-        
-        _cached_model = SentenceTransformer(
-            "Qwen/Qwen3-Embedding-0.6B",
+    if _cached_model is not None:
+        return _cached_model
+
+    with _model_lock:
+        if _cached_model is None:
+            if MODEL_SERVER_SOCKET:
+                _cached_model = get_model_client()
+            else:
+                _cached_model = load_local_embedding_model()
+    
+    return _cached_model
+
+
+def load_local_embedding_model():
+    """Load + warmup SentenceTransformer di proses ini."""
+    print("  ⏳ Loading Qwen3 Embedding Model (first time only)...")
+    st = profiled_import("sentence_transformers")
+    # Thread torch/faiss sesuai topologi worker (OMP_NUM_THREADS dari gunicorn post_fork)
+    configure_threads()
+    
+    with profile_step("load embedding model"):
+        model = st.SentenceTransformer(
+            EMBEDDING_MODEL_NAME,
             trust_remote_code=True,
             device="cpu"  # Force CPU for faster startup; change to "cuda" if GPU available
         )
-        
-        # Warmup: do a dummy encode to initialize all internal states
-        print("  ⏳ Warming up model...")
-        _ = _cached_model.encode(["warmup"], prompt_name="query", convert_to_numpy=True)
-        
-        print("  ✅ Model ready!")
     
-    return _cached_model
+    # Warmup: do a dummy encode to initialize all internal states
+    print("  ⏳ Warming up model...")
+    with profile_step("warmup encode"):
+        _ = model.encode(["warmup"], prompt_name="query", convert_to_numpy=True)
+    
+    print("  ✅ Model ready!")
+    return model
+
+
+def is_model_loaded() -> bool:
+    """True jika embedding model sudah selesai di-load (tanpa memicu loading)."""
+    return _cached_model is not None
+
+
+_background_loader = None
+
+def load_model_in_background():
+    """Mulai load embedding model di thread terpisah (fast-start mode)."""
+    global _background_loader
+    if _background_loader is None and _cached_model is None:
+        _background_loader = threading.Thread(
+            target=get_embedding_model, name="model-loader", daemon=True
+        )
+        _background_loader.start()
+    return _background_loader
+
+
+def is_model_warming() -> bool:
+    """True selama background loader masih berjalan dan model belum siap."""
+    return (
+        _cached_model is None
+        and _background_loader is not None
+        and _background_loader.is_alive()
+    )
 
 
 def parse_embedding(emb):
@@ -73,21 +130,85 @@ def parse_embedding(emb):
     return None
 
 class FoodMatcher:
-    def __init__(self):
+    def __init__(self, bundle=None):
+        """bundle: core.bundle.Bundle (default: versi CURRENT, atau file lepas di data/)."""
         self.use_supabase = USE_SUPABASE
         self.supabase = None
         self.index = None
         self.df = None
+        self.bundle = None
+        self._vocab = None
+        self._lexical_index = None
+        # Model di-load saat pertama dibutuhkan (lihat get_embedding_model),
+        # supaya katalog & index bisa dipakai sebelum model siap
+        self._model = None
         
         if self.use_supabase:
             print("☁️ Using Supabase vector search")
             self._init_supabase_client()
         else:
             print("💻 Using local FAISS index")
-            self._init_local()
-        
-        # Pre-load model during initialization
-        self.model = get_embedding_model()
+            self._init_local(bundle)
+
+        # Query table dibaca lewat get_query_table() (bisa di-reset saat bundle swap);
+        # top-k prekomputasi hanya dipakai jika tabel dibangun dari bundle ini
+        self._topk_checked = None
+        self._table_checked = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = get_embedding_model()
+        return self._model
+
+    @model.setter
+    def model(self, value):
+        self._model = value
+
+    @property
+    def query_table(self):
+        """
+        Query embedding prekomputasi untuk frasa yang paling sering.
+        None jika tidak ada, atau dibangun dengan model / dimensi lain (vektornya tidak cocok dengan index).
+        """
+        table = get_query_table()
+        checked = self._table_checked
+        if checked is None or checked[0] is not table:
+            index = getattr(self, "index", None)
+            ok = table is not None and table.matches_model(
+                EMBEDDING_MODEL_NAME, index.d if index is not None else None)
+            if table is not None and not ok:
+                print(f"  ⚠️ Query table dibangun untuk model {table.meta.get('model')!r} "
+                      f"dim {table.meta.get('dim')}, bukan {EMBEDDING_MODEL_NAME!r}: tidak dipakai")
+            self._table_checked = checked = (table, ok)
+        return checked[0] if checked[1] else None
+
+    @property
+    def _query_topk_ok(self) -> bool:
+        table = self.query_table
+        checked = self._topk_checked
+        if checked is None or checked[0] is not table:
+            ok = (
+                table is not None
+                and not self.use_supabase
+                and table.matches_catalog(getattr(self, "bundle", None), self.index)
+            )
+            if table is not None and not ok and not self.use_supabase:
+                print("  ⚠️ Query table dibangun dari katalog lain: top-k prekomputasi tidak dipakai")
+            self._topk_checked = checked = (table, ok)
+        return checked[1]
+
+    def model_ready(self) -> bool:
+        """True jika embed() bisa jalan tanpa menunggu model di-load."""
+        return self._model is not None or is_model_loaded()
+
+    def model_warming(self) -> bool:
+        """True jika model sedang di-load di background (jawab leksikal dulu)."""
+        return self._model is None and is_model_warming()
+
+    def has_cached_query(self, text) -> bool:
+        """True jika text bisa dicari tanpa model (ada di query table)."""
+        return getattr(self, "query_table", None) is not None and self.query_table.contains(text)
 
     def _get_model(self):
         """Return cached model."""
@@ -95,7 +216,7 @@ class FoodMatcher:
 
     def _init_supabase_client(self):
         """Inisialisasi koneksi Supabase."""
-        from supabase import create_client
+        create_client = profiled_import("supabase").create_client
         
         url = os.environ.get("SUPABASE_URL")
         key = os.environ.get("SUPABASE_ANON_KEY") or os.environ.get("SUPABASE_KEY")
@@ -106,45 +227,145 @@ class FoodMatcher:
         self.supabase = create_client(url, key)
         print("  ✅ Supabase client ready")
 
-    def _init_local(self):
-        """Inisialisasi FAISS Lokal."""
-        import pandas as pd
-        import faiss
+    def _init_local(self, bundle=None):
+        """Inisialisasi FAISS Lokal dari satu bundle katalog (parquet + embeddings + index)."""
+        from .bundle import open_bundle
 
-        BASE_DIR = Path(__file__).resolve().parent.parent
-        DATA_DIR = BASE_DIR / "data"
+        pd = profiled_import("pandas")
+        bundle = self.bundle = bundle or open_bundle()
 
-        if not os.path.exists(DATA_DIR / "data pangan bersih.parquet"):
+        if not os.path.exists(bundle.file("catalog")):
              raise FileNotFoundError("❌ Database belum dibuat! Jalankan 'build_embeddings.py' dulu.")
 
-        self.df = pd.read_parquet(DATA_DIR / "data pangan bersih.parquet")
-        self.emb = np.load(DATA_DIR / "build_embeddings.npy")
-        self.index = faiss.read_index(str(DATA_DIR / "build_index.faiss"))
+        with profile_step("load catalog parquet"):
+            self.df = pd.read_parquet(bundle.file("catalog"))
+        if MODEL_SERVER_SOCKET:
+            # Index (dan model) dipegang model server; worker hanya butuh katalog.
+            # Server me-load index bundle ini (dicocokkan dengan sha256 manifest), jadi hot reload
+            # tidak mencari di index lama meski jumlah barisnya sama
+            from .bundle import BundleError
+            from .model_server import ModelServerError
+
+            self.emb = None
+            try:
+                self.index = get_model_client().index(bundle)
+            except ModelServerError as e:
+                raise BundleError(f"{bundle.version}: model server tidak bisa me-load index: {e}") from e
+        else:
+            faiss = profiled_import("faiss")
+            with profile_step("load embeddings + FAISS index"):
+                self.emb = np.load(bundle.file("embeddings"))
+                self.index = faiss.read_index(str(bundle.file("index")))
+        # Katalog dan index harus dari versi yang sama: food_id = baris parquet
+        bundle.check_loaded(rows=len(self.df), ntotal=self.index.ntotal, dim=self.index.d,
+                            model=EMBEDDING_MODEL_NAME)
+
+    def vocabulary(self):
+        """
+        Set token dari kolom nama_clean (hanya mode lokal).
+        Dipakai sebagai pre-signal murah sebelum embedding; None di mode Supabase.
+        """
+        if self._vocab is None and self.df is not None:
+            vocab = set()
+            for name in self.df["nama_clean"].astype(str):
+                vocab.update(name.split())
+            self._vocab = vocab
+        return self._vocab
+
+    def lexical_search(self, text, k=5):
+        """
+        Pencarian leksikal (token overlap, skor Dice 0-1) di nama_clean, tanpa model.
+        Dipakai selama model masih di-load di background (mode lokal saja).
+        """
+        if self.df is None:
+            return []
+        if self._lexical_index is None:
+            postings = {}
+            lengths = []
+            for row, name in enumerate(self.df["nama_clean"].astype(str)):
+                tokens = set(name.split())
+                lengths.append(len(tokens))
+                for tok in tokens:
+                    postings.setdefault(tok, []).append(row)
+            self._lexical_index = (postings, np.array(lengths, dtype="float32"))
+
+        postings, lengths = self._lexical_index
+        q_tokens = set(re.findall(r"[a-z0-9]+", str(text).lower()))
+        if not q_tokens:
+            return []
+
+        overlap = {}
+        for tok in q_tokens:
+            for row in postings.get(tok, ()):
+                overlap[row] = overlap.get(row, 0) + 1
+        if not overlap:
+            return []
+
+        rows = np.fromiter(overlap.keys(), dtype=np.int64, count=len(overlap))
+        hits = np.fromiter(overlap.values(), dtype="float32", count=len(overlap))
+        scores = 2 * hits / (len(q_tokens) + lengths[rows])
+        order = np.argsort(-scores)[:k]
+        return self._local_results(rows[order], scores[order])
+
+    def _table_row(self, text, count=True):
+        table = getattr(self, "query_table", None)
+        return table.lookup(text, count=count) if table is not None else None
 
     def embed(self, text):
         """
-        Embed text menggunakan Qwen3.
+        Embed text menggunakan Qwen3 (atau ambil dari query table jika ada).
         """
-        return self.model.encode([text], prompt_name="query", convert_to_numpy=True)[0]
+        row = self._table_row(text)
+        if row is not None:
+            return self.query_table.vector(row)
+        return self._encode([text])[0]
 
-    def _search_single_supabase(self, text, k=5):
+    def _encode(self, texts):
+        model = self.model
+        if getattr(model, "remote", False):
+            # Model server: request ini hanya menunggu socket, batching terjadi di server
+            return model.encode(texts)
+        return run_cpu(model.encode, texts, prompt_name="query", convert_to_numpy=True)
+
+    def embed_batch(self, texts):
         """
-        Search via Supabase RPC.
+        Embed banyak teks dalam satu forward pass (float32, belum dinormalisasi).
+        Teks yang ada di query table tidak ikut di-encode.
+        """
+        texts = list(texts)
+        rows = [self._table_row(t) for t in texts]
+        missing = [i for i, r in enumerate(rows) if r is None]
+
+        if not missing:
+            return np.stack([self.query_table.vector(r) for r in rows])
+
+        encoded = self._encode([texts[i] for i in missing]).astype("float32")
+        if len(missing) == len(texts):
+            return encoded
+
+        out = np.empty((len(texts), encoded.shape[1]), dtype="float32")
+        out[missing] = encoded
+        for i, r in enumerate(rows):
+            if r is not None:
+                out[i] = self.query_table.vector(r)
+        return out
+
+    def _cached_topk(self, text, k):
+        """(ids, sims) dari query table jika valid untuk index ini, selain itu None."""
+        if not getattr(self, "_query_topk_ok", False):
+            return None
+        row = self._table_row(text, count=False)
+        return self.query_table.topk(row, k) if row is not None else None
+
+    def _rpc_match_foods(self, q_emb, k=5):
+        """
+        Panggil RPC match_foods Supabase untuk satu embedding (sudah dinormalisasi).
         """
-        q_emb = self.embed(text).astype("float32")
-        
-        # Normalisasi L2 (untuk Cosine Similarity)
-        norm = np.linalg.norm(q_emb)
-        if norm > 0:
-            q_emb = q_emb / norm
-        
-        embedding_list = q_emb.tolist()
-        
         try:
             result = self.supabase.rpc(
                 'match_foods',
                 {
-                    'query_embedding': embedding_list,
+                    'query_embedding': q_emb.tolist(),
                     'match_count': k,
                     'match_threshold': 0.3 
                 }
@@ -167,16 +388,23 @@ class FoodMatcher:
             print(f"❌ Supabase Search Error: {e}")
             return []
 
-    def _search_single_local(self, text, k=5):
-        """Search via Local FAISS."""
-        q_emb = self.embed(text).astype("float32").reshape(1, -1)
+    def _search_single_supabase(self, text, k=5):
+        """
+        Search via Supabase RPC.
+        """
+        q_emb = self.embed(text).astype("float32")
         
-        import faiss
-        faiss.normalize_L2(q_emb)
-        D, I = self.index.search(q_emb, k)
+        # Normalisasi L2 (untuk Cosine Similarity)
+        norm = np.linalg.norm(q_emb)
+        if norm > 0:
+            q_emb = q_emb / norm
         
+        return self._rpc_match_foods(q_emb, k)
+
+    def _local_results(self, ids, sims):
+        """Ubah satu baris hasil FAISS (I, D) menjadi list match."""
         results = []
-        for idx, sim in zip(I[0], D[0]):
+        for idx, sim in zip(ids, sims):
             if idx == -1: continue
             row = self.df.iloc[idx]
             results.append({
@@ -187,6 +415,28 @@ class FoodMatcher:
             })
         return results
 
+    def _search_single_local(self, text, k=5):
+        """Search via Local FAISS."""
+        cached = self._cached_topk(text, k)
+        if cached is not None:
+            return self._local_results(*cached)
+
+        if self._remote_text_search([text]):
+            D, I = self.index.search_texts([text], k)
+            return self._local_results(I[0], D[0])
+
+        q_emb = self.embed(text).astype("float32").reshape(1, -1)
+        
+        import faiss
+        faiss.normalize_L2(q_emb)
+        D, I = self.index.search(q_emb, k)
+        
+        return self._local_results(I[0], D[0])
+
+    def _remote_text_search(self, texts) -> bool:
+        """Model server: encode + FAISS satu round trip, kecuali ada vektor dari query table."""
+        return getattr(self.index, "remote", False) and not any(self.has_cached_query(t) for t in texts)
+
     def _search_single(self, text, k=5):
         """Router: Pilih Cloud atau Local."""
         if self.use_supabase:
@@ -194,16 +444,64 @@ class FoodMatcher:
         else:
             return self._search_single_local(text, k)
 
-    def match_with_llm_candidates(self, candidates, top_final=5):
+    def search_many(self, texts, k=5):
+        """
+        Batch search: satu encode untuk semua teks, lalu satu FAISS search
+        (mode lokal) atau satu RPC per teks (mode Supabase).
+        Return list hasil dengan urutan sama seperti texts.
+        """
+        texts = list(texts)
+        if not texts:
+            return []
+        if len(texts) == 1:
+            return [self._search_single(texts[0], k)]
+
+        if not self.use_supabase and getattr(self, "_query_topk_ok", False):
+            # Frasa yang ada di query table langsung pakai top-k prekomputasi
+            cached = [self._cached_topk(t, k) for t in texts]
+            rest = [i for i, c in enumerate(cached) if c is None]
+            if len(rest) < len(texts):
+                rest_results = self._search_many_embedded([texts[i] for i in rest], k) if rest else []
+                out = [self._local_results(*c) if c is not None else None for c in cached]
+                for i, res in zip(rest, rest_results):
+                    out[i] = res
+                return out
+
+        return self._search_many_embedded(texts, k)
+
+    def _search_many_embedded(self, texts, k=5):
+        """Bagian search_many yang benar-benar butuh embedding."""
+        if len(texts) == 1:
+            return [self._search_single(texts[0], k)]
+
+        if self._remote_text_search(texts):
+            D, I = self.index.search_texts(texts, k)
+            return [self._local_results(I[r], D[r]) for r in range(len(texts))]
+
+        q_emb = self.embed_batch(texts)
+        norms = np.linalg.norm(q_emb, axis=1, keepdims=True)
+        q_emb = q_emb / np.where(norms > 0, norms, 1.0)
+
+        if self.use_supabase:
+            return [self._rpc_match_foods(q, k) for q in q_emb]
+
+        D, I = self.index.search(np.ascontiguousarray(q_emb, dtype="float32"), k)
+        return [self._local_results(I[r], D[r]) for r in range(len(texts))]
+
+    @staticmethod
+    def aggregate_results(result_lists, top_final=5):
+        """Gabungkan beberapa list hasil: dedupe food_id, urutkan dari similarity tertinggi."""
         aggregated = []
         seen = set()
         
-        for c in candidates:
-            res = self._search_single(c)
+        for res in result_lists:
             for item in res:
                 if item["food_id"] not in seen:
                     aggregated.append(item)
                     seen.add(item["food_id"])
                     
         aggregated = sorted(aggregated, key=lambda x: x["similarity"], reverse=True)
-        return aggregated[:top_final]
\ No newline at end of file
+        return aggregated[:top_final]
+
+    def match_with_llm_candidates(self, candidates, top_final=5):
+        return self.aggregate_results(self.search_many(candidates), top_final)
@@ -0,0 +1,341 @@
+# ai/core/meal_plan.py
+
+import csv
+import os
+import re
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from .recommendation_engine import FEATURE_COLUMNS, PORTION_GRAM
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+AKG_PATH = BASE_DIR / "data raw" / "dataset_AKG.csv"
+
+# Kolom AKG -> kolom katalog, arah target, bobot
+#   "min"    : kekurangan dihukum, kelebihan tidak
+#   "target" : kekurangan & kelebihan dihukum
+#   "max"    : hanya kelebihan dihukum (batas atas)
+AKG_NUTRIENTS = [
+    ("Energi (kkal)", "Energi", "target", 1.5),
+    ("Protein (g)", "Protein", "min", 1.5),
+    ("Lemak Total (g)", "Lemak Total", "target", 1.0),
+    ("Karbohidrat (g)", "Karbohidrat", "target", 1.0),
+    ("Serat (g)", "Serat", "min", 1.0),
+    ("Natrium (mg)", "Natrium", "max", 1.0),
+]
+
+# Kondisi yang nilainya di AKG berupa TAMBAHAN atas kelompok Perempuan
+AKG_INCREMENT_GROUPS = ("Hamil", "Menyusui")
+_GROUP_ALIASES = {
+    "laki-laki": "Laki-laki", "laki laki": "Laki-laki", "pria": "Laki-laki", "male": "Laki-laki", "l": "Laki-laki",
+    "perempuan": "Perempuan", "wanita": "Perempuan", "female": "Perempuan", "p": "Perempuan",
+    "anak": "Bayi/Anak", "bayi": "Bayi/Anak", "bayi/anak": "Bayi/Anak",
+}
+
+# Solver
+PORTION_STEP_GRAM = int(os.environ.get("MEAL_PLAN_STEP_GRAM", "50"))
+MAX_GRAM_PER_FOOD = int(os.environ.get("MEAL_PLAN_MAX_GRAM_PER_FOOD", "300"))
+DEFAULT_MAX_ITEMS = int(os.environ.get("MEAL_PLAN_MAX_ITEMS", "6"))
+DEFAULT_TIME_LIMIT_MS = float(os.environ.get("MEAL_PLAN_TIME_LIMIT_MS", "200"))
+# Kandidat per nutrisi (kepadatan nutrisi per rupiah) sebelum greedy
+POOL_PER_NUTRIENT = int(os.environ.get("MEAL_PLAN_POOL_PER_NUTRIENT", "150"))
+LIKE_BONUS = 0.1
+
+
+# ----------------------------------------------------------------------
+# AKG
+# ----------------------------------------------------------------------
+def _parse_range(umur: str):
+    """'19-29 tahun' -> (19, 29, 'tahun'), '80+ tahun' -> (80, inf, 'tahun')."""
+    m = re.match(r"\s*(\d+)\s*(?:-\s*(\d+)|\+)\s*(tahun|bulan)", umur or "")
+    if not m:
+        return None
+    low = float(m.group(1))
+    high = float(m.group(2)) if m.group(2) else float("inf")
+    return low, high, m.group(3)
+
+
+_akg_rows = None
+_akg_lock = threading.Lock()
+
+
+def load_akg_table(path=AKG_PATH) -> list:
+    """Baris dataset_AKG.csv sebagai dict (nilai numerik sudah float), di-cache per proses."""
+    global _akg_rows
+    if _akg_rows is None:
+        with _akg_lock:
+            if _akg_rows is None:
+                rows = []
+                with open(path, newline="", encoding="utf-8") as f:
+                    for row in csv.DictReader(f):
+                        parsed = {"Kelompok": row["Kelompok"].strip(), "Umur": row["Umur"].strip()}
+                        for key, _, _, _ in AKG_NUTRIENTS:
+                            parsed[key] = float(row.get(key) or 0)
+                        rows.append(parsed)
+                _akg_rows = rows
+    return _akg_rows
+
+
+def _find_row(rows, group, age=None, umur=None):
+    candidates = [r for r in rows if r["Kelompok"].lower() == group.lower()]
+    if umur:
+        for r in candidates:
+            if r["Umur"].lower() == str(umur).strip().lower():
+                return r
+    if age is not None:
+        for r in candidates:
+            rng = _parse_range(r["Umur"])
+            if not rng:
+                continue
+            low, high, unit = rng
+            value = float(age) * 12 if unit == "bulan" else float(age)
+            if low <= value < high + 1:
+                return r
+    return None
+
+
+def find_akg_target(profile: dict) -> dict:
+    """
+    Target nutrisi harian dari profil:
+      {"group": "Perempuan", "age": 27}
+      {"group": "Perempuan", "age": 27, "condition": "Hamil", "stage": "Trimester 2"}
+      {"group": "Laki-laki", "umur": "19-29 tahun"}
+    Return {"group", "umur", "condition", "targets": {kolom katalog: nilai}}.
+    """
+    rows = load_akg_table()
+    raw_group = str(profile.get("group") or profile.get("kelompok") or "").strip()
+    group = _GROUP_ALIASES.get(raw_group.lower(), raw_group)
+    age = profile.get("age")
+    umur = profile.get("umur")
+    condition = profile.get("condition")
+
+    if group in AKG_INCREMENT_GROUPS:
+        condition, group = group, "Perempuan"
+
+    base = _find_row(rows, group, age=age, umur=umur)
+    if base is None:
+        raise ValueError(f"Kelompok AKG tidak ditemukan untuk group={raw_group!r}, age={age!r}, umur={umur!r}")
+
+    targets = {col: base[key] for key, col, _, _ in AKG_NUTRIENTS}
+
+    if condition:
+        extra = _find_row(rows, str(condition), umur=profile.get("stage"))
+        if extra is None:
+            extra = next((r for r in rows if r["Kelompok"].lower() == str(condition).lower()), None)
+        if extra is None:
+            raise ValueError(f"Kondisi AKG tidak dikenal: {condition!r}")
+        for key, col, _, _ in AKG_NUTRIENTS:
+            targets[col] += extra[key]
+        condition = f"{extra['Kelompok']} ({extra['Umur']})"
+
+    return {"group": base["Kelompok"], "umur": base["Umur"], "condition": condition, "targets": targets}
+
+
+# ----------------------------------------------------------------------
+# Solver
+# ----------------------------------------------------------------------
+class MealPlanSolver:
+    """
+    Greedy-with-bounds: setiap langkah menambah satu porsi (PORTION_STEP_GRAM)
+    dari satu makanan, dengan batas budget total, jumlah makanan berbeda, dan
+    gram per makanan. Gap = sum bobot * (kurang^2 + lebih^2) terhadap target
+    (relatif), sehingga nutrisi yang paling jauh dari target diprioritaskan.
+
+    Dua greedy dijalankan (perbaikan absolut dan perbaikan per rupiah) lalu
+    diambil yang terbaik (trik klasik knapsack), diikuti swap lokal selama
+    masih ada waktu. Semua langkah berhenti di deadline (latency cap).
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._cols = [FEATURE_COLUMNS.index(col) for _, col, _, _ in AKG_NUTRIENTS]
+        self.directions = [d for _, _, d, _ in AKG_NUTRIENTS]
+        self.weights = np.array([w for _, _, _, w in AKG_NUTRIENTS], dtype="float64")
+        self._penalize_short = np.array([d in ("min", "target") for d in self.directions])
+        self._penalize_over = np.array([d in ("max", "target") for d in self.directions])
+
+    def _gap(self, ratio):
+        """ratio: [..., m] asupan/target. Return gap [...]."""
+        short = np.where(self._penalize_short, np.maximum(0.0, 1.0 - ratio), 0.0)
+        over = np.where(self._penalize_over, np.maximum(0.0, ratio - 1.0), 0.0)
+        return (self.weights * (short ** 2 + over ** 2)).sum(axis=-1)
+
+    def _candidate_pool(self, valid, step_price, targets):
+        """Pangkas katalog ke makanan terpadat nutrisi per rupiah untuk setiap nutrisi."""
+        rows = np.flatnonzero(valid & np.isfinite(step_price) & (step_price > 0))
+        if len(rows) <= POOL_PER_NUTRIENT * len(self._cols):
+            return rows
+        feats = self.engine.features[rows][:, self._cols] / targets
+        density = feats / step_price[rows, None]
+        keep = set()
+        for j, direction in enumerate(self.directions):
+            if direction == "max":
+                continue
+            for scores in (density[:, j], feats[:, j]):
+                top = np.argpartition(-scores, POOL_PER_NUTRIENT - 1)[:POOL_PER_NUTRIENT]
+                keep.update(top.tolist())
+        return rows[np.sort(np.fromiter(keep, dtype=np.int64))]
+
+    def _greedy(self, pool_delta, pool_price, pref, start_ratio, budget, max_items, max_steps, deadline, by_price):
+        n = len(pool_price)
+        steps = np.zeros(n, dtype=np.int64)
+        ratio = start_ratio.copy()
+        spent = 0.0
+        items = 0
+        iterations = 0
+        timed_out = False
+        cur_gap = self._gap(ratio)
+
+        while True:
+            if time.perf_counter() >= deadline:
+                timed_out = True
+                break
+            iterations += 1
+            allowed = steps < max_steps
+            if items >= max_items:
+                allowed &= steps > 0
+            if budget is not None:
+                allowed &= pool_price <= budget - spent
+            if not allowed.any():
+                break
+
+            gain = cur_gap - self._gap(ratio + pool_delta)
+            gain = gain * pref
+            if by_price:
+                gain = gain / pool_price
+            gain = np.where(allowed, gain, -np.inf)
+            best = int(np.argmax(gain))
+            if not np.isfinite(gain[best]) or gain[best] <= 1e-9:
+                break
+
+            if steps[best] == 0:
+                items += 1
+            steps[best] += 1
+            spent += float(pool_price[best])
+            ratio = ratio + pool_delta[best]
+            cur_gap = self._gap(ratio)
+
+        return steps, ratio, spent, cur_gap, iterations, timed_out
+
+    def _improve(self, steps, ratio, spent, cur_gap, pool_delta, pool_price, budget, max_items, max_steps, deadline):
+        """Swap lokal: kurangi satu porsi makanan i, tambah satu porsi makanan terbaik lain."""
+        iterations = 0
+        improved = True
+        while improved:
+            improved = False
+            for i in np.flatnonzero(steps):
+                if time.perf_counter() >= deadline:
+                    return steps, ratio, spent, cur_gap, iterations, True
+                iterations += 1
+                base_ratio = ratio - pool_delta[i]
+                base_spent = spent - float(pool_price[i])
+                items = int((steps > 0).sum()) - (1 if steps[i] == 1 else 0)
+
+                allowed = steps < max_steps
+                allowed[i] = False
+                if items >= max_items:
+                    allowed &= steps > 0
+                if budget is not None:
+                    allowed &= pool_price <= budget - base_spent
+
+                # Opsi hapus saja juga dipertimbangkan (mis. kelebihan natrium)
+                gaps = np.where(allowed, self._gap(base_ratio + pool_delta), np.inf)
+                j = int(np.argmin(gaps))
+                drop_gap = self._gap(base_ratio)
+                if drop_gap < cur_gap - 1e-9 and drop_gap <= gaps[j]:
+                    steps[i] -= 1
+                    ratio, spent, cur_gap = base_ratio, base_spent, drop_gap
+                    improved = True
+                elif gaps[j] < cur_gap - 1e-9:
+                    steps[i] -= 1
+                    steps[j] += 1
+                    ratio = base_ratio + pool_delta[j]
+                    spent = base_spent + float(pool_price[j])
+                    cur_gap = gaps[j]
+                    improved = True
+        return steps, ratio, spent, cur_gap, iterations, False
+
+    def solve(
+        self,
+        targets: dict,
+        user_preferences: dict = None,
+        budget: float = None,
+        max_items: int = DEFAULT_MAX_ITEMS,
+        time_limit_ms: float = DEFAULT_TIME_LIMIT_MS,
+        consumed: dict = None,
+    ) -> dict:
+        t0 = time.perf_counter()
+        deadline = t0 + max(1.0, float(time_limit_ms)) / 1000.0
+        prefs = dict(user_preferences or {})
+        prefs.pop("budget", None)  # budget per item tidak berlaku di meal plan
+
+        target_vec = np.array([max(1e-6, float(targets[col])) for _, col, _, _ in AKG_NUTRIENTS])
+        start = np.array([float((consumed or {}).get(col, 0) or 0) for _, col, _, _ in AKG_NUTRIENTS])
+        start_ratio = start / target_vec
+
+        like_scores, valid = self.engine.score(None, prefs)
+        step_scale = PORTION_STEP_GRAM / PORTION_GRAM
+        step_price = self.engine.prices.astype("float64") * step_scale
+
+        pool = self._candidate_pool(valid, step_price, target_vec)
+        pool_price = step_price[pool]
+        pool_delta = self.engine.features[pool][:, self._cols].astype("float64") * step_scale / target_vec
+        pool_pref = 1.0 + LIKE_BONUS * (like_scores[pool] > 0)
+        max_steps = max(1, MAX_GRAM_PER_FOOD // PORTION_STEP_GRAM)
+
+        best = None
+        iterations = 0
+        timed_out = False
+        if len(pool):
+            for by_price in (False, True):
+                run = self._greedy(
+                    pool_delta, pool_price, pool_pref, start_ratio, budget,
+                    max_items, max_steps, deadline, by_price,
+                )
+                iterations += run[4]
+                timed_out |= run[5]
+                if best is None or run[3] < best[3]:
+                    best = run
+            steps, ratio, spent, cur_gap = best[0], best[1], best[2], best[3]
+            if not timed_out:
+                steps, ratio, spent, cur_gap, extra, timed_out = self._improve(
+                    steps.copy(), ratio, spent, cur_gap, pool_delta, pool_price,
+                    budget, max_items, max_steps, deadline,
+                )
+                iterations += extra
+        else:
+            steps, ratio, spent, cur_gap = np.zeros(0, dtype=np.int64), start_ratio, 0.0, self._gap(start_ratio)
+
+        items = []
+        for k in np.flatnonzero(steps):
+            i = pool[k]
+            food_id = self.engine.food_ids[i]
+            grams = int(steps[k]) * PORTION_STEP_GRAM
+            items.append({
+                "foodId": food_id.item() if hasattr(food_id, "item") else food_id,
+                "name": self.engine.names[i],
+                "grams": grams,
+                "estimatedPrice": int(round(float(pool_price[k]) * steps[k])),
+                "priceEstimated": bool(self.engine.price_estimated[i]),
+            })
+        items.sort(key=lambda x: -x["grams"])
+
+        intake = ratio * target_vec
+        return {
+            "items": items,
+            "totalPrice": int(round(spent)),
+            "budget": budget,
+            "nutrients": {col: round(float(v), 1) for (_, col, _, _), v in zip(AKG_NUTRIENTS, intake)},
+            "targets": {col: round(float(v), 1) for (_, col, _, _), v in zip(AKG_NUTRIENTS, target_vec)},
+            "coverage": {col: round(float(r) * 100, 1) for (_, col, _, _), r in zip(AKG_NUTRIENTS, ratio)},
+            "gap": round(float(cur_gap), 4),
+            "solver": {
+                "status": "time_limit" if timed_out else "converged",
+                "iterations": iterations,
+                "candidates": int(len(pool)),
+                "elapsedMs": round((time.perf_counter() - t0) * 1000, 2),
+            },
+        }
@@ -0,0 +1,40 @@
+# ai/core/metrics.py
+
+import threading
+import time
+from collections import defaultdict
+
+_started = time.time()
+_counters = defaultdict(int)
+_collectors = {}
+_lock = threading.Lock()
+
+
+def incr(name: str, n: int = 1):
+    """Tambah counter proses (thread-safe)."""
+    with _lock:
+        _counters[name] += n
+
+
+def register(name: str, collector):
+    """
+    Daftarkan collector: callable tanpa argumen yang mengembalikan dict stats
+    (mis. SingleFlight.stats). Dipanggil setiap kali snapshot() diminta.
+    """
+    with _lock:
+        _collectors[name] = collector
+
+
+def snapshot() -> dict:
+    """Semua counter + hasil setiap collector, untuk /api/metrics."""
+    with _lock:
+        counters = dict(_counters)
+        collectors = dict(_collectors)
+
+    out = {"uptimeSec": round(time.time() - _started, 1), "counters": counters}
+    for name, collector in sorted(collectors.items()):
+        try:
+            out[name] = collector()
+        except Exception as e:
+            out[name] = {"error": str(e)}
+    return out
@@ -0,0 +1,521 @@
+# ai/core/model_server.py
+"""
+Model server lokal: satu proses memegang embedding model + index FAISS, web
+worker gunicorn menjadi client tipis lewat Unix domain socket.
+
+  - satu salinan model per pod (bukan per worker)
+  - request dari semua worker di-batch menjadi satu model.encode
+  - worker start dalam milidetik (tanpa import torch / load model)
+
+Jalankan:
+    python -m core.model_server --socket /tmp/nutrimori-model.sock
+lalu set MODEL_SERVER_SOCKET di web worker (FoodMatcher otomatis memakai client).
+
+Protokol biner (little-endian), satu koneksi bisa dipakai untuk banyak request:
+  request : "NM" | op u8 | k u16 | n u32 | payload_len u32 | payload
+  response: "NM" | status u8 | n u32 | width u32 | payload_len u32 | payload
+op:
+  EMBED       payload = n x (u32 len + utf-8)        -> float32[n, dim]
+  SEARCH      payload = key + n x (u32 len + utf-8)  -> float32 sims[n, k] + int64 ids[n, k]
+  SEARCH_VEC  payload = key + float32[n, dim]        -> float32 sims[n, k] + int64 ids[n, k]
+  INFO        payload kosong                         -> JSON {"dim", "ntotal", "model"}
+  LOAD_INDEX  payload = JSON {"path", "key"}         -> JSON {"key", "dim", "ntotal"}
+key = u32 len + utf-8 sha256 index.faiss dari manifest bundle ("" = index saat start).
+status 0 = ok, 1 = error (payload = pesan utf-8).
+
+Hot reload bundle: worker mengirim LOAD_INDEX dengan path + checksum index bundle baru;
+server membaca file itu (harus bisa mengakses BUNDLE_DIR), mencocokkan sha256-nya, dan
+menyimpan maksimal MODEL_SERVER_MAX_INDEXES index (LRU). Snapshot lama dan baru masing-masing
+mencari di index-nya sendiri.
+"""
+
+import argparse
+import json
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+
+import numpy as np
+
+MODEL_SERVER_SOCKET = os.environ.get("MODEL_SERVER_SOCKET")
+# Batas teks per model.encode dan waktu tunggu untuk mengumpulkan batch lintas worker
+MODEL_SERVER_MAX_BATCH = int(os.environ.get("MODEL_SERVER_MAX_BATCH", "64"))
+MODEL_SERVER_MAX_WAIT_MS = float(os.environ.get("MODEL_SERVER_MAX_WAIT_MS", "2"))
+MODEL_SERVER_TIMEOUT_S = float(os.environ.get("MODEL_SERVER_TIMEOUT_S", "30"))
+# Index bundle yang disimpan bersamaan (aktif + yang sedang di-swap masuk)
+MODEL_SERVER_MAX_INDEXES = int(os.environ.get("MODEL_SERVER_MAX_INDEXES", "2"))
+
+OP_EMBED, OP_SEARCH, OP_SEARCH_VEC, OP_INFO, OP_LOAD_INDEX = 1, 2, 3, 4, 5
+STATUS_OK, STATUS_ERROR = 0, 1
+
+MAGIC = b"NM"
+_REQ = struct.Struct("<2sBHII")
+_RESP = struct.Struct("<2sBIII")
+_LEN = struct.Struct("<I")
+UNKNOWN_INDEX = "index tidak dikenal"
+
+
+def _recv_exact(sock, n: int) -> bytes:
+    buf = bytearray(n)
+    view = memoryview(buf)
+    got = 0
+    while got < n:
+        r = sock.recv_into(view[got:], n - got)
+        if r == 0:
+            raise ConnectionError("model server: koneksi ditutup")
+        got += r
+    return bytes(buf)
+
+
+def encode_texts(texts) -> bytes:
+    parts = []
+    for t in texts:
+        b = str(t).encode("utf-8")
+        parts.append(_LEN.pack(len(b)))
+        parts.append(b)
+    return b"".join(parts)
+
+
+def decode_texts(payload: bytes, n: int) -> list:
+    texts, pos = [], 0
+    for _ in range(n):
+        (size,) = _LEN.unpack_from(payload, pos)
+        pos += 4
+        texts.append(payload[pos:pos + size].decode("utf-8"))
+        pos += size
+    return texts
+
+
+def split_key(payload: bytes):
+    """(key, sisa payload) untuk SEARCH / SEARCH_VEC."""
+    (size,) = _LEN.unpack_from(payload, 0)
+    return payload[4:4 + size].decode("utf-8"), payload[4 + size:]
+
+
+def _search_payload(D, I) -> bytes:
+    return np.ascontiguousarray(D, dtype="float32").tobytes() + np.ascontiguousarray(I, dtype="int64").tobytes()
+
+
+def _split_search_payload(payload: bytes, n: int, k: int):
+    sims = np.frombuffer(payload, dtype="float32", count=n * k).reshape(n, k)
+    ids = np.frombuffer(payload, dtype="int64", count=n * k, offset=n * k * 4).reshape(n, k)
+    return sims, ids
+
+
+# ---------------------------------------------------------------- server
+
+
+class _Job:
+    __slots__ = ("op", "texts", "vectors", "k", "index", "future")
+
+    def __init__(self, op, texts=None, vectors=None, k=0, index=None):
+        self.op = op
+        self.texts = texts
+        self.vectors = vectors
+        self.k = k
+        self.index = index
+        self.future = Future()
+
+
+class Batcher:
+    """
+    Kumpulkan job dari semua koneksi selama MAX_WAIT_MS (atau sampai MAX_BATCH
+    teks), lalu: satu model.encode untuk semua teks unik, satu index.search
+    per index untuk semua query vector. Hasil dibagi kembali per job.
+    """
+
+    def __init__(self, model, index, max_batch=MODEL_SERVER_MAX_BATCH, max_wait_ms=MODEL_SERVER_MAX_WAIT_MS):
+        self.model = model
+        self.index = index
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.jobs = queue.Queue()
+        self.batches = 0
+        self.texts_encoded = 0
+        self._thread = threading.Thread(target=self._loop, name="model-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, job: _Job):
+        self.jobs.put(job)
+        return job.future.result()
+
+    def _collect(self):
+        jobs = [self.jobs.get()]
+        size = len(jobs[0].texts or ())
+        # Search vektor saja (tanpa encode) murah: ambil yang sudah antre, tanpa menunggu
+        deadline = time.monotonic() + (self.max_wait if size else 0.0)
+        while size < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                job = self.jobs.get(timeout=remaining)
+            except queue.Empty:
+                break
+            jobs.append(job)
+            size += len(job.texts or ())
+        return jobs
+
+    def _loop(self):
+        while True:
+            jobs = self._collect()
+            try:
+                self._run(jobs)
+            except Exception as e:
+                self._fail(jobs, e)
+
+    @staticmethod
+    def _fail(jobs, error):
+        for job in jobs:
+            if not job.future.done():
+                job.future.set_exception(error)
+
+    def _run(self, jobs):
+        texts = list(dict.fromkeys(t for job in jobs if job.texts for t in job.texts))
+        vectors = {}
+        if texts:
+            try:
+                encoded = self.model.encode(texts, prompt_name="query", convert_to_numpy=True).astype("float32")
+            except Exception as e:
+                # Encode gagal: hanya job berteks yang gagal, search vektor tetap jalan
+                self._fail([job for job in jobs if job.texts], e)
+                jobs = [job for job in jobs if not job.texts]
+            else:
+                vectors = dict(zip(texts, encoded))
+                self.texts_encoded += len(texts)
+        self.batches += 1
+
+        # Query search (teks maupun vektor) per index: satu index.search dengan k terbesar
+        groups = {}
+        for job in jobs:
+            if job.op == OP_SEARCH:
+                q = np.stack([vectors[t] for t in job.texts])
+            elif job.op == OP_SEARCH_VEC:
+                q = job.vectors
+            else:
+                continue
+            index = job.index if job.index is not None else self.index
+            _, queries, owners = groups.setdefault(id(index), (index, [], []))
+            queries.append(q)
+            owners.append(job)
+
+        results = {}
+        for index, queries, owners in groups.values():
+            # Satu index (atau satu job) yang gagal tidak ikut menggagalkan group lain di batch ini
+            try:
+                q = np.ascontiguousarray(np.vstack(queries), dtype="float32")
+                norms = np.linalg.norm(q, axis=1, keepdims=True)
+                q = q / np.where(norms > 0, norms, 1.0)
+                kmax = max(job.k for job in owners)
+                D, I = index.search(np.ascontiguousarray(q, dtype="float32"), kmax)
+            except Exception as e:
+                self._fail(owners, e)
+                continue
+            pos = 0
+            for job, part in zip(owners, queries):
+                results[id(job)] = (D[pos:pos + len(part), :job.k], I[pos:pos + len(part), :job.k])
+                pos += len(part)
+
+        for job in jobs:
+            if job.future.done():
+                continue
+            if job.op == OP_EMBED:
+                job.future.set_result(np.stack([vectors[t] for t in job.texts]) if job.texts else np.zeros((0, 0), "float32"))
+            else:
+                job.future.set_result(results[id(job)])
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        sock = self.request
+        while True:
+            try:
+                header = _recv_exact(sock, _REQ.size)
+            except ConnectionError:
+                return
+            magic, op, k, n, size = _REQ.unpack(header)
+            payload = _recv_exact(sock, size) if size else b""
+            if magic != MAGIC:
+                return
+            try:
+                status, n_out, width, body = STATUS_OK, *self._dispatch(op, k, n, payload)
+            except Exception as e:
+                status, n_out, width, body = STATUS_ERROR, 0, 0, str(e).encode("utf-8")
+            sock.sendall(_RESP.pack(MAGIC, status, n_out, width, len(body)) + body)
+
+    def _dispatch(self, op, k, n, payload):
+        server = self.server
+        if op == OP_INFO:
+            return 0, 0, json.dumps(server.info()).encode("utf-8")
+        if op == OP_LOAD_INDEX:
+            req = json.loads(payload)
+            return 0, 0, json.dumps(server.load_index(req["path"], req["key"])).encode("utf-8")
+        if op in (OP_SEARCH, OP_SEARCH_VEC):
+            key, payload = split_key(payload)
+            index = server.get_index(key)
+        if n == 0:
+            return 0, k, b""
+        if op == OP_EMBED:
+            out = server.batcher.submit(_Job(op, texts=decode_texts(payload, n)))
+            return n, out.shape[1] if n else 0, out.tobytes()
+        if op == OP_SEARCH:
+            D, I = server.batcher.submit(_Job(op, texts=decode_texts(payload, n), k=k, index=index))
+            return n, k, _search_payload(D, I)
+        if op == OP_SEARCH_VEC:
+            # Lebar salah ditolak di sini, sebelum masuk batch bersama request lain
+            if len(payload) != n * server.dim * 4:
+                raise ValueError(f"vektor harus {n} x {server.dim} float32, payload {len(payload)} byte")
+            vectors = np.frombuffer(payload, dtype="float32").reshape(n, server.dim)
+            D, I = server.batcher.submit(_Job(op, vectors=vectors, k=k, index=index))
+            return n, k, _search_payload(D, I)
+        raise ValueError(f"op tidak dikenal: {op}")
+
+
+class ModelServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, model, index, model_name="", **batch_opts):
+        socket_path = str(socket_path)
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super().__init__(socket_path, _Handler)
+        os.chmod(socket_path, 0o660)
+        self.batcher = Batcher(model, index, **batch_opts)
+        self.dim = int(index.d)
+        self.ntotal = int(index.ntotal)
+        self.model_name = model_name
+        self.max_indexes = MODEL_SERVER_MAX_INDEXES
+        self.indexes = OrderedDict()  # sha256 index.faiss -> index bundle, LRU
+        self._index_lock = threading.Lock()
+
+    def load_index(self, path, key: str) -> dict:
+        """Load index bundle (sekali per checksum); file harus cocok dengan sha256 di manifest."""
+        from .bundle import sha256_file
+
+        with self._index_lock:
+            index = self.indexes.get(key)
+            if index is None:
+                import faiss
+
+                actual = sha256_file(path)
+                if actual != key:
+                    raise ValueError(f"checksum {path} ({actual[:12]}) != manifest ({key[:12]})")
+                index = faiss.read_index(str(path))
+                if int(index.d) != self.dim:
+                    raise ValueError(f"dimensi index {index.d} != dimensi model server {self.dim}")
+                self.indexes[key] = index
+                while len(self.indexes) > self.max_indexes:
+                    self.indexes.popitem(last=False)
+                print(f"📦 Model server: index {key[:12]} loaded dari {path} ({index.ntotal} items)")
+            self.indexes.move_to_end(key)
+        return {"key": key, "dim": int(index.d), "ntotal": int(index.ntotal)}
+
+    def get_index(self, key: str):
+        if not key:
+            return self.batcher.index
+        with self._index_lock:
+            index = self.indexes.get(key)
+            if index is None:
+                raise ValueError(f"{UNKNOWN_INDEX}: {key[:12]}")
+            self.indexes.move_to_end(key)
+        return index
+
+    def info(self) -> dict:
+        return {
+            "dim": self.dim,
+            "ntotal": self.ntotal,
+            "model": self.model_name,
+            "indexes": list(self.indexes),
+            "batches": self.batcher.batches,
+            "textsEncoded": self.batcher.texts_encoded,
+        }
+
+
+# ---------------------------------------------------------------- client
+
+
+class ModelServerError(RuntimeError):
+    pass
+
+
+class ModelClient:
+    """
+    Client tipis untuk web worker. Koneksi disimpan di pool (satu per thread
+    yang sedang memakai), jadi request paralel di worker gthread tidak saling antre.
+    Punya encode() dengan signature SentenceTransformer agar bisa menggantikan model.
+    """
+
+    remote = True
+
+    def __init__(self, socket_path=None, timeout=MODEL_SERVER_TIMEOUT_S):
+        self.socket_path = str(socket_path or MODEL_SERVER_SOCKET)
+        self.timeout = timeout
+        self._pool = queue.LifoQueue()
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        return sock
+
+    def _call(self, op, n=0, k=0, payload=b""):
+        frame = _REQ.pack(MAGIC, op, k, n, len(payload)) + payload
+        for attempt in (0, 1):
+            try:
+                sock = self._connect() if attempt else self._pool.get_nowait()
+            except queue.Empty:
+                sock = self._connect()
+            try:
+                sock.sendall(frame)
+                magic, status, n_out, width, size = _RESP.unpack(_recv_exact(sock, _RESP.size))
+                body = _recv_exact(sock, size) if size else b""
+            except (ConnectionError, OSError):
+                sock.close()
+                # Koneksi lama bisa putus (server restart): coba sekali lagi dengan koneksi baru
+                if attempt:
+                    raise
+                continue
+            self._pool.put(sock)
+            if status != STATUS_OK:
+                raise ModelServerError(body.decode("utf-8", "replace"))
+            return n_out, width, body
+
+    def info(self) -> dict:
+        """Tidak di-cache: server bisa restart dengan index lain."""
+        _, _, body = self._call(OP_INFO)
+        return json.loads(body)
+
+    def load_index(self, path, key: str) -> dict:
+        _, _, body = self._call(OP_LOAD_INDEX, payload=json.dumps({"path": str(path), "key": key}).encode("utf-8"))
+        return json.loads(body)
+
+    def wait_ready(self, timeout: float = 600) -> dict:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                return self.info()
+            except (ConnectionError, OSError):
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.5)
+
+    def embed(self, texts) -> np.ndarray:
+        texts = list(texts)
+        n, dim, body = self._call(OP_EMBED, n=len(texts), payload=encode_texts(texts))
+        return np.frombuffer(body, dtype="float32").reshape(n, dim).copy()
+
+    def encode(self, texts, prompt_name=None, convert_to_numpy=True, **kwargs):
+        """Kompatibel dengan SentenceTransformer.encode (prompt 'query' dipakai server)."""
+        return self.embed(texts)
+
+    def search(self, texts, k: int = 5, index_key: str = ""):
+        """(sims[n, k], ids[n, k]): encode + FAISS di server, satu round trip."""
+        texts = list(texts)
+        payload = encode_texts([index_key]) + encode_texts(texts)
+        n, k, body = self._call(OP_SEARCH, n=len(texts), k=k, payload=payload)
+        return _split_search_payload(body, n, k)
+
+    def search_vectors(self, vectors, k: int = 5, index_key: str = ""):
+        vectors = np.ascontiguousarray(vectors, dtype="float32")
+        payload = encode_texts([index_key]) + vectors.tobytes()
+        n, k, body = self._call(OP_SEARCH_VEC, n=len(vectors), k=k, payload=payload)
+        return _split_search_payload(body, n, k)
+
+    def index(self, bundle=None):
+        """Index `bundle` di server (di-load bila belum ada); tanpa bundle: index saat server start."""
+        if bundle is None:
+            info = self.info()
+            return RemoteIndex(self, "", info["ntotal"], info["dim"])
+        path, key = bundle.file("index"), bundle.sha256("index")
+        info = self.load_index(path, key)
+        return RemoteIndex(self, key, info["ntotal"], info["dim"], path=path)
+
+
+class RemoteIndex:
+    """
+    Pengganti faiss index di web worker: ntotal / d dari server, search lewat socket
+    pada index dengan checksum `key`. Index yang sudah dibuang server (LRU, restart)
+    di-load ulang sekali.
+    """
+
+    remote = True
+
+    def __init__(self, client: ModelClient, key: str, ntotal: int, d: int, path=None):
+        self.client = client
+        self.key = key
+        self.path = path
+        self.ntotal = ntotal
+        self.d = d
+
+    def _retry_unknown(self, fn, *args):
+        try:
+            return fn(*args, index_key=self.key)
+        except ModelServerError as e:
+            if self.path is None or UNKNOWN_INDEX not in str(e):
+                raise
+            self.client.load_index(self.path, self.key)
+            return fn(*args, index_key=self.key)
+
+    def search(self, x, k):
+        return self._retry_unknown(self.client.search_vectors, x, k)
+
+    def search_texts(self, texts, k):
+        return self._retry_unknown(self.client.search, texts, k)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_model_client() -> ModelClient:
+    """Singleton client; menunggu server siap (server bisa start bersamaan dengan worker)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                client = ModelClient()
+                info = client.wait_ready()
+                print(f"✅ Model server connected: {client.socket_path} (dim {info['dim']}, {info['ntotal']} items)")
+                _client = client
+    return _client
+
+
+# ---------------------------------------------------------------- main
+
+
+def main():
+    from .bundle import open_bundle
+    from .matcher import load_local_embedding_model, EMBEDDING_MODEL_NAME
+    from .startup_profiler import print_report, profiled_import
+
+    ap = argparse.ArgumentParser(description="NutriMori embedding + FAISS model server (Unix socket)")
+    ap.add_argument("--socket", default=MODEL_SERVER_SOCKET or "/tmp/nutrimori-model.sock")
+    ap.add_argument("--index", type=Path, help="default: index.faiss dari bundle CURRENT")
+    ap.add_argument("--max-batch", type=int, default=MODEL_SERVER_MAX_BATCH)
+    ap.add_argument("--max-wait-ms", type=float, default=MODEL_SERVER_MAX_WAIT_MS)
+    args = ap.parse_args()
+
+    faiss = profiled_import("faiss")
+    index = faiss.read_index(str(args.index or open_bundle().file("index")))
+    model = load_local_embedding_model()
+    server = ModelServer(args.socket, model, index, model_name=EMBEDDING_MODEL_NAME,
+                         max_batch=args.max_batch, max_wait_ms=args.max_wait_ms)
+    print_report()
+    print(f"🚀 Model server listening on {args.socket} (dim {server.dim}, {server.ntotal} items)")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+# ai/core/nutrient_index.py
+
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .startup_profiler import profiled_import
+from .substitution import resolve_nutrient
+
+# Jumlah index FAISS (per kombinasi kolom) yang disimpan
+MAX_CACHED_INDEXES = 32
+
+
+class NutrientIndex:
+    """
+    Index ruang-nutrisi di atas kolom numerik NutritionCalculator (per 100 g).
+
+    Nilai distandarisasi (z-score per kolom) agar Energi (ratusan kkal) tidak
+    mendominasi Gula (gram). Untuk setiap kombinasi kolom yang ditanya dibuat
+    satu faiss.IndexFlatL2 (di-cache), lalu filter kelompok / Mentah-Olahan /
+    rentang nilai diterapkan sebagai IDSelectorBitmap saat search, jadi query
+    atas katalog penuh tetap sub-milidetik tanpa scan DataFrame.
+    """
+
+    def __init__(self, df, nutr_cols):
+        self.faiss = profiled_import("faiss")
+        self.columns = list(nutr_cols)
+        self._col = {c: j for j, c in enumerate(self.columns)}
+        self.n = len(df)
+
+        raw = np.nan_to_num(df[self.columns].to_numpy(dtype="float32"))
+        self.raw = np.ascontiguousarray(raw)
+        self.mean = raw.mean(axis=0)
+        std = raw.std(axis=0)
+        self.std = np.where(std > 0, std, 1.0).astype("float32")
+        self.z = np.ascontiguousarray((raw - self.mean) / self.std, dtype="float32")
+
+        self.names = df["Nama Bahan Makanan"].astype(str).to_numpy()
+        self.groups = df["Kelompok Makanan"].astype(str).to_numpy() if "Kelompok Makanan" in df else None
+        self.states = df["Mentah/Olahan"].astype(str).to_numpy() if "Mentah/Olahan" in df else None
+        self._groups_lower = np.char.lower(self.groups.astype(str)) if self.groups is not None else None
+        self._states_lower = np.char.lower(self.states.astype(str)) if self.states is not None else None
+
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_calculator(cls, calc):
+        """Pakai DataFrame + kolom nutrisi yang sudah diekstrak NutritionCalculator."""
+        return cls(calc.df, calc.nutr_cols)
+
+    def resolve_columns(self, names) -> list:
+        cols = [resolve_nutrient(c) for c in names]
+        unknown = [c for c in cols if c not in self._col]
+        if unknown:
+            raise ValueError(f"Nutrisi tidak dikenal: {unknown}. Pilihan: {self.columns}")
+        return cols
+
+    def resolve_unique(self, names) -> list:
+        """resolve_columns, tapi dua alias untuk kolom yang sama ditolak (bukan diam-diam salah satu)."""
+        names = list(names)
+        cols = self.resolve_columns(names)
+        seen = {}
+        for name, col in zip(names, cols):
+            if col in seen:
+                raise ValueError(f"Nutrisi ganda: {seen[col]!r} dan {name!r} sama-sama {col}")
+            seen[col] = name
+        return cols
+
+    def _index_for(self, cols: tuple):
+        with self._lock:
+            index = self._indexes.get(cols)
+            if index is None:
+                index = self.faiss.IndexFlatL2(len(cols))
+                index.add(np.ascontiguousarray(self.z[:, [self._col[c] for c in cols]]))
+                self._indexes[cols] = index
+                while len(self._indexes) > MAX_CACHED_INDEXES:
+                    self._indexes.popitem(last=False)
+            else:
+                self._indexes.move_to_end(cols)
+            return index
+
+    def filter_mask(self, groups=None, state=None, ranges=None):
+        """Mask bool[n] dari kelompok, Mentah/Olahan, dan rentang {kolom: [min, max]} (None = tanpa batas)."""
+        mask = np.ones(self.n, dtype=bool)
+        if groups and self._groups_lower is not None:
+            mask &= np.isin(self._groups_lower, [str(g).lower() for g in groups])
+        if state and self._states_lower is not None:
+            mask &= self._states_lower == str(state).lower()
+        ranges = ranges or {}
+        for col, bounds in zip(self.resolve_unique(ranges), ranges.values()):
+            lo, hi = (list(bounds) + [None, None])[:2]
+            values = self.raw[:, self._col[col]]
+            if lo is not None:
+                mask &= values >= float(lo)
+            if hi is not None:
+                mask &= values <= float(hi)
+        return mask
+
+    def search(self, targets: dict = None, k: int = 10, radius: float = None,
+               groups=None, state=None, ranges=None) -> list:
+        """
+        targets : {kolom: nilai per 100 g}; tanpa targets hanya filter (urutan katalog)
+        k       : jumlah hasil kNN (juga batas hasil range query)
+        radius  : range query, jarak maksimum dalam satuan standar deviasi
+        Return list (row, distance) urut jarak. Parameter tidak valid -> ValueError.
+        """
+        k = int(k)
+        if k < 1:
+            raise ValueError(f"k harus >= 1, bukan {k}")
+        if radius is not None:
+            if isinstance(radius, bool) or not isinstance(radius, (int, float)):
+                raise ValueError(f"radius harus angka, bukan {radius!r}")
+            if not math.isfinite(radius) or radius < 0:
+                raise ValueError(f"radius harus angka >= 0, bukan {radius}")
+
+        mask = self.filter_mask(groups, state, ranges)
+        if not mask.any():
+            return []
+
+        if not targets:
+            rows = np.flatnonzero(mask)[:k]
+            return [(int(r), None) for r in rows]
+
+        cols = tuple(self.resolve_unique(targets.keys()))
+        idx = [self._col[c] for c in cols]
+        query = ((np.array([float(v) for v in targets.values()], dtype="float32") - self.mean[idx]) / self.std[idx])
+        query = np.ascontiguousarray(query.reshape(1, -1), dtype="float32")
+        index = self._index_for(cols)
+
+        params = None
+        bits = None
+        if not mask.all():
+            bits = np.packbits(mask, bitorder="little")
+            params = self.faiss.SearchParameters(sel=self.faiss.IDSelectorBitmap(self.n, self.faiss.swig_ptr(bits)))
+
+        if radius is not None:
+            lims, D, I = index.range_search(query, float(radius) ** 2, params=params)
+            order = np.argsort(D[lims[0]:lims[1]], kind="stable")[:k]
+            rows, dists = I[lims[0]:lims[1]][order], D[lims[0]:lims[1]][order]
+        else:
+            D, I = index.search(query, min(k, self.n), params=params)
+            keep = I[0] != -1
+            rows, dists = I[0][keep], D[0][keep]
+
+        return [(int(r), float(np.sqrt(max(0.0, d)))) for r, d in zip(rows, dists)]
+
+    def describe(self, row: int, cols) -> dict:
+        item = {"foodId": int(row), "name": self.names[row]}
+        if self.groups is not None:
+            item["group"] = self.groups[row]
+        if self.states is not None:
+            item["state"] = self.states[row]
+        item["nutrients"] = {c: round(float(self.raw[row, self._col[c]]), 2) for c in cols}
+        return item
+
+
+_index_lock = threading.Lock()
+
+
+def get_nutrient_index(calc) -> NutrientIndex:
+    """Index per NutritionCalculator (satu per snapshot katalog), dibangun sekali."""
+    index = getattr(calc, "_nutrient_index", None)
+    if index is None:
+        with _index_lock:
+            index = getattr(calc, "_nutrient_index", None)
+            if index is None:
+                index = calc._nutrient_index = NutrientIndex.from_calculator(calc)
+                print(f"✅ Nutrient index ready ({index.n} items, {len(index.columns)} columns)")
+    return index
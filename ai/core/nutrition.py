@@ -1,14 +1,16 @@
-import pandas as pd
 import numpy as np
-from pathlib import Path
 from .portion import portion_to_gram
+from .startup_profiler import profile_step, profiled_import
 
 class NutritionCalculator:
-    def __init__(self):
-        BASE_DIR = Path(__file__).resolve().parent.parent
-        DATA_PATH = BASE_DIR / "data" / "data pangan bersih.parquet"
+    def __init__(self, bundle=None):
+        from .bundle import open_bundle
 
-        self.df = pd.read_parquet(DATA_PATH)
+        DATA_PATH = (bundle or open_bundle()).file("catalog")
+
+        pd = profiled_import("pandas")
+        with profile_step("NutritionCalculator load parquet"):
+            self.df = pd.read_parquet(DATA_PATH)
         
         # Ambil semua kolom numerik otomatis
         all_numeric = self.df.select_dtypes(include=[np.number]).columns.tolist()
@@ -53,4 +55,51 @@ class NutritionCalculator:
                 for col in self.nutr_cols:
                     final_nutrisi[col] = (acc[col] / valid) * (gram / 100.0)
 
-        return final_nutrisi
\ No newline at end of file
+        return final_nutrisi
+
+    def get_nutrition_batch(self, match_results_list, jumlah_list, satuan_list):
+        """
+        Versi vektor get_nutrition_smart untuk banyak item sekaligus (aturan sama:
+        exact_match jika similarity >= 0.90, selain itu rata-rata top 3).
+        Return list dict (None untuk item tanpa match).
+        """
+        if not hasattr(self, "_nutr_matrix"):
+            self._nutr_matrix = self.df[self.nutr_cols].to_numpy(dtype="float64")
+            self._names = self.df["Nama Bahan Makanan"].astype(str).to_numpy()
+
+        n = len(match_results_list)
+        rows = np.zeros((n, 3), dtype=np.int64)
+        counts = np.zeros(n, dtype=np.int64)
+        grams = np.zeros(n, dtype="float64")
+        methods = [None] * n
+
+        for i, (matches, jumlah, satuan) in enumerate(zip(match_results_list, jumlah_list, satuan_list)):
+            if not matches:
+                continue
+            top = matches[0]
+            grams[i] = portion_to_gram(jumlah, satuan, top.get("nama_clean"))
+            if top["similarity"] >= 0.90:
+                rows[i, 0], counts[i], methods[i] = top["food_id"], 1, "exact_match"
+            else:
+                cands = [m["food_id"] for m in matches[:3]]
+                rows[i, :len(cands)], counts[i], methods[i] = cands, len(cands), "average"
+
+        # Rata-rata baris terpilih (mask untuk slot kosong) x gram/100
+        mask = np.arange(3)[None, :] < counts[:, None]
+        summed = (self._nutr_matrix[rows] * mask[:, :, None]).sum(axis=1)
+        per_100g = summed / np.maximum(counts, 1)[:, None]
+        values = per_100g * (grams / 100.0)[:, None]
+
+        out = []
+        for i in range(n):
+            if methods[i] is None:
+                out.append(None)
+                continue
+            if methods[i] == "exact_match":
+                nama = self._names[rows[i, 0]]
+            else:
+                nama = "Mix: " + ", ".join(self._names[rows[i, :min(counts[i], 2)]])
+            item = {"gram": float(grams[i]), "nama_pilihan": nama, "metode": methods[i]}
+            item.update(zip(self.nutr_cols, values[i].tolist()))
+            out.append(item)
+        return out
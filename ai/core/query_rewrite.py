@@ -0,0 +1,131 @@
+# ai/core/query_rewrite.py
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from . import metrics
+from .spell import get_spell_index
+from .text_utils import normalize_query
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+ALIAS_DIR = Path(os.environ.get("ALIAS_DIR", BASE_DIR / "data" / "aliases"))
+# Path artifact tertentu (mis. untuk rollback); default: versi di ALIAS_DIR/LATEST
+ALIAS_TABLE_PATH = os.environ.get("ALIAS_TABLE_PATH")
+QUERY_REWRITE_ENABLED = os.environ.get("QUERY_REWRITE", "1") == "1"
+
+
+def latest_artifact(alias_dir=ALIAS_DIR):
+    """Path artifact yang ditunjuk ALIAS_DIR/LATEST, atau None."""
+    pointer = Path(alias_dir) / "LATEST"
+    if not pointer.exists():
+        return None
+    name = pointer.read_text(encoding="utf-8").strip()
+    return Path(alias_dir) / name if name else None
+
+
+class QueryRewriter:
+    """
+    Rewrite query sebelum FoodMatcher search, memakai tabel hasil mining
+    log Gemini (lihat preprocess/mine_aliases.py):
+      aliases  : query ternormalisasi utuh -> nama katalog ("nasgor ayam" -> "nasi goreng ayam")
+      synonyms : token -> token baku ("telor" -> "telur")
+    Alias dicek dulu; jika tidak ada, setiap token diganti sinonimnya.
+    """
+
+    def __init__(self, path):
+        path = Path(path)
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        self.path = path
+        self.version = data.get("version")
+        self.created_at = data.get("created_at")
+        self.aliases = {k: v["rewrite"] for k, v in data.get("aliases", {}).items()}
+        self.synonyms = {k: v["to"] for k, v in data.get("synonyms", {}).items()}
+        self.alias_hits = 0
+        self.synonym_hits = 0
+        self.misses = 0
+        self._lookup_s = 0.0
+
+    def rewrite(self, text: str):
+        """Return (teks untuk search, jenis) dengan jenis "alias" / "synonym" / None."""
+        t0 = time.perf_counter()
+        norm = normalize_query(text)
+        rewritten = self.aliases.get(norm)
+        kind = "alias" if rewritten else None
+        if rewritten is None and self.synonyms:
+            tokens = norm.split()
+            replaced = [self.synonyms.get(tok, tok) for tok in tokens]
+            if replaced != tokens:
+                rewritten, kind = " ".join(replaced), "synonym"
+        self._lookup_s += time.perf_counter() - t0
+
+        if kind == "alias":
+            self.alias_hits += 1
+        elif kind == "synonym":
+            self.synonym_hits += 1
+        else:
+            self.misses += 1
+        metrics.incr(f"query_rewrite.{kind or 'miss'}")
+        return (rewritten, kind) if kind else (text, None)
+
+    def stats(self) -> dict:
+        lookups = self.alias_hits + self.synonym_hits + self.misses
+        return {
+            "version": self.version,
+            "createdAt": self.created_at,
+            "aliases": len(self.aliases),
+            "synonyms": len(self.synonyms),
+            "lookups": lookups,
+            "aliasHits": self.alias_hits,
+            "synonymHits": self.synonym_hits,
+            "hitRate": round((self.alias_hits + self.synonym_hits) / lookups, 4) if lookups else 0.0,
+            "avgLookupUs": round(self._lookup_s / lookups * 1e6, 2) if lookups else 0.0,
+        }
+
+
+_rewriter = None
+_rewriter_lock = threading.Lock()
+_rewriter_loaded = False
+
+
+def get_query_rewriter():
+    """Singleton QueryRewriter; None jika dimatikan atau artifact belum di-mining."""
+    global _rewriter, _rewriter_loaded
+    if not _rewriter_loaded:
+        with _rewriter_lock:
+            if not _rewriter_loaded:
+                path = Path(ALIAS_TABLE_PATH) if ALIAS_TABLE_PATH else latest_artifact()
+                if QUERY_REWRITE_ENABLED and path is not None and path.exists():
+                    try:
+                        _rewriter = QueryRewriter(path)
+                        metrics.register("query_rewrite", _rewriter.stats)
+                        print(
+                            f"  ✅ Alias table v{_rewriter.version} loaded "
+                            f"({len(_rewriter.aliases)} alias, {len(_rewriter.synonyms)} sinonim)"
+                        )
+                    except Exception as e:
+                        print(f"  ⚠️ Alias table gagal di-load: {e}")
+                _rewriter_loaded = True
+    return _rewriter
+
+
+def rewrite_query(text: str):
+    """
+    (teks untuk search, jenis rewrite atau None) dari alias table hasil mining.
+    No-op tanpa artifact. Koreksi ejaan terpisah (spell_correct): hasilnya baru
+    dipakai jika mengalahkan query asli di search (core/refinement.py).
+    """
+    rewriter = get_query_rewriter()
+    return rewriter.rewrite(text) if rewriter is not None else (text, None)
+
+
+def spell_correct(query: str):
+    """Query dengan koreksi ejaan per token (core/spell.py), atau None jika tidak berubah."""
+    spell = get_spell_index()
+    if spell is None:
+        return None
+    corrected = spell.correct(query)
+    return corrected if corrected != query else None
@@ -0,0 +1,126 @@
+# ai/core/query_table.py
+
+import json
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from .text_utils import normalize_query
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+QUERY_TABLE_DIR = Path(os.environ.get("QUERY_TABLE_DIR", BASE_DIR / "data" / "query_table"))
+USE_QUERY_TABLE = os.environ.get("USE_QUERY_TABLE", "1") == "1"
+
+
+class QueryTable:
+    """
+    Tabel query embedding yang sudah dihitung offline
+    (lihat preprocess/build_query_table.py).
+
+    File (semua .npy dibuka memory-mapped, jadi murah untuk worker baru):
+      phrases.json    : list frasa ternormalisasi, urutan = baris
+      vectors.npy     : float32 [n, dim], sudah L2-normalized
+      topk_ids.npy    : int32   [n, k], hasil FAISS lokal
+      topk_sims.npy   : float32 [n, k]
+      meta.json       : model, dim, k, index_ntotal, catalog_version, catalog_fingerprint, created_at
+    Vektor hanya bergantung pada model; top-k hanya valid untuk bundle katalog sumbernya.
+    """
+
+    def __init__(self, table_dir=QUERY_TABLE_DIR):
+        table_dir = Path(table_dir)
+        with open(table_dir / "meta.json", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        with open(table_dir / "phrases.json", encoding="utf-8") as f:
+            phrases = json.load(f)
+
+        self.rows = {p: i for i, p in enumerate(phrases)}
+        self.vectors = np.load(table_dir / "vectors.npy", mmap_mode="r")
+        self.topk_ids = np.load(table_dir / "topk_ids.npy", mmap_mode="r")
+        self.topk_sims = np.load(table_dir / "topk_sims.npy", mmap_mode="r")
+        self.k = int(self.meta.get("k", self.topk_ids.shape[1]))
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.rows)
+
+    def lookup(self, text, count=True):
+        """
+        Return nomor baris untuk text (setelah normalisasi), atau None.
+        count=False: jangan hitung miss (dipakai saat caller masih akan mencoba embed()).
+        """
+        row = self.rows.get(normalize_query(text))
+        if row is not None:
+            self.hits += 1
+        elif count:
+            self.misses += 1
+        return row
+
+    def contains(self, text) -> bool:
+        """Seperti lookup tapi tanpa menghitung statistik."""
+        return normalize_query(text) in self.rows
+
+    def vector(self, row):
+        return np.asarray(self.vectors[row], dtype="float32")
+
+    def topk(self, row, k):
+        """(ids, sims) top-k prekomputasi; None jika k melebihi yang disimpan."""
+        if k > self.k:
+            return None
+        return np.asarray(self.topk_ids[row, :k]), np.asarray(self.topk_sims[row, :k])
+
+    def matches_model(self, model: str, dim: int = None) -> bool:
+        """Vektor hanya bisa dipakai untuk model embedding (dan dimensi index) yang sama dengan saat build."""
+        if self.meta.get("model") != model or self.vectors.shape[1] != int(self.meta.get("dim", -1)):
+            return False
+        return dim is None or self.vectors.shape[1] == int(dim)
+
+    def matches_catalog(self, bundle, index) -> bool:
+        """Top-k hanya valid untuk bundle (parquet + index) yang sama dengan saat build."""
+        return (
+            bundle is not None
+            and index is not None
+            and bundle.matches_artifact(self.meta)
+            and int(self.meta.get("index_ntotal", -1)) == int(index.ntotal)
+        )
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+_table = None
+_table_lock = threading.Lock()
+_table_loaded = False
+
+
+def get_query_table():
+    """Singleton QueryTable; None jika dimatikan atau artifact belum di-build."""
+    global _table, _table_loaded
+    if not _table_loaded:
+        with _table_lock:
+            if not _table_loaded:
+                if USE_QUERY_TABLE and (QUERY_TABLE_DIR / "meta.json").exists():
+                    try:
+                        _table = QueryTable(QUERY_TABLE_DIR)
+                        print(f"  ✅ Query table loaded ({len(_table)} frasa)")
+                    except Exception as e:
+                        print(f"  ⚠️ Query table gagal di-load: {e}")
+                _table_loaded = True
+    return _table
+
+
+def reset_query_table(*_):
+    """Baca ulang artifact saat dibutuhkan lagi (callback bundle swap: tabel bisa sudah di-build ulang)."""
+    global _table, _table_loaded
+    with _table_lock:
+        _table = None
+        _table_loaded = False
@@ -0,0 +1,259 @@
+# ai/core/recommendation_cache.py
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+# Backend: "memory" (default, per proses), "redis" (REDIS_URL, bisa Redis/KeyDB/
+# Dragonfly lokal, dibagi antar worker), atau "off"
+CACHE_BACKEND = os.environ.get("RECO_CACHE_BACKEND", "memory").strip().lower()
+CACHE_MAX_ENTRIES = int(os.environ.get("RECO_CACHE_MAX_ENTRIES", "10000"))
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+# Umur versi user sejak terakhir dibaca; harus >= TTL entry terpanjang (1 hari lokal)
+VERSION_TTL = max(int(os.environ.get("RECO_CACHE_VERSION_TTL", str(2 * 86400))), 86400)
+# Zona waktu default user (hari lokal = batas TTL)
+DEFAULT_TIMEZONE = os.environ.get("RECO_CACHE_TIMEZONE", "Asia/Jakarta")
+_FALLBACK_TZ = timezone(timedelta(hours=7))
+
+
+def _resolve_tz(tz=None, offset_minutes=None):
+    """IANA name ("Asia/Makassar") atau offset menit ke timur UTC (+420 = WIB)."""
+    if offset_minutes is not None:
+        return timezone(timedelta(minutes=int(offset_minutes)))
+    try:
+        from zoneinfo import ZoneInfo
+
+        return ZoneInfo(tz or DEFAULT_TIMEZONE)
+    except Exception:
+        return _FALLBACK_TZ
+
+
+def local_day(tz=None, offset_minutes=None, now: float = None):
+    """(tanggal lokal 'YYYY-MM-DD', detik sampai tengah malam lokal)."""
+    zone = _resolve_tz(tz, offset_minutes)
+    current = datetime.fromtimestamp(now if now is not None else time.time(), zone)
+    midnight = (current + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return current.strftime("%Y-%m-%d"), max(1, int((midnight - current).total_seconds()))
+
+
+def payload_digest(*parts) -> str:
+    """Hash stabil dari input JSON (urutan key tidak berpengaruh)."""
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+# ----------------------------------------------------------------------
+# Backends (nilai = string JSON)
+# ----------------------------------------------------------------------
+class InProcessBackend:
+    """LRU per proses dengan expiry per key (counter versi ikut di LRU yang sama)."""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def _put(self, key, value, ttl: int):
+        self._data[key] = (value, time.time() + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def set(self, key, value, ttl: int):
+        with self._lock:
+            self._put(key, value, ttl)
+
+    def _counter(self, key) -> int:
+        item = self._data.get(key)
+        return item[0] if item is not None and item[1] > time.time() else 0
+
+    def get_counter(self, key, ttl: int) -> int:
+        """Nilai counter (0 jika belum ada / kedaluwarsa); expiry diperpanjang ttl."""
+        with self._lock:
+            value = self._counter(key)
+            if value:
+                self._put(key, value, ttl)
+            return value
+
+    def incr(self, key, ttl: int) -> int:
+        with self._lock:
+            value = self._counter(key) + 1
+            self._put(key, value, ttl)
+            return value
+
+    def clear(self, prefix: str):
+        with self._lock:
+            for k in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[k]
+
+    def size(self) -> int:
+        return len(self._data)
+
+
+class RedisBackend:
+    """
+    Redis-compatible (Redis, KeyDB, Dragonfly). Batas ukuran diserahkan ke
+    server: set maxmemory + maxmemory-policy allkeys-lru.
+    """
+
+    def __init__(self, url: str = REDIS_URL):
+        import redis
+
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self._client.ping()
+
+    def get(self, key):
+        value = self._client.get(key)
+        return value.decode("utf-8") if value is not None else None
+
+    def set(self, key, value, ttl: int):
+        self._client.set(key, value, ex=ttl)
+
+    def get_counter(self, key, ttl: int) -> int:
+        # GETEX (Redis >= 6.2): baca + perpanjang expiry dalam satu round trip
+        value = self._client.getex(key, ex=ttl)
+        return int(value) if value is not None else 0
+
+    def incr(self, key, ttl: int) -> int:
+        pipe = self._client.pipeline()
+        pipe.incr(key)
+        pipe.expire(key, ttl)
+        return int(pipe.execute()[0])
+
+    def clear(self, prefix: str):
+        batch = []
+        for k in self._client.scan_iter(match=f"{prefix}*", count=500):
+            batch.append(k)
+            if len(batch) >= 500:
+                self._client.delete(*batch)
+                batch = []
+        if batch:
+            self._client.delete(*batch)
+
+    def size(self) -> int:
+        return int(self._client.dbsize())
+
+
+# ----------------------------------------------------------------------
+# Cache
+# ----------------------------------------------------------------------
+class RecommendationCache:
+    """
+    Cache hasil per user:
+      key = <ns>:<userId>:v<versi user>:<tanggal lokal>:<sha1(input)>
+    - Input (weeklyAnalysis, userPreferences, ...) masuk hash, jadi perubahan
+      preferensi otomatis miss tanpa invalidasi manual.
+    - TTL sampai tengah malam waktu lokal user.
+    - invalidate(user_id) menaikkan versi user -> semua entry lama tidak terpakai
+      (dan hilang sendiri lewat TTL/LRU).
+    - Versi user kedaluwarsa VERSION_TTL setelah terakhir dibaca. Entry hanya dibuat
+      tepat setelah versi dibaca dan hidup paling lama 1 hari, jadi saat versi hilang
+      (kembali ke 0) tidak ada entry lama yang bisa terpakai lagi.
+    """
+
+    def __init__(self, backend, namespace: str = "reco"):
+        self.backend = backend
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _version_key(self, user_id) -> str:
+        return f"{self.namespace}:ver:{user_id}"
+
+    def make_key(self, user_id, *parts, tz=None, offset_minutes=None):
+        day, ttl = local_day(tz, offset_minutes)
+        version = self.backend.get_counter(self._version_key(user_id), VERSION_TTL)
+        return f"{self.namespace}:{user_id}:v{version}:{day}:{payload_digest(*parts)}", ttl
+
+    def get_or_compute(self, user_id, parts: tuple, compute, tz=None, offset_minutes=None, refresh=False):
+        """
+        Return (json_string, hit: bool). compute() -> dict yang bisa di-JSON-kan.
+        Error backend tidak pernah menggagalkan request (fallback hitung langsung).
+        """
+        key = ttl = None
+        try:
+            key, ttl = self.make_key(user_id, *parts, tz=tz, offset_minutes=offset_minutes)
+            if not refresh:
+                cached = self.backend.get(key)
+                if cached is not None:
+                    self.hits += 1
+                    return cached, True
+        except Exception as e:
+            self.errors += 1
+            print(f"⚠️ Recommendation cache read error: {e}")
+
+        self.misses += 1
+        value = json.dumps(compute(), ensure_ascii=False)
+        if key is not None:
+            try:
+                self.backend.set(key, value, ttl)
+            except Exception as e:
+                self.errors += 1
+                print(f"⚠️ Recommendation cache write error: {e}")
+        return value, False
+
+    def invalidate(self, user_id) -> int:
+        """Buang semua hasil cache user (return versi baru)."""
+        return self.backend.incr(self._version_key(user_id), VERSION_TTL)
+
+    def invalidate_all(self):
+        self.backend.clear(f"{self.namespace}:")
+
+    def stats(self) -> dict:
+        try:
+            size = self.backend.size()
+        except Exception:
+            size = None
+        return {
+            "backend": type(self.backend).__name__,
+            "entries": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+        }
+
+
+_caches = {}
+_cache_lock = threading.Lock()
+
+
+def make_backend(kind: str = None, max_entries: int = CACHE_MAX_ENTRIES, label: str = "Recommendation cache"):
+    """Backend sesuai RECO_CACHE_BACKEND; redis gagal connect -> fallback memory."""
+    kind = (kind or CACHE_BACKEND).lower()
+    if kind == "off":
+        return None
+    if kind == "redis":
+        try:
+            backend = RedisBackend(REDIS_URL)
+            print(f"✅ {label}: redis ({REDIS_URL})")
+            return backend
+        except Exception as e:
+            print(f"⚠️ Redis tidak tersedia ({e}), pakai cache in-process")
+    return InProcessBackend(max_entries)
+
+
+def get_recommendation_cache(namespace: str = "reco"):
+    """Singleton per namespace; None jika RECO_CACHE_BACKEND=off."""
+    if namespace not in _caches:
+        with _cache_lock:
+            if namespace not in _caches:
+                backend = make_backend()
+                _caches[namespace] = RecommendationCache(backend, namespace) if backend else None
+    return _caches[namespace]
@@ -0,0 +1,451 @@
+# ai/core/recommendation_engine.py
+
+import re
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from .startup_profiler import profile_step, profiled_import
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+CATALOG_PATH = BASE_DIR / "data" / "data pangan bersih.parquet"
+PRICE_PATH = BASE_DIR / "data raw" / "dataset_harga_pangan.csv"
+
+# Harga estimasi dihitung per porsi 100 g (satuan yang sama dengan nilai gizi katalog)
+PORTION_GRAM = 100
+
+# Kolom nutrisi yang dipakai rule scoring (nama kolom parquet)
+FEATURE_COLUMNS = ["Energi", "Protein", "Lemak Total", "Karbohidrat", "Gula", "Serat", "Natrium"]
+
+# Rule fokus isu mingguan: kata kunci di pesan isu -> (kolom, ambang, arah)
+# arah "min": makanan dengan nilai >= ambang diutamakan; "max": nilai <= ambang diutamakan
+ISSUE_RULES = [
+    ("protein", "Protein", 8.0, "min"),
+    ("serat", "Serat", 3.0, "min"),
+    ("gula", "Gula", 5.0, "max"),
+    ("lemak", "Lemak Total", 10.0, "max"),
+    ("natrium", "Natrium", 400.0, "max"),
+    ("garam", "Natrium", 400.0, "max"),
+]
+# generate_daily_recommendation (kontrak lama) hanya mengenal isu protein
+LEGACY_ISSUE_RULES = ISSUE_RULES[:1]
+
+# Kata kunci nama pangan (token nama_clean) -> awalan komoditas di dataset_harga_pangan.csv.
+# Urutan penting: yang lebih spesifik dulu.
+PRICE_KEYWORDS = [
+    ("beras merah", "Beras Merah"),
+    ("ketan", "Beras Ketan Putih"),
+    ("beras", "Beras Medium (Eceran)"),
+    ("nasi", "Beras Medium (Eceran)"),
+    ("tepung terigu", "Tepung Terigu Protein Sedang"),
+    ("jagung", "Jagung Pipilan Kering (Peternak)"),
+    ("hati sapi", "Hati Sapi"),
+    ("sapi", "Daging Sapi Murni"),
+    ("kambing", "Daging Kambing/Domba"),
+    ("domba", "Daging Kambing/Domba"),
+    ("telur bebek", "Telur Bebek Asin"),
+    ("telur", "Telur Ayam Ras"),
+    ("ayam kampung", "Daging Ayam Kampung"),
+    ("ayam", "Daging Ayam Ras Segar"),
+    ("kembung", "Ikan Kembung"),
+    ("tongkol", "Ikan Tongkol"),
+    ("bandeng", "Ikan Bandeng"),
+    ("lele", "Ikan Lele"),
+    ("ikan mas", "Ikan Mas"),
+    ("nila", "Ikan Nila"),
+    ("udang", "Udang Vaname"),
+    ("teri", "Teri Medan"),
+    ("cabai rawit", "Cabai Rawit Merah"),
+    ("cabai hijau", "Cabai Hijau Besar"),
+    ("cabai", "Cabai Merah Keriting"),
+    ("bawang merah", "Bawang Merah"),
+    ("bawang putih", "Bawang Putih"),
+    ("bawang bombay", "Bawang Bombay"),
+    ("daun bawang", "Daun Bawang"),
+    ("tomat", "Tomat Buah"),
+    ("wortel", "Wortel Lokal"),
+    ("kentang", "Kentang"),
+    ("bayam", "Sayur Bayam"),
+    ("kangkung", "Sayur Kangkung"),
+    ("kubis", "Kol/Kubis"),
+    ("kol", "Kol/Kubis"),
+    ("buncis", "Buncis"),
+    ("labu siam", "Labu Siam"),
+    ("pisang", "Pisang Ambon"),
+    ("pepaya", "Pepaya California"),
+    ("jeruk", "Jeruk Medan/Siam"),
+    ("mangga", "Mangga Harum Manis"),
+    ("salak", "Salak Pondoh"),
+    ("semangka", "Semangka Merah"),
+    ("melon", "Melon"),
+    ("buah naga", "Buah Naga Merah"),
+    ("alpukat", "Alpukat Mentega"),
+    ("minyak", "Minyak Goreng Curah"),
+    ("gula merah", "Gula Merah/Jawa"),
+    ("gula aren", "Gula Merah/Jawa"),
+    ("gula", "Gula Pasir"),
+    ("garam", "Garam Halus"),
+    ("kental manis", "Susu Kental Manis"),
+    ("susu bubuk", "Susu Bubuk"),
+    ("tempe", "Kacang Kedelai"),
+    ("tahu", "Kacang Kedelai"),
+    ("kedelai", "Kacang Kedelai"),
+    ("kacang tanah", "Kacang Tanah"),
+    ("kacang hijau", "Kacang Hijau"),
+    ("mi", "Mie Instan"),
+    ("mie", "Mie Instan"),
+]
+
+# Berat (gram) untuk satuan harga non-kg di dataset harga
+_UNIT_GRAMS = {"per butir": 60, "per ikat": 250, "per sisir": 1200, "per bungkus": 85}
+
+
+def _tokens(text: str) -> list:
+    return re.findall(r"[a-z0-9]+", str(text).lower())
+
+
+def _price_per_100g(commodity: str, price: float):
+    """Konversi harga baris dataset harga ke Rp per 100 g; None jika tidak bisa."""
+    label = commodity.lower()
+    if "ekor" in label or "hidup" in label:
+        return None
+    for unit, grams in _UNIT_GRAMS.items():
+        if unit in label:
+            return price * 100.0 / grams
+    m = re.search(r"\((\d+)\s*g\)", label)
+    if m:
+        return price * 100.0 / float(m.group(1))
+    return price / 10.0  # default Rp/kg
+
+
+def load_price_table(path=PRICE_PATH) -> list:
+    """
+    Return list (key, Rp per 100 g) dari dataset harga, satu baris per komoditas,
+    diurutkan dari tahun terbaru (awalan PRICE_KEYWORDS mengambil yang pertama cocok).
+    key = "<Komoditas>,<Tahun>".
+    """
+    pd = profiled_import("pandas")
+    prices = pd.read_csv(path)
+    prices = prices.sort_values("Tahun", kind="stable", ascending=False)
+    prices = prices.drop_duplicates("Komoditas", keep="first")
+    table = []
+    for _, row in prices.iterrows():
+        per_100g = _price_per_100g(str(row["Komoditas"]), float(row["Harga"]))
+        if per_100g is not None:
+            table.append((f"{row['Komoditas']},{row['Tahun']}", per_100g))
+    return table
+
+
+def estimate_catalog_prices(names: list, groups: list, price_table: list) -> tuple:
+    """
+    Gabungkan harga ke katalog lewat PRICE_KEYWORDS.
+    Baris tanpa kecocokan memakai median harga kelompok makanannya (atau median global).
+    Return (price_per_portion float32[n], estimated bool[n]).
+    """
+    commodity_price = {}
+    for keyword, prefix in PRICE_KEYWORDS:
+        for key, per_100g in price_table:
+            if key.startswith(prefix):
+                commodity_price[keyword] = per_100g
+                break
+
+    keyword_tokens = [(kw.split(), commodity_price[kw]) for kw, _ in PRICE_KEYWORDS if kw in commodity_price]
+
+    n = len(names)
+    per_100g = np.full(n, np.nan, dtype="float64")
+    for i, name in enumerate(names):
+        tokens = set(_tokens(name))
+        for kw_tokens, price in keyword_tokens:
+            if all(t in tokens for t in kw_tokens):
+                per_100g[i] = price
+                break
+
+    matched = ~np.isnan(per_100g)
+    global_median = float(np.nanmedian(per_100g)) if matched.any() else 2000.0
+    groups = np.asarray(groups, dtype=object)
+    for group in set(groups[~matched]):
+        in_group = groups == group
+        known = per_100g[in_group & matched]
+        fill = float(np.median(known)) if len(known) else global_median
+        per_100g[in_group & ~matched] = fill
+
+    return (per_100g * PORTION_GRAM / 100.0).astype("float32"), ~matched
+
+
+class RecommendationEngine:
+    """
+    Rule-based daily recommendation, vektorisasi NumPy.
+
+    Fitur katalog (matriks nutrisi, harga per porsi, token index nama) dihitung
+    sekali saat engine dibuat; recommend() hanya operasi array + argpartition,
+    sehingga katalog 100k item tetap di kisaran milidetik.
+
+    legacy=True memakai aturan loop lama generate_daily_recommendation persis
+    (avoid = nama persis, likes = substring nama, isu mingguan hanya protein);
+    default memakai ISSUE_RULES lengkap dan avoid/likes per token.
+    """
+
+    def __init__(self, food_ids, names, nutrients: dict, prices, groups=None, price_estimated=None,
+                 legacy: bool = False):
+        self.food_ids = np.asarray(food_ids)
+        self.names = np.asarray(names, dtype=object)
+        self.n = len(self.names)
+        self.legacy = legacy
+        # float64: ambang & skor sama persis dengan aritmetika float Python di loop lama
+        self.prices = np.asarray(prices, dtype="float64")
+        self.price_estimated = (
+            np.asarray(price_estimated, dtype=bool) if price_estimated is not None else np.zeros(self.n, bool)
+        )
+        self.groups = np.asarray(groups if groups is not None else [""] * self.n, dtype=object)
+
+        # Matriks nutrisi [n, len(FEATURE_COLUMNS)]
+        self.features = np.zeros((self.n, len(FEATURE_COLUMNS)), dtype="float64")
+        for j, col in enumerate(FEATURE_COLUMNS):
+            if col in nutrients:
+                self.features[:, j] = np.nan_to_num(np.asarray(nutrients[col], dtype="float64"))
+        self._col = {c: j for j, c in enumerate(FEATURE_COLUMNS)}
+
+        # Token -> baris, untuk likes/avoid tanpa scan string per request
+        postings = {}
+        self._lower_names = {}
+        for i, name in enumerate(self.names):
+            lower = str(name).lower().strip()
+            self._lower_names.setdefault(lower, []).append(i)
+            for tok in set(_tokens(lower)):
+                postings.setdefault(tok, []).append(i)
+        self._postings = {t: np.asarray(rows, dtype=np.int64) for t, rows in postings.items()}
+        self._has_name = np.array([bool(str(nm).strip()) for nm in self.names], dtype=bool)
+        if legacy:
+            # Loop lama: nama kosong dilewati, avoid dibandingkan dengan name.lower() tanpa strip
+            self._has_name = np.array([bool(nm) for nm in self.names], dtype=bool)
+            self._legacy_lower = [str(nm).lower() if nm else "" for nm in self.names]
+            self._lower_names = {}
+            for i, lower in enumerate(self._legacy_lower):
+                self._lower_names.setdefault(lower, []).append(i)
+
+    # ------------------------------------------------------------------
+    # Konstruktor
+    # ------------------------------------------------------------------
+    @classmethod
+    def from_parquet(cls, catalog_path=CATALOG_PATH, price_path=PRICE_PATH):
+        """Katalog lengkap dari parquet + harga dari dataset_harga_pangan.csv."""
+        pd = profiled_import("pandas")
+        with profile_step("RecommendationEngine load catalog"):
+            df = pd.read_parquet(catalog_path)
+            names = df["Nama Bahan Makanan"].astype(str).tolist()
+            groups = df["Kelompok Makanan"].astype(str).tolist()
+            nutrients = {c: df[c].to_numpy() for c in FEATURE_COLUMNS if c in df.columns}
+            prices, estimated = estimate_catalog_prices(
+                df["nama_clean"].astype(str).tolist(), groups, load_price_table(price_path)
+            )
+        return cls(np.arange(len(df)), names, nutrients, prices, groups, estimated)
+
+    @classmethod
+    def from_catalog(cls, records: list):
+        """
+        Katalog override dari request / backend. Menerima dua gaya key:
+          {"foodId", "name", "estimatedPrice", "nutrition": {"Protein": .., "Lemak": ..}}
+          {"food_id", "name", "price_estimated", "protein", "fat", "sugar"}
+        """
+        aliases = {
+            "Protein": ("Protein", "protein"),
+            "Lemak Total": ("Lemak Total", "Lemak", "fat", "lemak"),
+            "Gula": ("Gula", "sugar", "gula"),
+            "Energi": ("Energi", "calories", "energy", "energi"),
+            "Karbohidrat": ("Karbohidrat", "carbs", "karbohidrat"),
+            "Serat": ("Serat", "fiber", "serat"),
+            "Natrium": ("Natrium", "sodium", "natrium"),
+        }
+
+        def pick(d, keys, default=0.0):
+            for k in keys:
+                if d.get(k) is not None:
+                    return d[k]
+            return default
+
+        food_ids, names, prices = [], [], []
+        nutrients = {c: [] for c in FEATURE_COLUMNS}
+        for rec in records or []:
+            nutr = {**rec, **(rec.get("nutrition") or {})}
+            food_ids.append(pick(rec, ("foodId", "food_id", "id"), None))
+            names.append(str(rec.get("name", "") or ""))
+            price = pick(rec, ("estimatedPrice", "price_estimated"), None)
+            if price is None and rec.get("pricePerKg") is not None:
+                price = float(rec["pricePerKg"]) * PORTION_GRAM / 1000.0
+            prices.append(float(price or 0))
+            for col in FEATURE_COLUMNS:
+                nutrients[col].append(float(pick(nutr, aliases[col]) or 0))
+
+        return cls(np.asarray(food_ids, dtype=object), names, nutrients, prices)
+
+    @classmethod
+    def from_legacy_records(cls, records: list):
+        """
+        foods_from_supabase generate_daily_recommendation: hanya key lama
+        {"food_id", "name", "price_estimated", "protein", "fat", "sugar"} dan aturan legacy.
+        """
+        records = records or []
+        nutrients = {
+            "Protein": [r.get("protein", 0) for r in records],
+            "Lemak Total": [r.get("fat", 0) for r in records],
+            "Gula": [r.get("sugar", 0) for r in records],
+        }
+        food_ids = np.empty(len(records), dtype=object)
+        food_ids[:] = [r.get("food_id") for r in records]
+        names = [r.get("name", "") for r in records]
+        prices = [r.get("price_estimated", 0) for r in records]
+        return cls(food_ids, names, nutrients, prices, legacy=True)
+
+    # ------------------------------------------------------------------
+    # Scoring
+    # ------------------------------------------------------------------
+    def _rows_matching(self, term: str):
+        """Baris yang namanya memuat semua token term."""
+        toks = _tokens(term)
+        if not toks:
+            return np.empty(0, dtype=np.int64)
+        rows = self._postings.get(toks[0])
+        if rows is None:
+            return np.empty(0, dtype=np.int64)
+        for t in toks[1:]:
+            other = self._postings.get(t)
+            if other is None:
+                return np.empty(0, dtype=np.int64)
+            rows = np.intersect1d(rows, other, assume_unique=True)
+        return rows
+
+    def score(self, key_issue, user_preferences: dict):
+        """Return (scores float32[n], valid bool[n])."""
+        budget = user_preferences.get("budget")
+        avoid = [str(x).lower() for x in user_preferences.get("avoid", []) or []]
+        likes = [str(x).lower() for x in user_preferences.get("likes", []) or []]
+
+        valid = self._has_name.copy()
+        for term in avoid:
+            if self.legacy:
+                valid[self._lower_names.get(term, [])] = False
+                continue
+            valid[self._rows_matching(term)] = False
+            valid[self._lower_names.get(term.strip(), [])] = False
+        if budget:
+            valid &= self.prices <= float(budget)
+
+        scores = np.zeros(self.n, dtype="float64")
+
+        # Fokus isu mingguan
+        issue = (key_issue or "").lower()
+        for keyword, col, threshold, direction in (LEGACY_ISSUE_RULES if self.legacy else ISSUE_RULES):
+            if keyword in issue:
+                values = self.features[:, self._col[col]]
+                good = values >= threshold if direction == "min" else values <= threshold
+                scores += np.where(good, 2.0, -1.0)
+                break
+
+        # Penalize unhealthy
+        scores -= 0.5 * (self.features[:, self._col["Lemak Total"]] >= 15)
+        scores -= 0.5 * (self.features[:, self._col["Gula"]] >= 15)
+
+        # User likes
+        if likes:
+            if self.legacy:
+                liked = np.fromiter((any(t in nm for t in likes) for nm in self._legacy_lower), bool, self.n)
+            else:
+                liked = np.zeros(self.n, dtype=bool)
+                for term in likes:
+                    liked[self._rows_matching(term)] = True
+            scores += 0.5 * liked
+
+        # Cheap food bonus
+        if budget:
+            scores += np.maximum(0.0, 1.0 - self.prices / float(budget))
+
+        return scores, valid
+
+    def top_k(self, scores, valid, k: int):
+        """
+        Indeks top-k (urut skor menurun) dengan argpartition. Skor sama diurutkan
+        menurut posisi katalog, seperti sort stabil di loop lama.
+        """
+        candidates = np.flatnonzero(valid)
+        if len(candidates) == 0 or k <= 0:
+            return candidates[:0]
+        cand_scores = scores[candidates]
+        if len(candidates) > k:
+            kth = -np.partition(-cand_scores, k - 1)[k - 1]
+            above = np.flatnonzero(cand_scores > kth)
+            ties = np.flatnonzero(cand_scores == kth)[:k - len(above)]
+            keep = np.sort(np.concatenate([above, ties]))
+            candidates, cand_scores = candidates[keep], cand_scores[keep]
+        order = np.argsort(-cand_scores, kind="stable")
+        return candidates[order]
+
+    def recommend(self, weekly_analysis: dict, user_preferences: dict, top_k: int = 5) -> dict:
+        """
+        OUTPUT (FINAL CONTRACT):
+        { "recommendedFoods": [ { foodId, name, estimatedPrice, reason } ] }
+        """
+        key_issue, main_reco_text = extract_weekly_issue(weekly_analysis or {})
+        scores, valid = self.score(key_issue, user_preferences or {})
+        top = self.top_k(scores, valid, top_k)
+
+        reason_parts = []
+        if key_issue:
+            reason_parts.append(key_issue.rstrip("."))
+        if main_reco_text:
+            reason_parts.append(main_reco_text.rstrip("."))
+        reason_parts.append("Dipilih karena harga terjangkau dan sesuai preferensi kamu")
+        reason = ". ".join(reason_parts) + "."
+
+        recommended = []
+        for i in top:
+            food_id = self.food_ids[i]
+            recommended.append({
+                "foodId": food_id.item() if hasattr(food_id, "item") else food_id,
+                "name": self.names[i],
+                "estimatedPrice": int(round(float(self.prices[i]))),
+                "reason": reason,
+            })
+        return {"recommendedFoods": recommended}
+
+
+def extract_weekly_issue(weekly_analysis: dict):
+    """(key_issue, main_reco_text) dari hasil analisis mingguan."""
+    patterns = weekly_analysis.get("patterns", []) or []
+    recommendations = weekly_analysis.get("recommendations", []) or []
+
+    key_issue = None
+    for p in patterns:
+        if p.get("type") == "negative" and p.get("impact") == "High":
+            key_issue = p.get("message")
+            break
+
+    if not key_issue and patterns:
+        key_issue = patterns[0].get("message")
+
+    main_reco_text = recommendations[0] if recommendations else None
+    return key_issue, main_reco_text
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_recommendation_engine() -> RecommendationEngine:
+    """Singleton engine atas katalog lengkap (dibangun sekali per versi katalog)."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                from .bundle import get_bundle_manager
+
+                _engine = RecommendationEngine.from_parquet(catalog_path=get_bundle_manager().catalog_path())
+                print(f"✅ RecommendationEngine ready ({_engine.n} items)")
+    return _engine
+
+
+def reset_recommendation_engine(*_):
+    """Buang engine lama; dibangun ulang dari katalog aktif saat dipakai lagi (callback bundle swap)."""
+    global _engine
+    with _engine_lock:
+        _engine = None
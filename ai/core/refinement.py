@@ -0,0 +1,290 @@
+# ai/core/refinement.py
+
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from . import llm_trace, metrics
+from .llm_helper import generate_food_candidates, generate_food_candidates_batch
+from .query_rewrite import rewrite_query, spell_correct
+from .reranker import RERANK_TOP_K, get_reranker
+
+# Skor minimum agar hasil direct search dianggap cukup (tanpa Gemini)
+SCORE_THRESHOLD = 0.5
+
+# Mode LLM refinement:
+# - "sequential"  : direct search dulu, Gemini hanya jika skor < 0.5 (default, hemat kuota)
+# - "speculative" : Gemini langsung dijalankan paralel jika pre-signal memprediksi skor rendah
+# - "eager"       : Gemini selalu dijalankan paralel dengan direct search (latency minimum)
+# - "off"         : tanpa Gemini sama sekali
+REFINE_MODES = ("sequential", "speculative", "eager", "off")
+REFINE_MODE = os.environ.get("LLM_REFINE_MODE", "sequential").strip().lower()
+if REFINE_MODE not in REFINE_MODES:
+    print(f"⚠️ LLM_REFINE_MODE '{REFINE_MODE}' tidak dikenal, pakai 'sequential'")
+    REFINE_MODE = "sequential"
+
+# Pre-signal: query pendek / token asing biasanya berakhir di skor < 0.5
+SHORT_QUERY_CHARS = int(os.environ.get("SPECULATIVE_SHORT_QUERY_CHARS", "4"))
+UNKNOWN_TOKEN_RATIO = float(os.environ.get("SPECULATIVE_UNKNOWN_TOKEN_RATIO", "0.5"))
+
+# Selama model masih di-load di background, jawab dengan lexical search
+LEXICAL_WHILE_WARMING = os.environ.get("LEXICAL_WHILE_WARMING", "1") == "1"
+
+_llm_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("SPECULATIVE_LLM_WORKERS", "4")),
+    thread_name_prefix="llm-refine",
+)
+
+
+def resolve_refine_mode(mode: str | None = None) -> str:
+    """Mode efektif: mode per request jika valid, selain itu LLM_REFINE_MODE."""
+    mode = (mode or REFINE_MODE).strip().lower()
+    return mode if mode in REFINE_MODES else REFINE_MODE
+
+
+def _top_score(pool) -> float:
+    return max((m["similarity"] for m in pool), default=0)
+
+
+def search_spell_checked(food_matcher, queries, k: int = 5):
+    """
+    search_many untuk queries dan koreksi ejaannya dalam satu batch. Koreksi hanya
+    dipakai jika skor query asli < SCORE_THRESHOLD dan skor koreksinya lebih tinggi:
+    kata makanan yang valid ("salad buah", "ramen") tidak diganti kata katalog yang mirip.
+    Return (hasil per query, query terpilih, set index yang memakai koreksi).
+    """
+    queries = list(queries)
+    corrections = [spell_correct(q) for q in queries]
+    extra = [c for c in corrections if c is not None]
+    results = food_matcher.search_many(queries + extra, k=k)
+    pools, chosen, corrected = results[:len(queries)], list(queries), set()
+
+    alternatives = iter(results[len(queries):])
+    for i, correction in enumerate(corrections):
+        if correction is None:
+            continue
+        alt = next(alternatives)
+        score = _top_score(pools[i])
+        if score < SCORE_THRESHOLD and _top_score(alt) > score:
+            pools[i], chosen[i] = alt, correction
+            corrected.add(i)
+            metrics.incr("query_rewrite.spell")
+        else:
+            metrics.incr("query_rewrite.spell_rejected")
+    return pools, chosen, corrected
+
+
+def predict_low_confidence(text: str, vocabulary=None):
+    """
+    Prediksi murah (tanpa embedding) apakah direct search kemungkinan skor < 0.5.
+    Return (bool, alasan).
+    """
+    tokens = re.findall(r"[a-z]+", (text or "").lower())
+
+    if len(text.strip()) < SHORT_QUERY_CHARS or not tokens:
+        return True, "short_query"
+
+    if vocabulary:
+        unknown = [t for t in tokens if t not in vocabulary]
+        if len(unknown) == len(tokens):
+            return True, "lexical_miss"
+        if len(unknown) / len(tokens) >= UNKNOWN_TOKEN_RATIO:
+            return True, "unknown_tokens"
+
+    return False, None
+
+
+def search_with_refinement(food_matcher, text: str, top_n: int = 5, mode: str | None = None) -> dict:
+    """
+    Attempt 0: Rewrite query lewat alias table hasil mining (core/query_rewrite.py)
+    Attempt 1: Direct database search (+ koreksi ejaan jika skornya lebih baik)
+    Attempt 2: Cross-encoder rerank top-50 (core/reranker.py) jika skor < 0.5
+    Attempt 3: LLM refinement (Gemini) jika skor rerank masih meragukan
+
+    Pada mode speculative/eager, Gemini sudah berjalan paralel dengan attempt 1
+    dan hasilnya dibuang (atau dibatalkan sebelum request terkirim) jika
+    direct search sudah lolos threshold.
+
+    Return: {"matches": [...], "method": str, "search_terms": [...]}
+    """
+    mode = resolve_refine_mode(mode)
+
+    # Rewrite hanya untuk search lokal; Gemini tetap menerima input asli user
+    query, rewrite_kind = rewrite_query(text)
+    if rewrite_kind:
+        print(f"      🔁 Query rewrite ({rewrite_kind}): '{text}' -> '{query}'")
+
+    if LEXICAL_WHILE_WARMING and food_matcher.model_warming() and not food_matcher.has_cached_query(query):
+        lexical = food_matcher.lexical_search(query, top_n)
+        if lexical:
+            print("      ⚡ Model masih loading, pakai lexical search")
+            return {"matches": lexical, "method": "lexical", "search_terms": [query]}
+
+    llm_future = None
+    cancel_event = None
+    if mode == "eager":
+        reason = "eager"
+    elif mode == "speculative":
+        _, reason = predict_low_confidence(query, food_matcher.vocabulary())
+    else:
+        reason = None
+
+    if reason:
+        print(f"      ⚡ Speculative LLM refinement started ({reason})")
+        cancel_event = threading.Event()
+        llm_future = _llm_executor.submit(generate_food_candidates, text, cancel_event)
+
+    # Mode off (juga dipakai saat degraded) tidak menambah kerja CPU untuk rerank
+    reranker = get_reranker() if mode != "off" else None
+
+    print("      👉 Strategy: Direct Database Search")
+    pools, queries, corrected = search_spell_checked(food_matcher, [query], k=RERANK_TOP_K if reranker else top_n)
+    pool = pools[0]
+    if corrected:
+        print(f"      🔁 Koreksi ejaan: '{query}' -> '{queries[0]}'")
+        query, rewrite_kind = queries[0], rewrite_kind or "spell"
+    direct_matches = food_matcher.aggregate_results([pool], top_n)
+
+    if direct_matches:
+        top_score = direct_matches[0].get("similarity", 0)
+        print(f"      📊 Best Score: {top_score:.4f}")
+
+        if top_score >= SCORE_THRESHOLD:
+            print("      ✅ Match Found! Stopping loop.")
+            if llm_future is not None:
+                cancel_event.set()
+                llm_future.cancel()
+            method = "query_rewrite" if rewrite_kind else "direct_match"
+            return {"matches": direct_matches, "method": method, "search_terms": [query]}
+
+        print(f"      ⚠️ Score < {SCORE_THRESHOLD}. Trying next strategy...")
+    else:
+        print("      ❌ No matches found in DB.")
+
+    if mode == "off":
+        print("      ❌ LLM refinement disabled. Returning best effort.")
+        return {"matches": direct_matches, "method": "direct_match", "search_terms": [query]}
+
+    if reranker is not None and pool:
+        print(f"      👉 Strategy: Cross-encoder Rerank (top-{len(pool)})")
+        reranked, confident = reranker.rerank(query, pool, top_n)
+        print(f"      📊 Rerank Score: {reranked[0]['rerank_score']:.4f}")
+        if confident:
+            print("      ✅ Rerank confident. Skipping Gemini.")
+            llm_trace.record(text, [], reranked, method="reranked")
+            if llm_future is not None:
+                cancel_event.set()
+                llm_future.cancel()
+            return {"matches": reranked, "method": "reranked", "search_terms": [query]}
+        print(f"      ⚠️ Rerank < {reranker.accept_score}. Escalating to Gemini...")
+
+    print("      👉 Strategy: LLM Refinement (Gemini)")
+    if llm_future is not None:
+        search_terms = llm_future.result()
+    else:
+        search_terms = generate_food_candidates(text)
+    print(f"      🤖 LLM Terms: {search_terms}")
+
+    llm_matches = food_matcher.match_with_llm_candidates(search_terms, top_final=top_n)
+    if llm_matches:
+        print(f"      📊 Best Score: {llm_matches[0].get('similarity', 0):.4f}")
+        llm_trace.record(text, search_terms, llm_matches)
+        return {"matches": llm_matches, "method": "llm_enhanced", "search_terms": search_terms}
+
+    print("      ❌ Last attempt. Returning best effort.")
+    return {"matches": direct_matches, "method": "direct_match", "search_terms": [query]}
+
+
+def match_candidates_batched(food_matcher, candidates: list, top_n: int = 5, allow_llm: bool = True) -> list:
+    """
+    Mode dua fase untuk banyak kandidat sekaligus (/api/match-foods):
+      1. Direct search semua kandidat (satu batch encode + search); kandidat
+         dengan skor < 0.5 dinilai ulang cross-encoder dalam satu predict
+      2. Kandidat yang skor rerank-nya masih meragukan dikirim ke Gemini dalam
+         SATU prompt, lalu semua istilah hasil Gemini dicari dalam satu batch retrieval.
+    Jumlah request Gemini per panggilan maksimal satu.
+
+    Return list {"matches", "method", "search_terms"} dengan urutan sama seperti candidates.
+    """
+    results = [None] * len(candidates)
+    for i, result in iter_candidates_batched(food_matcher, candidates, top_n, allow_llm):
+        results[i] = result
+    return results
+
+
+def iter_candidates_batched(food_matcher, candidates: list, top_n: int = 5, allow_llm: bool = True):
+    """
+    Sama seperti match_candidates_batched, tapi sebagai generator (index, result)
+    yang meng-yield setiap kandidat begitu hasil finalnya siap: kandidat yang
+    lolos direct search langsung keluar, yang butuh Gemini menyusul setelah fase 2.
+    """
+    # Search lokal memakai query hasil rewrite; Gemini tetap menerima kandidat asli
+    rewrites = [rewrite_query(c) for c in candidates]
+    queries = [q for q, _ in rewrites]
+    if (
+        LEXICAL_WHILE_WARMING
+        and food_matcher.model_warming()
+        and not all(food_matcher.has_cached_query(q) for q in queries)
+    ):
+        lexical = [food_matcher.lexical_search(q, top_n) for q in queries]
+        if all(lexical):
+            print("   ⚡ Model masih loading, pakai lexical search")
+            for i, (q, m) in enumerate(zip(queries, lexical)):
+                yield i, {"matches": m, "method": "lexical", "search_terms": [q]}
+            return
+
+    reranker = get_reranker() if allow_llm else None
+    direct, queries, corrected = search_spell_checked(food_matcher, queries, k=RERANK_TOP_K if reranker else top_n)
+    kinds = [kind or ("spell" if i in corrected else None) for i, (_, kind) in enumerate(rewrites)]
+    results = []
+    low = []
+    passed = 0
+
+    for i, (query, rewrite_kind, res) in enumerate(zip(queries, kinds, direct)):
+        matches = food_matcher.aggregate_results([res], top_n)
+        top_score = matches[0]["similarity"] if matches else 0
+        method = "query_rewrite" if rewrite_kind and top_score >= SCORE_THRESHOLD else "direct_match"
+        results.append({"matches": matches, "method": method, "search_terms": [query]})
+        passed += top_score >= SCORE_THRESHOLD
+        if top_score < SCORE_THRESHOLD and allow_llm:
+            low.append(i)
+        else:
+            yield i, results[i]
+
+    print(f"   📊 Direct search: {passed}/{len(candidates)} kandidat lolos threshold")
+    if low and reranker is not None:
+        reranked = reranker.rerank_many([queries[i] for i in low], [direct[i] for i in low], top_n)
+        escalate = []
+        for i, (matches, confident) in zip(low, reranked):
+            if confident:
+                results[i] = {"matches": matches, "method": "reranked", "search_terms": [queries[i]]}
+                llm_trace.record(candidates[i], [], matches, method="reranked")
+                yield i, results[i]
+            else:
+                escalate.append(i)
+        print(f"   📊 Rerank: {len(low) - len(escalate)}/{len(low)} kandidat diterima tanpa Gemini")
+        low = escalate
+    if not low:
+        return
+
+    print(f"   👉 Strategy: Batched LLM Refinement untuk {len(low)} kandidat")
+    term_lists = generate_food_candidates_batch([candidates[i] for i in low])
+    if term_lists is None:
+        print("   ❌ Batched LLM refinement gagal. Returning best effort.")
+        for i in low:
+            yield i, results[i]
+        return
+
+    flat_terms = [t for terms in term_lists for t in terms]
+    flat_results = food_matcher.search_many(flat_terms)
+
+    pos = 0
+    for i, terms in zip(low, term_lists):
+        per_term = flat_results[pos:pos + len(terms)]
+        pos += len(terms)
+        llm_matches = food_matcher.aggregate_results(per_term, top_n)
+        if llm_matches:
+            results[i] = {"matches": llm_matches, "method": "llm_enhanced", "search_terms": terms}
+            llm_trace.record(candidates[i], terms, llm_matches)
+        yield i, results[i]
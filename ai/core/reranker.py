@@ -0,0 +1,117 @@
+# ai/core/reranker.py
+"""
+Cross-encoder lokal untuk menilai ulang kandidat FAISS sebelum Gemini.
+
+Bi-encoder (Qwen3) memberi skor < 0.5 untuk banyak query sehari-hari
+("nasgor ayam", "es teh") walaupun jawaban benarnya ada di top-50. Cross-encoder
+membaca (query, nama makanan) bersama-sama, jadi urutan top-50 jauh lebih tepat;
+Gemini hanya dipanggil jika skor rerank teratas masih meragukan.
+
+Skor cross-encoder disimpan di `rerank_score`; `similarity` tetap cosine FAISS
+(dipakai aturan exact match >= 0.90 di nutrition.py, metadata.score, dan frontend).
+Default mati sampai hasil benchmarks/eval_reranker.py tercatat di README.
+"""
+
+import os
+import threading
+
+from . import metrics
+from .executors import run_cpu
+from .startup_profiler import profile_step, profiled_import
+
+RERANKER_ENABLED = os.environ.get("RERANKER", "0") == "1"
+# Multilingual (mMARCO, termasuk Bahasa Indonesia), ~118M parameter, cukup cepat di CPU
+RERANKER_MODEL = os.environ.get("RERANKER_MODEL", "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1")
+# Jumlah kandidat FAISS yang dinilai ulang per query
+RERANK_TOP_K = int(os.environ.get("RERANK_TOP_K", "50"))
+# Skor rerank (sigmoid, 0..1) minimum agar hasil diterima tanpa Gemini
+RERANK_ACCEPT_SCORE = float(os.environ.get("RERANK_ACCEPT_SCORE", "0.6"))
+# Selisih minimum skor #1 dan #2; 0 = tidak dicek (nama mirip seperti
+# "Soto Lamongan" / "Soto Ayam Lamongan" sama-sama benar)
+RERANK_MIN_MARGIN = float(os.environ.get("RERANK_MIN_MARGIN", "0"))
+RERANK_BATCH_SIZE = int(os.environ.get("RERANK_BATCH_SIZE", "64"))
+
+
+class Reranker:
+    def __init__(self, model_name: str = RERANKER_MODEL, accept_score: float = RERANK_ACCEPT_SCORE,
+                 min_margin: float = RERANK_MIN_MARGIN):
+        self.model_name = model_name
+        self.accept_score = accept_score
+        self.min_margin = min_margin
+        print(f"  ⏳ Loading reranker {model_name}...")
+        st = profiled_import("sentence_transformers")
+        with profile_step("load reranker model"):
+            self.model = st.CrossEncoder(model_name, max_length=64, device="cpu")
+        print("  ✅ Reranker ready!")
+
+    def score(self, pairs) -> list:
+        """Skor 0..1 untuk setiap (query, nama). CrossEncoder 1-label sudah memakai sigmoid."""
+        if not pairs:
+            return []
+        scores = run_cpu(
+            self.model.predict, pairs, batch_size=RERANK_BATCH_SIZE,
+            convert_to_numpy=True, show_progress_bar=False,
+        )
+        return [float(s) for s in scores]
+
+    def confident(self, matches) -> bool:
+        if not matches or matches[0]["rerank_score"] < self.accept_score:
+            return False
+        if self.min_margin > 0 and len(matches) > 1:
+            return matches[0]["rerank_score"] - matches[1]["rerank_score"] >= self.min_margin
+        return True
+
+    def rerank_many(self, queries, pools, top_n: int = 5) -> list:
+        """
+        Nilai ulang pool kandidat setiap query dalam SATU predict.
+        pools[i] = hasil search (list match) untuk queries[i].
+        Return list (matches, confident) dengan urutan sama seperti queries;
+        matches urut rerank_score, similarity tetap skor FAISS.
+        """
+        pairs = []
+        spans = []
+        deduped = []
+        for query, pool in zip(queries, pools):
+            seen = set()
+            items = [m for m in pool if not (m["food_id"] in seen or seen.add(m["food_id"]))]
+            spans.append((len(pairs), len(items)))
+            deduped.append(items)
+            pairs.extend((query, str(m["nama"])) for m in items)
+
+        scores = self.score(pairs)
+        out = []
+        for (start, n), items in zip(spans, deduped):
+            ranked = [{**m, "rerank_score": s} for m, s in zip(items, scores[start:start + n])]
+            ranked.sort(key=lambda m: m["rerank_score"], reverse=True)
+            ranked = ranked[:top_n]
+            ok = self.confident(ranked)
+            metrics.incr("reranker.accepted" if ok else "reranker.escalated")
+            out.append((ranked, ok))
+        return out
+
+    def rerank(self, query: str, pool, top_n: int = 5):
+        return self.rerank_many([query], [pool], top_n)[0]
+
+
+_reranker = None
+_reranker_failed = False
+_reranker_lock = threading.Lock()
+
+
+def get_reranker():
+    """
+    Singleton reranker; None jika RERANKER=0 atau model gagal dimuat
+    (kegagalan diingat, refinement kembali ke alur Gemini biasa).
+    """
+    global _reranker, _reranker_failed
+    if not RERANKER_ENABLED or _reranker_failed:
+        return None
+    if _reranker is None:
+        with _reranker_lock:
+            if _reranker is None and not _reranker_failed:
+                try:
+                    _reranker = Reranker()
+                except Exception as e:
+                    print(f"⚠️ Reranker tidak tersedia, pakai Gemini: {e}")
+                    _reranker_failed = True
+    return _reranker
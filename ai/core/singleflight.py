@@ -0,0 +1,133 @@
+# ai/core/singleflight.py
+
+import os
+import threading
+
+from . import metrics
+
+# Matikan penggabungan request (mis. untuk debugging) dengan SINGLE_FLIGHT=0
+SINGLE_FLIGHT_ENABLED = os.environ.get("SINGLE_FLIGHT", "1") == "1"
+
+
+class _AllCancelled:
+    """
+    Cancel token gabungan untuk satu flight: is_set() baru True jika SEMUA
+    peserta sudah membatalkan. Peserta tanpa cancel_event tidak pernah batal,
+    jadi satu follower yang masih butuh hasil menahan flight tetap berjalan.
+    fired mencatat bahwa fn pernah melihat token ter-set (hasilnya mungkin batal).
+    """
+
+    def __init__(self):
+        self.events = []
+        self.fired = False
+
+    def add(self, event):
+        self.events.append(event)
+
+    def is_set(self) -> bool:
+        if bool(self.events) and all(e is not None and e.is_set() for e in self.events):
+            self.fired = True
+        return self.fired
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters", "cancel")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+        self.cancel = _AllCancelled()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel.fired
+
+
+class SingleFlight:
+    """
+    Gabungkan panggilan identik yang sedang berjalan bersamaan (seperti Go
+    singleflight): caller pertama untuk sebuah key menjalankan fn, caller lain
+    dengan key sama menunggu dan menerima hasil (atau exception) yang sama.
+    Tidak ada cache: begitu flight selesai, panggilan berikutnya menjalankan fn lagi.
+
+    Hasil dibagi ke semua caller, jadi jangan dimutasi.
+    Stats terdaftar di core.metrics sebagai "singleflight.<name>".
+    """
+
+    def __init__(self, name: str, enabled: bool = None):
+        self.name = name
+        self.enabled = SINGLE_FLIGHT_ENABLED if enabled is None else enabled
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._executions = 0
+        self._shared = 0
+        self._max_waiters = 0
+        self._retried = 0
+        metrics.register(f"singleflight.{name}", self.stats)
+
+    def do(self, key, fn, *args, cancel_event=None, **kwargs):
+        """
+        Return (result, shared). shared=True jika hasil berasal dari flight caller lain.
+
+        cancel_event (opsional): diteruskan ke fn sebagai token gabungan, yang
+        hanya ter-set jika semua caller flight ini sudah membatalkan.
+        """
+        if not self.enabled:
+            if cancel_event is not None:
+                kwargs["cancel_event"] = cancel_event
+            return fn(*args, **kwargs), False
+
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                call.cancel.add(cancel_event)
+                self._shared += 1
+                self._max_waiters = max(self._max_waiters, call.waiters)
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                call.cancel.add(cancel_event)
+                self._executions += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.cancelled and not (cancel_event is not None and cancel_event.is_set()):
+                # Flight dibatalkan peserta lain sebelum caller ini bergabung: hasilnya
+                # (kosong / exception batal) bukan jawaban untuk caller yang masih menunggu
+                with self._lock:
+                    self._retried += 1
+                return self.do(key, fn, *args, cancel_event=cancel_event, **kwargs)
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            if cancel_event is not None:
+                kwargs["cancel_event"] = call.cancel
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result, False
+
+    def stats(self) -> dict:
+        with self._lock:
+            calls = self._executions + self._shared
+            return {
+                "enabled": self.enabled,
+                "calls": calls,
+                "executions": self._executions,
+                "coalesced": self._shared,
+                "coalescedRatio": round(self._shared / calls, 4) if calls else 0.0,
+                "inFlight": len(self._calls),
+                "maxWaiters": self._max_waiters,
+                "cancelledRetries": self._retried,
+            }
@@ -0,0 +1,186 @@
+# ai/core/spell.py
+"""
+Koreksi ejaan token query (SymSpell: symmetric delete) terhadap kosakata
+nama_clean katalog, sebelum query di-embed. "ayem gorng" -> "ayam goreng".
+
+Index dibangun offline oleh preprocess/build_spell_index.py:
+  words.npy    : bytes [n] token kosakata (UTF-8, fixed width)
+  freqs.npy    : int32 [n] jumlah kemunculan token di nama_clean
+  del_keys.npy : uint64 [m] hash setiap delete-variant, urut
+  del_ptr.npy  : int64 [m+1] CSR: del_ptr[j]:del_ptr[j+1] -> del_ids
+  del_ids.npy  : int32 word id pemilik delete-variant tersebut
+  meta.json    : max_distance, prefix_length, jumlah kata, catalog_fingerprint, created_at
+Semua .npy dibuka memory-mapped. Index hanya dipakai untuk bundle katalog sumbernya
+(kosakata katalog lain membuat koreksi menunjuk makanan yang tidak ada).
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from functools import lru_cache
+from itertools import combinations
+from pathlib import Path
+
+import numpy as np
+
+from . import metrics
+from .text_utils import normalize_query
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+SPELL_INDEX_DIR = Path(os.environ.get("SPELL_INDEX_DIR", BASE_DIR / "data" / "spell_index"))
+SPELL_CORRECTION_ENABLED = os.environ.get("SPELL_CORRECTION", "1") == "1"
+# Token lebih pendek dari ini tidak dikoreksi ("es", "teh" terlalu ambigu)
+SPELL_MIN_TOKEN_LEN = int(os.environ.get("SPELL_MIN_TOKEN_LEN", "4"))
+# Jarak edit 2 hanya untuk token sepanjang ini; token lebih pendek maksimal 1 huruf salah
+# (dengan jarak 2, "banyak" -> "minyak", "nasgor" -> "nastar")
+SPELL_LONG_TOKEN_LEN = int(os.environ.get("SPELL_LONG_TOKEN_LEN", "9"))
+
+
+def term_hash(term: str) -> int:
+    """Hash 64-bit stabil antar proses (hash() Python di-salt per proses)."""
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def delete_variants(term: str, max_distance: int, prefix_length: int) -> set:
+    """term (dipotong ke prefix_length) + semua varian dengan <= max_distance huruf dihapus."""
+    term = term[:prefix_length]
+    out = {term}
+    for d in range(1, min(max_distance, len(term) - 1) + 1):
+        for drop in combinations(range(len(term)), d):
+            out.add("".join(ch for i, ch in enumerate(term) if i not in drop))
+    return out
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """Damerau-Levenshtein (optimal string alignment); > max_distance -> max_distance + 1."""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    prev2 = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if prev2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > max_distance:
+            return max_distance + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+class SpellIndex:
+    def __init__(self, index_dir=SPELL_INDEX_DIR, min_token_len: int = SPELL_MIN_TOKEN_LEN):
+        index_dir = Path(index_dir)
+        with open(index_dir / "meta.json", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.max_distance = int(self.meta["max_distance"])
+        self.prefix_length = int(self.meta["prefix_length"])
+        self.min_token_len = min_token_len
+
+        self.words = np.load(index_dir / "words.npy", mmap_mode="r")
+        self.freqs = np.load(index_dir / "freqs.npy", mmap_mode="r")
+        self.del_keys = np.load(index_dir / "del_keys.npy", mmap_mode="r")
+        self.del_ptr = np.load(index_dir / "del_ptr.npy", mmap_mode="r")
+        self.del_ids = np.load(index_dir / "del_ids.npy", mmap_mode="r")
+        self.vocab = {w.decode("utf-8") for w in self.words}
+
+        self.tokens = 0
+        self.corrections = 0
+        self._lookup_s = 0.0
+        # Koreksi per token di-cache: kosakata query user sangat berulang
+        self._correct_token = lru_cache(maxsize=50_000)(self._lookup)
+
+    def __len__(self):
+        return len(self.words)
+
+    def _candidates(self, token: str, max_distance: int):
+        keys = np.array([term_hash(v) for v in delete_variants(token, max_distance, self.prefix_length)],
+                        dtype=np.uint64)
+        # Satu searchsorted untuk semua varian
+        pos = np.minimum(np.searchsorted(self.del_keys, keys), len(self.del_keys) - 1)
+        ids = set()
+        for j in pos[self.del_keys[pos] == keys]:
+            ids.update(self.del_ids[self.del_ptr[j]:self.del_ptr[j + 1]].tolist())
+        return ids
+
+    def _lookup(self, token: str):
+        """Kata kosakata terdekat (jarak terkecil, lalu frekuensi terbesar), atau None."""
+        max_distance = self.max_distance if len(token) >= SPELL_LONG_TOKEN_LEN else min(1, self.max_distance)
+        best, best_key = None, None
+        for wid in self._candidates(token, max_distance):
+            word = self.words[wid].decode("utf-8")
+            dist = edit_distance(token, word, max_distance)
+            if dist > max_distance:
+                continue
+            key = (dist, -int(self.freqs[wid]))
+            if best_key is None or key < best_key:
+                best, best_key = word, key
+        return best
+
+    def correct_token(self, token: str) -> str:
+        if len(token) < self.min_token_len or token in self.vocab or not token.isalpha():
+            return token
+        return self._correct_token(token) or token
+
+    def correct(self, text: str) -> str:
+        """Koreksi setiap token teks (sudah dinormalisasi). Teks tanpa koreksi dikembalikan apa adanya."""
+        t0 = time.perf_counter()
+        tokens = normalize_query(text).split()
+        fixed = [self.correct_token(t) for t in tokens]
+        changed = sum(a != b for a, b in zip(tokens, fixed))
+        self._lookup_s += time.perf_counter() - t0
+        self.tokens += len(tokens)
+        self.corrections += changed
+        return " ".join(fixed) if changed else text
+
+    def stats(self) -> dict:
+        return {
+            "words": len(self),
+            "tokens": self.tokens,
+            "corrections": self.corrections,
+            "correctionRate": round(self.corrections / self.tokens, 4) if self.tokens else 0.0,
+            "avgUsPerToken": round(self._lookup_s / self.tokens * 1e6, 2) if self.tokens else 0.0,
+            "cache": self._correct_token.cache_info()._asdict(),
+        }
+
+
+_index = None
+_index_lock = threading.Lock()
+_index_loaded = False
+
+
+def get_spell_index():
+    """Singleton SpellIndex; None jika dimatikan atau index belum di-build."""
+    global _index, _index_loaded
+    if not _index_loaded:
+        with _index_lock:
+            if not _index_loaded:
+                if SPELL_CORRECTION_ENABLED and (SPELL_INDEX_DIR / "meta.json").exists():
+                    try:
+                        from .bundle import get_bundle_manager
+
+                        index = SpellIndex(SPELL_INDEX_DIR)
+                        bundle = get_bundle_manager().active_bundle()
+                        if bundle.matches_artifact(index.meta, with_index=False):
+                            _index = index
+                            metrics.register("spell", _index.stats)
+                            print(f"  ✅ Spell index loaded ({len(_index)} kata)")
+                        else:
+                            print(f"  ⚠️ Spell index bukan dari katalog {bundle.version}, koreksi ejaan dimatikan. "
+                                  "Jalankan ulang preprocess/build_spell_index.py")
+                    except Exception as e:
+                        print(f"  ⚠️ Spell index gagal di-load: {e}")
+                _index_loaded = True
+    return _index
+
+
+def reset_spell_index(*_):
+    """Buang index lama (callback bundle swap); di-load ulang dan dicek terhadap katalog baru."""
+    global _index, _index_loaded
+    with _index_lock:
+        _index = None
+        _index_loaded = False
@@ -0,0 +1,71 @@
+# ai/core/startup_profiler.py
+
+import importlib
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Titik nol kira-kira = saat proses mulai import app
+_T0 = time.perf_counter()
+_lock = threading.Lock()
+_steps = []
+
+
+@contextmanager
+def profile_step(name: str, kind: str = "init"):
+    """
+    Catat durasi satu langkah startup (import / init).
+    Contoh:
+        with profile_step("load FAISS index"):
+            index = faiss.read_index(...)
+    """
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except Exception as e:
+        error = str(e)
+        raise
+    finally:
+        end = time.perf_counter()
+        with _lock:
+            _steps.append({
+                "name": name,
+                "kind": kind,
+                "thread": threading.current_thread().name,
+                "startMs": round((start - _T0) * 1000, 1),
+                "durationMs": round((end - start) * 1000, 1),
+                **({"error": error} if error else {}),
+            })
+
+
+def profiled_import(module_name: str):
+    """
+    importlib.import_module + catat waktunya. Hanya import pertama yang dicatat;
+    modul yang sudah ada di sys.modules langsung dikembalikan (_steps tidak tumbuh).
+    """
+    module = sys.modules.get(module_name)
+    if module is not None:
+        return module
+    with profile_step(f"import {module_name}", kind="import"):
+        return importlib.import_module(module_name)
+
+
+def report() -> dict:
+    with _lock:
+        steps = list(_steps)
+    return {
+        "uptimeMs": round((time.perf_counter() - _T0) * 1000, 1),
+        "importMs": round(sum(s["durationMs"] for s in steps if s["kind"] == "import"), 1),
+        "initMs": round(sum(s["durationMs"] for s in steps if s["kind"] == "init"), 1),
+        "steps": steps,
+    }
+
+
+def print_report():
+    data = report()
+    print("⏱️ Startup profile:")
+    for s in sorted(data["steps"], key=lambda s: s["startMs"]):
+        print(f"   {s['kind']:<6} {s['durationMs']:>9.1f} ms  {s['name']}")
+    print(f"   total import {data['importMs']} ms | init {data['initMs']} ms")
@@ -0,0 +1,167 @@
+# ai/core/substitution.py
+
+import json
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from .startup_profiler import profile_step, profiled_import
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+KNN_GRAPH_DIR = Path(os.environ.get("KNN_GRAPH_DIR", BASE_DIR / "data" / "knn_graph"))
+CATALOG_PATH = BASE_DIR / "data" / "data pangan bersih.parquet"
+
+# Nama nutrisi yang diterima di filter -> kolom katalog
+NUTRIENT_ALIASES = {
+    "energi": "Energi", "energy": "Energi", "calories": "Energi", "kalori": "Energi",
+    "protein": "Protein",
+    "lemak": "Lemak Total", "fat": "Lemak Total", "lemak total": "Lemak Total",
+    "karbohidrat": "Karbohidrat", "carbs": "Karbohidrat", "karbo": "Karbohidrat",
+    "gula": "Gula", "sugar": "Gula",
+    "serat": "Serat", "fiber": "Serat",
+    "natrium": "Natrium", "sodium": "Natrium", "garam": "Natrium",
+    "kolesterol": "Kolesterol", "cholesterol": "Kolesterol",
+    "lemak jenuh": "Lemak Jenuh", "saturated fat": "Lemak Jenuh",
+}
+
+
+def resolve_nutrient(name: str) -> str:
+    """Alias nutrisi (sugar, fat, ...) -> nama kolom katalog; nama kolom dikembalikan apa adanya."""
+    key = str(name).strip()
+    return NUTRIENT_ALIASES.get(key.lower(), key)
+
+
+SUMMARY_COLUMNS = ["Energi", "Protein", "Lemak Total", "Karbohidrat", "Gula", "Serat", "Natrium"]
+
+
+class SubstitutionGraph:
+    """
+    kNN graph prekomputasi (lihat preprocess/build_knn_graph.py) + matriks nutrisi.
+
+    File di KNN_GRAPH_DIR (memory-mapped):
+      indptr.npy  : int64   [n+1]
+      indices.npy : int32   [edges]  food_id tetangga
+      sims.npy    : float16 [edges]  cosine similarity
+      meta.json   : n, neighbors, index_ntotal, catalog_version, catalog_fingerprint, created_at
+
+    neighbors(food_id) hanya slice indices[indptr[i]:indptr[i+1]], tanpa model.
+    """
+
+    def __init__(self, graph_dir=KNN_GRAPH_DIR, catalog_path=CATALOG_PATH):
+        graph_dir = Path(graph_dir)
+        with open(graph_dir / "meta.json", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.indptr = np.load(graph_dir / "indptr.npy", mmap_mode="r")
+        self.indices = np.load(graph_dir / "indices.npy", mmap_mode="r")
+        self.sims = np.load(graph_dir / "sims.npy", mmap_mode="r")
+        self.n = len(self.indptr) - 1
+
+        pd = profiled_import("pandas")
+        with profile_step("SubstitutionGraph load nutrients"):
+            df = pd.read_parquet(catalog_path)
+        if len(df) != self.n:
+            raise ValueError(
+                f"kNN graph ({self.n} item) tidak cocok dengan katalog ({len(df)} item), "
+                "jalankan ulang preprocess/build_knn_graph.py"
+            )
+        self.names = df["Nama Bahan Makanan"].astype(str).to_numpy()
+        self.state = df["Mentah/Olahan"].astype(str).to_numpy() if "Mentah/Olahan" in df.columns else None
+        numeric = df.select_dtypes("number")
+        self.columns = list(numeric.columns)
+        self._col = {c: j for j, c in enumerate(self.columns)}
+        self.nutrients = np.nan_to_num(numeric.to_numpy(dtype="float32"))
+
+    def neighbors(self, food_id: int):
+        """(ids, sims) tetangga food_id, urut similarity menurun."""
+        if not 0 <= food_id < self.n:
+            raise KeyError(food_id)
+        start, end = self.indptr[food_id], self.indptr[food_id + 1]
+        return np.asarray(self.indices[start:end]), np.asarray(self.sims[start:end], dtype="float32")
+
+    def substitutes(self, food_id: int, lower=(), higher=(), k: int = 10, min_similarity: float = 0.0,
+                    min_delta_pct: float = 0.0) -> dict:
+        """
+        Tetangga food_id yang nutrisinya lebih rendah (lower) / lebih tinggi (higher)
+        dari makanan asal. min_delta_pct: selisih relatif minimum (0.1 = 10%).
+        """
+        lower = [resolve_nutrient(c) for c in lower or []]
+        higher = [resolve_nutrient(c) for c in higher or []]
+        unknown = [c for c in lower + higher if c not in self._col]
+        if unknown:
+            raise ValueError(f"Nutrisi tidak dikenal: {unknown}. Pilihan: {self.columns}")
+
+        ids, sims = self.neighbors(food_id)
+        source = self.nutrients[food_id]
+        cand = self.nutrients[ids]
+        keep = sims >= min_similarity
+
+        for col in lower:
+            j = self._col[col]
+            keep &= cand[:, j] < source[j] * (1.0 - min_delta_pct)
+        for col in higher:
+            j = self._col[col]
+            if source[j] > 0:
+                keep &= cand[:, j] > source[j] * (1.0 + min_delta_pct)
+            else:
+                keep &= cand[:, j] > 0
+
+        ids, sims, cand = ids[keep][:k], sims[keep][:k], cand[keep][:k]
+        delta_cols = list(dict.fromkeys(lower + higher + [c for c in SUMMARY_COLUMNS if c in self._col]))
+
+        def summary(values):
+            return {c: round(float(values[self._col[c]]), 2) for c in delta_cols}
+
+        return {
+            "food": {"foodId": int(food_id), "name": self.names[food_id], "nutrients": summary(source)},
+            "filters": {"lower": lower, "higher": higher, "minSimilarity": min_similarity, "minDeltaPct": min_delta_pct},
+            "substitutes": [
+                {
+                    "foodId": int(i),
+                    "name": self.names[i],
+                    "similarity": round(float(s), 4),
+                    **({"state": self.state[i]} if self.state is not None else {}),
+                    "nutrients": summary(v),
+                    "delta": {c: round(float(v[self._col[c]] - source[self._col[c]]), 2) for c in delta_cols},
+                }
+                for i, s, v in zip(ids, sims, cand)
+            ],
+        }
+
+
+_graph = None
+_graph_lock = threading.Lock()
+
+
+def get_substitution_graph():
+    """Singleton graph; FileNotFoundError jika belum di-build."""
+    global _graph
+    if _graph is None:
+        with _graph_lock:
+            if _graph is None:
+                if not (KNN_GRAPH_DIR / "meta.json").exists():
+                    raise FileNotFoundError(
+                        f"kNN graph belum dibuat di {KNN_GRAPH_DIR}. Jalankan 'preprocess/build_knn_graph.py'."
+                    )
+                from .bundle import get_bundle_manager
+
+                bundle = get_bundle_manager().active_bundle()
+                with profile_step("load kNN substitution graph"):
+                    graph = SubstitutionGraph(catalog_path=bundle.file("catalog"))
+                # food_id tetangga = baris katalog: graph dari katalog lain menunjuk makanan yang salah
+                if not bundle.matches_artifact(graph.meta):
+                    raise FileNotFoundError(
+                        f"kNN graph di {KNN_GRAPH_DIR} bukan dari katalog {bundle.version}. "
+                        "Jalankan ulang 'preprocess/build_knn_graph.py'."
+                    )
+                _graph = graph
+                print(f"✅ kNN substitution graph loaded ({_graph.n} items, {_graph.meta.get('edges')} edges)")
+    return _graph
+
+
+def reset_substitution_graph(*_):
+    """Buang graph lama (callback bundle swap); di-load ulang dan dicek terhadap katalog baru."""
+    global _graph
+    with _graph_lock:
+        _graph = None
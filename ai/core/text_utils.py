@@ -0,0 +1,17 @@
+# ai/core/text_utils.py
+
+import unicodedata
+
+# Sama dengan preprocess/clean_data.normalize_name, supaya query user dan
+# kolom nama_clean dinormalisasi dengan cara yang identik
+_STRIP_CHARS = [",", ".", "(", ")", ":", ";", "/", "\\", "-", "’", "'", '"']
+
+
+def normalize_query(text: str) -> str:
+    """Lowercase, NFKD, buang tanda baca, rapikan spasi."""
+    if not isinstance(text, str):
+        return ""
+    text = unicodedata.normalize("NFKD", text.lower().strip())
+    for ch in _STRIP_CHARS:
+        text = text.replace(ch, " ")
+    return " ".join(text.split())
@@ -0,0 +1,144 @@
+# ai/core/topology.py
+"""
+Topologi worker berbasis jumlah CPU yang benar-benar tersedia untuk proses
+(affinity + kuota cgroup v1/v2, bukan os.cpu_count() host).
+
+Tanpa pengaturan, setiap worker gunicorn menjalankan torch dengan intra-op
+thread = jumlah core host; dengan -w 4 semua worker saling berebut core.
+WORKER_TOPOLOGY memilih pembagian:
+  off        : tidak diubah (WEB_CONCURRENCY + default torch), default
+  latency    : 1 worker, semua CPU untuk intra-op thread (p50 per request terendah)
+  throughput : banyak worker kecil, TOPOLOGY_THREADS_PER_WORKER thread masing-masing
+  manual     : TOPOLOGY_WORKERS x TOPOLOGY_THREADS (untuk benchmark matrix)
+TOPOLOGY_PIN=1 mem-pin setiap worker ke core-nya sendiri (os.sched_setaffinity).
+"""
+
+import math
+import os
+import sys
+
+WORKER_TOPOLOGY = os.environ.get("WORKER_TOPOLOGY", "off").lower()
+TOPOLOGY_THREADS_PER_WORKER = int(os.environ.get("TOPOLOGY_THREADS_PER_WORKER", "2"))
+# Setiap worker memuat model sendiri (~1-2 GB), jadi jumlah worker tetap dibatasi
+TOPOLOGY_MAX_WORKERS = int(os.environ.get("TOPOLOGY_MAX_WORKERS", "4"))
+TOPOLOGY_PIN = os.environ.get("TOPOLOGY_PIN", "0") == "1"
+
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+
+def _read(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def cgroup_cpu_limit():
+    """Kuota CPU cgroup (bisa pecahan), None jika tidak dibatasi."""
+    # cgroup v2: "max 100000" atau "200000 100000"
+    cpu_max = _read("/sys/fs/cgroup/cpu.max")
+    if cpu_max:
+        quota, _, period = cpu_max.partition(" ")
+        if quota != "max" and period:
+            return int(quota) / int(period)
+        return None
+    # cgroup v1
+    quota = _read("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") or _read("/sys/fs/cgroup/cpu,cpuacct/cpu.cfs_quota_us")
+    period = _read("/sys/fs/cgroup/cpu/cpu.cfs_period_us") or _read("/sys/fs/cgroup/cpu,cpuacct/cpu.cfs_period_us")
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+    return None
+
+
+def allowed_cpus() -> list:
+    """ID core yang boleh dipakai proses ini (affinity), urut."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def available_cpus() -> int:
+    """min(affinity, kuota cgroup dibulatkan ke atas), minimal 1."""
+    n = len(allowed_cpus())
+    quota = cgroup_cpu_limit()
+    if quota is not None:
+        n = min(n, max(1, math.ceil(quota)))
+    return max(1, n)
+
+
+def plan(mode: str = None, cpus: int = None) -> dict:
+    """
+    Return {"mode", "cpus", "workers", "threads", "cpusets"}; None untuk mode off.
+    cpusets[i] = core untuk worker ke-i (dipakai jika TOPOLOGY_PIN=1).
+    """
+    mode = (mode or WORKER_TOPOLOGY).lower()
+    if mode == "off":
+        return None
+    cpus = cpus or available_cpus()
+    cores = allowed_cpus()[:cpus]
+
+    if mode == "latency":
+        workers, threads = 1, cpus
+    elif mode == "throughput":
+        threads = max(1, min(TOPOLOGY_THREADS_PER_WORKER, cpus))
+        workers = max(1, min(TOPOLOGY_MAX_WORKERS, cpus // threads))
+    elif mode == "manual":
+        workers = int(os.environ.get("TOPOLOGY_WORKERS", "1"))
+        threads = int(os.environ.get("TOPOLOGY_THREADS", str(max(1, cpus // workers))))
+    else:
+        raise ValueError(f"WORKER_TOPOLOGY tidak dikenal: {mode!r} (off/latency/throughput/manual)")
+
+    # Worker i mendapat `threads` core berurutan; jika worker x thread > cpus, cpuset berputar
+    cpusets = [[cores[(i * threads + j) % len(cores)] for j in range(min(threads, len(cores)))] for i in range(workers)]
+    return {"mode": mode, "cpus": cpus, "workers": workers, "threads": threads, "cpusets": cpusets}
+
+
+def set_thread_env(threads: int):
+    """Set OMP/MKL/... sebelum torch/faiss/numpy di-import (dipanggil di post_fork)."""
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
+    # Tokenizer HF punya thread pool sendiri; di worker multi-proses lebih baik mati
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+
+def configure_threads():
+    """
+    Terapkan jumlah thread ke library yang sudah di-import (torch, faiss).
+    Dipanggil setelah model dimuat; no-op jika topologi off dan OMP_NUM_THREADS tidak di-set.
+    """
+    threads = os.environ.get("OMP_NUM_THREADS")
+    if not threads:
+        return None
+    threads = int(threads)
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(threads)
+        # inter-op hanya bisa di-set sekali, sebelum ada kerja paralel
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            pass
+    faiss = sys.modules.get("faiss")
+    if faiss is not None and hasattr(faiss, "omp_set_num_threads"):
+        faiss.omp_set_num_threads(threads)
+    return threads
+
+
+def pin_worker(slot: int, topology: dict):
+    """Pin proses ini ke cpuset worker `slot` (Linux saja)."""
+    if not topology or not hasattr(os, "sched_setaffinity"):
+        return None
+    cpuset = topology["cpusets"][slot % len(topology["cpusets"])]
+    os.sched_setaffinity(0, cpuset)
+    return cpuset
+
+
+def describe(topology: dict = None) -> dict:
+    """Ringkasan untuk log / endpoint."""
+    info = {"availableCpus": available_cpus(), "cgroupQuota": cgroup_cpu_limit(), "affinity": allowed_cpus()}
+    if topology:
+        info.update({k: topology[k] for k in ("mode", "workers", "threads")})
+        if TOPOLOGY_PIN:
+            info["cpusets"] = topology["cpusets"]
+    return info
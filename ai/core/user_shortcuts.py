@@ -0,0 +1,182 @@
+# ai/core/user_shortcuts.py
+"""
+Shortcut per user: frasa yang pernah dikonfirmasi user -> food_id + porsi.
+User mencatat makanan yang sama hampir setiap hari; frasa yang sudah dikonfirmasi
+dijawab langsung tanpa parse / embed / search / Gemini (method "user_shortcut").
+
+Satu map JSON per user, jadi satu round trip backend per request berapa pun kandidatnya:
+  us:<userId>:map -> {"tempe goreng": {"food_id", "nama", "qty", "unit", "n", "ts", "catalog"}}
+Frasa = nama dari rule parser tanpa jumlah/satuan ("2 potong tempe goreng" -> "tempe goreng").
+Maksimal USER_SHORTCUT_MAX_PER_USER frasa; yang paling lama tidak dikonfirmasi dibuang.
+Backend sama dengan cache rekomendasi (memory per proses, atau redis dibagi antar worker).
+Entry dari versi katalog lain diabaikan (food_id = nomor baris katalog).
+"""
+
+import json
+import os
+import threading
+import time
+
+from . import metrics
+from .food_parser import rule_based_parse
+from .recommendation_cache import make_backend
+from .text_utils import normalize_query
+
+# "memory" (default), "redis" (REDIS_URL), atau "off"
+USER_SHORTCUTS_BACKEND = os.environ.get("USER_SHORTCUTS", "memory").strip().lower()
+USER_SHORTCUT_MAX_USERS = int(os.environ.get("USER_SHORTCUT_MAX_USERS", "20000"))
+USER_SHORTCUT_MAX_PER_USER = int(os.environ.get("USER_SHORTCUT_MAX_PER_USER", "50"))
+USER_SHORTCUT_TTL_DAYS = float(os.environ.get("USER_SHORTCUT_TTL_DAYS", "90"))
+# Berapa kali pasangan frasa -> food_id harus dikonfirmasi sebelum dipakai
+USER_SHORTCUT_MIN_CONFIRMS = int(os.environ.get("USER_SHORTCUT_MIN_CONFIRMS", "1"))
+
+
+def shortcut_phrase(text: str):
+    """
+    (frasa, qty, unit): frasa = nama makanan tanpa jumlah/satuan; qty/unit hanya
+    terisi jika input memang menyebut jumlah ("2 potong tempe goreng").
+    """
+    norm = normalize_query(text)
+    items, _ = rule_based_parse(text)
+    if len(items) == 1:
+        name = normalize_query(items[0]["name"])
+        if name and name != norm:
+            return name, items[0]["qty"], items[0]["unit"]
+    return norm, None, None
+
+
+class UserShortcuts:
+    def __init__(self, backend, namespace: str = "us", max_per_user: int = USER_SHORTCUT_MAX_PER_USER,
+                 ttl_s: int = int(USER_SHORTCUT_TTL_DAYS * 86400), min_confirms: int = USER_SHORTCUT_MIN_CONFIRMS):
+        self.backend = backend
+        self.namespace = namespace
+        self.max_per_user = max_per_user
+        self.ttl_s = ttl_s
+        self.min_confirms = min_confirms
+        self.lookups = 0
+        self.hits = 0
+        self.stale = 0
+        self.errors = 0
+        self.confirms = 0
+        self._lookup_s = 0.0
+
+    def _key(self, user_id) -> str:
+        return f"{self.namespace}:{user_id}:map"
+
+    def _load(self, user_id) -> dict:
+        raw = self.backend.get(self._key(user_id))
+        return json.loads(raw) if raw else {}
+
+    def lookup(self, user_id, texts: list, catalog_version: str) -> dict:
+        """
+        {index: shortcut} untuk teks yang pernah dikonfirmasi user.
+        shortcut = {"food_id", "nama", "quantity", "unit", "confirmations"}; jumlah dari
+        input menang atas porsi yang tersimpan. Error backend -> {} (jalur normal).
+        """
+        t0 = time.perf_counter()
+        try:
+            entries = self._load(user_id)
+        except Exception as e:
+            self.errors += 1
+            print(f"⚠️ User shortcut read error: {e}")
+            return {}
+
+        found = {}
+        for i, text in enumerate(texts):
+            if not entries:
+                break
+            phrase, qty, unit = shortcut_phrase(text)
+            entry = entries.get(phrase)
+            if entry is None or entry["n"] < self.min_confirms:
+                continue
+            if entry.get("catalog") != catalog_version:
+                self.stale += 1
+                continue
+            found[i] = {
+                "food_id": entry["food_id"],
+                "nama": entry["nama"],
+                "quantity": qty if qty is not None else entry["qty"],
+                "unit": unit if qty is not None else entry["unit"],
+                "confirmations": entry["n"],
+            }
+
+        self.lookups += len(texts)
+        self.hits += len(found)
+        self._lookup_s += time.perf_counter() - t0
+        metrics.incr("user_shortcuts.hit", len(found))
+        metrics.incr("user_shortcuts.miss", len(texts) - len(found))
+        return found
+
+    def confirm(self, user_id, text: str, food_id: int, nama: str, catalog_version: str,
+                quantity=None, unit=None) -> dict:
+        """
+        Simpan pilihan user untuk frasa ini. Konfirmasi food_id yang sama menaikkan n;
+        food_id lain menggantikan entry. Read-modify-write tanpa lock antar worker:
+        konfirmasi bersamaan untuk user yang sama -> yang terakhir menang.
+        """
+        phrase, parsed_qty, parsed_unit = shortcut_phrase(text)
+        if not phrase:
+            raise ValueError("text kosong")
+        entries = self._load(user_id)
+        prev = entries.get(phrase)
+        same = prev is not None and prev["food_id"] == food_id and prev.get("catalog") == catalog_version
+        entry = {
+            "food_id": int(food_id),
+            "nama": nama,
+            "qty": float(quantity if quantity is not None else parsed_qty if parsed_qty is not None else 1.0),
+            "unit": unit or parsed_unit or "porsi",
+            "n": prev["n"] + 1 if same else 1,
+            "ts": round(time.time(), 3),
+            "catalog": catalog_version,
+        }
+        entries[phrase] = entry
+        if len(entries) > self.max_per_user:
+            for old in sorted(entries, key=lambda p: entries[p]["ts"])[: len(entries) - self.max_per_user]:
+                del entries[old]
+        self.backend.set(self._key(user_id), json.dumps(entries, ensure_ascii=False), self.ttl_s)
+        self.confirms += 1
+        metrics.incr("user_shortcuts.confirm")
+        return {"phrase": phrase, **entry}
+
+    def forget(self, user_id, text: str = None) -> int:
+        """Hapus satu frasa (atau semua shortcut user jika text None). Return jumlah yang dihapus."""
+        entries = self._load(user_id)
+        if text is None:
+            removed = len(entries)
+            entries = {}
+        else:
+            removed = int(entries.pop(shortcut_phrase(text)[0], None) is not None)
+        if removed:
+            self.backend.set(self._key(user_id), json.dumps(entries, ensure_ascii=False), self.ttl_s)
+        return removed
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.backend).__name__,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hitRate": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+            "stale": self.stale,
+            "confirms": self.confirms,
+            "errors": self.errors,
+            "avgUsPerLookup": round(self._lookup_s / self.lookups * 1e6, 2) if self.lookups else 0.0,
+        }
+
+
+_shortcuts = None
+_shortcuts_lock = threading.Lock()
+_shortcuts_loaded = False
+
+
+def get_user_shortcuts():
+    """Singleton UserShortcuts; None jika USER_SHORTCUTS=off."""
+    global _shortcuts, _shortcuts_loaded
+    if not _shortcuts_loaded:
+        with _shortcuts_lock:
+            if not _shortcuts_loaded:
+                backend = make_backend(USER_SHORTCUTS_BACKEND, USER_SHORTCUT_MAX_USERS, label="User shortcuts")
+                if backend is not None:
+                    _shortcuts = UserShortcuts(backend)
+                    metrics.register("user_shortcuts", _shortcuts.stats)
+                _shortcuts_loaded = True
+    return _shortcuts
@@ -0,0 +1,91 @@
+# ai/gunicorn.conf.py
+#
+# Serving mode: gthread. Setiap worker punya banyak thread, sehingga request
+# yang menunggu Gemini / Supabase (I/O, GIL dilepas) tidak memblokir request
+# lain. Encode model tetap dibatasi lewat core/executors.py (EMBED_WORKERS).
+#
+#   gunicorn -c gunicorn.conf.py app:app
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core import topology  # noqa: E402
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '7860')}"
+
+# Satu worker = satu salinan model (~1-2 GB), jadi default 1 worker
+workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
+
+# WORKER_TOPOLOGY=latency|throughput|manual: jumlah worker + thread torch/OMP per
+# worker dihitung dari CPU yang tersedia (cgroup-aware), lihat core/topology.py
+_topology = topology.plan()
+if _topology:
+    workers = _topology["workers"]
+
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.environ.get("GUNICORN_THREADS", "32"))
+
+# Request dengan Gemini + retry bisa > 30 detik
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+
+# Jangan preload: thread loader model (FAST_START) tidak ikut ter-fork
+preload_app = False
+
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG") or None
+errorlog = "-"
+
+
+# MODEL_SERVER_SOCKET + MODEL_SERVER_SPAWN=1: master menjalankan model server
+# (core/model_server.py) sebagai sidecar; worker hanya client tipis, satu model per pod
+_model_server = None
+
+
+def on_starting(server):
+    global _model_server
+    if os.environ.get("MODEL_SERVER_SOCKET") and os.environ.get("MODEL_SERVER_SPAWN", "0") == "1":
+        import subprocess
+
+        _model_server = subprocess.Popen(
+            [sys.executable, "-m", "core.model_server"], cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+        server.log.info("Model server spawned (pid %s) on %s", _model_server.pid, os.environ["MODEL_SERVER_SOCKET"])
+
+
+def on_exit(server):
+    if _model_server is not None:
+        _model_server.terminate()
+        _model_server.wait(timeout=30)
+
+
+def pre_fork(server, worker):
+    # Slot topologi pertama yang tidak dipakai worker hidup (worker pengganti mewarisi slot yang kosong)
+    used = {getattr(w, "topology_slot", None) for w in server.WORKERS.values()}
+    worker.topology_slot = next(i for i in range(len(server.WORKERS) + 1) if i not in used)
+
+
+def post_fork(server, worker):
+    if not _topology:
+        return
+    # Sebelum app (dan torch/faiss) di-import di worker ini
+    topology.set_thread_env(_topology["threads"])
+    cpuset = topology.pin_worker(worker.topology_slot, _topology) if topology.TOPOLOGY_PIN else None
+    server.log.info(
+        "Worker %s slot %s: %s threads%s", worker.pid, worker.topology_slot, _topology["threads"],
+        f", pinned to CPU {cpuset}" if cpuset else "",
+    )
+
+
+def post_worker_init(worker):
+    # Worker me-reset handler sinyal sebelum load app; pasang lagi reload bundle katalog
+    # (SIGHUP ke worker: `pkill -HUP -P <pid master>`; SIGHUP ke master = restart semua worker)
+    from core.bundle import get_bundle_manager
+
+    get_bundle_manager().install_signal_handler()
+
+
+def when_ready(server):
+    server.log.info("Topology: %s", topology.describe(_topology))
@@ -0,0 +1,130 @@
+# ai/loadtest/fake_gemini.py
+"""
+Fake Gemini REST server untuk load test: latency dan error rate bisa diatur, tanpa kuota.
+
+Meniru endpoint generateContent v1beta yang dipakai google-generativeai dengan
+transport="rest". Jalankan, lalu set di service:
+    GEMINI_API_ENDPOINT=http://127.0.0.1:8089  GOOGLE_API_KEY=fake
+
+Usage:
+    python loadtest/fake_gemini.py [--port 8089] [--latency-ms 1500] [--jitter-ms 500] [--error-rate 0.05]
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def fake_answer(prompt: str):
+    """Jawaban JSON yang lolos validator masing-masing prompt di core/."""
+    numbered = re.findall(r'^\s*\d+\.\s+"(.*)"\s*$', prompt, flags=re.M)
+    if numbered:
+        # generate_food_candidates_batch
+        return [{"input": q, "candidates": [q, f"{q}, goreng", f"{q}, rebus"]} for q in numbered]
+
+    m = re.search(r'(?:User Input|Input user):\s*"(.*?)"', prompt, flags=re.S)
+    user = (m.group(1) if m else "makanan").strip() or "makanan"
+    items = [part.strip() for part in re.split(r",| dan ", user) if part.strip()] or [user]
+
+    if "JSON Array of Strings" in prompt:
+        # generate_food_candidates
+        return [user, f"{user}, goreng", f"{user}, rebus"]
+    if '"candidates"' in prompt:
+        # parse_food_with_candidates
+        return [{"name": it, "qty": 1, "unit": "porsi", "confidence": 0.9, "candidates": [it, f"{it}, goreng"]}
+                for it in items]
+    # parse_food_text
+    return [{"name": it, "qty": 1, "unit": "porsi", "confidence": 0.9} for it in items]
+
+
+class Handler(BaseHTTPRequestHandler):
+    latency_ms = 1500.0
+    jitter_ms = 500.0
+    # Porsi request yang dijawab error (kode diambil acak dari error_codes), setelah latency
+    error_rate = 0.0
+    error_codes = (429, 500, 503)
+    calls = 0
+    errors = 0
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, code, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.startswith("/stats"):
+            self._send(200, {"calls": Handler.calls, "errors": Handler.errors})
+        else:
+            self._send(404, {"error": {"code": 404, "message": "not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if ":generateContent" not in self.path:
+            self._send(404, {"error": {"code": 404, "message": f"unsupported path {self.path}"}})
+            return
+
+        with Handler.lock:
+            Handler.calls += 1
+        delay = max(0.0, Handler.latency_ms + random.uniform(-Handler.jitter_ms, Handler.jitter_ms))
+        time.sleep(delay / 1000.0)
+
+        if Handler.error_rate and random.random() < Handler.error_rate:
+            code = random.choice(Handler.error_codes)
+            with Handler.lock:
+                Handler.errors += 1
+            status = {429: "RESOURCE_EXHAUSTED", 503: "UNAVAILABLE"}.get(code, "INTERNAL")
+            self._send(code, {"error": {"code": code, "message": "fake error", "status": status}})
+            return
+
+        prompt = " ".join(
+            part.get("text", "")
+            for content in request.get("contents", [])
+            for part in content.get("parts", [])
+        )
+        self._send(200, {
+            "candidates": [{
+                "content": {"role": "model", "parts": [{"text": json.dumps(fake_answer(prompt))}]},
+                "finishReason": "STOP",
+                "index": 0,
+            }],
+            "usageMetadata": {"promptTokenCount": len(prompt) // 4, "candidatesTokenCount": 20},
+        })
+
+
+def serve(port: int, latency_ms: float, jitter_ms: float, error_rate: float = 0.0):
+    Handler.latency_ms = latency_ms
+    Handler.jitter_ms = jitter_ms
+    Handler.error_rate = error_rate
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8089)
+    ap.add_argument("--latency-ms", type=float, default=1500)
+    ap.add_argument("--jitter-ms", type=float, default=500)
+    ap.add_argument("--error-rate", type=float, default=0.0, help="porsi request yang dijawab 429/500/503")
+    args = ap.parse_args()
+
+    server = serve(args.port, args.latency_ms, args.jitter_ms, args.error_rate)
+    print(f"🤖 Fake Gemini on http://127.0.0.1:{args.port} (latency {args.latency_ms}±{args.jitter_ms} ms, "
+          f"error rate {args.error_rate:.0%})")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
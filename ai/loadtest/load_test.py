@@ -0,0 +1,192 @@
+# ai/loadtest/load_test.py
+"""
+Load test: N user konkuren terhadap service yang dijalankan dengan gunicorn,
+Gemini diganti loadtest/fake_gemini.py (latency bisa diatur).
+
+Membandingkan worker sync (1 request per worker) dengan gthread
+(lihat gunicorn.conf.py) pada endpoint yang menunggu Gemini.
+
+Usage (dari folder ai/, butuh environment lengkap: model + index):
+    python loadtest/load_test.py --users 50 --duration 60 --latency-ms 1500 --modes sync gthread
+Tanpa model embedding (stub, bundle dibuat dari katalog asli; lihat stub_model.py):
+    python loadtest/load_test.py --stub-model --users 50 --duration 60
+"""
+
+import argparse
+import os
+import random
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import requests
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from fake_gemini import Handler as FakeGeminiHandler, serve as serve_fake_gemini  # noqa: E402
+
+# Input yang tidak lolos rule parser / direct search -> jalur Gemini
+LLM_TEXTS = [
+    "seporsi soto betawi kuah santan sama emping",
+    "nasi liwet komplit ala sunda",
+    "es kopi susu gula aren literan",
+    "ayam geprek level 5 + nasi",
+    "martabak manis keju coklat setengah loyang",
+    "seblak ceker pedas",
+    "mie gacoan level 3",
+    "cilok bumbu kacang sebungkus",
+]
+
+MODES = {
+    "sync": ["--worker-class", "sync", "--threads", "1"],
+    "gthread": [],  # default gunicorn.conf.py
+}
+
+
+def wait_ready(base_url: str, timeout: float = 600, proc=None):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc is not None and proc.poll() is not None:
+            return False  # service mati saat boot
+        try:
+            r = requests.get(f"{base_url}/health", timeout=2)
+            if r.ok and r.json().get("modelReady"):
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(1)
+    return False
+
+
+def start_service(mode: str, port: int, gemini_url: str, workers: int, extra_env: dict = None, log_file=None,
+                  stub_model: bool = False):
+    env = {
+        **os.environ,
+        "PORT": str(port),
+        "WEB_CONCURRENCY": str(workers),
+        "GEMINI_API_ENDPOINT": gemini_url,
+        "GOOGLE_API_KEY": os.environ.get("GOOGLE_API_KEY", "fake"),
+        "PRELOAD_MODELS": "1",
+        "FAST_START": "0",
+        **(extra_env or {}),
+    }
+    target = ["--pythonpath", "loadtest", "stub_app:app"] if stub_model else ["app:app"]
+    cmd = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", *MODES[mode], *target]
+    out = log_file or subprocess.DEVNULL
+    return subprocess.Popen(cmd, cwd=BASE_DIR, env=env, stdout=out, stderr=out)
+
+
+def run_users(url: str, users: int, duration: float, timeout: float, make_body=None):
+    """make_body(rng) -> JSON body; default teks yang masuk jalur Gemini (LLM_TEXTS)."""
+    make_body = make_body or (lambda rng: {"text": rng.choice(LLM_TEXTS)})
+    latencies, errors = [], []
+    lock = threading.Lock()
+    stop_at = time.time() + duration
+
+    def user_loop(seed):
+        rng = random.Random(seed)
+        session = requests.Session()
+        while time.time() < stop_at:
+            t0 = time.perf_counter()
+            try:
+                r = session.post(url, json=make_body(rng), timeout=timeout)
+                ok = r.status_code == 200
+                err = None if ok else f"HTTP {r.status_code}"
+            except requests.RequestException as e:
+                ok, err = False, type(e).__name__
+            elapsed = (time.perf_counter() - t0) * 1000
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors.append(err)
+
+    threads = [threading.Thread(target=user_loop, args=(i,), daemon=True) for i in range(users)]
+    t_start = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.time() - t_start
+
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] if latencies else float("nan")
+
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": len(latencies) / wall,
+        "p50": statistics.median(latencies) if latencies else float("nan"),
+        "p95": pct(0.95),
+        "p99": pct(0.99),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--users", type=int, default=50)
+    ap.add_argument("--duration", type=float, default=60)
+    ap.add_argument("--latency-ms", type=float, default=1500, help="Latency fake Gemini")
+    ap.add_argument("--jitter-ms", type=float, default=300)
+    ap.add_argument("--endpoint", default="/api/parse-food")
+    ap.add_argument("--modes", nargs="+", default=["sync", "gthread"], choices=list(MODES))
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--port", type=int, default=7861)
+    ap.add_argument("--gemini-port", type=int, default=8089)
+    ap.add_argument("--timeout", type=float, default=120)
+    ap.add_argument("--stub-model", action="store_true", help="embedding model stub + bundle sementara")
+    args = ap.parse_args()
+
+    extra_env = {}
+    if args.stub_model:
+        from stub_model import build_bundle
+
+        extra_env["BUNDLE_DIR"] = str(build_bundle(Path(tempfile.mkdtemp(prefix="nutrimori-stub-"))))
+
+    fake = serve_fake_gemini(args.gemini_port, args.latency_ms, args.jitter_ms)
+    threading.Thread(target=fake.serve_forever, daemon=True).start()
+    gemini_url = f"http://127.0.0.1:{args.gemini_port}"
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    rows = []
+    for mode in args.modes:
+        print(f"🚀 Starting service ({mode}, {args.workers} worker)...")
+        proc = start_service(mode, args.port, gemini_url, args.workers, extra_env=extra_env,
+                             stub_model=args.stub_model)
+        try:
+            if not wait_ready(base_url, proc=proc):
+                print(f"❌ Service ({mode}) tidak siap, dilewati")
+                continue
+            print(f"   {args.users} users x {args.duration:.0f}s -> {args.endpoint}")
+            calls_before = FakeGeminiHandler.calls
+            result = run_users(base_url + args.endpoint, args.users, args.duration, args.timeout)
+            # Input yang lolos direct search tidak memanggil Gemini; kolom ini = request yang benar-benar menunggu LLM
+            result["gemini"] = FakeGeminiHandler.calls - calls_before
+            rows.append((mode, result))
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait(timeout=60)
+
+    fake.shutdown()
+    model = ", stub model" if args.stub_model else ""
+    print(f"\nFake Gemini latency {args.latency_ms:.0f}±{args.jitter_ms:.0f} ms, {args.users} users, "
+          f"{args.workers} worker{model}")
+    print(f"{'mode':>8} | {'req':>6} | {'err':>5} | {'rps':>7} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8} | "
+          f"{'gemini':>6}")
+    for mode, r in rows:
+        print(
+            f"{mode:>8} | {r['requests']:>6} | {r['errors']:>5} | {r['rps']:7.2f} | "
+            f"{r['p50']:8.0f} | {r['p95']:8.0f} | {r['p99']:8.0f} | {r['gemini']:>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+# ai/loadtest/stub_app.py
+"""
+Entry WSGI service dengan embedding model stub (loadtest/stub_model.py):
+    gunicorn -c gunicorn.conf.py --pythonpath loadtest stub_app:app
+BUNDLE_DIR harus menunjuk bundle dari stub_model.build_bundle() (dimensi sama).
+"""
+
+import core.matcher
+from stub_model import STUB_MODEL_NAME, HashEmbeddingModel
+
+core.matcher.load_local_embedding_model = HashEmbeddingModel
+# Cek manifest bundle (model yang membuat embeddings) harus cocok dengan stub
+core.matcher.EMBEDDING_MODEL_NAME = STUB_MODEL_NAME
+
+from app import app  # noqa: E402,F401
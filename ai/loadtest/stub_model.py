@@ -0,0 +1,77 @@
+# ai/loadtest/stub_model.py
+"""
+Embedding model tiruan tanpa sentence-transformers/torch, dipakai load test,
+unit test (tests/conftest.py) dan microbenchmark (benchmarks/micro/conftest.py):
+vektor per token dari hash, embedding teks = jumlah vektor tokennya (teks yang
+berbagi kata tetap mirip, jadi direct search / threshold tetap bermakna).
+
+build_bundle() membuat bundle dari katalog asli (data/data pangan bersih.parquet)
+dengan embeddings stub lewat preprocess/build_bundle.py. Service dijalankan dengan
+loadtest/stub_app.py sebagai entry WSGI agar worker memakai model yang sama.
+
+Latency & RSS embedding TIDAK representatif (encode stub ~mikrodetik); angka load
+test dengan stub hanya mengukur jalur I/O (Gemini / Supabase) dan serving.
+"""
+
+import hashlib
+import subprocess
+import sys
+from pathlib import Path
+
+import faiss
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+CATALOG_PATH = BASE_DIR / "data" / "data pangan bersih.parquet"
+STUB_DIM = 64
+STUB_MODEL_NAME = "stub-hash-embedding"
+
+
+class HashEmbeddingModel:
+    """Pengganti SentenceTransformer.encode (deterministik, tanpa bobot model)."""
+
+    def __init__(self, dim: int = STUB_DIM):
+        self.dim = dim
+        self._cache = {}
+
+    def _token(self, token: str):
+        vec = self._cache.get(token)
+        if vec is None:
+            seed = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+            vec = self._cache[token] = np.random.default_rng(seed).standard_normal(self.dim).astype("float32")
+        return vec
+
+    def encode(self, texts, prompt_name=None, convert_to_numpy=True, **kwargs):
+        if isinstance(texts, str):
+            texts = [texts]
+        out = np.zeros((len(texts), self.dim), dtype="float32")
+        for i, text in enumerate(texts):
+            for token in str(text).lower().split():
+                out[i] += self._token(token)
+        return out
+
+
+def build_bundle(out_dir: Path, version: str = "v0001") -> Path:
+    """Bundle katalog asli + embeddings/index stub di out_dir (dipakai sebagai BUNDLE_DIR)."""
+    out_dir = Path(out_dir)
+    if (out_dir / version / "manifest.json").exists():
+        return out_dir
+    work = out_dir / "stub-src"
+    work.mkdir(parents=True, exist_ok=True)
+    df = pd.read_parquet(CATALOG_PATH)
+    emb = HashEmbeddingModel().encode(df["food_text"].astype(str).tolist())
+    np.save(work / "embeddings.npy", emb)
+    normed = emb.copy()
+    faiss.normalize_L2(normed)
+    index = faiss.IndexFlatIP(normed.shape[1])
+    index.add(normed)
+    faiss.write_index(index, str(work / "faiss.index"))
+    subprocess.run(
+        [sys.executable, str(BASE_DIR / "preprocess" / "build_bundle.py"),
+         "--catalog", str(CATALOG_PATH), "--embeddings", str(work / "embeddings.npy"),
+         "--index", str(work / "faiss.index"), "--model", STUB_MODEL_NAME,
+         "--version", version, "--out-dir", str(out_dir)],
+        check=True, capture_output=True,
+    )
+    return out_dir
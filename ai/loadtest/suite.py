@@ -0,0 +1,378 @@
+# ai/loadtest/suite.py
+"""
+Load test offline yang bisa diulang: service (gunicorn) + fake Gemini (latency +
+error rate) + opsional fake Supabase (RPC match_foods, pengganti pgvector), dengan
+traffic campuran /api/match-foods, /api/parse-food dan /api/daily-recommendation
+pada beberapa tingkat konkurensi (step).
+
+Per step dilaporkan: rps, latency p50/p90/p99/max (total dan per endpoint),
+error per jenis, RSS service (master + worker: awal / puncak / akhir), dan jumlah
+panggilan Gemini. --json menyimpan hasil dengan skema tetap; --compare baseline.json
+menampilkan selisih rps dan p99 per step terhadap run sebelumnya.
+
+Usage (dari folder ai/, butuh model embedding + katalog/index, tanpa jaringan):
+    python loadtest/suite.py --steps 1 4 16 32 --step-duration 30 --json runs/base.json
+    python loadtest/suite.py --vector-store supabase --gemini-error-rate 0.05 --compare runs/base.json
+Tanpa model embedding: --stub-model (lihat loadtest/stub_model.py).
+"""
+
+import argparse
+import json
+import random
+import signal
+import statistics
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+import psutil
+import requests
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(Path(__file__).resolve().parent))
+
+import fake_gemini  # noqa: E402
+from load_test import LLM_TEXTS, MODES, start_service, wait_ready  # noqa: E402
+
+LABELED_PATH = BASE_DIR / "benchmarks" / "data" / "labeled_queries.jsonl"
+SCHEMA_VERSION = 1
+
+# Input sehari-hari yang biasanya lolos direct search
+COMMON_TEXTS = [
+    "nasi putih", "tempe goreng", "tahu goreng", "telur dadar", "ayam goreng", "sayur bayam",
+    "ikan bandeng goreng", "teh manis", "pisang ambon", "mie goreng", "susu sapi", "kangkung tumis",
+]
+WEEKLY_ISSUES = [
+    ("Asupan gula melebihi batas harian", "Kurangi minuman manis"),
+    ("Asupan serat rendah", "Perbanyak sayur dan buah"),
+    ("Protein di bawah kebutuhan", "Tambah lauk tinggi protein"),
+    ("Natrium tinggi dari makanan olahan", "Kurangi makanan instan"),
+    ("Lemak jenuh tinggi", "Kurangi gorengan"),
+]
+AVOID = ["udang", "kacang", "susu", "daging sapi", "pedas"]
+LIKES = ["tempe", "tahu", "ayam", "ikan", "sayur", "buah"]
+ENDPOINTS = {
+    "match": "/api/match-foods",
+    "parse": "/api/parse-food",
+    "reco": "/api/daily-recommendation",
+}
+
+
+def load_queries():
+    if not LABELED_PATH.exists():
+        return list(COMMON_TEXTS)
+    with open(LABELED_PATH, encoding="utf-8") as f:
+        return [json.loads(line)["query"] for line in f if line.strip()]
+
+
+class Traffic:
+    """Body request per endpoint; deterministik untuk (seed, step, user)."""
+
+    def __init__(self, llm_share: float, users_pool: int):
+        self.queries = load_queries() + COMMON_TEXTS
+        self.llm_share = llm_share
+        self.users_pool = users_pool
+
+    def _text(self, rng):
+        return rng.choice(LLM_TEXTS) if rng.random() < self.llm_share else rng.choice(self.queries)
+
+    def _user(self, rng):
+        # Pool user terbatas: user yang sama muncul lagi (cache rekomendasi / shortcut ikut teruji)
+        return f"loadtest-{rng.randrange(self.users_pool)}"
+
+    def match(self, rng):
+        texts = [self._text(rng) for _ in range(rng.choice((1, 1, 2, 3)))]
+        return {"text": ", ".join(texts), "limit": 5, "userId": self._user(rng)}
+
+    def parse(self, rng):
+        return {"text": self._text(rng), "quantity": rng.choice((1, 1, 2, 0.5)), "unit": "porsi",
+                "userId": self._user(rng)}
+
+    def reco(self, rng):
+        issue, advice = rng.choice(WEEKLY_ISSUES)
+        return {
+            "userId": self._user(rng),
+            "weeklyAnalysis": {
+                "patterns": [{"type": "negative", "impact": "High", "message": issue}],
+                "recommendations": [advice],
+            },
+            "userPreferences": {
+                "budget": rng.choice((15000, 25000, 50000)),
+                "avoid": rng.sample(AVOID, rng.randint(0, 2)),
+                "likes": rng.sample(LIKES, rng.randint(0, 3)),
+            },
+            "topK": 5,
+        }
+
+
+def parse_mix(text: str) -> dict:
+    """"match=6,parse=3,reco=1" -> bobot per endpoint."""
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ENDPOINTS:
+            raise SystemExit(f"endpoint tidak dikenal di --mix: {name} (pilihan: {', '.join(ENDPOINTS)})")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def latency_summary(values: list) -> dict:
+    if not values:
+        return {"p50": None, "p90": None, "p99": None, "max": None, "mean": None}
+    values = sorted(values)
+
+    def pct(p):
+        return round(values[min(len(values) - 1, int(p * len(values)))], 1)
+
+    return {"p50": round(statistics.median(values), 1), "p90": pct(0.90), "p99": pct(0.99),
+            "max": round(values[-1], 1), "mean": round(statistics.mean(values), 1)}
+
+
+class RssSampler(threading.Thread):
+    """RSS proses service + semua child (worker gunicorn, model server) tiap interval."""
+
+    def __init__(self, pid: int, interval_s: float = 0.5):
+        super().__init__(daemon=True)
+        self.root = psutil.Process(pid)
+        self.interval_s = interval_s
+        self.samples = []
+        self._done = threading.Event()
+
+    def rss_mb(self) -> float:
+        total = 0
+        for proc in [self.root, *self.root.children(recursive=True)]:
+            try:
+                total += proc.memory_info().rss
+            except psutil.Error:
+                pass
+        return total / 1e6
+
+    def run(self):
+        while not self._done.is_set():
+            self.samples.append(self.rss_mb())
+            self._done.wait(self.interval_s)
+
+    def stop(self) -> dict:
+        self._done.set()
+        self.join()
+        self.samples.append(self.rss_mb())
+        return {"start": round(self.samples[0], 1), "peak": round(max(self.samples), 1),
+                "end": round(self.samples[-1], 1)}
+
+
+def run_step(base_url: str, users: int, duration: float, traffic: Traffic, mix: dict, seed: int,
+             timeout: float, think_ms: float):
+    names, weights = list(mix), list(mix.values())
+    latencies = defaultdict(list)
+    errors = defaultdict(Counter)
+    lock = threading.Lock()
+    stop_at = time.time() + duration
+
+    def user_loop(index):
+        rng = random.Random(f"{seed}:{users}:{index}")
+        session = requests.Session()
+        while time.time() < stop_at:
+            name = rng.choices(names, weights)[0]
+            body = getattr(traffic, name)(rng)
+            t0 = time.perf_counter()
+            try:
+                r = session.post(base_url + ENDPOINTS[name], json=body, timeout=timeout)
+                # parse-food: 404 = tidak ada match, jawaban valid
+                ok = r.status_code == 200 or (name == "parse" and r.status_code == 404)
+                err = None if ok else f"HTTP {r.status_code}"
+            except requests.RequestException as e:
+                err = type(e).__name__
+            elapsed = (time.perf_counter() - t0) * 1000
+            with lock:
+                if err is None:
+                    latencies[name].append(elapsed)
+                else:
+                    errors[name][err] += 1
+            if think_ms:
+                time.sleep(rng.expovariate(1000.0 / think_ms))
+
+    threads = [threading.Thread(target=user_loop, args=(i,), daemon=True) for i in range(users)]
+    t_start = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.time() - t_start
+
+    endpoints = {}
+    for name in names:
+        ok, failed = len(latencies[name]), sum(errors[name].values())
+        endpoints[name] = {"requests": ok, "errors": failed, "rps": round(ok / wall, 2),
+                           "latencyMs": latency_summary(latencies[name])}
+    all_ok = [v for name in names for v in latencies[name]]
+    error_kinds = Counter()
+    for name in names:
+        error_kinds.update(errors[name])
+    return {
+        "users": users,
+        "durationS": round(wall, 2),
+        "requests": len(all_ok),
+        "errors": sum(error_kinds.values()),
+        "errorKinds": dict(error_kinds),
+        "rps": round(len(all_ok) / wall, 2),
+        "latencyMs": latency_summary(all_ok),
+        "endpoints": endpoints,
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def fmt(value, spec):
+    return format(value, spec) if value is not None else format("-", ">" + spec.split(".")[0])
+
+
+def print_step(step: dict):
+    lat = step["latencyMs"]
+    print(f"{step['users']:>5} | {step['requests']:>6} | {step['errors']:>5} | {step['rps']:7.2f} | "
+          f"{fmt(lat['p50'], '8.0f')} | {fmt(lat['p90'], '8.0f')} | {fmt(lat['p99'], '8.0f')} | "
+          f"{fmt(lat['max'], '8.0f')} | {step['rssMb']['peak']:8.0f} | {step['geminiCalls']:>6}")
+    for name, ep in step["endpoints"].items():
+        lat = ep["latencyMs"]
+        print(f"{'':>5}   {name:<6} {ep['requests']:>6} ok {ep['errors']:>4} err {ep['rps']:7.2f} rps  "
+              f"p50 {fmt(lat['p50'], '.0f')}  p90 {fmt(lat['p90'], '.0f')}  p99 {fmt(lat['p99'], '.0f')} ms")
+    if step["errorKinds"]:
+        print(f"{'':>5}   errors: {step['errorKinds']}")
+
+
+def print_compare(result: dict, baseline: dict):
+    base_steps = {s["users"]: s for s in baseline.get("steps", [])}
+    print(f"\nVs baseline {baseline.get('git') or '?'} ({baseline.get('startedAt', '?')}):")
+    print(f"{'users':>5} | {'rps':>18} | {'p99 ms':>18} | {'peak RSS MB':>18}")
+    for step in result["steps"]:
+        base = base_steps.get(step["users"])
+        if base is None:
+            continue
+
+        def delta(new, old):
+            if new is None or old in (None, 0):
+                return f"{fmt(new, '.0f'):>8} (   -  )"
+            return f"{new:8.1f} ({(new - old) / old:+6.1%})"
+
+        print(f"{step['users']:>5} | {delta(step['rps'], base['rps']):>18} | "
+              f"{delta(step['latencyMs']['p99'], base['latencyMs']['p99']):>18} | "
+              f"{delta(step['rssMb']['peak'], base['rssMb']['peak']):>18}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Load test offline: fake Gemini (+ fake Supabase), traffic campuran")
+    ap.add_argument("--steps", type=int, nargs="+", default=[1, 4, 16, 32], help="jumlah user konkuren per step")
+    ap.add_argument("--step-duration", type=float, default=30)
+    ap.add_argument("--warmup", type=float, default=5, help="detik traffic sebelum step pertama (tidak dihitung)")
+    ap.add_argument("--mix", default="match=6,parse=3,reco=1", help="bobot endpoint")
+    ap.add_argument("--llm-share", type=float, default=0.2, help="porsi teks yang biasanya butuh Gemini")
+    ap.add_argument("--users-pool", type=int, default=200, help="jumlah userId berbeda")
+    ap.add_argument("--think-ms", type=float, default=0, help="rata-rata jeda antar request per user")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--mode", default="gthread", choices=list(MODES))
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--vector-store", default="local", choices=["local", "supabase"])
+    ap.add_argument("--gemini-latency-ms", type=float, default=1500)
+    ap.add_argument("--gemini-jitter-ms", type=float, default=300)
+    ap.add_argument("--gemini-error-rate", type=float, default=0.0)
+    ap.add_argument("--supabase-latency-ms", type=float, default=20)
+    ap.add_argument("--port", type=int, default=7862)
+    ap.add_argument("--gemini-port", type=int, default=8089)
+    ap.add_argument("--supabase-port", type=int, default=8090)
+    ap.add_argument("--timeout", type=float, default=120)
+    ap.add_argument("--stub-model", action="store_true", help="embedding model stub + bundle sementara")
+    ap.add_argument("--env", nargs="*", default=[], metavar="KEY=VALUE", help="env tambahan untuk service")
+    ap.add_argument("--service-log", type=Path, help="simpan stdout/stderr service ke file")
+    ap.add_argument("--json", type=Path, help="simpan hasil (skema tetap) ke file JSON")
+    ap.add_argument("--compare", type=Path, help="hasil JSON sebelumnya sebagai baseline")
+    args = ap.parse_args()
+
+    mix = parse_mix(args.mix)
+    gemini = fake_gemini.serve(args.gemini_port, args.gemini_latency_ms, args.gemini_jitter_ms,
+                               args.gemini_error_rate)
+    threading.Thread(target=gemini.serve_forever, daemon=True).start()
+    extra_env = {
+        # Suite tidak boleh menulis artefak di data/
+        "LLM_TRACE": "0",
+        **dict(item.split("=", 1) for item in args.env),
+    }
+    if args.stub_model:
+        from stub_model import build_bundle
+
+        # Di-set di proses ini juga: fake Supabase membaca bundle yang sama
+        os.environ["BUNDLE_DIR"] = str(build_bundle(Path(tempfile.mkdtemp(prefix="nutrimori-stub-"))))
+
+    supabase = None
+    if args.vector_store == "supabase":
+        import fake_supabase
+
+        supabase = fake_supabase.serve(args.supabase_port, args.supabase_latency_ms)
+        threading.Thread(target=supabase.serve_forever, daemon=True).start()
+        extra_env.update({"USE_SUPABASE": "1", "SUPABASE_URL": f"http://127.0.0.1:{args.supabase_port}",
+                          "SUPABASE_KEY": fake_supabase.FAKE_KEY})
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    log_file = open(args.service_log, "w") if args.service_log else None
+    print(f"🚀 Starting service ({args.mode}, {args.workers} worker, vector store {args.vector_store})...")
+    proc = start_service(args.mode, args.port, f"http://127.0.0.1:{args.gemini_port}", args.workers,
+                         extra_env=extra_env, log_file=log_file, stub_model=args.stub_model)
+    result = {
+        "suite": "nutrimori-loadtest",
+        "schema": SCHEMA_VERSION,
+        "startedAt": datetime.now(timezone.utc).isoformat(),
+        "git": git_commit(),
+        "params": {k: (str(v) if isinstance(v, Path) else v) for k, v in vars(args).items()
+                   if k not in ("json", "compare", "service_log")},
+        "steps": [],
+    }
+    traffic = Traffic(args.llm_share, args.users_pool)
+    try:
+        t0 = time.time()
+        if not wait_ready(base_url, proc=proc):
+            raise SystemExit("❌ Service tidak siap (lihat --service-log)")
+        result["readyS"] = round(time.time() - t0, 1)
+        print(f"   ready in {result['readyS']} s")
+        if args.warmup > 0:
+            run_step(base_url, min(args.steps), args.warmup, traffic, mix, args.seed - 1, args.timeout, args.think_ms)
+
+        print(f"\n{'users':>5} | {'req':>6} | {'err':>5} | {'rps':>7} | {'p50 ms':>8} | {'p90 ms':>8} | "
+              f"{'p99 ms':>8} | {'max ms':>8} | {'RSS MB':>8} | {'gemini':>6}")
+        for users in args.steps:
+            sampler = RssSampler(proc.pid)
+            sampler.start()
+            calls_before = fake_gemini.Handler.calls
+            step = run_step(base_url, users, args.step_duration, traffic, mix, args.seed, args.timeout, args.think_ms)
+            step["rssMb"] = sampler.stop()
+            step["geminiCalls"] = fake_gemini.Handler.calls - calls_before
+            result["steps"].append(step)
+            print_step(step)
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=60)
+        gemini.shutdown()
+        if supabase is not None:
+            supabase.shutdown()
+        if log_file is not None:
+            log_file.close()
+
+    if args.json:
+        args.json.parent.mkdir(parents=True, exist_ok=True)
+        args.json.write_text(json.dumps(result, indent=2))
+        print(f"\nSaved: {args.json}")
+    if args.compare:
+        print_compare(result, json.loads(args.compare.read_text()))
+
+
+if __name__ == "__main__":
+    main()
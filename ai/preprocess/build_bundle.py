@@ -0,0 +1,118 @@
+from pathlib import Path
+from datetime import datetime, timezone
+import argparse
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+import faiss
+
+# Path setup
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+DATA_DIR = BASE_DIR / "ai" / "data"
+
+sys.path.append(str(BASE_DIR / "ai"))
+from core.bundle import BUNDLE_DIR, BUNDLE_FILES, LOOSE_FILES, current_version_name, sha256_file  # noqa: E402
+from core.matcher import EMBEDDING_MODEL_NAME  # noqa: E402
+
+# Alur rilis katalog:
+#   1. clean_data.py + build_embeddings.py  -> file lepas di data/
+#   2. build_bundle.py                      -> data/bundles/vNNNN/ + CURRENT -> vNNNN
+#   3. reload worker: SIGHUP, POST /admin/bundle/reload, atau BUNDLE_WATCH_INTERVAL_S
+# Rollback: build_bundle.py --activate v0003 lalu reload.
+
+
+def next_version(out_dir: Path) -> str:
+    versions = [int(p.name[1:]) for p in out_dir.glob("v*") if p.is_dir() and p.name[1:].isdigit()]
+    return f"v{max(versions, default=0) + 1:04d}"
+
+
+def activate(out_dir: Path, version: str):
+    """Tulis pointer CURRENT secara atomik (tmp + rename)."""
+    if not (out_dir / version / "manifest.json").exists():
+        raise SystemExit(f"❌ Bundle {version} tidak ada di {out_dir}")
+    tmp = out_dir / "CURRENT.tmp"
+    tmp.write_text(version + "\n", encoding="utf-8")
+    tmp.replace(out_dir / "CURRENT")
+    print(f"✅ CURRENT -> {version}")
+
+
+def validate(catalog: Path, embeddings: Path, index_path: Path):
+    """Baris katalog == baris embeddings == ntotal index, dimensi sama. Return (rows, dim)."""
+    rows = len(pd.read_parquet(catalog))
+    emb = np.load(embeddings, mmap_mode="r")
+    index = faiss.read_index(str(index_path))
+    if not (rows == emb.shape[0] == index.ntotal):
+        raise SystemExit(
+            f"❌ Tidak konsisten: katalog {rows} baris, embeddings {emb.shape[0]}, index {index.ntotal}. "
+            "Jalankan ulang build_embeddings.py."
+        )
+    if emb.shape[1] != index.d:
+        raise SystemExit(f"❌ Dimensi embeddings {emb.shape[1]} != index {index.d}")
+    return rows, int(index.d)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Bundle katalog berversi (parquet + embeddings + FAISS index + manifest)")
+    ap.add_argument("--catalog", type=Path, default=LOOSE_FILES["catalog"])
+    ap.add_argument("--embeddings", type=Path, default=LOOSE_FILES["embeddings"])
+    ap.add_argument("--index", type=Path, default=LOOSE_FILES["index"])
+    ap.add_argument("--model", default=EMBEDDING_MODEL_NAME, help="model yang membuat embeddings")
+    ap.add_argument("--version", help="nama versi (default: vNNNN berikutnya)")
+    ap.add_argument("--out-dir", type=Path, default=BUNDLE_DIR)
+    ap.add_argument("--no-activate", action="store_true", help="jangan pindahkan CURRENT ke bundle baru")
+    ap.add_argument("--activate", metavar="VERSION", help="hanya pindahkan CURRENT ke bundle yang sudah ada")
+    args = ap.parse_args()
+
+    out_dir = args.out_dir
+    if args.activate:
+        activate(out_dir, args.activate)
+        return
+
+    sources = {"catalog": args.catalog, "embeddings": args.embeddings, "index": args.index}
+    for path in sources.values():
+        if not os.path.exists(path):
+            print(f"❌ ERROR: {path} belum ada. Jalankan clean_data.py dan build_embeddings.py dulu.")
+            return
+
+    rows, dim = validate(args.catalog, args.embeddings, args.index)
+    version = args.version or next_version(out_dir)
+    final_dir = out_dir / version
+    if final_dir.exists():
+        raise SystemExit(f"❌ Bundle {version} sudah ada; bundle tidak pernah ditimpa")
+
+    # Tulis ke folder sementara lalu rename: worker tidak pernah melihat bundle setengah jadi
+    tmp_dir = out_dir / f".{version}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+    files = {}
+    for name, src in sources.items():
+        dst = tmp_dir / BUNDLE_FILES[name]
+        shutil.copyfile(src, dst)
+        files[name] = {"file": BUNDLE_FILES[name], "sha256": sha256_file(dst), "bytes": dst.stat().st_size}
+        print(f"📦 {name:<10} {files[name]['bytes']:>12,} bytes  sha256 {files[name]['sha256'][:12]}")
+
+    manifest = {
+        "version": version,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "model": args.model,
+        "dim": dim,
+        "rows": rows,
+        "files": files,
+    }
+    with open(tmp_dir / "manifest.json", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    tmp_dir.rename(final_dir)
+    print(f"Saved bundle: {final_dir} ({rows} baris, dim {dim}, model {args.model})")
+
+    if args.no_activate:
+        print(f"CURRENT tetap {current_version_name(out_dir)}")
+    else:
+        activate(out_dir, version)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+from pathlib import Path
+from datetime import datetime, timezone
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import faiss
+
+# Path setup
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+OUT_DIR = BASE_DIR / "ai" / "data" / "knn_graph"
+
+sys.path.append(str(BASE_DIR / "ai"))
+from core.bundle import open_bundle  # noqa: E402
+
+
+def load_vectors(index, emb_path: Path):
+    """Vektor katalog dari index (IndexFlat bisa reconstruct), fallback ke .npy."""
+    try:
+        vectors = index.reconstruct_n(0, index.ntotal)
+    except RuntimeError:
+        print(f"Index tidak mendukung reconstruct, pakai {emb_path}")
+        vectors = np.load(emb_path).astype("float32")
+        faiss.normalize_L2(vectors)
+    return np.ascontiguousarray(vectors, dtype="float32")
+
+
+def build_graph(index, vectors, neighbors: int, min_sim: float, batch_size: int):
+    """
+    kNN untuk setiap baris (tanpa dirinya sendiri) dalam format CSR:
+      indptr[i]:indptr[i+1] -> indices / sims tetangga baris i, urut similarity menurun.
+    """
+    n = vectors.shape[0]
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    all_ids, all_sims = [], []
+
+    for start in range(0, n, batch_size):
+        D, I = index.search(vectors[start:start + batch_size], neighbors + 1)
+        for offset, (ids, sims) in enumerate(zip(I, D)):
+            row = start + offset
+            keep = (ids != row) & (ids != -1) & (sims >= min_sim)
+            ids, sims = ids[keep][:neighbors], sims[keep][:neighbors]
+            all_ids.append(ids.astype(np.int32))
+            all_sims.append(sims.astype(np.float16))
+            indptr[row + 1] = indptr[row] + len(ids)
+        print(f"  {min(start + batch_size, n)}/{n}")
+
+    indices = np.concatenate(all_ids) if all_ids else np.zeros(0, np.int32)
+    sims = np.concatenate(all_sims) if all_sims else np.zeros(0, np.float16)
+    return indptr, indices, sims
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build kNN substitution graph (CSR) dari index bundle katalog")
+    parser.add_argument("--bundle", help="versi bundle katalog (default: CURRENT / file lepas)")
+    parser.add_argument("--out", type=Path, default=OUT_DIR)
+    parser.add_argument("--neighbors", type=int, default=32, help="Tetangga per makanan")
+    parser.add_argument("--min-sim", type=float, default=0.0, help="Buang tetangga di bawah similarity ini")
+    parser.add_argument("--batch-size", type=int, default=1024)
+    args = parser.parse_args()
+
+    bundle = open_bundle(args.bundle)
+    if not os.path.exists(bundle.file("index")):
+        print(f"❌ ERROR: Index tidak ditemukan: {bundle.file('index')}. Jalankan build_embeddings.py dulu.")
+        return
+
+    t0 = time.perf_counter()
+    index = faiss.read_index(str(bundle.file("index")))
+    vectors = load_vectors(index, bundle.file("embeddings"))
+    print(f"Membangun kNN graph: {vectors.shape[0]} item, {args.neighbors} tetangga")
+    indptr, indices, sims = build_graph(index, vectors, args.neighbors, args.min_sim, args.batch_size)
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    np.save(args.out / "indptr.npy", indptr)
+    np.save(args.out / "indices.npy", indices)
+    np.save(args.out / "sims.npy", sims)
+    meta = {
+        "n": int(vectors.shape[0]),
+        "neighbors": args.neighbors,
+        "min_sim": args.min_sim,
+        "edges": int(len(indices)),
+        "index_ntotal": int(index.ntotal),
+        # Graph hanya di-load untuk bundle dengan fingerprint ini (core/substitution.py)
+        **bundle.artifact_meta(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+    with open(args.out / "meta.json", "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+    size_mb = (indptr.nbytes + indices.nbytes + sims.nbytes) / 1e6
+    print(f"Saved kNN graph: {args.out} ({meta['edges']} edges, {size_mb:.2f} MB, {time.perf_counter() - t0:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
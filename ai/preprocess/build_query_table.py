@@ -0,0 +1,129 @@
+from pathlib import Path
+from collections import Counter
+from datetime import datetime, timezone
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from sentence_transformers import SentenceTransformer
+import faiss
+
+# Path setup
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+OUT_DIR = BASE_DIR / "ai" / "data" / "query_table"
+
+sys.path.append(str(BASE_DIR / "ai"))
+from core.bundle import open_bundle  # noqa: E402
+from core.text_utils import normalize_query  # noqa: E402
+
+MODEL_NAME = "Qwen/Qwen3-Embedding-0.6B"
+
+# Nama masakan Indonesia yang sering di-log tapi belum tentu ada di nama_clean
+COMMON_DISHES = [
+    "nasi goreng", "nasi putih", "nasi uduk", "nasi kuning", "nasi padang", "nasi campur",
+    "mie goreng", "mie ayam", "mie rebus", "indomie goreng", "bakso", "soto ayam",
+    "soto betawi", "sate ayam", "sate kambing", "ayam goreng", "ayam bakar", "ayam geprek",
+    "ayam penyet", "rendang", "gado gado", "pecel", "ketoprak", "lontong sayur", "opor ayam",
+    "gulai kambing", "rawon", "sayur asem", "sayur lodeh", "capcay", "tumis kangkung",
+    "tempe goreng", "tahu goreng", "tempe bacem", "tahu bacem", "telur dadar", "telur ceplok",
+    "telur rebus", "telur balado", "ikan goreng", "ikan bakar", "pecel lele", "siomay",
+    "batagor", "martabak manis", "martabak telur", "bubur ayam", "kerupuk", "gorengan",
+    "pisang goreng", "es teh manis", "teh manis", "kopi susu", "es jeruk", "jus alpukat",
+]
+
+
+def load_phrases(path: Path):
+    """File frasa dari log: satu frasa per baris, opsional '<frasa>\\t<jumlah>'."""
+    counts = Counter()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if not line.strip() or line.startswith("#"):
+                continue
+            phrase, _, n = line.partition("\t")
+            counts[normalize_query(phrase)] += int(n) if n.strip().isdigit() else 1
+    return counts
+
+
+def generate_phrases(df: pd.DataFrame, max_ngram: int):
+    """Frasa dari prefix n-gram nama_clean (1..max_ngram token) + COMMON_DISHES."""
+    counts = Counter()
+    for name in df["nama_clean"].astype(str):
+        tokens = name.split()
+        for n in range(1, min(max_ngram, len(tokens)) + 1):
+            counts[" ".join(tokens[:n])] += 1
+        counts[name] += 1
+    for dish in COMMON_DISHES:
+        counts[normalize_query(dish)] += 1000  # selalu masuk
+    return counts
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Precompute query embeddings + top-k untuk frasa populer")
+    ap.add_argument("--phrases", type=Path, help="file frasa dari log (default: generate dari katalog)")
+    ap.add_argument("--max-phrases", type=int, default=5000)
+    ap.add_argument("--max-ngram", type=int, default=3)
+    ap.add_argument("--top-k", type=int, default=10)
+    ap.add_argument("--batch-size", type=int, default=64)
+    ap.add_argument("--bundle", help="versi bundle katalog untuk top-k (default: CURRENT / file lepas)")
+    args = ap.parse_args()
+
+    bundle = open_bundle(args.bundle)
+    if not os.path.exists(bundle.file("catalog")) or not os.path.exists(bundle.file("index")):
+        print("❌ ERROR: parquet / FAISS index belum ada. Jalankan build_embeddings.py dulu.")
+        return
+
+    df = pd.read_parquet(bundle.file("catalog"))
+    if args.phrases:
+        print(f"📂 Membaca frasa dari log: {args.phrases}")
+        counts = load_phrases(args.phrases)
+    else:
+        print("🔄 Generate frasa dari n-gram nama_clean + nama masakan umum...")
+        counts = generate_phrases(df, args.max_ngram)
+
+    phrases = [p for p, _ in counts.most_common(args.max_phrases) if p]
+    print(f"📊 Total frasa: {len(phrases)}")
+
+    print(f"Loading Model {MODEL_NAME}...")
+    model = SentenceTransformer(MODEL_NAME, trust_remote_code=True)
+
+    # Query memakai prompt "query" (sama seperti FoodMatcher.embed)
+    vectors = model.encode(
+        phrases, prompt_name="query", batch_size=args.batch_size,
+        show_progress_bar=True, convert_to_numpy=True,
+    ).astype("float32")
+    faiss.normalize_L2(vectors)
+
+    index = faiss.read_index(str(bundle.file("index")))
+    if index.d != vectors.shape[1]:
+        print(f"❌ ERROR: dimensi index ({index.d}) != dimensi model ({vectors.shape[1]})")
+        return
+    sims, ids = index.search(vectors, args.top_k)
+
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    np.save(OUT_DIR / "vectors.npy", vectors)
+    np.save(OUT_DIR / "topk_ids.npy", ids.astype("int32"))
+    np.save(OUT_DIR / "topk_sims.npy", sims.astype("float32"))
+    with open(OUT_DIR / "phrases.json", "w", encoding="utf-8") as f:
+        json.dump(phrases, f, ensure_ascii=False)
+    with open(OUT_DIR / "meta.json", "w", encoding="utf-8") as f:
+        json.dump({
+            "model": MODEL_NAME,
+            "dim": int(vectors.shape[1]),
+            "k": args.top_k,
+            "count": len(phrases),
+            "index_ntotal": int(index.ntotal),
+            # Top-k hanya dipakai untuk bundle dengan fingerprint ini (QueryTable.matches_catalog)
+            **bundle.artifact_meta(),
+            "source": str(args.phrases) if args.phrases else "generated",
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }, f, indent=2)
+
+    print(f"Saved query table: {OUT_DIR} ({len(phrases)} frasa, top-{args.top_k})")
+
+
+if __name__ == "__main__":
+    main()
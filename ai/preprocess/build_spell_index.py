@@ -0,0 +1,108 @@
+from pathlib import Path
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Path setup
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+OUT_DIR = BASE_DIR / "ai" / "data" / "spell_index"
+
+sys.path.append(str(BASE_DIR / "ai"))
+from core.bundle import open_bundle  # noqa: E402
+from core.portion import PORSI_MAP  # noqa: E402
+from core.spell import delete_variants, term_hash  # noqa: E402
+from core.text_utils import normalize_query  # noqa: E402
+
+# Kata non-makanan yang sering ada di input user: tidak boleh "dikoreksi" menjadi
+# nama bahan ("gelas" -> "gelap", "banyak" -> "minyak"), jadi ikut kosakata
+KEEP_WORDS = [
+    *PORSI_MAP, "mangkok", "cangkir", "irisan", "gram", "setengah", "seperempat", "sepertiga",
+    "satu", "dua", "tiga", "empat", "lima", "enam", "tujuh", "delapan", "sembilan", "sepuluh",
+    "tanpa", "pakai", "pake", "sedikit", "banyak", "agak", "kurang", "lebih", "sisa", "level",
+    "pedas", "manis", "asin", "gorengan", "jumbo", "besar", "kecil", "sedang",
+]
+
+
+def vocabulary(df: pd.DataFrame, min_len: int) -> Counter:
+    """Frekuensi token nama_clean (huruf saja, minimal min_len karakter)."""
+    names = df["nama_clean"].astype(str) if "nama_clean" in df else df["Nama Bahan Makanan"].map(normalize_query)
+    return Counter(t for name in names for t in name.split() if len(t) >= min_len and t.isalpha())
+
+
+def build_deletes(words, max_distance: int, prefix_length: int):
+    """Hash delete-variant -> word id, dalam bentuk CSR urut hash (untuk searchsorted)."""
+    table = defaultdict(set)
+    for wid, word in enumerate(words):
+        for variant in delete_variants(word, max_distance, prefix_length):
+            table[term_hash(variant)].add(wid)
+
+    keys = np.array(sorted(table), dtype=np.uint64)
+    ptr = np.zeros(len(keys) + 1, dtype=np.int64)
+    ids = []
+    for j, key in enumerate(keys):
+        members = sorted(table[int(key)])
+        ids.extend(members)
+        ptr[j + 1] = ptr[j] + len(members)
+    return keys, ptr, np.array(ids, dtype=np.int32)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Build index koreksi ejaan (SymSpell) dari token nama_clean")
+    ap.add_argument("--max-distance", type=int, default=2)
+    ap.add_argument("--prefix-length", type=int, default=7)
+    ap.add_argument("--min-len", type=int, default=2, help="panjang minimal token kosakata")
+    ap.add_argument("--keep-words", type=Path, help="file kata tambahan yang tidak boleh dikoreksi")
+    ap.add_argument("--out-dir", type=Path, default=OUT_DIR)
+    ap.add_argument("--bundle", help="versi bundle katalog (default: CURRENT / file lepas)")
+    args = ap.parse_args()
+
+    bundle = open_bundle(args.bundle)
+    if not os.path.exists(bundle.file("catalog")):
+        print(f"❌ ERROR: {bundle.file('catalog')} belum ada. Jalankan clean_data.py dulu.")
+        return
+
+    df = pd.read_parquet(bundle.file("catalog"))
+    counts = vocabulary(df, args.min_len)
+    keep = list(KEEP_WORDS)
+    if args.keep_words:
+        keep += [w for w in normalize_query(args.keep_words.read_text(encoding="utf-8")).split()]
+    for word in keep:
+        counts[word] = max(counts[word], 1)
+    words = sorted(counts, key=lambda w: (-counts[w], w))
+    print(f"📊 {len(words)} token kosakata dari {len(df)} baris")
+
+    keys, ptr, ids = build_deletes(words, args.max_distance, args.prefix_length)
+    print(f"🔄 {len(keys)} delete-variant, {len(ids)} entri")
+
+    out_dir = args.out_dir
+    out_dir.mkdir(parents=True, exist_ok=True)
+    encoded = [w.encode("utf-8") for w in words]
+    np.save(out_dir / "words.npy", np.array(encoded, dtype=f"S{max(map(len, encoded))}"))
+    np.save(out_dir / "freqs.npy", np.array([counts[w] for w in words], dtype=np.int32))
+    np.save(out_dir / "del_keys.npy", keys)
+    np.save(out_dir / "del_ptr.npy", ptr)
+    np.save(out_dir / "del_ids.npy", ids)
+    with open(out_dir / "meta.json", "w", encoding="utf-8") as f:
+        json.dump({
+            "max_distance": args.max_distance,
+            "prefix_length": args.prefix_length,
+            "words": len(words),
+            "deletes": int(len(keys)),
+            "catalog_rows": int(len(df)),
+            # Index hanya di-load untuk katalog dengan fingerprint ini (core/spell.py);
+            # kosakata tidak bergantung pada FAISS index, jadi cukup checksum katalog
+            **bundle.artifact_meta(with_index=False),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }, f, indent=2)
+
+    print(f"Saved spell index: {out_dir}")
+
+
+if __name__ == "__main__":
+    main()
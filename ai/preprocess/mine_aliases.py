@@ -0,0 +1,153 @@
+from pathlib import Path
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from difflib import SequenceMatcher
+import argparse
+import json
+import sys
+
+import pandas as pd
+
+# Path setup
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+DATA_PATH = BASE_DIR / "ai" / "data" / "data pangan bersih.parquet"
+TRACE_DIR = BASE_DIR / "ai" / "data" / "llm_trace"
+OUT_DIR = BASE_DIR / "ai" / "data" / "aliases"
+
+sys.path.append(str(BASE_DIR / "ai"))
+from core.text_utils import normalize_query  # noqa: E402
+
+
+def load_traces(paths):
+    """Baris trace dari core/llm_trace.py; hanya refinement yang berakhir dengan match."""
+    records = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # baris terpotong (worker mati saat menulis)
+                if rec.get("top") and rec.get("norm"):
+                    records.append(rec)
+    return records
+
+
+def mine_aliases(records, min_support, min_agreement, min_similarity):
+    """
+    Query utuh -> nama katalog jika query yang sama berulang kali berakhir
+    di food yang sama. Query yang sudah persis nama katalog dilewati.
+    """
+    targets = defaultdict(Counter)
+    for rec in records:
+        # Match hasil rerank: skor FAISS-nya memang rendah, yang diterima skor cross-encoder
+        if rec["top"].get("rerank_score", rec["top"]["similarity"]) >= min_similarity:
+            targets[rec["norm"]][rec["top"]["nama_clean"]] += 1
+
+    aliases = {}
+    for norm, counter in targets.items():
+        total = sum(counter.values())
+        target, n = counter.most_common(1)[0]
+        if total < min_support or n / total < min_agreement or target == norm:
+            continue
+        aliases[norm] = {"rewrite": target, "support": n, "confidence": round(n / total, 3)}
+    return aliases
+
+
+def mine_synonyms(records, vocab, min_support, min_agreement, min_ratio):
+    """
+    Token query yang tidak ada di kosakata katalog -> token paling mirip (ejaan)
+    di istilah Gemini / nama hasil match, mis. "telor" -> "telur".
+    """
+    pairs = defaultdict(Counter)
+    for rec in records:
+        q_tokens = set(rec["norm"].split())
+        out_tokens = set(rec["top"]["nama_clean"].split())
+        for term in rec.get("terms", []):
+            out_tokens.update(normalize_query(term).split())
+        out_tokens = {t for t in out_tokens if t in vocab} - q_tokens
+        for tok in q_tokens - vocab:
+            if len(tok) < 3 or tok.isdigit():
+                continue
+            best = max(out_tokens, key=lambda t: SequenceMatcher(None, tok, t).ratio(), default=None)
+            if best and SequenceMatcher(None, tok, best).ratio() >= min_ratio:
+                pairs[tok][best] += 1
+
+    synonyms = {}
+    for tok, counter in pairs.items():
+        total = sum(counter.values())
+        target, n = counter.most_common(1)[0]
+        if n >= min_support and n / total >= min_agreement:
+            synonyms[tok] = {"to": target, "support": n, "confidence": round(n / total, 3)}
+    return synonyms
+
+
+def next_version(out_dir: Path) -> int:
+    versions = [int(p.stem.split("-v")[-1]) for p in out_dir.glob("aliases-v*.json") if p.stem.split("-v")[-1].isdigit()]
+    return max(versions, default=0) + 1
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Mining alias + sinonim query dari trace refinement Gemini")
+    ap.add_argument("--traces", type=Path, nargs="+", help="file/folder trace JSONL (default: data/llm_trace)")
+    ap.add_argument("--min-support", type=int, default=2, help="minimal kemunculan pasangan yang sama")
+    ap.add_argument("--min-agreement", type=float, default=0.6, help="porsi minimal target terbanyak")
+    ap.add_argument("--min-similarity", type=float, default=0.5, help="skor match minimal agar dianggap berhasil")
+    ap.add_argument("--min-token-ratio", type=float, default=0.7, help="kemiripan ejaan minimal untuk sinonim token")
+    ap.add_argument("--out-dir", type=Path, default=OUT_DIR)
+    ap.add_argument("--dry-run", action="store_true", help="tampilkan hasil tanpa menulis artifact")
+    args = ap.parse_args()
+
+    paths = []
+    for p in args.traces or [TRACE_DIR]:
+        paths.extend(sorted(p.glob("*.jsonl")) if p.is_dir() else [p])
+    if not paths:
+        print(f"❌ ERROR: tidak ada file trace di {args.traces or TRACE_DIR}")
+        return
+
+    records = load_traces(paths)
+    print(f"📂 {len(records)} trace dari {len(paths)} file")
+
+    df = pd.read_parquet(DATA_PATH)
+    names = df["nama_clean"].astype(str) if "nama_clean" in df else df["Nama Bahan Makanan"].map(normalize_query)
+    vocab = {tok for name in names for tok in name.split()}
+
+    aliases = mine_aliases(records, args.min_support, args.min_agreement, args.min_similarity)
+    synonyms = mine_synonyms(records, vocab, args.min_support, args.min_agreement, args.min_token_ratio)
+    print(f"📊 {len(aliases)} alias, {len(synonyms)} sinonim")
+    for tok, s in sorted(synonyms.items(), key=lambda kv: -kv[1]["support"])[:20]:
+        print(f"   {tok} -> {s['to']} ({s['support']}x)")
+
+    if args.dry_run:
+        return
+
+    out_dir = args.out_dir
+    out_dir.mkdir(parents=True, exist_ok=True)
+    version = next_version(out_dir)
+    out_path = out_dir / f"aliases-v{version:04d}.json"
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "version": version,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "source": [str(p) for p in paths],
+            "records": len(records),
+            "catalog_rows": int(len(df)),
+            "params": {
+                "min_support": args.min_support,
+                "min_agreement": args.min_agreement,
+                "min_similarity": args.min_similarity,
+                "min_token_ratio": args.min_token_ratio,
+            },
+            "aliases": aliases,
+            "synonyms": synonyms,
+        }, f, ensure_ascii=False, indent=1)
+    # Pointer ditulis terakhir: worker tidak pernah membaca artifact setengah jadi
+    tmp = out_dir / "LATEST.tmp"
+    tmp.write_text(out_path.name, encoding="utf-8")
+    tmp.replace(out_dir / "LATEST")
+
+    print(f"Saved alias table: {out_path} (LATEST -> v{version})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# ai/tests/conftest.py
+"""
+Unit test (pytest) tanpa model, Gemini, atau artifact di data/: bundle katalog kecil
+di folder sementara + embedding model stub yang deterministik.
+
+Usage (dari folder ai/):
+    python -m pytest tests
+"""
+
+import atexit
+import json
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+# Satu embedding model stub untuk test, microbenchmark dan load test (loadtest/stub_model.py)
+sys.path.append(str(BASE_DIR / "loadtest"))
+
+TMP_DIR = Path(tempfile.mkdtemp(prefix="nutrimori-tests-"))
+atexit.register(shutil.rmtree, TMP_DIR, True)
+
+# Sebelum core.* di-import: semua artifact menunjuk folder kosong, tanpa Supabase / model server
+os.environ.update({
+    "BUNDLE_DIR": str(TMP_DIR / "bundles"),
+    "QUERY_TABLE_DIR": str(TMP_DIR / "query_table"),
+    "KNN_GRAPH_DIR": str(TMP_DIR / "knn_graph"),
+    "SPELL_INDEX_DIR": str(TMP_DIR / "spell_index"),
+    "ALIAS_DIR": str(TMP_DIR / "aliases"),
+    "USE_SUPABASE": "0",
+    "MODEL_SERVER_SOCKET": "",
+    "RERANKER": "0",
+    "LLM_TRACE": "0",
+    "PRELOAD_MODELS": "0",
+    "FAST_START": "0",
+    "BUNDLE_WATCH_INTERVAL_S": "0",
+})
+
+from stub_model import HashEmbeddingModel  # noqa: E402
+
+EMBEDDING_DIM = 32
+CATALOG_NAMES = [
+    "tempe goreng", "tahu goreng", "tahu rebus", "tempe bacem", "nasi putih", "nasi goreng",
+    "ayam goreng", "ayam bakar", "telur rebus", "telur dadar", "sayur bayam", "soto ayam",
+    "ikan bandeng bakar", "pisang", "susu sapi", "salak", "buah naga", "mie rebus",
+]
+NUTRIENT_COLUMNS = ["Energi", "Protein", "Lemak Total", "Karbohidrat", "Gula", "Serat", "Natrium"]
+
+
+STUB_MODEL = HashEmbeddingModel(EMBEDDING_DIM)
+
+
+def write_bundle(names, version: str, bundle_dir=None, activate: bool = True) -> Path:
+    """Bundle katalog (parquet + embeddings + index + manifest) seperti preprocess/build_bundle.py."""
+    import faiss
+
+    from core.bundle import BUNDLE_DIR, BUNDLE_FILES, sha256_file
+
+    bundle_dir = Path(bundle_dir or BUNDLE_DIR)
+    path = bundle_dir / version
+    path.mkdir(parents=True)
+    rng = np.random.default_rng(len(names))
+    df = pd.DataFrame({
+        "Nama Bahan Makanan": [n.title() for n in names],
+        "Mentah/Olahan": ["Olahan"] * len(names),
+        "Kelompok Makanan": ["Lain"] * len(names),
+        **{col: rng.gamma(2.0, 10.0, size=len(names)).round(2) for col in NUTRIENT_COLUMNS},
+        "nama_clean": list(names),
+        "food_text": list(names),
+    })
+    df.to_parquet(path / BUNDLE_FILES["catalog"])
+    emb = STUB_MODEL.encode(list(names))
+    np.save(path / BUNDLE_FILES["embeddings"], emb)
+    emb = emb.copy()
+    faiss.normalize_L2(emb)
+    index = faiss.IndexFlatIP(EMBEDDING_DIM)
+    index.add(emb)
+    faiss.write_index(index, str(path / BUNDLE_FILES["index"]))
+
+    files = {
+        name: {"file": fname, "sha256": sha256_file(path / fname), "bytes": (path / fname).stat().st_size}
+        for name, fname in BUNDLE_FILES.items()
+    }
+    with open(path / "manifest.json", "w", encoding="utf-8") as f:
+        json.dump({"version": version, "dim": EMBEDDING_DIM, "rows": len(names), "files": files}, f)
+    if activate:
+        (bundle_dir / "CURRENT").write_text(version + "\n", encoding="utf-8")
+    return path
+
+
+write_bundle(CATALOG_NAMES, "v0001")
+
+
+@pytest.fixture(scope="session", autouse=True)
+def stub_model():
+    import core.matcher
+
+    core.matcher._cached_model = STUB_MODEL
+    return STUB_MODEL
+
+
+@pytest.fixture(scope="session")
+def app_module(stub_model):
+    import app
+
+    return app
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
@@ -0,0 +1,131 @@
+# ai/tests/test_admission.py
+"""AdmissionLimit: slot tidak pernah melebihi batas dan setiap release membangunkan satu penunggu."""
+
+import threading
+import time
+
+from core.admission import AdmissionLimit
+
+TIMEOUT = 5
+
+
+def _start(target, *args):
+    thread = threading.Thread(target=target, args=args, daemon=True)
+    thread.start()
+    return thread
+
+
+def _wait_queued(limit, n):
+    """Tunggu sampai n request pernah masuk antrian (masih menunggu atau sudah timeout)."""
+    deadline = time.monotonic() + TIMEOUT
+    while limit.stats()["waiting"] + limit.stats()["timedOut"] < n:
+        assert time.monotonic() < deadline, f"{n} request tidak masuk antrian"
+        time.sleep(0.001)
+
+
+def test_never_exceeds_max_concurrent():
+    limit = AdmissionLimit("test", max_concurrent=2, max_queue=50, queue_timeout=TIMEOUT)
+    lock = threading.Lock()
+    active, peak, admitted = [0], [0], []
+
+    def request():
+        assert limit.acquire()
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.005)
+        with lock:
+            active[0] -= 1
+        admitted.append(1)
+        limit.release(0.005)
+
+    threads = [_start(request) for _ in range(20)]
+    for t in threads:
+        t.join(TIMEOUT)
+
+    stats = limit.stats()
+    assert len(admitted) == 20 and peak[0] <= 2
+    assert stats["active"] == stats["waiting"] == 0
+    assert stats["admitted"] == 20 and stats["rejected"] == stats["timedOut"] == 0
+
+
+def test_full_queue_rejects_immediately():
+    limit = AdmissionLimit("test", max_concurrent=1, max_queue=1, queue_timeout=TIMEOUT)
+    assert limit.acquire()
+    queued = []
+    waiter = _start(lambda: queued.append(limit.acquire()))
+    _wait_queued(limit, 1)
+
+    t0 = time.monotonic()
+    assert not limit.acquire()
+    assert time.monotonic() - t0 < 0.5
+    assert limit.stats()["rejected"] == 1
+
+    limit.release()
+    waiter.join(TIMEOUT)
+    assert queued == [True] and limit.stats()["active"] == 1
+
+
+def test_waiter_times_out():
+    limit = AdmissionLimit("test", max_concurrent=1, max_queue=4, queue_timeout=0.05)
+    assert limit.acquire()
+    t0 = time.monotonic()
+    assert not limit.acquire()
+    assert time.monotonic() - t0 >= 0.05
+
+    stats = limit.stats()
+    assert stats["timedOut"] == 1 and stats["waiting"] == 0
+    limit.release()
+    # Tidak ada penunggu tersisa: slot langsung tersedia lagi
+    assert limit.acquire()
+
+
+def test_release_hands_slot_to_waiters_in_order():
+    limit = AdmissionLimit("test", max_concurrent=1, max_queue=8, queue_timeout=TIMEOUT)
+    assert limit.acquire()
+    order = []
+
+    def request(i):
+        assert limit.acquire()
+        order.append(i)
+        limit.release()
+
+    threads = []
+    for i in range(8):
+        threads.append(_start(request, i))
+        _wait_queued(limit, i + 1)
+    limit.release()
+    for t in threads:
+        t.join(TIMEOUT)
+
+    # Satu notify() per release cukup: setiap penunggu kebagian slot, urut FIFO
+    assert order == list(range(8))
+    assert limit.stats()["timedOut"] == 0 and limit.stats()["active"] == 0
+
+
+def test_timed_out_waiter_does_not_swallow_release():
+    """Release yang berbarengan dengan timeout penunggu lain tetap sampai ke penunggu berikutnya."""
+    for _ in range(30):
+        limit = AdmissionLimit("test", max_concurrent=1, max_queue=2, queue_timeout=0.01)
+        assert limit.acquire()
+        results = {}
+
+        def request(name):
+            ok = limit.acquire()
+            results[name] = ok
+            if ok:
+                limit.release()
+
+        short = _start(request, "short")
+        _wait_queued(limit, 1)
+        limit.queue_timeout = TIMEOUT
+        long = _start(request, "long")
+        _wait_queued(limit, 2)
+
+        time.sleep(0.01)
+        limit.release()
+        short.join(TIMEOUT)
+        long.join(TIMEOUT)
+
+        assert results["long"] is True
+        assert limit.stats()["active"] == limit.stats()["waiting"] == 0
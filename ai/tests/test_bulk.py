@@ -0,0 +1,70 @@
+# ai/tests/test_bulk.py
+"""/api/bulk-match: entri yang gagal hanya menandai dirinya sendiri, backfill tetap jalan."""
+
+import json
+
+import pytest
+
+import core.bulk as bulk
+
+
+def _lines(resp):
+    # close() melepas slot admission "bulk" (dilepas saat stream selesai)
+    with resp:
+        assert resp.status_code == 200
+        return [json.loads(line) for line in resp.get_data(as_text=True).splitlines() if line]
+
+
+def _post_ndjson(client, lines, query=""):
+    body = "\n".join(lines) + "\n"
+    return client.post(f"/api/bulk-match{query}", data=body, content_type="application/x-ndjson")
+
+
+def test_bad_ndjson_line_is_reported_per_entry(client):
+    events = _lines(_post_ndjson(client, ['"tempe goreng"', "{bukan json", "[1, 2]", '{"id": "x", "text": "nasi putih"}']))
+
+    results, summary = events[:-1], events[-1]
+    assert [r["type"] for r in results] == ["result"] * 4
+    assert [r["id"] for r in results] == [0, 1, 2, "x"]
+    assert "error" in results[1] and "JSON" in results[1]["error"]
+    assert "error" in results[2]
+    assert results[3]["items"][0]["match"]["nama"] == "Nasi Putih"
+    assert summary["type"] == "summary" and summary["errors"] == 2
+
+
+def test_non_dict_entry_in_json_body(client):
+    events = _lines(client.post("/api/bulk-match", json={"entries": [1, "tempe goreng", None]}))
+    assert [("error" in e) for e in events[:-1]] == [True, False, True]
+    assert events[1]["items"][0]["match"]["nama"] == "Tempe Goreng"
+
+
+def test_failed_chunk_only_marks_its_entries(client, monkeypatch):
+    real = bulk.match_candidates_batched
+    calls = []
+
+    def flaky(matcher, names, *args, **kwargs):
+        calls.append(list(names))
+        if len(calls) == 1:
+            raise RuntimeError("Gemini 503")
+        return real(matcher, names, *args, **kwargs)
+
+    monkeypatch.setattr(bulk, "match_candidates_batched", flaky)
+    monkeypatch.setattr(bulk, "BULK_CHUNK_SIZE", 2)
+    texts = ["tempe goreng", "tahu goreng", "tempe goreng", "nasi putih"]
+    events = _lines(client.post("/api/bulk-match", json=texts))
+
+    assert [e.get("error") for e in events[:-1]] == ["Gemini 503", "Gemini 503", None, None]
+    # Error sementara tidak di-cache: duplikat di chunk berikutnya diproses ulang
+    assert events[2]["items"][0]["match"]["nama"] == "Tempe Goreng"
+    assert events[-1]["errors"] == 2
+
+
+@pytest.mark.parametrize("query", ["?limit=abc", "?limit=0"])
+def test_invalid_limit_is_400(client, query):
+    with _post_ndjson(client, ['"tempe goreng"'], query) as resp:
+        assert resp.status_code == 400 and "limit" in resp.get_json()["error"]
+
+
+def test_entries_must_be_a_list(client):
+    with client.post("/api/bulk-match", json={"entries": "tempe goreng"}) as resp:
+        assert resp.status_code == 400
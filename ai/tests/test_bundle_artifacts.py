@@ -0,0 +1,126 @@
+# ai/tests/test_bundle_artifacts.py
+"""Query table, kNN graph dan spell index hanya dipakai untuk bundle katalog sumbernya."""
+
+import json
+import os
+import subprocess
+import sys
+
+import faiss
+import numpy as np
+import pytest
+
+import core.query_table as query_table
+import core.spell as spell
+import core.substitution as substitution
+from core.bundle import Bundle, get_bundle_manager
+from core.matcher import EMBEDDING_MODEL_NAME
+
+from conftest import BASE_DIR, CATALOG_NAMES, STUB_MODEL, write_bundle
+
+PHRASES = ["tempe goreng", "nasi putih"]
+
+
+def _build(script, *args):
+    subprocess.run([sys.executable, str(BASE_DIR / "preprocess" / script), *args],
+                   check=True, capture_output=True, env=os.environ.copy())
+
+
+def _write_query_table(bundle, matcher, model=EMBEDDING_MODEL_NAME):
+    out = query_table.QUERY_TABLE_DIR
+    out.mkdir(parents=True, exist_ok=True)
+    vectors = STUB_MODEL.encode(PHRASES)
+    faiss.normalize_L2(vectors)
+    sims, ids = matcher.index.search(vectors, 5)
+    np.save(out / "vectors.npy", vectors)
+    np.save(out / "topk_ids.npy", ids.astype("int32"))
+    np.save(out / "topk_sims.npy", sims.astype("float32"))
+    with open(out / "phrases.json", "w", encoding="utf-8") as f:
+        json.dump(PHRASES, f)
+    with open(out / "meta.json", "w", encoding="utf-8") as f:
+        json.dump({"model": model, "dim": int(vectors.shape[1]), "k": 5, "count": len(PHRASES),
+                   "index_ntotal": int(matcher.index.ntotal), **bundle.artifact_meta()}, f)
+
+
+@pytest.fixture
+def artifacts(app_module):
+    """Artifact dari bundle v0001; setelah test, kembali ke v0001 tanpa artifact."""
+    manager = get_bundle_manager()
+    snapshot = manager.current()
+    _write_query_table(snapshot.bundle, snapshot.matcher)
+    _build("build_knn_graph.py", "--out", str(substitution.KNN_GRAPH_DIR), "--neighbors", "4")
+    _build("build_spell_index.py", "--out-dir", str(spell.SPELL_INDEX_DIR))
+    app_module._invalidate_catalog_caches(snapshot)
+    yield manager
+
+    manager.reload("v0001")
+    for path in (query_table.QUERY_TABLE_DIR, substitution.KNN_GRAPH_DIR, spell.SPELL_INDEX_DIR):
+        (path / "meta.json").unlink(missing_ok=True)
+    app_module._invalidate_catalog_caches(manager.current())
+
+
+def test_artifacts_used_for_source_bundle(artifacts):
+    snapshot = artifacts.current()
+    assert snapshot.matcher._query_topk_ok
+    assert spell.get_spell_index() is not None
+    graph = substitution.get_substitution_graph()
+    assert graph.meta["catalog_fingerprint"] == snapshot.bundle.fingerprint()
+
+
+def test_same_size_catalog_swap_disables_artifacts(artifacts, client):
+    # Jumlah baris sama dengan v0001 (cek ntotal lama lolos), tapi baris menunjuk makanan lain
+    write_bundle(list(reversed(CATALOG_NAMES)), "v0002", activate=False)
+    artifacts.reload("v0002")
+    snapshot = artifacts.current()
+    assert snapshot.version == "v0002"
+    assert snapshot.matcher.index.ntotal == len(CATALOG_NAMES)
+
+    assert not snapshot.matcher._query_topk_ok
+    assert spell.get_spell_index() is None
+    with pytest.raises(FileNotFoundError, match="bukan dari katalog v0002"):
+        substitution.get_substitution_graph()
+    assert client.get("/api/foods/0/substitutes").status_code == 503
+
+
+def test_rebuilt_artifacts_picked_up_after_reset(artifacts, app_module):
+    write_bundle(CATALOG_NAMES[:-1], "v0003", activate=False)
+    artifacts.reload("v0003")
+    snapshot = artifacts.current()
+    assert not snapshot.matcher._query_topk_ok
+
+    _write_query_table(snapshot.bundle, snapshot.matcher)
+    app_module._invalidate_catalog_caches(snapshot)
+    assert snapshot.matcher._query_topk_ok
+
+
+def test_query_table_from_other_model_is_not_used(artifacts, app_module):
+    snapshot = artifacts.current()
+    assert snapshot.matcher.has_cached_query(PHRASES[0])
+
+    _write_query_table(snapshot.bundle, snapshot.matcher, model="other/embedding-model")
+    app_module._invalidate_catalog_caches(snapshot)
+    assert snapshot.matcher.query_table is None
+    assert not snapshot.matcher.has_cached_query(PHRASES[0])
+    assert not snapshot.matcher._query_topk_ok
+
+
+def test_query_table_dim_must_match_index():
+    table = query_table.QueryTable.__new__(query_table.QueryTable)
+    table.meta = {"model": EMBEDDING_MODEL_NAME, "dim": 8}
+    table.vectors = np.zeros((2, 8), dtype="float32")
+    assert table.matches_model(EMBEDDING_MODEL_NAME, 8)
+    assert not table.matches_model(EMBEDDING_MODEL_NAME, 16)
+    table.meta["dim"] = 16
+    assert not table.matches_model(EMBEDDING_MODEL_NAME)
+
+
+def test_spell_fingerprint_ignores_faiss_index(tmp_path):
+    # Kosakata ejaan hanya butuh katalog: checkout tanpa build_index.faiss tetap bisa build + load
+    catalog = BASE_DIR / "data" / "data pangan bersih.parquet"
+    bundle = Bundle(files={"catalog": catalog, "index": tmp_path / "build_index.faiss"})
+    meta = bundle.artifact_meta(with_index=False)
+    with pytest.raises(FileNotFoundError):
+        bundle.fingerprint()
+
+    rebuilt = Bundle(files={"catalog": catalog, "index": tmp_path / "rebuilt.faiss"})
+    assert rebuilt.matches_artifact(meta, with_index=False)
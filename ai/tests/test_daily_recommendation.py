@@ -0,0 +1,151 @@
+# ai/tests/test_daily_recommendation.py
+"""
+generate_daily_recommendation = loop rule-based lama, bit-for-bit; recommend_for_user
+(katalog lengkap / candidateCatalog) memakai aturan baru (ISSUE_RULES, avoid per token).
+"""
+
+import random
+
+import pytest
+
+from core.daily_recommendation import generate_daily_recommendation, recommend_for_user
+
+
+def legacy_daily_recommendation(weekly_analysis, user_preferences, foods_from_supabase, top_k=5):
+    """Salinan loop lama (sebelum RecommendationEngine) sebagai referensi."""
+    budget = user_preferences.get("budget")
+    avoid = set(x.lower() for x in user_preferences.get("avoid", []))
+    likes = set(x.lower() for x in user_preferences.get("likes", []))
+
+    patterns = weekly_analysis.get("patterns", [])
+    recommendations = weekly_analysis.get("recommendations", [])
+    key_issue = None
+    for p in patterns:
+        if p.get("type") == "negative" and p.get("impact") == "High":
+            key_issue = p.get("message")
+            break
+    if not key_issue and patterns:
+        key_issue = patterns[0].get("message")
+    main_reco_text = recommendations[0] if recommendations else None
+
+    scored = []
+    for food in foods_from_supabase:
+        food_id = food.get("food_id")
+        name = food.get("name", "")
+        price = food.get("price_estimated", 0)
+        protein = food.get("protein", 0)
+        fat = food.get("fat", 0)
+        sugar = food.get("sugar", 0)
+        if not name:
+            continue
+        if name.lower() in avoid:
+            continue
+        if budget and price > budget:
+            continue
+        score = 0
+        if key_issue and "protein" in key_issue.lower():
+            if protein >= 8:
+                score += 2
+            else:
+                score -= 1
+        if fat >= 15:
+            score -= 0.5
+        if sugar >= 15:
+            score -= 0.5
+        if likes and any(l in name.lower() for l in likes):
+            score += 0.5
+        if budget:
+            score += max(0, 1 - (price / budget))
+        scored.append({"foodId": food_id, "name": name, "estimatedPrice": round(price), "score": score})
+
+    scored.sort(key=lambda x: x["score"], reverse=True)
+    recommended = []
+    for f in scored[:top_k]:
+        reason_parts = []
+        if key_issue:
+            reason_parts.append(key_issue.rstrip("."))
+        if main_reco_text:
+            reason_parts.append(main_reco_text.rstrip("."))
+        reason_parts.append("Dipilih karena harga terjangkau dan sesuai preferensi kamu")
+        recommended.append({"foodId": f["foodId"], "name": f["name"], "estimatedPrice": f["estimatedPrice"],
+                            "reason": ". ".join(reason_parts) + "."})
+    return {"recommendedFoods": recommended}
+
+
+WORDS = ["tahu", "tempe", "ayam", "goreng", "rebus", "bakar", "sayur", "bayam", "gorengan", "ikan",
+         "nasi", "tahun", "kacang", "Tahu", "AYAM"]
+ISSUES = ["Asupan protein kurang dari target", "Asupan serat rendah", "Gula berlebih", "Natrium tinggi", ""]
+
+
+def random_catalog(rng, n):
+    foods = []
+    for i in range(n):
+        name = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 3)))
+        foods.append({
+            "food_id": i,
+            "name": rng.choice([name, name, name, "", " "]),
+            # Banyak harga & nutrisi kembar: urutan skor sama harus ikut sort stabil lama
+            "price_estimated": rng.choice([1000, 1500, 2500.5, 3000, rng.uniform(100, 6000)]),
+            "protein": rng.choice([0, 7.99, 8, 8.0000001, rng.uniform(0, 30)]),
+            "fat": rng.choice([0, 15, 14.999, rng.uniform(0, 30)]),
+            "sugar": rng.choice([0, 15, rng.uniform(0, 30)]),
+        })
+    return foods
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_matches_legacy_loop(seed):
+    rng = random.Random(seed)
+    foods = random_catalog(rng, rng.choice([3, 20, 200]))
+    weekly = {
+        "patterns": [{"type": "negative", "message": rng.choice(ISSUES), "impact": rng.choice(["High", "Low"])}],
+        "recommendations": rng.choice([[], ["Tambahkan sumber protein seperti telur."]]),
+    }
+    prefs = {
+        "budget": rng.choice([None, 0, 2000, 3000, 5000]),
+        "avoid": rng.sample(["gorengan", "ayam goreng", "tahu", "AYAM"], rng.randint(0, 2)),
+        "likes": rng.sample(["tahu", "tempe", "kacang", "ahu"], rng.randint(0, 2)),
+    }
+    top_k = rng.choice([1, 5, 10])
+
+    expected = legacy_daily_recommendation(weekly, prefs, foods, top_k)
+    actual = generate_daily_recommendation(weekly_analysis=weekly, user_preferences=prefs,
+                                           foods_from_supabase=foods, top_k=top_k)
+    assert actual == expected
+
+
+# Katalog kecil untuk membandingkan aturan lama vs baru secara eksplisit
+FOODS = [
+    {"food_id": 1, "name": "Ayam Goreng", "price_estimated": 3000, "protein": 20, "fat": 12, "sugar": 0, "fiber": 0},
+    {"food_id": 2, "name": "Ayam", "price_estimated": 2800, "protein": 18, "fat": 5, "sugar": 0, "fiber": 0},
+    {"food_id": 3, "name": "Sayur Bayam", "price_estimated": 1500, "protein": 3, "fat": 1, "sugar": 1, "fiber": 4},
+    {"food_id": 4, "name": "Nasi Putih", "price_estimated": 1000, "protein": 3, "fat": 0, "sugar": 0, "fiber": 0},
+]
+PREFS = {"budget": 4000, "avoid": ["ayam"], "likes": []}
+
+
+def _ids(result):
+    return [f["foodId"] for f in result["recommendedFoods"]]
+
+
+def test_legacy_vs_new_avoid():
+    weekly = {"patterns": [{"type": "negative", "message": "Protein kurang", "impact": "High"}]}
+
+    legacy = generate_daily_recommendation(weekly_analysis=weekly, user_preferences=PREFS, foods_from_supabase=FOODS)
+    new = recommend_for_user(weekly_analysis=weekly, user_preferences=PREFS, candidate_catalog=FOODS)
+
+    # Lama: avoid hanya nama persis ("Ayam"); baru: semua nama yang memuat token "ayam"
+    assert _ids(legacy) == [1, 4, 3]
+    assert _ids(new) == [4, 3]
+
+
+def test_legacy_vs_new_issue_rules():
+    weekly = {"patterns": [{"type": "negative", "message": "Asupan serat rendah", "impact": "High"}]}
+    prefs = {**PREFS, "avoid": []}
+
+    legacy = generate_daily_recommendation(weekly_analysis=weekly, user_preferences=prefs, foods_from_supabase=FOODS)
+    new = recommend_for_user(weekly_analysis=weekly, user_preferences=prefs, candidate_catalog=FOODS)
+
+    # Lama: isu selain protein tidak memengaruhi skor (urut harga); baru: serat >= 3 diutamakan
+    assert _ids(legacy) == [4, 3, 2, 1]
+    assert _ids(new) == [3, 4, 2, 1]
@@ -0,0 +1,54 @@
+# ai/tests/test_food_parser.py
+"""Rule parser: jumlah, satuan, kata bilangan; input ambigu / qty 0 diserahkan ke Gemini."""
+
+import pytest
+
+import core.food_parser as food_parser
+from core.food_parser import RULE_PARSER_MIN_CONFIDENCE, rule_based_parse
+
+
+def _items(text):
+    items, confidence = rule_based_parse(text)
+    return [(it["name"], it["qty"], it["unit"]) for it in items], confidence
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("2 tempe goreng dan nasi setengah porsi", [("tempe goreng", 2.0, "porsi"), ("nasi", 0.5, "porsi")]),
+    ("dua potong tahu goreng", [("tahu goreng", 2.0, "potong")]),
+    ("satu setengah piring nasi", [("nasi", 1.5, "piring")]),
+    ("sepiring nasi goreng", [("nasi goreng", 1.0, "piring")]),
+    ("1/2 porsi soto ayam", [("soto ayam", 0.5, "porsi")]),
+    ("lima butir telur rebus, teh manis", [("telur rebus", 5.0, "butir"), ("teh manis", 1.0, "porsi")]),
+    ("sepuluh sdm gula", [("gula", 10.0, "sendok")]),
+])
+def test_confident_parses(text, expected):
+    items, confidence = _items(text)
+    assert items == expected
+    assert confidence >= RULE_PARSER_MIN_CONFIDENCE
+
+
+@pytest.mark.parametrize("text", [
+    "telur 0 butir",
+    "0 porsi nasi",
+    "nasi tanpa sambal",
+    "2 tempe 3 potong",
+    "tempe 2 goreng",
+    "3",
+    "",
+])
+def test_uncertain_parses_fall_below_threshold(text):
+    _, confidence = _items(text)
+    assert confidence < RULE_PARSER_MIN_CONFIDENCE
+
+
+def test_zero_quantity_goes_to_gemini(monkeypatch):
+    calls = []
+
+    def gemini(text, default_unit="porsi"):
+        calls.append(text)
+        return [{"name": "telur", "qty": 1.0, "unit": "butir", "confidence": 0.9}]
+
+    monkeypatch.setattr(food_parser, "parse_food_text", gemini)
+    items, parser = food_parser.parse_food_text_fast("telur 0 butir")
+    assert parser == "llm" and calls == ["telur 0 butir"]
+    assert items[0]["qty"] == 1.0
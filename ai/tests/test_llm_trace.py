@@ -0,0 +1,63 @@
+# ai/tests/test_llm_trace.py
+"""Trace LLM default mati dan dibatasi ukuran / jumlah file."""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+import core.llm_trace as llm_trace
+
+from conftest import BASE_DIR
+
+MATCH = [{"food_id": 0, "nama": "Tempe Goreng", "nama_clean": "tempe goreng", "similarity": 0.8}]
+
+
+@pytest.fixture
+def trace_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_trace, "LLM_TRACE_DIR", tmp_path)
+    monkeypatch.setattr(llm_trace, "_disabled", False)
+    monkeypatch.setattr(llm_trace, "LLM_TRACE_MAX_BYTES", 1024)
+    monkeypatch.setattr(llm_trace, "LLM_TRACE_KEEP_FILES", 3)
+    return tmp_path
+
+
+def test_disabled_by_default():
+    env = {k: v for k, v in os.environ.items() if k != "LLM_TRACE"}
+    out = subprocess.run(
+        [sys.executable, "-c", "import core.llm_trace as t; print(t.LLM_TRACE_ENABLED, t._disabled)"],
+        cwd=BASE_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    assert out.stdout.split() == ["False", "True"]
+
+
+def test_rotation_bounds_disk_usage(trace_dir):
+    for i in range(200):
+        llm_trace.record(f"tempe gorengan pedas nomor {i}", ["tempe goreng"], MATCH)
+
+    files = sorted(trace_dir.glob("trace-*.jsonl"))
+    active = trace_dir / f"trace-{os.getpid()}.jsonl"
+    # File aktif + LLM_TRACE_KEEP_FILES file hasil roll
+    assert len(files) <= 1 + llm_trace.LLM_TRACE_KEEP_FILES
+    assert len([f for f in files if f != active]) == llm_trace.LLM_TRACE_KEEP_FILES
+    assert all(f.stat().st_size < 2 * llm_trace.LLM_TRACE_MAX_BYTES for f in files)
+
+    # Baris terbaru tetap terbaca oleh miner
+    sys.path.insert(0, str(BASE_DIR / "preprocess"))
+    from mine_aliases import load_traces
+
+    queries = [r["query"] for r in load_traces(files)]
+    assert "tempe gorengan pedas nomor 199" in queries
+
+
+def test_rotation_keeps_other_workers_active_file(trace_dir):
+    other = trace_dir / "trace-99999.jsonl"
+    other.write_text('{"query": "nasi putih"}\n', encoding="utf-8")
+    os.utime(other, (0, 0))  # lebih tua dari semua file hasil roll
+
+    for i in range(200):
+        llm_trace.record(f"tempe gorengan pedas nomor {i}", ["tempe goreng"], MATCH)
+
+    assert other.exists()
+    assert len(list(trace_dir.glob("trace-*-*.jsonl"))) == llm_trace.LLM_TRACE_KEEP_FILES
@@ -0,0 +1,86 @@
+# ai/tests/test_match_snapshot.py
+"""match_candidate memakai snapshot katalog request, juga saat hot reload dan di thread pool."""
+
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import core.refinement as refinement
+
+
+def _snapshot(version):
+    return SimpleNamespace(version=version, matcher=SimpleNamespace(version=version))
+
+
+@pytest.fixture
+def fake_search(monkeypatch):
+    """search_with_refinement palsu: food_id = versi matcher; versi "old" menunggu gate."""
+    gate, started = threading.Event(), threading.Event()
+
+    def search(matcher, candidate, top_n=5, mode=None):
+        if matcher.version == "old":
+            started.set()
+            gate.wait(5)
+        return {"matches": [{"food_id": matcher.version, "nama": candidate, "similarity": 0.9}],
+                "method": "direct_match", "search_terms": [candidate]}
+
+    monkeypatch.setattr(refinement, "search_with_refinement", search)
+    return SimpleNamespace(gate=gate, started=started)
+
+
+def test_flight_is_not_shared_across_catalog_versions(app_module, fake_search):
+    results = {}
+    old = threading.Thread(target=lambda: results.setdefault(
+        "old", app_module.match_candidate("tempe goreng", 3, None, _snapshot("old"))))
+    old.start()
+    assert fake_search.started.wait(5)
+
+    # Request yang dipin ke snapshot baru tidak boleh ikut flight snapshot lama
+    results["new"] = app_module.match_candidate("tempe goreng", 3, None, _snapshot("new"))
+    fake_search.gate.set()
+    old.join(5)
+
+    assert results["new"]["matches"][0]["food_id"] == "new"
+    assert results["old"]["matches"][0]["food_id"] == "old"
+
+
+def test_per_candidate_stream_uses_pinned_snapshot(app_module, fake_search, monkeypatch):
+    fake_search.gate.set()
+    # bundles.current() sudah pindah versi; request ini dipin ke "pinned"
+    monkeypatch.setattr(app_module.bundles, "current", lambda: _snapshot("reloaded"))
+    with app_module.app.test_request_context():
+        app_module.g.catalog = _snapshot("pinned")
+        results = dict(app_module.iter_match_results(["tempe goreng", "tahu goreng", "nasi putih"], 3,
+                                                     mode="per_candidate", refine_mode="off"))
+
+    assert sorted(results) == [0, 1, 2]
+    assert {r["matches"][0]["food_id"] for r in results.values()} == {"pinned"}
+
+
+def test_failing_candidate_does_not_end_stream(app_module, fake_search, monkeypatch):
+    fake_search.gate.set()
+    real = app_module.match_candidate
+
+    def flaky(candidate, *args):
+        if candidate == "tahu goreng":
+            raise RuntimeError("boom")
+        return real(candidate, *args)
+
+    monkeypatch.setattr(app_module, "match_candidate", flaky)
+    with app_module.app.test_request_context():
+        app_module.g.catalog = _snapshot("pinned")
+        results = dict(app_module.iter_match_results(["tempe goreng", "tahu goreng", "nasi putih"], 3,
+                                                     mode="per_candidate", refine_mode="off"))
+
+    assert results[1] == {"matches": [], "method": "error", "error": "boom"}
+    assert results[0]["method"] == results[2]["method"] == "direct_match"
+
+
+def test_pipeline_uses_active_snapshot(app_module):
+    import core.ai_pipeline as ai_pipeline
+    from core.bundle import get_bundle_manager
+
+    snapshot = get_bundle_manager().current()
+    assert ai_pipeline.get_matcher() is snapshot.matcher
+    assert ai_pipeline.get_nutrition_calc() is snapshot.nutrition_calc
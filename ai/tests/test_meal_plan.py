@@ -0,0 +1,68 @@
+# ai/tests/test_meal_plan.py
+"""Meal plan: total harga tidak pernah melewati budget harian, batas item / gram dipatuhi."""
+
+import numpy as np
+import pytest
+
+from core.meal_plan import MAX_GRAM_PER_FOOD
+
+PROFILE = {"group": "Perempuan", "age": 27}
+
+
+def _catalog(n=60, seed=3):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "foodId": i,
+            "name": f"makanan {i}",
+            "estimatedPrice": int(rng.integers(500, 15000)),
+            "nutrition": {
+                "Energi": float(rng.gamma(2.0, 80.0)),
+                "Protein": float(rng.gamma(2.0, 5.0)),
+                "Lemak": float(rng.gamma(2.0, 4.0)),
+                "Karbohidrat": float(rng.gamma(2.0, 12.0)),
+                "Serat": float(rng.gamma(1.5, 1.5)),
+                "Natrium": float(rng.gamma(2.0, 100.0)),
+            },
+        }
+        for i in range(n)
+    ]
+
+
+CATALOG = _catalog()
+
+
+def _plan(client, **body):
+    resp = client.post("/api/meal-plan", json={"profile": PROFILE, "candidateCatalog": CATALOG, **body})
+    assert resp.status_code == 200, resp.get_json()
+    return resp.get_json()["mealPlan"]
+
+
+@pytest.mark.parametrize("budget", [2000, 10000, 30000, 80000])
+def test_total_price_stays_under_budget(client, budget):
+    plan = _plan(client, userPreferences={"dailyBudget": budget})
+    assert plan["budget"] == budget
+    assert plan["totalPrice"] <= budget
+
+
+def test_budget_binds(client):
+    tight = _plan(client, userPreferences={"dailyBudget": 5000})
+    free = _plan(client, userPreferences={})
+    assert free["budget"] is None
+    assert free["totalPrice"] > tight["totalPrice"]
+    assert free["gap"] <= tight["gap"]
+
+
+def test_items_and_grams_are_bounded(client):
+    plan = _plan(client, userPreferences={"dailyBudget": 50000}, maxItems=3)
+    assert 0 < len(plan["items"]) <= 3
+    assert all(0 < it["grams"] <= MAX_GRAM_PER_FOOD for it in plan["items"])
+
+
+def test_avoided_foods_are_not_planned(client):
+    plan = _plan(client, userPreferences={"dailyBudget": 50000, "avoid": ["makanan"]})
+    assert plan["items"] == [] and plan["totalPrice"] == 0
+
+
+def test_missing_profile_is_rejected(client):
+    assert client.post("/api/meal-plan", json={"candidateCatalog": CATALOG}).status_code == 400
@@ -0,0 +1,117 @@
+# ai/tests/test_model_server.py
+"""Model server mencari di index bundle milik worker, bukan index saat server start."""
+
+import threading
+
+import faiss
+import numpy as np
+import pytest
+
+import core.matcher as matcher_module
+from core.bundle import Bundle, BundleError
+from core.model_server import OP_SEARCH, OP_SEARCH_VEC, ModelClient, ModelServer, ModelServerError, _Job
+
+from conftest import CATALOG_NAMES, STUB_MODEL, TMP_DIR, write_bundle
+
+
+@pytest.fixture(scope="module")
+def bundles(tmp_path_factory):
+    root = tmp_path_factory.mktemp("ms-bundles")
+    # Ukuran sama: cek jumlah baris saja tidak bisa membedakan keduanya
+    old = Bundle.open(write_bundle(CATALOG_NAMES, "v0001", bundle_dir=root, activate=False))
+    new = Bundle.open(write_bundle(list(reversed(CATALOG_NAMES)), "v0002", bundle_dir=root, activate=False))
+    return old, new
+
+
+@pytest.fixture
+def server(bundles):
+    socket_path = TMP_DIR / "model.sock"
+    server = ModelServer(socket_path, STUB_MODEL, faiss.read_index(str(bundles[0].file("index"))),
+                         max_wait_ms=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def model_client(server):
+    return ModelClient(server.server_address)
+
+
+def _top_id(index, text):
+    _, ids = index.search_texts([text], 1)
+    return ids[0][0]
+
+
+def test_index_per_bundle(bundles, model_client):
+    old, new = bundles
+    old_index, new_index = model_client.index(old), model_client.index(new)
+    assert old_index.ntotal == new_index.ntotal == len(CATALOG_NAMES)
+
+    assert _top_id(old_index, "tempe goreng") == 0
+    assert _top_id(new_index, "tempe goreng") == len(CATALOG_NAMES) - 1
+    # Index saat start tetap bisa dipakai tanpa bundle
+    assert _top_id(model_client.index(), "tempe goreng") == 0
+
+
+def test_evicted_index_is_reloaded(bundles, server, model_client):
+    old, new = bundles
+    server.max_indexes = 1
+    old_index = model_client.index(old)
+    model_client.index(new)
+    assert list(server.indexes) == [new.sha256("index")]
+
+    sims, ids = old_index.search(STUB_MODEL.encode(["nasi putih"]), 1)
+    assert ids[0][0] == CATALOG_NAMES.index("nasi putih")
+
+
+def test_checksum_mismatch_is_refused(bundles, model_client):
+    with pytest.raises(ModelServerError, match="checksum"):
+        model_client.load_index(bundles[1].file("index"), bundles[0].sha256("index"))
+    with pytest.raises(ModelServerError, match="index tidak dikenal"):
+        model_client.search(["tempe goreng"], 1, index_key="0" * 64)
+
+
+def test_matcher_uses_bundle_index(bundles, model_client, monkeypatch):
+    monkeypatch.setattr(matcher_module, "MODEL_SERVER_SOCKET", str(model_client.socket_path))
+    monkeypatch.setattr(matcher_module, "get_model_client", lambda: model_client)
+
+    matcher = matcher_module.FoodMatcher(bundles[1])
+    assert matcher.index.key == bundles[1].sha256("index")
+    assert matcher._search_single_local("tempe goreng", 1)[0]["nama_clean"] == "tempe goreng"
+
+    def unreadable(path, key):
+        raise ModelServerError(f"{path}: permission denied")
+
+    monkeypatch.setattr(model_client, "load_index", unreadable)
+    with pytest.raises(BundleError, match="model server"):
+        matcher_module.FoodMatcher(bundles[0])
+
+
+def test_wrong_vector_width_is_refused(bundles, model_client):
+    with pytest.raises(ModelServerError, match="float32"):
+        model_client.search_vectors(np.zeros((2, STUB_MODEL.dim + 1), dtype="float32"), 1)
+    # Koneksi tetap bisa dipakai setelah error
+    _, ids = model_client.search(["tempe goreng"], 1)
+    assert ids[0][0] == 0
+
+
+class _BrokenIndex:
+    def search(self, q, k):
+        raise RuntimeError("index rusak")
+
+
+def test_batch_failure_is_isolated_per_index(server):
+    batcher = server.batcher
+    vec = STUB_MODEL.encode(["tempe goreng"])
+    good = _Job(OP_SEARCH_VEC, vectors=vec, k=1)
+    bad = _Job(OP_SEARCH_VEC, vectors=vec, k=1, index=_BrokenIndex())
+    texts = _Job(OP_SEARCH, texts=["tempe goreng"], k=1)
+    batcher._run([good, bad, texts])
+
+    assert good.future.result()[1][0][0] == 0
+    assert texts.future.result()[1][0][0] == 0
+    with pytest.raises(RuntimeError, match="index rusak"):
+        bad.future.result()
@@ -0,0 +1,58 @@
+# ai/tests/test_nutrient_index.py
+"""NutrientIndex: kNN / range query di ruang nutrisi + validasi parameter (400, bukan 500)."""
+
+import pytest
+
+from core.nutrient_index import get_nutrient_index
+
+
+@pytest.fixture
+def index(app_module):
+    return get_nutrient_index(app_module.bundles.current().nutrition_calc)
+
+
+def test_knn_returns_nearest_first(index):
+    row = 3
+    target = {c: float(index.raw[row, index._col[c]]) for c in ("Protein", "Gula")}
+    hits = index.search(targets=target, k=4)
+    assert len(hits) == 4
+    assert hits[0] == (row, pytest.approx(0.0, abs=1e-3))
+    assert [d for _, d in hits] == sorted(d for _, d in hits)
+
+
+def test_ranges_filter_and_radius(index):
+    energy = index.raw[:, index._col["Energi"]]
+    limit = float(sorted(energy)[len(energy) // 2])
+    hits = index.search(ranges={"calories": [None, limit]}, k=100)
+    assert hits and all(energy[r] <= limit for r, _ in hits)
+
+    within = index.search(targets={"protein": 10}, k=100, radius=0.5)
+    assert all(d <= 0.5 + 1e-6 for _, d in within)
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"k": 0}, {"k": -3}, {"radius": -1.0}, {"radius": "0.5"}, {"radius": float("nan")}, {"radius": True},
+])
+def test_invalid_k_or_radius(index, kwargs):
+    with pytest.raises(ValueError):
+        index.search(targets={"Protein": 10}, **kwargs)
+
+
+@pytest.mark.parametrize("body", [
+    {"targets": {"protein": 10, "Protein": 12}},
+    {"targets": {"Protein": 10}, "ranges": {"sugar": [0, 5], "Gula": [1, 2]}},
+])
+def test_duplicate_aliases_rejected(index, body):
+    with pytest.raises(ValueError, match="ganda"):
+        index.search(**body)
+
+
+@pytest.mark.parametrize("body", [
+    {"targets": {"Protein": 10}, "k": 0},
+    {"targets": {"Protein": 10}, "k": None},
+    {"targets": {"Protein": 10}, "radius": "jauh"},
+    {"targets": {"fat": 5, "lemak": 6}},
+])
+def test_endpoint_returns_400(client, body):
+    resp = client.post("/api/nutrient-search", json=body)
+    assert resp.status_code == 400, resp.get_json()
@@ -0,0 +1,96 @@
+# ai/tests/test_recommendation_cache.py
+"""Cache rekomendasi: TTL sampai tengah malam lokal, invalidasi per user, dan ukuran terbatas."""
+
+import json
+
+import pytest
+
+import core.recommendation_cache as reco_cache
+from core.recommendation_cache import InProcessBackend, RecommendationCache, local_day
+
+# 2024-05-01 23:00 WIB
+LATE_EVENING = 1714579200.0
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock(LATE_EVENING)
+    monkeypatch.setattr(reco_cache.time, "time", clock)
+    return clock
+
+
+def _cache(max_entries=100):
+    return RecommendationCache(InProcessBackend(max_entries))
+
+
+def _compute(counter):
+    def compute():
+        counter.append(1)
+        return {"n": len(counter)}
+    return compute
+
+
+def test_ttl_ends_at_local_midnight():
+    assert local_day("Asia/Jakarta", now=LATE_EVENING) == ("2024-05-01", 3600)
+    # Offset menit: di WITA (+480) hari berikutnya baru mulai, TTL satu hari penuh
+    assert local_day(offset_minutes=480, now=LATE_EVENING) == ("2024-05-02", 24 * 3600)
+
+
+def test_entry_expires_with_the_day(clock):
+    cache, calls = _cache(), []
+    assert cache.get_or_compute("u1", ({"a": 1},), _compute(calls))[1] is False
+    assert cache.get_or_compute("u1", ({"a": 1},), _compute(calls)) == (json.dumps({"n": 1}), True)
+
+    clock.now += 3600
+    assert cache.get_or_compute("u1", ({"a": 1},), _compute(calls))[1] is False
+    assert len(calls) == 2
+
+
+def test_changed_input_and_invalidate_miss(clock):
+    cache, calls = _cache(), []
+    cache.get_or_compute("u1", ({"a": 1},), _compute(calls))
+    cache.get_or_compute("u2", ({"a": 1},), _compute(calls))
+    assert cache.get_or_compute("u1", ({"a": 2},), _compute(calls))[1] is False
+
+    assert cache.invalidate("u1") == 1
+    assert cache.get_or_compute("u1", ({"a": 1},), _compute(calls))[1] is False
+    assert cache.get_or_compute("u2", ({"a": 1},), _compute(calls))[1] is True
+
+    cache.invalidate_all()
+    assert cache.get_or_compute("u2", ({"a": 1},), _compute(calls))[1] is False
+
+
+def test_version_counters_are_bounded(clock):
+    backend = InProcessBackend(max_entries=10)
+    cache = RecommendationCache(backend)
+    for i in range(100):
+        cache.invalidate(f"user-{i}")
+    assert backend.size() == 10
+
+
+def test_expired_version_does_not_revive_old_entries(clock):
+    cache, calls = _cache(), []
+    cache.get_or_compute("u1", ({"a": 1},), _compute(calls))
+    cache.invalidate("u1")
+
+    clock.now += reco_cache.VERSION_TTL + 1
+    assert cache.backend.get_counter(cache._version_key("u1"), reco_cache.VERSION_TTL) == 0
+    # Versi kembali 0, tapi entry v0 lama sudah kedaluwarsa (TTL <= 1 hari)
+    assert cache.get_or_compute("u1", ({"a": 1},), _compute(calls))[1] is False
+    assert len(calls) == 2
+
+
+def test_reading_version_extends_its_ttl(clock):
+    cache = _cache()
+    cache.invalidate("u1")
+    for _ in range(3):
+        clock.now += reco_cache.VERSION_TTL - 10
+        assert cache.backend.get_counter(cache._version_key("u1"), reco_cache.VERSION_TTL) == 1
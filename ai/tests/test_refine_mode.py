@@ -0,0 +1,74 @@
+# ai/tests/test_refine_mode.py
+"""LLM_REFINE_MODE=off harus berlaku untuk semua jalur /api/match-foods, bukan hanya per_candidate."""
+
+import json
+
+import pytest
+
+import core.refinement as refinement
+
+# Token asing untuk stub model: skor direct search jauh di bawah SCORE_THRESHOLD
+LOW_SCORE_TEXT = "zwieback dan quinoa"
+
+
+@pytest.fixture
+def gemini_calls(monkeypatch):
+    calls = []
+
+    def single(text, cancel_event=None):
+        calls.append(text)
+        return ["tempe goreng"]
+
+    def batch(texts):
+        calls.append(list(texts))
+        return [["tempe goreng"] for _ in texts]
+
+    monkeypatch.setattr(refinement, "generate_food_candidates", single)
+    monkeypatch.setattr(refinement, "generate_food_candidates_batch", batch)
+    monkeypatch.setattr(refinement, "get_reranker", lambda: pytest.fail("reranker dipanggil"))
+    return calls
+
+
+def _stream(client, body):
+    resp = client.post("/api/match-foods", json={**body, "stream": True})
+    assert resp.status_code == 200
+    return [json.loads(line) for line in resp.get_data(as_text=True).splitlines() if line]
+
+
+@pytest.mark.parametrize("mode", ["batched", "per_candidate"])
+def test_global_off_skips_gemini(client, gemini_calls, monkeypatch, mode):
+    monkeypatch.setattr(refinement, "REFINE_MODE", "off")
+
+    resp = client.post("/api/match-foods", json={"text": LOW_SCORE_TEXT, "mode": mode})
+    assert resp.status_code == 200
+    assert [r["method"] for r in resp.get_json()] == ["direct_match", "direct_match"]
+
+    events = _stream(client, {"text": LOW_SCORE_TEXT, "mode": mode})
+    assert [e["method"] for e in events if e["type"] == "match"] == ["direct_match", "direct_match"]
+    assert gemini_calls == []
+
+
+def test_request_mode_overrides_global_off(client, gemini_calls, monkeypatch):
+    monkeypatch.setattr(refinement, "REFINE_MODE", "off")
+    monkeypatch.setattr(refinement, "get_reranker", lambda: None)
+
+    resp = client.post("/api/match-foods", json={"text": LOW_SCORE_TEXT, "refineMode": "sequential"})
+    assert resp.status_code == 200
+    assert {r["method"] for r in resp.get_json()} == {"llm_enhanced"}
+    assert len(gemini_calls) == 1  # batched: satu prompt untuk semua kandidat
+
+
+def test_default_mode_still_refines(client, gemini_calls, monkeypatch):
+    monkeypatch.setattr(refinement, "REFINE_MODE", "sequential")
+    monkeypatch.setattr(refinement, "get_reranker", lambda: None)
+
+    resp = client.post("/api/match-foods", json={"text": LOW_SCORE_TEXT})
+    assert {r["method"] for r in resp.get_json()} == {"llm_enhanced"}
+    assert gemini_calls
+
+
+def test_resolve_refine_mode(monkeypatch):
+    monkeypatch.setattr(refinement, "REFINE_MODE", "off")
+    assert refinement.resolve_refine_mode(None) == "off"
+    assert refinement.resolve_refine_mode("Eager") == "eager"
+    assert refinement.resolve_refine_mode("bogus") == "off"
@@ -0,0 +1,62 @@
+# ai/tests/test_reranker.py
+"""Reranker menambah rerank_score; similarity tetap skor FAISS."""
+
+import pytest
+
+from core.reranker import Reranker
+
+from conftest import CATALOG_NAMES
+
+
+class FakeCrossEncoder:
+    def __init__(self, scores):
+        self.scores = scores
+
+    def predict(self, pairs, **kwargs):
+        return [self.scores.get(name.lower(), 0.1) for _, name in pairs]
+
+
+def _reranker(scores, accept_score=0.6):
+    rr = Reranker.__new__(Reranker)
+    rr.model_name = "fake"
+    rr.accept_score = accept_score
+    rr.min_margin = 0
+    rr.model = FakeCrossEncoder(scores)
+    return rr
+
+
+def _pool(names, sims):
+    return [{"food_id": CATALOG_NAMES.index(n), "nama": n.title(), "nama_clean": n, "similarity": s}
+            for n, s in zip(names, sims)]
+
+
+POOL = _pool(["tahu goreng", "tempe goreng", "tempe bacem"], [0.46, 0.44, 0.41])
+
+
+def test_rerank_keeps_faiss_similarity():
+    rr = _reranker({"tempe goreng": 0.97, "tempe bacem": 0.5})
+    matches, confident = rr.rerank("tempe gorengan", POOL, top_n=3)
+
+    assert confident
+    assert [m["nama_clean"] for m in matches] == ["tempe goreng", "tempe bacem", "tahu goreng"]
+    assert [m["similarity"] for m in matches] == [0.44, 0.41, 0.46]
+    assert [m["rerank_score"] for m in matches] == pytest.approx([0.97, 0.5, 0.1])
+
+
+def test_confidence_uses_rerank_score():
+    rr = _reranker({"tempe goreng": 0.55})
+    [(_, confident)] = rr.rerank_many(["tempe gorengan"], [POOL], top_n=3)
+    assert not confident
+
+
+def test_reranked_matches_do_not_trigger_exact_match(app_module):
+    rr = _reranker({"tempe goreng": 0.97, "tempe bacem": 0.5})
+    matches, _ = rr.rerank("tempe gorengan", POOL, top_n=3)
+
+    nutrition = app_module.get_nutrition_calc().get_nutrition_smart(matches, 1, "porsi")
+    assert nutrition["metode"] == "average"
+
+    formatted = app_module.format_matches(matches)
+    assert formatted[0] == {"food_id": CATALOG_NAMES.index("tempe goreng"), "nama": "Tempe Goreng",
+                            "similarity": 0.44, "rerankScore": 0.97}
+    assert [m["nama"] for m in formatted] == ["Tempe Goreng", "Tempe Bacem", "Tahu Goreng"]
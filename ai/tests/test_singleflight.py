@@ -0,0 +1,170 @@
+# ai/tests/test_singleflight.py
+"""SingleFlight: request identik digabung; flight yang dibatalkan tidak bocor ke caller lain."""
+
+import threading
+
+import pytest
+
+from core.singleflight import SingleFlight
+
+TIMEOUT = 5
+
+
+def _start(target, *args):
+    thread = threading.Thread(target=target, args=args, daemon=True)
+    thread.start()
+    return thread
+
+
+def _wait_waiters(flight, key, n):
+    """Tunggu sampai n follower sudah bergabung ke flight key."""
+    for _ in range(TIMEOUT * 1000):
+        with flight._lock:
+            call = flight._calls.get(key)
+            if call is not None and call.waiters >= n:
+                return
+        threading.Event().wait(0.001)
+    raise AssertionError(f"{n} follower tidak bergabung")
+
+
+def _wait_for_flight(flight, key):
+    for _ in range(TIMEOUT * 1000):
+        with flight._lock:
+            if key in flight._calls:
+                return
+        threading.Event().wait(0.001)
+    raise AssertionError("flight tidak dimulai")
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight("test-share", enabled=True)
+    release = threading.Event()
+    calls = []
+
+    def fn(x):
+        calls.append(x)
+        release.wait(TIMEOUT)
+        return x * 2
+
+    results = []
+    threads = [_start(lambda: results.append(flight.do("k", fn, 21))) for _ in range(5)]
+    _wait_waiters(flight, "k", 4)
+    release.set()
+    for t in threads:
+        t.join(TIMEOUT)
+
+    assert calls == [21]
+    assert sorted(results) == [(42, False)] + [(42, True)] * 4
+    assert flight.stats()["executions"] == 1 and flight.stats()["inFlight"] == 0
+
+
+def test_error_reaches_every_follower():
+    flight = SingleFlight("test-error", enabled=True)
+    release = threading.Event()
+
+    def fn():
+        release.wait(TIMEOUT)
+        raise ValueError("gagal")
+
+    errors = []
+
+    def caller():
+        try:
+            flight.do("k", fn)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [_start(caller) for _ in range(3)]
+    _wait_waiters(flight, "k", 2)
+    release.set()
+    for t in threads:
+        t.join(TIMEOUT)
+
+    assert len(errors) == 3 and len({id(e) for e in errors}) == 1
+    # Flight selesai -> key dilepas, call berikutnya dieksekusi ulang
+    with pytest.raises(ValueError):
+        flight.do("k", fn)
+    assert flight.stats()["executions"] == 2
+
+
+def _cancellable_fn(observed, proceed, executions):
+    def fn(cancel_event=None):
+        executions.append(cancel_event)
+        if cancel_event is not None and cancel_event.is_set():
+            observed.set()
+            proceed.wait(TIMEOUT)
+            return []
+        return ["hasil"]
+    return fn
+
+
+def test_follower_without_cancel_event_reexecutes_cancelled_flight():
+    flight = SingleFlight("test-cancel", enabled=True)
+    observed, proceed = threading.Event(), threading.Event()
+    executions = []
+    fn = _cancellable_fn(observed, proceed, executions)
+
+    cancelled = threading.Event()
+    cancelled.set()
+    leader_result = []
+    leader = _start(lambda: leader_result.append(flight.do("k", fn, cancel_event=cancelled)))
+    assert observed.wait(TIMEOUT)
+
+    # Bergabung SETELAH fn melihat token batal: caller ini masih butuh hasil
+    follower_result = []
+    follower = _start(lambda: follower_result.append(flight.do("k", fn)))
+    _wait_waiters(flight, "k", 1)
+    proceed.set()
+    leader.join(TIMEOUT)
+    follower.join(TIMEOUT)
+
+    assert leader_result == [([], False)]
+    assert follower_result == [(["hasil"], False)]
+    assert len(executions) == 2 and executions[1] is None
+    assert flight.stats()["cancelledRetries"] == 1
+
+
+def test_cancelled_follower_accepts_cancelled_result():
+    flight = SingleFlight("test-cancel-all", enabled=True)
+    observed, proceed = threading.Event(), threading.Event()
+    executions = []
+    fn = _cancellable_fn(observed, proceed, executions)
+
+    cancelled = threading.Event()
+    cancelled.set()
+    results = []
+    leader = _start(lambda: results.append(flight.do("k", fn, cancel_event=cancelled)))
+    assert observed.wait(TIMEOUT)
+    follower = _start(lambda: results.append(flight.do("k", fn, cancel_event=cancelled)))
+    _wait_waiters(flight, "k", 1)
+    proceed.set()
+    leader.join(TIMEOUT)
+    follower.join(TIMEOUT)
+
+    assert sorted(results) == [([], False), ([], True)]
+    assert len(executions) == 1 and flight.stats()["cancelledRetries"] == 0
+
+
+def test_one_live_participant_keeps_flight_running():
+    flight = SingleFlight("test-live", enabled=True)
+    release = threading.Event()
+    seen = []
+
+    def fn(cancel_event=None):
+        release.wait(TIMEOUT)
+        seen.append(cancel_event.is_set())
+        return "ok"
+
+    cancelled, live = threading.Event(), threading.Event()
+    cancelled.set()
+    results = []
+    leader = _start(lambda: results.append(flight.do("k", fn, cancel_event=cancelled)))
+    _wait_for_flight(flight, "k")
+    follower = _start(lambda: results.append(flight.do("k", fn, cancel_event=live)))
+    _wait_waiters(flight, "k", 1)
+    release.set()
+    leader.join(TIMEOUT)
+    follower.join(TIMEOUT)
+
+    assert seen == [False]
+    assert sorted(results) == [("ok", False), ("ok", True)]
@@ -0,0 +1,118 @@
+# ai/tests/test_spell_gating.py
+"""Koreksi ejaan hanya dipakai jika query asli lemah dan hasil koreksinya lebih baik."""
+
+import os
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+
+import core.query_rewrite as query_rewrite
+import core.refinement as refinement
+from core.matcher import FoodMatcher
+from core.spell import SpellIndex
+
+from conftest import BASE_DIR, write_bundle
+
+# Kata makanan valid yang tidak ada di katalog -> koreksi SymSpell ke kata katalog yang mirip
+VALID_FOOD_QUERIES = {
+    "salad buah": "salak buah",
+    "ramen": "rames",
+    "teh tarik": "teh arik",
+}
+TYPO_QUERY = ("ayem gorng", "ayam goreng")
+
+
+@pytest.fixture(scope="module")
+def spell_index(tmp_path_factory):
+    """Spell index dari katalog asli (data/data pangan bersih.parquet) lewat builder-nya."""
+    root = tmp_path_factory.mktemp("spell")
+    names = pd.read_parquet(BASE_DIR / "data" / "data pangan bersih.parquet")["nama_clean"].astype(str).tolist()
+    write_bundle(names, "v0001", bundle_dir=root / "bundles")
+    subprocess.run(
+        [sys.executable, str(BASE_DIR / "preprocess" / "build_spell_index.py"), "--out-dir", str(root / "index")],
+        check=True, capture_output=True, env={**os.environ, "BUNDLE_DIR": str(root / "bundles")},
+    )
+    return SpellIndex(root / "index")
+
+
+@pytest.fixture(autouse=True)
+def use_spell_index(spell_index, monkeypatch):
+    monkeypatch.setattr(query_rewrite, "get_spell_index", lambda: spell_index)
+    monkeypatch.setattr(query_rewrite, "get_query_rewriter", lambda: None)
+
+
+class ScoredMatcher:
+    """FoodMatcher palsu: skor top-1 per teks ditentukan test (default 0.3)."""
+
+    def __init__(self, scores):
+        self.scores = scores
+        self.searched = []
+
+    def search_many(self, texts, k=5):
+        self.searched.append(list(texts))
+        return [[{"food_id": i, "nama_clean": t, "similarity": self.scores.get(t, 0.3)}]
+                for i, t in enumerate(texts)]
+
+    aggregate_results = staticmethod(FoodMatcher.aggregate_results)
+
+    def model_warming(self):
+        return False
+
+    def has_cached_query(self, text):
+        return False
+
+    def vocabulary(self):
+        return None
+
+
+def test_symspell_alone_rewrites_valid_food_words(spell_index):
+    for query, corrected in VALID_FOOD_QUERIES.items():
+        assert spell_index.correct(query) == corrected
+    assert spell_index.correct(TYPO_QUERY[0]) == TYPO_QUERY[1]
+
+
+@pytest.mark.parametrize("query", list(VALID_FOOD_QUERIES))
+def test_confident_query_is_not_corrected(query):
+    corrected = VALID_FOOD_QUERIES[query]
+    matcher = ScoredMatcher({query: 0.72, corrected: 0.95})
+
+    pools, queries, chosen = refinement.search_spell_checked(matcher, [query])
+    assert queries == [query] and chosen == set()
+    assert pools[0][0]["nama_clean"] == query
+    # Satu batch search: query asli + koreksinya
+    assert matcher.searched == [[query, corrected]]
+
+
+@pytest.mark.parametrize("query", list(VALID_FOOD_QUERIES))
+def test_weak_query_keeps_original_when_correction_is_not_better(query):
+    corrected = VALID_FOOD_QUERIES[query]
+    matcher = ScoredMatcher({query: 0.42, corrected: 0.42})
+
+    _, queries, chosen = refinement.search_spell_checked(matcher, [query])
+    assert queries == [query] and chosen == set()
+
+
+def test_typo_is_corrected_when_it_scores_higher():
+    typo, corrected = TYPO_QUERY
+    matcher = ScoredMatcher({typo: 0.31, corrected: 0.93})
+
+    pools, queries, chosen = refinement.search_spell_checked(matcher, ["nasi putih", typo])
+    assert queries == ["nasi putih", corrected] and chosen == {1}
+    assert pools[1][0]["nama_clean"] == corrected
+
+
+@pytest.mark.parametrize("mode", ["single", "batched"])
+def test_refinement_methods(mode):
+    typo, corrected = TYPO_QUERY
+    matcher = ScoredMatcher({"salad buah": 0.64, "salak buah": 0.9, typo: 0.31, corrected: 0.93})
+    candidates = ["salad buah", typo]
+
+    if mode == "single":
+        results = [refinement.search_with_refinement(matcher, c, mode="off") for c in candidates]
+    else:
+        results = refinement.match_candidates_batched(matcher, candidates, allow_llm=False)
+
+    assert [r["method"] for r in results] == ["direct_match", "query_rewrite"]
+    assert [r["search_terms"] for r in results] == [["salad buah"], [corrected]]
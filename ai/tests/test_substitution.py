@@ -0,0 +1,87 @@
+# ai/tests/test_substitution.py
+"""Filter substitusi: lower / higher relatif ke makanan asal, minDeltaPct, minSimilarity, k."""
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.substitution import SubstitutionGraph
+
+# food 0 = asal; tetangga 1..4 urut similarity menurun
+FOODS = [
+    ("Tempe Goreng", {"Gula": 2.0, "Protein": 10.0, "Lemak Total": 20.0, "Serat": 0.0}),
+    ("Tempe Kukus", {"Gula": 1.0, "Protein": 12.0, "Lemak Total": 8.0, "Serat": 1.0}),
+    ("Tempe Bacem", {"Gula": 9.0, "Protein": 11.0, "Lemak Total": 10.0, "Serat": 0.0}),
+    ("Tahu Goreng", {"Gula": 1.9, "Protein": 9.0, "Lemak Total": 18.0, "Serat": 0.5}),
+    ("Tahu Rebus", {"Gula": 0.5, "Protein": 8.0, "Lemak Total": 4.0, "Serat": 0.0}),
+]
+SIMS = [0.95, 0.9, 0.8, 0.6]
+
+
+@pytest.fixture(scope="module")
+def graph(tmp_path_factory):
+    root = tmp_path_factory.mktemp("knn")
+    df = pd.DataFrame([{"Nama Bahan Makanan": n, "Mentah/Olahan": "Olahan", **v} for n, v in FOODS])
+    df.to_parquet(root / "catalog.parquet")
+    # Hanya food 0 yang punya tetangga
+    np.save(root / "indptr.npy", np.array([0, 4, 4, 4, 4, 4], dtype=np.int64))
+    np.save(root / "indices.npy", np.array([1, 2, 3, 4], dtype=np.int32))
+    np.save(root / "sims.npy", np.array(SIMS, dtype=np.float16))
+    with open(root / "meta.json", "w", encoding="utf-8") as f:
+        json.dump({"n": len(FOODS), "neighbors": 4}, f)
+    return SubstitutionGraph(root, catalog_path=root / "catalog.parquet")
+
+
+def _ids(result):
+    return [s["foodId"] for s in result["substitutes"]]
+
+
+def test_no_filter_returns_neighbors_in_order(graph):
+    result = graph.substitutes(0)
+    assert _ids(result) == [1, 2, 3, 4]
+    assert [s["similarity"] for s in result["substitutes"]] == pytest.approx(SIMS, abs=1e-3)
+    assert result["substitutes"][0]["delta"]["Lemak Total"] == -12.0
+
+
+def test_lower_and_higher(graph):
+    assert _ids(graph.substitutes(0, lower=["Gula"])) == [1, 3, 4]
+    assert _ids(graph.substitutes(0, lower=["Gula"], higher=["Protein"])) == [1]
+    # Alias nutrisi
+    assert _ids(graph.substitutes(0, lower=["sugar", "fat"])) == [1, 3, 4]
+
+
+def test_higher_from_zero_source(graph):
+    assert _ids(graph.substitutes(0, higher=["Serat"])) == [1, 3]
+
+
+def test_min_delta_pct(graph):
+    # Tahu Goreng hanya 5% lebih rendah gulanya
+    assert _ids(graph.substitutes(0, lower=["Gula"], min_delta_pct=0.1)) == [1, 4]
+
+
+def test_min_similarity_and_k(graph):
+    assert _ids(graph.substitutes(0, min_similarity=0.85)) == [1, 2]
+    assert _ids(graph.substitutes(0, lower=["Gula"], k=2)) == [1, 3]
+
+
+def test_unknown_nutrient_and_food(graph):
+    with pytest.raises(ValueError, match="tidak dikenal"):
+        graph.substitutes(0, lower=["Vitamin Z"])
+    with pytest.raises(KeyError):
+        graph.substitutes(len(FOODS))
+    assert graph.substitutes(1)["substitutes"] == []
+
+
+def test_endpoint_parses_filters(client, graph, monkeypatch):
+    import core.substitution as substitution
+
+    monkeypatch.setattr(substitution, "get_substitution_graph", lambda: graph)
+    resp = client.get("/api/foods/0/substitutes?lower=Gula,fat&higher=Protein&minSimilarity=0.5")
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert body["filters"]["lower"] == ["Gula", "Lemak Total"] and _ids(body) == [1]
+
+    assert client.get("/api/foods/0/substitutes?lower=Vitamin+Z").status_code == 400
+    assert client.get(f"/api/foods/{len(FOODS)}/substitutes").status_code == 404
@@ -0,0 +1,77 @@
+# ai/tests/test_user_shortcuts.py
+"""Shortcut user: confirm -> dijawab langsung, hanya untuk versi katalog snapshot request."""
+
+from types import SimpleNamespace
+
+import pytest
+from flask import g
+
+from core.bundle import get_bundle_manager
+from core.user_shortcuts import get_user_shortcuts
+
+from conftest import CATALOG_NAMES, write_bundle
+
+FOOD_ID = CATALOG_NAMES.index("tempe bacem")
+
+
+def _confirm(client, user_id, **body):
+    return client.post("/api/shortcuts/confirm",
+                       json={"userId": user_id, "text": "2 potong tempe bacem", "foodId": FOOD_ID, **body})
+
+
+def _match(client, user_id, text="tempe bacem"):
+    resp = client.post("/api/match-foods", json={"text": text, "userId": user_id, "refineMode": "off"})
+    assert resp.status_code == 200
+    return resp.get_json()[0]
+
+
+def test_confirmed_phrase_is_answered_from_shortcut(client):
+    resp = _confirm(client, "sc-1")
+    assert resp.status_code == 200
+    assert resp.get_json()["phrase"] == "tempe bacem"
+
+    result = _match(client, "sc-1", "3 potong tempe bacem")
+    assert result["method"] == "user_shortcut"
+    assert result["match_result"][0]["food_id"] == FOOD_ID
+    # Jumlah dari input menang atas porsi yang tersimpan
+    assert result["portion"] == {"quantity": 3.0, "unit": "potong"}
+    assert _match(client, "sc-other")["method"] != "user_shortcut"
+
+
+@pytest.mark.parametrize("food_id", [True, False, -1, len(CATALOG_NAMES), "3", 1.0])
+def test_invalid_food_id_is_rejected(client, food_id):
+    resp = _confirm(client, "sc-2", foodId=food_id)
+    assert resp.status_code == 400
+    assert "Unknown foodId" in resp.get_json()["error"]
+
+
+def test_missing_fields_are_rejected(client):
+    resp = client.post("/api/shortcuts/confirm", json={"userId": "sc-3", "text": "tempe bacem"})
+    assert resp.status_code == 400
+
+
+def test_lookup_uses_request_snapshot_version(app_module):
+    store = get_user_shortcuts()
+    store.confirm("sc-4", "tempe bacem", FOOD_ID, "Tempe Bacem", "pinned")
+    with app_module.app.test_request_context():
+        # Bundle aktif tetap v0001; request ini sudah memegang snapshot lain
+        g.catalog = SimpleNamespace(version="pinned")
+        assert app_module.lookup_shortcuts("sc-4", ["tempe bacem"])[0]["matches"][0]["food_id"] == FOOD_ID
+    with app_module.app.test_request_context():
+        assert app_module.lookup_shortcuts("sc-4", ["tempe bacem"]) == {}
+
+
+def test_shortcut_from_previous_catalog_is_ignored(client, app_module):
+    assert _confirm(client, "sc-5").status_code == 200
+    manager = get_bundle_manager()
+    write_bundle(list(reversed(CATALOG_NAMES)), "v0048", activate=False)
+    stale = get_user_shortcuts().stale
+    try:
+        manager.reload("v0048")
+        app_module._invalidate_catalog_caches(manager.current())
+        result = _match(client, "sc-5")
+        assert result["method"] != "user_shortcut"
+        assert get_user_shortcuts().stale == stale + 1
+    finally:
+        manager.reload("v0001")
+        app_module._invalidate_catalog_caches(manager.current())
@@ -8,7 +8,7 @@ import {
 } from "@/hooks/useFoodLogs";
 import { useNutritionAnalysis } from "@/hooks/useNutritionAnalysis";
 import { useProfile } from "@/hooks/useProfile";
-import { matchFoods, VerifiedFood } from "@/services/food-matcher.service";
+import { matchFoodsStream, VerifiedFood } from "@/services/food-matcher.service";
 import { MatchResult, Meal } from "@/types";
 import {
   NutritionAnalysisResponse,
@@ -254,7 +254,15 @@ const DashboardContent: React.FC = () => {
     setIsProcessing(true);
     setLastRawInput(input);
     try {
-      const results = await matchFoods(input);
+      // Modal verifikasi dibuka begitu daftar kandidat datang,
+      // hasil tiap kandidat mengisi baris masing-masing saat siap
+      const results = await matchFoodsStream(input, (partial) => {
+        setMatchResults(partial);
+        if (partial.length > 0) {
+          setCurrentStep("verify");
+          setIsProcessing(false);
+        }
+      });
       setMatchResults(results);
       setCurrentStep("verify");
     } catch (err) {
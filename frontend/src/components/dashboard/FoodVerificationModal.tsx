@@ -48,6 +48,26 @@ const FoodVerificationModal: React.FC<FoodVerificationModalProps> = ({
   } | null>(null);
   const addButtonRef = useRef<HTMLButtonElement | null>(null);
 
+  // Stream: isi baris yang masih kosong begitu hasil kandidatnya datang
+  useEffect(() => {
+    setSelections((prev) =>
+      prev.map((s) => {
+        if (s.selectedFoodId !== 0) return s;
+        const match = matchResults.find(
+          (m) => m.candidate === s.candidate && !m.pending
+        );
+        const best = match?.match_result[0];
+        return best
+          ? { ...s, selectedFoodId: best.food_id, selectedName: best.nama }
+          : s;
+      })
+    );
+  }, [matchResults]);
+
+  const isPending = (candidate: string) =>
+    matchResults.some((m) => m.candidate === candidate && m.pending);
+  const anyPending = matchResults.some((m) => m.pending);
+
   useEffect(() => {
     const t = window.setTimeout(() => setVisible(true), 10);
     return () => clearTimeout(t);
@@ -286,7 +306,13 @@ const FoodVerificationModal: React.FC<FoodVerificationModalProps> = ({
                   className="w-full flex items-center justify-between bg-white dark:bg-gray-900 border border-gray-200 dark:border-gray-700 rounded-lg px-3 py-2 text-left"
                 >
                   <span className="font-medium dark:text-white">
-                    {sel.selectedName}
+                    {sel.selectedFoodId === 0 && isPending(sel.candidate) ? (
+                      <span className="text-gray-400 animate-pulse">
+                        Mencari...
+                      </span>
+                    ) : (
+                      sel.selectedName
+                    )}
                   </span>
                   <ChevronDown className="w-4 h-4 text-gray-400" />
                 </button>
@@ -397,7 +423,7 @@ const FoodVerificationModal: React.FC<FoodVerificationModalProps> = ({
           </button>
           <button
             onClick={handleConfirm}
-            disabled={selections.length === 0}
+            disabled={selections.length === 0 || anyPending}
             className="flex-1 py-3 bg-emerald-600 hover:bg-emerald-700 text-white rounded-xl font-bold flex items-center justify-center gap-2 disabled:opacity-50 transition"
           >
             <Check className="w-4 h-4" /> Konfirmasi
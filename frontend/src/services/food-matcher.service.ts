@@ -49,6 +49,8 @@ export interface VerifiedFood {
   unit: string;
 }
 
+const MATCH_FOODS_URL = "https://jakij4ki-nutrimori-api.hf.space/api/match-foods";
+
 /**
  * Match natural language input to food candidates
  * Replace this implementation with real AI later
@@ -56,7 +58,7 @@ export interface VerifiedFood {
 export async function matchFoods(input: string): Promise<MatchResult[]> {
   try {
     const response = await fetch(
-      "https://jakij4ki-nutrimori-api.hf.space/api/match-foods",
+      MATCH_FOODS_URL,
       {
         method: "POST",
         headers: {
@@ -87,6 +89,93 @@ export async function matchFoods(input: string): Promise<MatchResult[]> {
   }
 }
 
+type MatchStreamEvent =
+  | { type: "candidates"; candidates: string[] }
+  | ({ type: "match"; index: number } & MatchResult)
+  | { type: "summary"; count: number };
+
+/**
+ * Streaming version of matchFoods: backend sends NDJSON, one event per line
+ * (candidates -> match per index as soon as it is ready -> summary).
+ * onUpdate is called with the full list (pending items included) after every event.
+ */
+export async function matchFoodsStream(
+  input: string,
+  onUpdate?: (results: MatchResult[]) => void
+): Promise<MatchResult[]> {
+  let results: MatchResult[] = [];
+  const emit = () => onUpdate?.([...results]);
+
+  try {
+    const response = await fetch(MATCH_FOODS_URL, {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+        Accept: "application/x-ndjson",
+      },
+      body: JSON.stringify({ text: input, stream: true }),
+    });
+
+    if (!response.ok) {
+      console.error("Match foods stream API error:", response.status);
+      return [];
+    }
+
+    // Backend lama tanpa dukungan stream -> array JSON biasa
+    if (
+      !response.body ||
+      !response.headers.get("Content-Type")?.includes("ndjson")
+    ) {
+      const result = await response.json();
+      results = Array.isArray(result) ? result : [];
+      emit();
+      return results;
+    }
+
+    const handleEvent = (event: MatchStreamEvent) => {
+      if (event.type === "candidates") {
+        results = event.candidates.map((candidate) => ({
+          candidate,
+          match_result: [],
+          pending: true,
+        }));
+      } else if (event.type === "match") {
+        results[event.index] = {
+          candidate: event.candidate,
+          match_result: event.match_result ?? [],
+        };
+      } else {
+        return;
+      }
+      emit();
+    };
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    for (;;) {
+      const { done, value } = await reader.read();
+      buffer += decoder.decode(value, { stream: !done });
+      const lines = buffer.split("\n");
+      buffer = done ? "" : lines.pop() ?? "";
+      for (const line of lines) {
+        if (line.trim()) handleEvent(JSON.parse(line));
+      }
+      if (done) break;
+    }
+
+    // Kandidat yang tidak pernah dikirim (stream terputus) -> tanpa hasil
+    results = results.map((r) => ({ ...r, pending: false }));
+    emit();
+    return results;
+  } catch (error) {
+    console.error("Failed to stream match foods:", error);
+    results = results.map((r) => ({ ...r, pending: false }));
+    emit();
+    return results;
+  }
+}
+
 /**
  * Search foods for autocomplete via backend API
  */
@@ -32,6 +32,8 @@ export type MatchResult = {
     nama: string;
     similarity: number;
   }[];
+  // true selama hasil kandidat ini belum datang dari stream
+  pending?: boolean;
 };
 export interface Meal {
   id: string;